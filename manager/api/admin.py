@@ -32,9 +32,12 @@ from django.contrib import admin
 from api.models import (
     ConfigFile,
     ControlLocation,
+    EmailOutboxEntry,
     EmergencyContact,
     ImageTag,
+    JiraOutboxEntry,
     ScriptConfiguration,
+    Task,
     Token,
 )
 
@@ -55,4 +58,7 @@ admin.site.register(EmergencyContact)
 admin.site.register(ImageTag)
 admin.site.register(ControlLocation, ControlLocationAdmin)
 admin.site.register(ScriptConfiguration)
+admin.site.register(JiraOutboxEntry)
+admin.site.register(EmailOutboxEntry)
+admin.site.register(Task)
 # admin.site.register(Permission)
@@ -0,0 +1,105 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Management utility to benchmark the time service against astropy."""
+
+import timeit
+
+from astropy.time import Time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from manager import time_service
+
+
+def get_times_with_astropy():
+    """Return the time measures computed with astropy,
+    as `manager.utils.get_times` did before the time service."""
+    t = Time.now()
+    return {
+        "mjd": t.mjd,
+        "sidereal_summit": t.sidereal_time("apparent", longitude=-70.749417, model=None).value,
+        "sidereal_greenwich": t.sidereal_time("apparent", longitude="greenwich", model=None).value,
+    }
+
+
+class Command(BaseCommand):
+    """Django command to time `manager.time_service.get_times`
+    against the same measures computed with astropy.
+
+    The time service is timed without memoization, so every call
+    computes the measures. The timings depend on the machine,
+    so nothing is asserted, they are only printed.
+    """
+
+    help = "Time the time service against astropy, without memoization."
+
+    def add_arguments(self, parser):
+        """Add arguments for the command.
+
+        Params
+        ------
+        parser: object
+            parser for the arguments
+        """
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=200,
+            help="Number of calls to the time service in each repetition.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of repetitions, the fastest one is reported.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command, which prints the duration of a call
+        to the time service and to astropy.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with additional
+            keyword arguments (indexed by keys in the dict)
+        """
+        number = options["number"]
+        repeat = options["repeat"]
+        # Astropy is much slower, so it is called less times
+        astropy_number = max(1, number // 10)
+        with override_settings(TIME_SERVICE_RESOLUTION=0):
+            # Load the astropy tables and warm up the time service
+            get_times_with_astropy()
+            time_service.get_times()
+            astropy_duration = min(
+                timeit.repeat(get_times_with_astropy, number=astropy_number, repeat=repeat)
+            )
+            astropy_duration /= astropy_number
+            service_duration = min(timeit.repeat(time_service.get_times, number=number, repeat=repeat))
+            service_duration /= number
+
+        self.stdout.write(
+            f"get_times: astropy {astropy_duration * 1e3:.3f} ms, "
+            f"time service {service_duration * 1e3:.3f} ms, "
+            f"speedup {astropy_duration / service_duration:.0f}x"
+        )
@@ -0,0 +1,87 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Management utility to run the background tasks."""
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+from manager.smtp_client import smtp_client
+
+from api.task_queue import run_tasks
+
+
+class Command(BaseCommand):
+    """Django command to run the tasks queued in the database,
+    see `api.task_queue`.
+
+    The `tasks` module of every installed app is imported first,
+    so the tasks it registers can be run. By default the command runs
+    until stopped. Use `--once` to run the tasks ready to be run and exit.
+    """
+
+    help = "Run the background tasks queued in the database."
+
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        """Add arguments for the command.
+
+        Params
+        ------
+        parser: object
+            parser for the arguments
+        """
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            help="Maximum number of tasks run concurrently.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Seconds to wait when there are no tasks ready to be run.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the tasks ready to be run and exit.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command, which runs the background tasks.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with additional
+            keyword arguments (indexed by keys in the dict)
+        """
+        autodiscover_modules("tasks")
+        try:
+            run_tasks(
+                max_workers=options["max_workers"],
+                once=options["once"],
+                poll_interval=options["interval"],
+            )
+        finally:
+            # The email outbox task keeps the connection open between runs
+            smtp_client.close()
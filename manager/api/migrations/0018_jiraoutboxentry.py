@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0017_auto_20240522_2001"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JiraOutboxEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+                ),
+                (
+                    "creation_timestamp",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creation time"),
+                ),
+                (
+                    "update_timestamp",
+                    models.DateTimeField(auto_now=True, verbose_name="Last Updated"),
+                ),
+                ("payload", models.JSONField()),
+                (
+                    "ole_service",
+                    models.CharField(
+                        choices=[
+                            ("exposurelog", "exposurelog"),
+                            ("narrativelog", "narrativelog"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("ole_message_ids", models.JSONField(blank=True, default=list)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("processing", "processing"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_timestamp",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("jira_url", models.CharField(blank=True, max_length=200)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0018_jiraoutboxentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailOutboxEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+                ),
+                (
+                    "creation_timestamp",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creation time"),
+                ),
+                (
+                    "update_timestamp",
+                    models.DateTimeField(auto_now=True, verbose_name="Last Updated"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("processing", "processing"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_timestamp",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("to", models.TextField()),
+                ("subject", models.CharField(max_length=255)),
+                ("html_content", models.TextField()),
+                ("plain_content", models.TextField()),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -29,6 +29,7 @@ import rest_framework.authtoken.models
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from manager.utils import validate_file_extension, validate_json_file
 
@@ -214,3 +215,132 @@ class ScriptConfiguration(models.Model):
             f"{self.script_path}[{self.config_name}]"
         """
         return f"[{self.id}] {self.script_type} - {self.script_path} - {self.config_name}"
+
+
+class QueueEntry(BaseModel):
+    """Base Model of the entries of the queues
+    processed in the background, see `api.task_queue`."""
+
+    class Meta:
+        """Define attributes of the Meta class."""
+
+        abstract = True
+        """Make this an abstract class in order to be used
+        as a base model of the queues"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        PROCESSING = "processing", "processing"
+        DONE = "done", "done"
+        FAILED = "failed", "failed"
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    """Status of the entry"""
+
+    attempts = models.PositiveIntegerField(default=0)
+    """Number of failed attempts to process the entry"""
+
+    next_attempt_timestamp = models.DateTimeField(default=timezone.now)
+    """Time from which the entry can be processed"""
+
+    last_error = models.TextField(blank=True)
+    """Error of the last failed attempt"""
+
+
+class JiraOutboxEntry(QueueEntry):
+    """Jira ticket or comment waiting to be sent to the JIRA API.
+
+    Entries are created by the OLE endpoints and sent in the background
+    by the `process_jira_outbox` task, which then adds the url of the
+    Jira ticket to the OLE messages."""
+
+    class OleServices(models.TextChoices):
+        EXPOSURELOG = "exposurelog", "exposurelog"
+        NARRATIVELOG = "narrativelog", "narrativelog"
+
+    payload = models.JSONField()
+    """Data of the JIRA payload, see `manager.utils.send_jira_payload`"""
+
+    ole_service = models.CharField(max_length=20, choices=OleServices.choices)
+    """The OLE service of the messages linked to the Jira ticket"""
+
+    ole_message_ids = models.JSONField(default=list, blank=True)
+    """Ids of the OLE messages the Jira ticket url is added to"""
+
+    jira_url = models.CharField(max_length=200, blank=True)
+    """Url of the Jira ticket, set once the JIRA payload has been sent"""
+
+    def __str__(self):
+        """Define the string representation for objects of this class.
+
+        Returns
+        -------
+        str
+            The string representation as:
+            f"[self.id] {self.ole_service} - {self.status}"
+        """
+        return f"[{self.id}] {self.ole_service} - {self.status}"
+
+
+class EmailOutboxEntry(QueueEntry):
+    """Email waiting to be sent through the SMTP server.
+
+    Entries are created by the night report endpoint and sent
+    in the background by the `process_email_outbox` task."""
+
+    to = models.TextField()
+    """The email address of the recipient"""
+
+    subject = models.CharField(max_length=255)
+    """The subject of the email"""
+
+    html_content = models.TextField()
+    """The content of the email in HTML format"""
+
+    plain_content = models.TextField()
+    """The content of the email in plain text format"""
+
+    def __str__(self):
+        """Define the string representation for objects of this class.
+
+        Returns
+        -------
+        str
+            The string representation as:
+            f"[self.id] {self.subject} - {self.status}"
+        """
+        return f"[{self.id}] {self.subject} - {self.status}"
+
+
+class Task(QueueEntry):
+    """Job run in the background by the `process_tasks` command.
+
+    The function run by the job is registered with
+    `api.task_queue.register_task`, see `api.tasks`."""
+
+    name = models.CharField(max_length=100, db_index=True)
+    """Name of the registered task"""
+
+    args = models.JSONField(default=list, blank=True)
+    """Positional arguments of the task"""
+
+    kwargs = models.JSONField(default=dict, blank=True)
+    """Keyword arguments of the task"""
+
+    result = models.JSONField(null=True, blank=True)
+    """Value returned by the last run of the task"""
+
+    unique_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    """Key preventing the same job from being queued twice,
+    released when the job is finished"""
+
+    def __str__(self):
+        """Define the string representation for objects of this class.
+
+        Returns
+        -------
+        str
+            The string representation as:
+            f"[self.id] {self.name} - {self.status}"
+        """
+        return f"[{self.id}] {self.name} - {self.status}"
@@ -0,0 +1,236 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Outboxes of the requests to slow services sent in the background.
+
+Instead of waiting for the JIRA API while the OLE message is created,
+the OLE endpoints store the JIRA payload in a `JiraOutboxEntry` and
+return at once. The entries are then processed in the background by
+`process_jira_outbox`, which sends the payload to the JIRA API
+and adds the url of the Jira ticket to the OLE messages.
+
+In the same way the night report email is stored in an
+`EmailOutboxEntry` and sent by `process_email_outbox`, reusing
+the connection to the SMTP server between emails.
+
+Both functions are run periodically by the background tasks, see
+`api.tasks`. Failed entries are retried with an exponential backoff.
+"""
+
+import os
+
+from manager import utils
+from manager.resilience import upstream_request
+from manager.smtp_client import smtp_client
+
+from api.models import EmailOutboxEntry, JiraOutboxEntry
+from api.task_queue import claim_entries, complete_entry, keep_claimed
+
+
+class JiraOutboxError(Exception):
+    """Raised when a step of a Jira outbox entry fails."""
+
+
+def get_jira_payload_error(payload_data):
+    """Return the error of a JIRA payload that would be rejected
+    before being sent to the JIRA API.
+
+    Parameters
+    ----------
+    payload_data : `dict`
+        The data of the JIRA payload, see `manager.utils.get_jira_payload_data`
+
+    Returns
+    -------
+    `str` or None
+        The error message, or None if the payload is valid
+    """
+    if payload_data.get("jira_new") == "true":
+        if "request_type" not in payload_data:
+            return "Error reading request type"
+    elif "jira_issue_id" not in payload_data:
+        return "Error reading the JIRA issue ID"
+    return None
+
+
+def enqueue_jira_payload(payload_data, ole_service, ole_message_ids):
+    """Store a JIRA payload to be sent in the background.
+
+    Parameters
+    ----------
+    payload_data : `dict`
+        The data of the JIRA payload, see `manager.utils.get_jira_payload_data`
+    ole_service : `str`
+        The OLE service of the messages, one of `JiraOutboxEntry.OleServices`
+    ole_message_ids : `list`
+        Ids of the OLE messages the Jira ticket url is added to
+
+    Returns
+    -------
+    `JiraOutboxEntry`
+        The created entry
+    """
+    payload = {key: payload_data.get(key) for key in payload_data if key != "file[]"}
+    return JiraOutboxEntry.objects.create(
+        payload=payload,
+        ole_service=ole_service,
+        ole_message_ids=[str(message_id) for message_id in ole_message_ids],
+    )
+
+
+def add_ole_message_url(ole_service, message_id, url):
+    """Add an url to the urls of an OLE message, if not already there.
+
+    Parameters
+    ----------
+    ole_service : `str`
+        The OLE service of the message, e.g. "exposurelog"
+    message_id : `str`
+        Id of the OLE message
+    url : `str`
+        The url to add
+
+    Raises
+    ------
+    JiraOutboxError
+        If the OLE message could not be read or updated
+    """
+    message_url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/{ole_service}/messages/{message_id}"
+    response = upstream_request("ole", "get", message_url)
+    if response.status_code != 200:
+        raise JiraOutboxError(f"Error getting {ole_service} message {message_id}")
+
+    urls = response.json().get("urls") or []
+    if url in urls:
+        return
+
+    response = upstream_request("ole", "patch", message_url, json={"urls": [url, *urls]})
+    utils.invalidate_ole_listings(ole_service)
+    if response.status_code != 200:
+        raise JiraOutboxError(f"Error updating {ole_service} message {message_id}")
+
+
+def process_jira_outbox_entry(entry):
+    """Send the JIRA payload of an entry and link the Jira ticket
+    to its OLE messages.
+
+    The Jira ticket is only created once, so a retry after the OLE
+    messages could not be updated does not create another ticket.
+
+    Parameters
+    ----------
+    entry : `JiraOutboxEntry`
+        The entry to process, already claimed by the worker
+    """
+    try:
+        if not entry.jira_url:
+            response = utils.send_jira_payload(entry.payload)
+            if response.status_code != 200:
+                error = response.data.get("error")
+                ack = response.data.get("ack", "Error sending the JIRA payload")
+                raise JiraOutboxError(f"{ack}: {error}" if error else ack)
+            entry.jira_url = response.data["url"]
+            entry.save(update_fields=["jira_url"])
+
+        for message_id in entry.ole_message_ids:
+            add_ole_message_url(entry.ole_service, message_id, entry.jira_url)
+    except Exception as e:
+        complete_entry(entry, error=e)
+    else:
+        complete_entry(entry)
+
+
+def process_jira_outbox(limit=None):
+    """Process the Jira outbox entries ready to be sent.
+
+    Parameters
+    ----------
+    limit : `int`, optional
+        Maximum number of entries to process,
+        `settings.QUEUE_BATCH_SIZE` by default
+
+    Returns
+    -------
+    `int`
+        Number of processed entries
+    """
+    processed = 0
+    for entry in claim_entries(JiraOutboxEntry, limit):
+        with keep_claimed(entry):
+            process_jira_outbox_entry(entry)
+        processed += 1
+    return processed
+
+
+def enqueue_email(to, subject, html_content, plain_content):
+    """Store an email to be sent in the background.
+
+    Parameters
+    ----------
+    to : `str`
+        The email address of the recipient
+    subject : `str`
+        The subject of the email
+    html_content : `str`
+        The content of the email in HTML format
+    plain_content : `str`
+        The content of the email in plain text format
+
+    Returns
+    -------
+    `EmailOutboxEntry`
+        The created entry
+    """
+    return EmailOutboxEntry.objects.create(
+        to=to,
+        subject=subject,
+        html_content=html_content,
+        plain_content=plain_content,
+    )
+
+
+def process_email_outbox(limit=None):
+    """Send the emails of the outbox ready to be sent.
+
+    The emails are sent through `manager.smtp_client.smtp_client`,
+    so the authenticated connection to the SMTP server is reused.
+
+    Parameters
+    ----------
+    limit : `int`, optional
+        Maximum number of entries to process,
+        `settings.QUEUE_BATCH_SIZE` by default
+
+    Returns
+    -------
+    `int`
+        Number of processed entries
+    """
+    processed = 0
+    for entry in claim_entries(EmailOutboxEntry, limit):
+        with keep_claimed(entry):
+            try:
+                smtp_client.send(entry.to, entry.subject, entry.html_content, entry.plain_content)
+            except Exception as e:
+                complete_entry(entry, error=e)
+            else:
+                complete_entry(entry)
+        processed += 1
+    return processed
@@ -31,9 +31,12 @@ from rest_framework import serializers
 from api.models import (
     ConfigFile,
     ControlLocation,
+    EmailOutboxEntry,
     EmergencyContact,
     ImageTag,
+    JiraOutboxEntry,
     ScriptConfiguration,
+    Task,
 )
 from manager import utils
 
@@ -297,6 +300,78 @@ class ControlLocationSerializer(serializers.ModelSerializer):
         """The fields of the model class to serialize"""
 
 
+class JiraOutboxEntrySerializer(serializers.ModelSerializer):
+    """Serializer to map the JiraOutboxEntry Model instance into JSON format."""
+
+    class Meta:
+        """Meta class to map serializer's fields with the model fields."""
+
+        model = JiraOutboxEntry
+        """The model class to serialize"""
+
+        fields = (
+            "id",
+            "status",
+            "attempts",
+            "jira_url",
+            "last_error",
+            "ole_service",
+            "ole_message_ids",
+            "next_attempt_timestamp",
+            "creation_timestamp",
+            "update_timestamp",
+        )
+        """The fields of the model class to serialize"""
+
+
+class EmailOutboxEntrySerializer(serializers.ModelSerializer):
+    """Serializer to map the EmailOutboxEntry Model instance into JSON format."""
+
+    class Meta:
+        """Meta class to map serializer's fields with the model fields."""
+
+        model = EmailOutboxEntry
+        """The model class to serialize"""
+
+        fields = (
+            "id",
+            "status",
+            "attempts",
+            "last_error",
+            "to",
+            "subject",
+            "next_attempt_timestamp",
+            "creation_timestamp",
+            "update_timestamp",
+        )
+        """The fields of the model class to serialize"""
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    """Serializer to map the Task Model instance into JSON format."""
+
+    class Meta:
+        """Meta class to map serializer's fields with the model fields."""
+
+        model = Task
+        """The model class to serialize"""
+
+        fields = (
+            "id",
+            "name",
+            "status",
+            "attempts",
+            "last_error",
+            "args",
+            "kwargs",
+            "result",
+            "next_attempt_timestamp",
+            "creation_timestamp",
+            "update_timestamp",
+        )
+        """The fields of the model class to serialize"""
+
+
 class ScriptConfigurationSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     script_path = serializers.CharField(max_length=100)
@@ -0,0 +1,380 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Queue of the jobs run in the background by the `process_tasks` command.
+
+The jobs are stored in the database as `Task` entries. The functions they
+run are registered with `register_task`, in the `tasks` module of the apps
+(see `api.tasks`). A task can be queued to run as soon as possible, after a
+delay, or periodically. Failed tasks are retried with an exponential backoff.
+
+The helpers to claim and retry the entries of a queue are shared with
+the outboxes, see `api.outbox`. The entries left processing by a worker
+that stopped are released after `settings.QUEUE_PROCESSING_TIMEOUT` seconds,
+so the entries being processed are kept claimed with `keep_claimed`, which
+refreshes their `update_timestamp` while slow calls to the upstream services
+(e.g. Jira or SMTP) are waited for, instead of bounding the time of the calls.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from api.models import QueueEntry, Task
+
+
+def get_backoff(attempts):
+    """Return the seconds to wait before the next attempt.
+
+    Parameters
+    ----------
+    attempts : `int`
+        Number of failed attempts
+
+    Returns
+    -------
+    `float`
+        The seconds to wait, `settings.QUEUE_BACKOFF` doubled after each
+        failed attempt up to `settings.QUEUE_MAX_BACKOFF`
+    """
+    return min(settings.QUEUE_BACKOFF * 2 ** (attempts - 1), settings.QUEUE_MAX_BACKOFF)
+
+
+def complete_entry(entry, error=None, max_attempts=None):
+    """Save the result of processing a queue entry.
+
+    Failed entries are pending again after a backoff, see `get_backoff`,
+    until the maximum number of attempts have failed.
+
+    Parameters
+    ----------
+    entry : `QueueEntry`
+        The processed entry
+    error : `Exception`, optional
+        The error of the attempt, None if it succeeded
+    max_attempts : `int`, optional
+        Number of failed attempts after which the entry is marked as failed,
+        `settings.QUEUE_MAX_ATTEMPTS` by default
+    """
+    if error is None:
+        entry.status = QueueEntry.Status.DONE
+        entry.last_error = ""
+    else:
+        entry.attempts += 1
+        entry.last_error = str(error)
+        if entry.attempts >= (max_attempts or settings.QUEUE_MAX_ATTEMPTS):
+            entry.status = QueueEntry.Status.FAILED
+        else:
+            entry.status = QueueEntry.Status.PENDING
+            entry.next_attempt_timestamp = timezone.now() + timedelta(seconds=get_backoff(entry.attempts))
+    entry.save()
+
+
+@contextmanager
+def keep_claimed(entry):
+    """Keep a claimed queue entry claimed while it is processed.
+
+    The `update_timestamp` of the entry is refreshed in a thread every third
+    of `settings.QUEUE_PROCESSING_TIMEOUT`, so the entry is not released
+    and processed again by another worker while it takes longer.
+
+    Parameters
+    ----------
+    entry : `QueueEntry`
+        The entry, already claimed by the worker
+    """
+    stopped = threading.Event()
+
+    def refresh_claim():
+        try:
+            while not stopped.wait(settings.QUEUE_PROCESSING_TIMEOUT / 3):
+                type(entry).objects.filter(id=entry.id, status=QueueEntry.Status.PROCESSING).update(
+                    update_timestamp=timezone.now()
+                )
+        finally:
+            # Each thread uses its own connection to the database
+            connection.close()
+
+    thread = threading.Thread(target=refresh_claim, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def claim_entries(model, limit=None):
+    """Claim the entries of a queue ready to be processed.
+
+    Each entry is claimed before being returned, so several workers
+    can run at the same time without processing an entry twice.
+    Entries claimed by a worker that stopped are released after
+    `settings.QUEUE_PROCESSING_TIMEOUT` seconds, the entries must be
+    processed within `keep_claimed` to keep them claimed for longer.
+
+    Parameters
+    ----------
+    model : `type`
+        The model of the queue, a subclass of `QueueEntry`
+    limit : `int`, optional
+        Maximum number of entries to claim,
+        `settings.QUEUE_BATCH_SIZE` by default
+
+    Yields
+    ------
+    `QueueEntry`
+        The claimed entries, oldest first
+    """
+    now = timezone.now()
+
+    # Release the entries claimed by a worker that stopped
+    model.objects.filter(
+        status=QueueEntry.Status.PROCESSING,
+        update_timestamp__lt=now - timedelta(seconds=settings.QUEUE_PROCESSING_TIMEOUT),
+    ).update(status=QueueEntry.Status.PENDING)
+
+    entry_ids = list(
+        model.objects.filter(status=QueueEntry.Status.PENDING, next_attempt_timestamp__lte=now)
+        .order_by("next_attempt_timestamp")
+        .values_list("id", flat=True)[: limit or settings.QUEUE_BATCH_SIZE]
+    )
+
+    for entry_id in entry_ids:
+        claimed = model.objects.filter(id=entry_id, status=QueueEntry.Status.PENDING).update(
+            status=QueueEntry.Status.PROCESSING, update_timestamp=timezone.now()
+        )
+        if claimed:
+            yield model.objects.get(id=entry_id)
+
+
+class TaskDefinition:
+    """Function registered to be run by the tasks.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the task
+    func : `callable`
+        The function run by the task
+    max_attempts : `int`
+        Number of failed attempts after which the task is marked as failed
+    interval : `float` or None
+        Seconds between the runs of a periodic task,
+        None if the task is not periodic
+    """
+
+    def __init__(self, name, func, max_attempts, interval):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.interval = interval
+
+
+_registry = {}
+
+
+def register_task(name=None, max_attempts=None, interval=None):
+    """Register a function to be run by the tasks.
+
+    Parameters
+    ----------
+    name : `str`, optional
+        Name of the task, the name of the function by default
+    max_attempts : `int`, optional
+        Number of failed attempts after which the task is marked as failed,
+        `settings.QUEUE_MAX_ATTEMPTS` by default
+    interval : `float`, optional
+        If set, the task is run periodically every `interval` seconds
+        by the workers. Failed runs of a periodic task are not retried,
+        the task just runs again at the next period
+
+    Returns
+    -------
+    `callable`
+        Decorator registering the function, which is returned unchanged
+    """
+
+    def decorator(func):
+        task_name = name or func.__name__
+        _registry[task_name] = TaskDefinition(
+            task_name, func, max_attempts or settings.QUEUE_MAX_ATTEMPTS, interval
+        )
+        return func
+
+    return decorator
+
+
+def get_registered_tasks():
+    """Return the registered tasks.
+
+    Returns
+    -------
+    `dict`
+        The `TaskDefinition` of each task, indexed by name
+    """
+    return dict(_registry)
+
+
+def enqueue_task(name, args=None, kwargs=None, delay=0, unique_key=None):
+    """Queue a task to be run in the background.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the registered task
+    args : `list`, optional
+        Positional arguments of the task, must be JSON serializable
+    kwargs : `dict`, optional
+        Keyword arguments of the task, must be JSON serializable
+    delay : `float`, optional
+        Seconds to wait before running the task
+    unique_key : `str`, optional
+        If a task with the same key is pending or running,
+        it is returned instead of queuing a new one
+
+    Returns
+    -------
+    `Task`
+        The queued task
+
+    Raises
+    ------
+    ValueError
+        If the task is not registered
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                args=args or [],
+                kwargs=kwargs or {},
+                next_attempt_timestamp=timezone.now() + timedelta(seconds=delay),
+                unique_key=unique_key,
+            )
+    except IntegrityError:
+        return Task.objects.get(unique_key=unique_key)
+
+
+def schedule_periodic_tasks():
+    """Queue the periodic tasks not queued yet.
+
+    Each periodic task has a single entry, which is queued
+    again for the next period after every run.
+    """
+    for definition in _registry.values():
+        if definition.interval is not None:
+            enqueue_task(definition.name, unique_key=f"periodic:{definition.name}")
+
+
+def run_task(task):
+    """Run a claimed task and save its result.
+
+    Parameters
+    ----------
+    task : `Task`
+        The task to run, already claimed by the worker
+    """
+    definition = _registry.get(task.name)
+    if definition is None:
+        task.unique_key = None
+        complete_entry(task, error=f"Unknown task: {task.name}", max_attempts=1)
+        return
+
+    error = None
+    try:
+        with keep_claimed(task):
+            result = definition.func(*task.args, **task.kwargs)
+        task.result = json.loads(json.dumps(result, default=str))
+    except Exception as e:
+        error = e
+
+    if definition.interval is not None:
+        task.status = Task.Status.PENDING
+        task.next_attempt_timestamp = timezone.now() + timedelta(seconds=definition.interval)
+        task.attempts = task.attempts + 1 if error else 0
+        task.last_error = str(error) if error else ""
+        task.save()
+        return
+
+    if error is None or task.attempts + 1 >= definition.max_attempts:
+        # Release the key so the same job can be queued again
+        task.unique_key = None
+    complete_entry(task, error=error, max_attempts=definition.max_attempts)
+
+
+def _run_task_in_thread(task):
+    try:
+        run_task(task)
+    finally:
+        # Each thread uses its own connection to the database
+        connection.close()
+
+
+def run_tasks(max_workers=None, once=False, poll_interval=None):
+    """Run the queued tasks until stopped.
+
+    Parameters
+    ----------
+    max_workers : `int`, optional
+        Maximum number of tasks run concurrently,
+        `settings.TASKS_MAX_WORKERS` by default. If 1, the tasks
+        are run one after the other in the calling thread
+    once : `bool`, optional
+        If True, return once there are no tasks ready to be run
+    poll_interval : `float`, optional
+        Seconds to wait when there are no tasks ready to be run,
+        `settings.TASKS_POLL_INTERVAL` by default
+    """
+    max_workers = max_workers or settings.TASKS_MAX_WORKERS
+    poll_interval = poll_interval or settings.TASKS_POLL_INTERVAL
+    executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    running = set()
+    try:
+        while True:
+            schedule_periodic_tasks()
+            running = {future for future in running if not future.done()}
+            free_workers = max_workers - len(running)
+            claimed = list(claim_entries(Task, free_workers)) if free_workers > 0 else []
+            for task in claimed:
+                if executor is None:
+                    run_task(task)
+                else:
+                    running.add(executor.submit(_run_task_in_thread, task))
+            if claimed:
+                continue
+            if running:
+                wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
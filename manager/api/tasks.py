@@ -0,0 +1,131 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Tasks of the api app run in the background by the `process_tasks` command.
+
+The `tasks` module of every installed app is imported by the worker,
+so the tasks registered there with `register_task` can be run.
+"""
+
+from datetime import timedelta
+
+import astropy.time
+from django.conf import settings
+from django.utils import timezone
+from manager.utils import (
+    get_obsday_end_to_utc,
+    get_obsday_from_tai,
+    get_tai_from_utc,
+    prefetch_nightreport_status_snapshot,
+)
+
+from api import outbox
+from api.models import Task
+from api.task_queue import register_task
+
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+"""Cache backends not shared between the worker and the web processes"""
+
+
+@register_task(interval=settings.OUTBOX_INTERVAL)
+def process_jira_outbox():
+    """Send the Jira tickets and comments stored in the Jira outbox.
+
+    Returns
+    -------
+    `int`
+        Number of processed entries
+    """
+    return outbox.process_jira_outbox()
+
+
+@register_task(interval=settings.OUTBOX_INTERVAL)
+def process_email_outbox():
+    """Send the emails stored in the email outbox.
+
+    Returns
+    -------
+    `int`
+        Number of processed entries
+    """
+    return outbox.process_email_outbox()
+
+
+@register_task(interval=settings.NIGHTREPORT_SNAPSHOT_INTERVAL)
+def prefetch_nightreport_status():
+    """Cache the observatory and CSCs status of the current observing day
+    near its end, when the night report is sent.
+
+    The status is only prefetched during the last
+    `settings.NIGHTREPORT_SNAPSHOT_WINDOW` hours of the observing day,
+    from each instance of `settings.NIGHTREPORT_SNAPSHOT_EFD_INSTANCES`.
+    The snapshots are read by the web processes from the cache, so they
+    are not prefetched unless the cache is shared, i.e. `REDIS_HOST` is set.
+
+    Returns
+    -------
+    `list`
+        The EFD instances the status was prefetched from
+
+    Raises
+    ------
+    RuntimeError
+        If the status could not be prefetched from an EFD instance
+    """
+    if settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+
+    curr_tai = astropy.time.Time.now().tai.datetime
+    day_obs = int(get_obsday_from_tai(curr_tai))
+    obsday_end_tai = get_tai_from_utc(get_obsday_end_to_utc(day_obs))
+    if obsday_end_tai - curr_tai > timedelta(hours=settings.NIGHTREPORT_SNAPSHOT_WINDOW):
+        return []
+
+    prefetched = []
+    errors = []
+    for efd_instance in settings.NIGHTREPORT_SNAPSHOT_EFD_INSTANCES:
+        try:
+            prefetch_nightreport_status_snapshot(efd_instance, day_obs)
+            prefetched.append(efd_instance)
+        except Exception as e:
+            errors.append(f"{efd_instance}: {e}")
+    if errors:
+        raise RuntimeError(f"Error prefetching the night report status from {', '.join(errors)}")
+    return prefetched
+
+
+@register_task(interval=3600)
+def delete_finished_tasks():
+    """Delete the tasks finished more than
+    `settings.TASKS_RETENTION_DAYS` days ago.
+
+    Returns
+    -------
+    `int`
+        Number of deleted tasks
+    """
+    deleted, _ = Task.objects.filter(
+        status__in=[Task.Status.DONE, Task.Status.FAILED],
+        update_timestamp__lt=timezone.now() - timedelta(days=settings.TASKS_RETENTION_DAYS),
+    ).delete()
+    return deleted
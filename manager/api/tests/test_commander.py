@@ -19,12 +19,15 @@
 
 
 import os
-from unittest.mock import call, patch
+import threading
+from unittest.mock import MagicMock, call, patch
 
+from django.conf import settings
 from django.contrib.auth.models import Permission, User
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from manager.permissions import UserBasedPermission
+from manager.resilience import UpstreamUnavailable, upstream_request
 from rest_framework.test import APIClient
 
 from api.models import Token
@@ -82,7 +85,10 @@ class CommanderTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = "http://foo:bar/cmd"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data_with_identity))
+        self.assertEqual(
+            mock_requests.call_args,
+            call(expected_url, json=data_with_identity, timeout=settings.UPSTREAM_TIMEOUT),
+        )
 
     @patch("requests.post")
     def test_unauthorized_commander(self, mock_requests):
@@ -102,6 +108,142 @@ class CommanderTestCase(TestCase):
         self.assertEqual(response.status_code, 403)
         self.assertEqual(result, UserBasedPermission.message)
 
+    @patch("requests.Session.post")
+    @patch.dict(os.environ, {"SERVER_URL": "localhost"})
+    def test_authorized_commander_batch(self, mock_requests):
+        """Test authorized user batch commands are sent to love-commander"""
+        # Arrange:
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        mock_requests.return_value.status_code = 200
+        mock_requests.return_value.json.return_value = {"ack": "Done"}
+        commands = [
+            {
+                "csc": "ScriptQueue",
+                "salindex": 1,
+                "cmd": "cmd_stopScripts",
+                "params": {"salIndices": [100000 + i], "terminate": False},
+            }
+            for i in range(5)
+        ]
+        url = reverse("commander-batch")
+
+        for mode in ["concurrent", "sequential"]:
+            mock_requests.reset_mock()
+
+            # Act:
+            response = self.client.post(url, {"commands": commands, "mode": mode}, format="json")
+
+            # Assert:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.data["results"],
+                [{"status": 200, "data": {"ack": "Done"}}] * len(commands),
+            )
+            expected_calls = [
+                call(
+                    "http://foo:bar/cmd",
+                    json={**command, "identity": f"{self.user.username}@localhost"},
+                    timeout=settings.UPSTREAM_TIMEOUT,
+                )
+                for command in commands
+            ]
+            if mode == "sequential":
+                self.assertEqual(mock_requests.call_args_list, expected_calls)
+            else:
+                self.assertCountEqual(mock_requests.call_args_list, expected_calls)
+
+    @override_settings(
+        UPSTREAM_BULKHEAD_LIMITS={"commander": 2},
+        COMMANDER_BATCH_CONCURRENCY=2,
+        UPSTREAM_BULKHEAD_MAX_WAIT=0.01,
+    )
+    @patch("requests.post")
+    @patch("requests.Session.post")
+    def test_commander_batch_leaves_slots_to_single_commands(self, mock_session_post, mock_post):
+        """Test a single command is not rejected by the bulkhead while a batch is running"""
+        # Arrange:
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        mock_post.return_value.status_code = 200
+        single_statuses = []
+        # Lets the batch commands sent at the same time hold their slots together
+        in_flight = threading.Barrier(2)
+
+        def batch_post(url, json, timeout):
+            try:
+                in_flight.wait(timeout=0.1)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                single_statuses.append(upstream_request("commander", "post", url, json={}).status_code)
+            except UpstreamUnavailable as e:
+                single_statuses.append(e.status_code)
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {"ack": "Done"}
+            return response
+
+        mock_session_post.side_effect = batch_post
+        commands = [{"csc": "Test", "salindex": 1, "cmd": "cmd_start", "params": {}}] * 4
+
+        # Act:
+        response = self.client.post(reverse("commander-batch"), {"commands": commands}, format="json")
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["status"] for result in response.data["results"]], [200] * 4)
+        self.assertEqual(single_statuses, [200] * 4)
+
+    @patch("requests.Session.post")
+    def test_commander_batch_stop_on_error(self, mock_requests):
+        """Test sequential batch commands are skipped after a failed one"""
+        # Arrange:
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        mock_requests.return_value.status_code = 400
+        mock_requests.return_value.json.return_value = {"ack": "Failed"}
+        commands = [{"csc": "Test", "salindex": 1, "cmd": "cmd_start", "params": {}}] * 3
+        url = reverse("commander-batch")
+
+        # Act:
+        response = self.client.post(
+            url, {"commands": commands, "mode": "sequential", "stop_on_error": True}, format="json"
+        )
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_requests.call_count, 1)
+        self.assertEqual(response.data["results"][0], {"status": 400, "data": {"ack": "Failed"}})
+        self.assertEqual([result["status"] for result in response.data["results"][1:]], [None, None])
+
+    @patch("requests.Session.post")
+    def test_invalid_commander_batch(self, mock_requests):
+        """Test invalid batches are rejected"""
+        # Arrange:
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        url = reverse("commander-batch")
+        command = {"csc": "Test", "salindex": 1, "cmd": "cmd_start", "params": {}}
+
+        # Act & Assert:
+        for data in [{}, {"commands": []}, {"commands": [command], "mode": "foo"}]:
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+        with override_settings(COMMANDER_BATCH_MAX_SIZE=2):
+            response = self.client.post(url, {"commands": [command] * 3}, format="json")
+            self.assertEqual(response.status_code, 400)
+        mock_requests.assert_not_called()
+
+    @patch("requests.Session.post")
+    def test_unauthorized_commander_batch(self, mock_requests):
+        """Test an unauthorized user can't send batch commands"""
+        # Act:
+        url = reverse("commander-batch")
+        command = {"csc": "Test", "salindex": 1, "cmd": "cmd_start", "params": {}}
+
+        response = self.client.post(url, {"commands": [command]}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), UserBasedPermission.message)
+        mock_requests.assert_not_called()
+
 
 @override_settings(DEBUG=True)
 class SalinfoTestCase(TestCase):
@@ -139,7 +281,7 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/salinfo/metadata"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
 
     @patch("requests.get")
     def test_salinfo_topic_names(self, mock_requests):
@@ -150,7 +292,7 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/salinfo/topic-names"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
 
     @patch("requests.get")
     def test_salinfo_topic_names_with_param(self, mock_requests):
@@ -161,7 +303,7 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/salinfo/topic-names?categories=telemetry"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
 
     @patch("requests.get")
     def test_salinfo_topic_data(self, mock_requests):
@@ -172,7 +314,7 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/salinfo/topic-data"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
 
     @patch("requests.get")
     def test_salinfo_topic_data_with_param(self, mock_requests):
@@ -183,7 +325,37 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/salinfo/topic-data?categories=telemetry"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
+
+    @override_settings(PROXY_STREAMING_PASSTHROUGH=True, PROXY_STREAMING_CHUNK_SIZE=4)
+    @patch("requests.get")
+    def test_salinfo_metadata_streaming(self, mock_requests):
+        """Test the upstream body is forwarded in chunks
+        when the streaming passthrough is enabled"""
+        # Arrange:
+        body = b'{"ATDome": {"sal_version": "7.1.0"}}'
+        mock_requests.return_value.status_code = 200
+        mock_requests.return_value.headers = {"content-type": "application/json"}
+        mock_requests.return_value.iter_content.return_value = iter(
+            [body[i : i + 4] for i in range(0, len(body), 4)]
+        )
+        url = reverse("salinfo-metadata")
+
+        # Act:
+        response = self.client.get(url)
+
+        # Assert:
+        expected_url = "http://foo:bar/salinfo/metadata"
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, stream=True, timeout=settings.UPSTREAM_TIMEOUT)
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(b"".join(response), body)
+        mock_requests.return_value.iter_content.assert_called_with(chunk_size=4)
+        mock_requests.return_value.close.assert_called_once()
+        mock_requests.return_value.json.assert_not_called()
 
 
 @override_settings(DEBUG=True)
@@ -236,7 +408,62 @@ class EFDTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = "http://foo:bar/efd/timeseries"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=settings.UPSTREAM_TIMEOUT)
+        )
+
+    @patch("requests.post")
+    def test_timeseries_query_downsampled(self, mock_requests):
+        """Test the timeseries is downsampled when max_points is provided"""
+        # Arrange:
+        samples = [
+            {"ts": f"2020-03-16 12:00:{i // 10:02d}.{i % 10}00000+00:00", "value": i % 7} for i in range(500)
+        ]
+        samples[250]["value"] = 100
+        mock_requests.return_value.status_code = 200
+        mock_requests.return_value.json.return_value = {
+            "ATDome-0-topic1": {"field1": samples},
+        }
+        data = {
+            "start_date": "2020-03-16T12:00:00",
+            "time_window": 15,
+            "cscs": {"ATDome": {"0": {"topic1": ["field1"]}}},
+            "efd_instance": "summit_efd",
+        }
+        url = reverse("EFD-timeseries")
+
+        # Act:
+        response = self.client.post(
+            url, {**data, "max_points": 50, "downsample_method": "minmax"}, format="json"
+        )
+
+        # Assert:
+        self.assertEqual(
+            mock_requests.call_args,
+            call("http://foo:bar/efd/timeseries", json=data, timeout=settings.UPSTREAM_TIMEOUT),
+        )
+        self.assertEqual(response.status_code, 200)
+        field = response.data["ATDome-0-topic1"]["field1"]
+        self.assertLessEqual(len(field), 50)
+        self.assertEqual(field[0], samples[0])
+        self.assertEqual(field[-1], samples[-1])
+        self.assertIn(samples[250], field)
+        self.assertEqual(response["X-Downsampling-Method"], "minmax")
+        self.assertEqual(response["X-Downsampling-Original-Points"], "500")
+        self.assertEqual(response["X-Downsampling-Returned-Points"], str(len(field)))
+
+    @patch("requests.post")
+    def test_timeseries_query_invalid_downsampling(self, mock_requests):
+        """Test invalid downsampling parameters are rejected"""
+        url = reverse("EFD-timeseries")
+
+        response = self.client.post(url, {"max_points": "foo"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, {"max_points": 100, "downsample_method": "foo"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        mock_requests.assert_not_called()
 
 
 @override_settings(DEBUG=True)
@@ -284,7 +511,9 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = "http://foo:bar/tcs/aux"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=settings.UPSTREAM_TIMEOUT)
+        )
 
     @patch("requests.post")
     def test_command_query_atcs_unauthorized(self, mock_requests):
@@ -314,7 +543,7 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/tcs/aux/docstrings"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
 
     @patch("requests.post")
     def test_command_query_mtcs(self, mock_requests):
@@ -334,7 +563,9 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = "http://foo:bar/tcs/main"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=settings.UPSTREAM_TIMEOUT)
+        )
 
     @patch("requests.post")
     def test_command_query_mtcs_unauthorized(self, mock_requests):
@@ -364,4 +595,4 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = "http://foo:bar/tcs/main/docstrings"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=settings.UPSTREAM_TIMEOUT))
@@ -79,3 +79,24 @@ class EmergencyContactApiTestCase(TestCase):
         self.assertEqual(response.data[1]["name"], self.ec2.name)
         self.assertEqual(response.data[1]["contact_info"], self.ec2.contact_info)
         self.assertEqual(response.data[1]["email"], self.ec2.email)
+
+    def test_list_emergency_contacts_not_modified(self):
+        """Test that the emergency contacts are not sent again
+        to a client that has their current version."""
+        # Arrange:
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        url = reverse("emergencycontact-list")
+        response = self.client.get(url, format="json")
+        etag = response["ETag"]
+
+        # Act:
+        not_modified_response = self.client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+        self.ec2.delete()
+        modified_response = self.client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        # Assert:
+        self.assertEqual(not_modified_response.status_code, 304)
+        self.assertEqual(not_modified_response["ETag"], etag)
+        self.assertEqual(modified_response.status_code, 200)
+        self.assertNotEqual(modified_response["ETag"], etag)
+        self.assertEqual(len(modified_response.data), 1)
@@ -28,9 +28,11 @@ import astropy
 import pytest
 import requests
 import rest_framework
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from manager.jira_client import jira_client
 from manager.utils import (
     ERROR_OBS_TICKETS,
     JIRA_PROJECTS_WITH_TIME_LOSS,
@@ -512,7 +514,7 @@ class JiraTestCase(TestCase):
         function with all needed parameters"""
 
         # Arrange
-        mock_jira_patcher = patch("requests.get")
+        mock_jira_patcher = patch("requests.Session.get")
         mock_jira_client = mock_jira_patcher.start()
 
         url_call_1 = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/myself"
@@ -545,8 +547,8 @@ class JiraTestCase(TestCase):
         jira_response = get_jira_obs_report(request_data)
 
         # Assert
-        mock_jira_client.assert_any_call(url_call_1, headers=self.headers)
-        mock_jira_client.assert_any_call(url_call_2, headers=self.headers)
+        mock_jira_client.assert_any_call(url_call_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        mock_jira_client.assert_any_call(url_call_2, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
 
         assert jira_response[0]["key"] == "LOVE-XX"
         assert jira_response[0]["summary"] == "Issue title"
@@ -564,7 +566,7 @@ class JiraTestCase(TestCase):
             "day_obs": 20241127,
         }
 
-        mock_jira_patcher = patch("requests.get")
+        mock_jira_patcher = patch("requests.Session.get")
         mock_jira_client = mock_jira_patcher.start()
 
         success_response_1 = requests.Response()
@@ -609,6 +611,7 @@ class JiraTestCase(TestCase):
             payload = self.mock_jira_issues_response()
             del payload["issues"][0]["fields"][key]
             sucess_response_2.json = lambda: payload
+            jira_client.clear_cache()
             mock_jira_client.side_effect = [success_response_1, sucess_response_2]
             with pytest.raises(Exception) as e:
                 get_jira_obs_report(request_data)
@@ -623,6 +626,7 @@ class JiraTestCase(TestCase):
             payload = self.mock_jira_issues_response()
             payload["issues"][0]["fields"][key] = None
             sucess_response_2.json = lambda: payload
+            jira_client.clear_cache()
             mock_jira_client.side_effect = [success_response_1, sucess_response_2]
             jira_response = get_jira_obs_report(request_data)
 
@@ -641,6 +645,89 @@ class JiraTestCase(TestCase):
         with pytest.raises(ValueError):
             get_jira_obs_report(request_data)
 
+    def test_get_jira_obs_report_paginated(self):
+        """Test call to get_jira_obs_report function
+        when the issues are split in several pages"""
+
+        # Arrange
+        mock_jira_patcher = patch("requests.Session.get")
+        mock_jira_client = mock_jira_patcher.start()
+
+        response_1 = requests.Response()
+        response_1.status_code = 200
+        response_1.json = lambda: {
+            "timeZone": "America/Phoenix",
+        }
+
+        jql_query = "project = 'OBS' AND created >= '2024-11-27 05:00' AND created <= '2024-11-28 05:00'"
+        url_page_1 = (
+            f"https://{os.environ.get('JIRA_API_HOSTNAME')}"
+            f"/rest/api/latest/search/jql?jql={quote(jql_query)}"
+            f"&fields={OBS_TICKETS_FIELDS}"
+        )
+        url_page_2 = f"{url_page_1}&nextPageToken=page-2"
+
+        page_1 = self.mock_jira_issues_response()
+        page_1["nextPageToken"] = "page-2"
+        page_1["isLast"] = False
+        response_2 = requests.Response()
+        response_2.status_code = 200
+        response_2.json = lambda: page_1
+
+        page_2 = self.mock_jira_issues_response()
+        page_2["issues"][0]["key"] = "LOVE-YY"
+        page_2["isLast"] = True
+        response_3 = requests.Response()
+        response_3.status_code = 200
+        response_3.json = lambda: page_2
+
+        mock_jira_client.side_effect = [response_1, response_2, response_3]
+
+        # Act
+        jira_response = get_jira_obs_report({"day_obs": "20241127"})
+
+        # Assert
+        mock_jira_client.assert_any_call(url_page_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        mock_jira_client.assert_any_call(url_page_2, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        assert mock_jira_client.call_count == 3
+        assert [issue["key"] for issue in jira_response] == ["LOVE-XX", "LOVE-YY"]
+
+        mock_jira_patcher.stop()
+
+    def test_get_jira_obs_report_cached_timezone(self):
+        """Test the JIRA user timezone is requested only once
+        by consecutive calls to get_jira_obs_report"""
+
+        # Arrange
+        mock_jira_patcher = patch("requests.Session.get")
+        mock_jira_client = mock_jira_patcher.start()
+
+        url_myself = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/myself"
+
+        response_1 = requests.Response()
+        response_1.status_code = 200
+        response_1.json = lambda: {
+            "timeZone": "America/Phoenix",
+        }
+
+        response_2 = requests.Response()
+        response_2.status_code = 200
+        response_2.json = self.mock_jira_issues_response
+
+        mock_jira_client.side_effect = [response_1, response_2, response_2]
+
+        # Act
+        get_jira_obs_report({"day_obs": "20241127"})
+        jira_response = get_jira_obs_report({"day_obs": "20241128"})
+
+        # Assert
+        myself_calls = [call for call in mock_jira_client.call_args_list if call.args[0] == url_myself]
+        assert len(myself_calls) == 1
+        assert mock_jira_client.call_count == 3
+        assert jira_response[0]["key"] == "LOVE-XX"
+
+        mock_jira_patcher.stop()
+
 
 class JiraAPITestCase(TestCase):
     def setUp(self):
@@ -673,7 +760,7 @@ class JiraAPITestCase(TestCase):
     def test_jira_tickets_report(self):
         """Test jira tickets report endpoint."""
         # Arrange:
-        mock_jira_patcher = patch("requests.get")
+        mock_jira_patcher = patch("requests.Session.get")
         mock_jira_client = mock_jira_patcher.start()
 
         jira_project = "OBS"
@@ -722,8 +809,8 @@ class JiraAPITestCase(TestCase):
         url = f"{base_url}?{urlencode(query_params)}"
         response = self.client.get(url, format="json")
 
-        mock_jira_client.assert_any_call(url_call_1, headers=self.headers)
-        mock_jira_client.assert_any_call(url_call_2, headers=self.headers)
+        mock_jira_client.assert_any_call(url_call_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        mock_jira_client.assert_any_call(url_call_2, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
@@ -735,7 +822,7 @@ class JiraAPITestCase(TestCase):
         without passing a day_obs query param. This means the current
         day_obs will be used."""
         # Arrange:
-        mock_jira_patcher = patch("requests.get")
+        mock_jira_patcher = patch("requests.Session.get")
         mock_jira_client = mock_jira_patcher.start()
 
         jira_project = "OBS"
@@ -791,8 +878,8 @@ class JiraAPITestCase(TestCase):
         url = reverse("Jira-tickets-report", kwargs={"project": jira_project})
         response = self.client.get(url, format="json")
 
-        mock_jira_client.assert_any_call(url_call_1, headers=self.headers)
-        mock_jira_client.assert_any_call(url_call_2, headers=self.headers)
+        mock_jira_client.assert_any_call(url_call_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        mock_jira_client.assert_any_call(url_call_2, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
@@ -802,7 +889,7 @@ class JiraAPITestCase(TestCase):
     def test_jira_tickets_report_jira_fail(self):
         """Test jira tickets report endpoint with fail response from Jira."""
         # Arrange:
-        mock_jira_patcher = patch("requests.get")
+        mock_jira_patcher = patch("requests.Session.get")
         mock_jira_client = mock_jira_patcher.start()
 
         jira_project = "OBS"
@@ -857,7 +944,7 @@ class JiraAPITestCase(TestCase):
         # Act:
         response = self.client.get(url, format="json")
 
-        mock_jira_client.assert_any_call(url_call_1, headers=self.headers)
+        mock_jira_client.assert_any_call(url_call_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
 
         self.assertEqual(response.status_code, 500)
         self.assertEqual(
@@ -871,14 +958,65 @@ class JiraAPITestCase(TestCase):
         # Act:
         response = self.client.get(url, format="json")
 
-        mock_jira_client.assert_any_call(url_call_1, headers=self.headers)
-        mock_jira_client.assert_any_call(url_call_2, headers=self.headers)
+        mock_jira_client.assert_any_call(url_call_1, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
+        mock_jira_client.assert_any_call(url_call_2, headers=self.headers, timeout=settings.UPSTREAM_TIMEOUT)
 
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.data["error"], ERROR_OBS_TICKETS)
 
         mock_jira_patcher.stop()
 
+    def test_jira_tickets_report_cached(self):
+        """Test jira tickets report endpoint reuses the issues
+        of a day_obs requested shortly before."""
+        # Arrange:
+        mock_jira_patcher = patch("requests.Session.get")
+        mock_jira_client = mock_jira_patcher.start()
+
+        response_1 = requests.Response()
+        response_1.status_code = 200
+        response_1.json = lambda: {
+            "timeZone": "America/Phoenix",
+        }
+        response_2 = requests.Response()
+        response_2.status_code = 200
+        response_2.json = lambda: {
+            "issues": [
+                {
+                    "key": "LOVE-XX",
+                    "fields": {
+                        "summary": "Issue title",
+                        OBS_TIME_LOST_FIELD: 13.6,
+                        OBS_SYSTEMS_FIELD: json.loads(JIRA_OBS_SYSTEMS_SELECTION_EXAMPLE),
+                        "creator": {"displayName": "user"},
+                        "created": "2024-11-27T12:00:00.00000",
+                    },
+                }
+            ]
+        }
+        mock_jira_client.side_effect = [response_1, response_2]
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        base_url = reverse("Jira-tickets-report", kwargs={"project": "OBS"})
+        url = f"{base_url}?{urlencode({'day_obs': '20241127'})}"
+
+        # Act:
+        response_first = self.client.get(url, format="json")
+        response_second = self.client.get(url, format="json")
+
+        # Assert:
+        self.assertEqual(mock_jira_client.call_count, 2)
+        self.assertEqual(response_first.status_code, 200)
+        self.assertEqual(response_second.status_code, 200)
+        self.assertEqual(response_first.data, response_second.data)
+
+        # The night report always requests fresh issues
+        mock_jira_client.side_effect = [response_2]
+        get_jira_obs_report({"day_obs": "20241127"})
+        self.assertEqual(mock_jira_client.call_count, 3)
+
+        mock_jira_patcher.stop()
+
     def test_jira_tickets_report_invalid_project(self):
         """Test jira tickets report endpoint with invalid project."""
         # Arrange:
@@ -24,7 +24,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import HttpRequest
 from django.test import TestCase, override_settings
 from django.utils.datastructures import MultiValueDict
-from manager.utils import upload_to_lfa
+from manager.utils import MultipartFileStream, upload_to_lfa
 
 
 @override_settings(DEBUG=True)
@@ -50,7 +50,7 @@ class LFATestCase(TestCase):
         mock_post.return_value = mock_response
 
         request = HttpRequest()
-        request.FILES["file[]"] = [SimpleUploadedFile("test.txt", b"file_content")]
+        request.FILES = MultiValueDict({"file[]": [SimpleUploadedFile("test.txt", b"file_content")]})
         response = upload_to_lfa(request, option="upload-file")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(
@@ -61,7 +61,7 @@ class LFATestCase(TestCase):
             },
         )
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_successful_multiple_file_upload(self, mock_post):
         # Create mock responses for the API
         mock_response1 = Mock()
@@ -72,10 +72,13 @@ class LFATestCase(TestCase):
         mock_response2.status_code = 200
         mock_response2.json.return_value = {"url": "http://example.com/uploaded-file2"}
 
-        mock_post.side_effect = [
-            mock_response1,
-            mock_response2,
-        ]  # Mock responses for multiple file uploads
+        # Mock responses for multiple file uploads,
+        # files are uploaded concurrently
+        mock_responses = {
+            "test1.txt": mock_response1,
+            "test2.txt": mock_response2,
+        }
+        mock_post.side_effect = lambda url, data, headers, timeout: mock_responses[data.file_name]
 
         request = HttpRequest()
         uploaded_file1 = SimpleUploadedFile("test1.txt", b"file_content_1")
@@ -103,10 +106,61 @@ class LFATestCase(TestCase):
         mock_post.return_value = mock_response
 
         request = HttpRequest()
-        request.FILES["file[]"] = [SimpleUploadedFile("test.txt", b"file_content")]
+        request.FILES = MultiValueDict({"file[]": [SimpleUploadedFile("test.txt", b"file_content")]})
+        response = upload_to_lfa(request, option="upload-file")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data,
+            {
+                "ack": "Error when uploading files",
+                "urls": [],
+                "files": [{"name": "test.txt", "size": 12, "status": 500, "url": None}],
+            },
+        )
+
+    @patch("requests.Session.post")
+    def test_partially_failed_multiple_file_upload(self, mock_post):
+        def lfa_post(url, data, headers, timeout):
+            mock_response = Mock()
+            if data.file_name == "test2.txt":
+                mock_response.status_code = 500
+            else:
+                mock_response.status_code = 200
+                mock_response.json.return_value = {"url": f"http://example.com/{data.file_name}"}
+            return mock_response
+
+        mock_post.side_effect = lfa_post
+
+        request = HttpRequest()
+        request.FILES = MultiValueDict(
+            {"file[]": [SimpleUploadedFile(f"test{i}.txt", b"file_content") for i in range(1, 4)]}
+        )
         response = upload_to_lfa(request, option="upload-file")
+
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(response.data, {"ack": "Error when uploading files"})
+        self.assertEqual(response.data["ack"], "Error when uploading files")
+        self.assertEqual(
+            response.data["urls"],
+            ["http://example.com/test1.txt", "http://example.com/test3.txt"],
+        )
+        self.assertEqual([file["status"] for file in response.data["files"]], [200, 500, 200])
+        self.assertEqual(response.data["files"][1]["url"], None)
+
+    def test_multipart_file_stream(self):
+        file_content = b"file_content" * 1000
+        uploaded_file = SimpleUploadedFile("test.txt", file_content, content_type="text/plain")
+        stream = MultipartFileStream("uploaded_file", uploaded_file)
+
+        body = b""
+        while chunk := stream.read(1000):
+            body += chunk
+
+        self.assertEqual(len(body), len(stream))
+        boundary = stream.content_type.split("boundary=")[1]
+        self.assertTrue(body.startswith(f"--{boundary}\r\n".encode()))
+        self.assertIn(b'name="uploaded_file"; filename="test.txt"', body)
+        self.assertIn(b"Content-Type: text/plain\r\n\r\n" + file_content + b"\r\n", body)
+        self.assertTrue(body.endswith(f"--{boundary}--\r\n".encode()))
 
     def test_invalid_option(self):
         request = HttpRequest()
@@ -21,6 +21,7 @@
 import os
 from unittest.mock import call, patch
 
+from django.conf import settings
 from django.contrib.auth.models import Permission, User
 from django.test import TestCase, override_settings
 from django.urls import reverse
@@ -73,7 +74,9 @@ class LOVECscTestCase(TestCase):
             self.client.post(url, data, format="json")
 
         expected_url = "http://foo:bar/lovecsc/observinglog"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=settings.UPSTREAM_TIMEOUT)
+        )
 
     @patch("requests.post")
     def test_unauthorized_lovecsc(self, mock_requests):
@@ -19,24 +19,29 @@
 
 import datetime
 import json
+import time
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
 import astropy
 import requests
 import rest_framework.response
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from freezegun import freeze_time
 from manager.utils import (
     DATETIME_ISO_FORMAT,
     ERROR_OBS_TICKETS,
     get_obsday_end_to_utc,
+    get_nightreport_status_snapshot_key,
     get_obsday_from_tai,
     get_tai_from_utc,
 )
 from rest_framework.test import APIClient
 
-from api.models import Token
+from api.models import EmailOutboxEntry, Token
 from api.views import NIGHT_REPORT_CONFLICT_MESSAGE
 
 OBS_SYSTEMS_HIERARCHY = """
@@ -164,6 +169,65 @@ class OLETestCase(TestCase):
 
         mock_ole_patcher.stop()
 
+    @override_settings(OLE_LISTING_CACHE_TTL=5, OLE_LISTING_FULL_REFRESH_INTERVAL=300)
+    def test_exposurelog_list_cache(self):
+        """Test exposurelog listings are shared between clients,
+        refreshed with the messages added since the last refresh
+        and invalidated when a message is deleted."""
+        # Arrange:
+        messages = [
+            {"id": "2", "date_added": "2024-01-01T00:02:00"},
+            {"id": "1", "date_added": "2024-01-01T00:01:00"},
+        ]
+        new_message = {"id": "3", "date_added": "2024-01-01T00:03:00"}
+
+        def ole_get(url, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            if "min_date_added" in parse_qs(urlparse(url).query):
+                response.json = lambda: [new_message, messages[0]]
+            else:
+                response.json = lambda: messages
+            return response
+
+        mock_ole_get_patcher = patch("requests.get")
+        mock_ole_get_client = mock_ole_get_patcher.start()
+        mock_ole_get_client.side_effect = ole_get
+        mock_ole_delete_patcher = patch("requests.delete")
+        mock_ole_delete_client = mock_ole_delete_patcher.start()
+        response = requests.Response()
+        response.status_code = 204
+        mock_ole_delete_client.return_value = response
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        url = reverse("ExposureLogs-list")
+        query = {"order_by": "-date_added", "limit": 2}
+
+        # Act:
+        with freeze_time("2024-01-01 00:05:00") as frozen_time:
+            first_response = self.client.get(url, query)
+            cached_response = self.client.get(url, query)
+            frozen_time.tick(10)
+            refreshed_response = self.client.get(url, query)
+            self.client.delete(reverse("ExposureLogs-detail", args=["1"]))
+            invalidated_response = self.client.get(url, query)
+
+        # Assert:
+        self.assertEqual(first_response.data, messages)
+        self.assertEqual(cached_response.data, messages)
+        self.assertEqual([message["id"] for message in refreshed_response.data], ["3", "2"])
+        self.assertEqual(invalidated_response.data, messages)
+        requested_queries = [
+            parse_qs(urlparse(call.args[0]).query) for call in mock_ole_get_client.call_args_list
+        ]
+        self.assertEqual(len(requested_queries), 3)
+        self.assertNotIn("min_date_added", requested_queries[0])
+        self.assertEqual(requested_queries[1]["min_date_added"], ["2024-01-01T00:02:00"])
+        self.assertNotIn("min_date_added", requested_queries[2])
+
+        mock_ole_get_patcher.stop()
+        mock_ole_delete_patcher.stop()
+
     def test_simple_exposurelog_create(self):
         """Test exposurelog create."""
         # Arrange:
@@ -202,6 +266,82 @@ class OLETestCase(TestCase):
 
         mock_ole_patcher.stop()
 
+    def test_multiple_exposurelog_create(self):
+        """Test exposurelog create for several obs_ids."""
+        # Arrange:
+        mock_ole_patcher = patch("requests.Session.post")
+        mock_ole_client = mock_ole_patcher.start()
+
+        def ole_post(url, json, timeout):
+            response = requests.Response()
+            if json["obs_id"] == "AT_O_20220208_000142":
+                response.status_code = 400
+                response.json = lambda: {"detail": "Invalid obs_id"}
+            else:
+                response.status_code = 201
+                response.json = lambda: {"obs_id": json["obs_id"]}
+            return response
+
+        mock_ole_client.side_effect = ole_post
+        obs_ids = [f"AT_O_20220208_00014{i}" for i in range(5)]
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+
+        # Act:
+        url = reverse("ExposureLogs-list")
+        response = self.client.post(url, {**self.payload_full_exposure, "obs_id": ",".join(obs_ids)})
+
+        # Assert:
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(mock_ole_client.call_count, len(obs_ids))
+        self.assertEqual([result["obs_id"] for result in response.data["results"]], obs_ids)
+        for result in response.data["results"]:
+            if result["obs_id"] == "AT_O_20220208_000142":
+                self.assertEqual(result["status"], 400)
+            else:
+                self.assertEqual(result["status"], 201)
+                self.assertEqual(result["data"], {"obs_id": result["obs_id"]})
+        payload = mock_ole_client.call_args.kwargs["json"]
+        self.assertEqual(payload["tags"], ["tag1", " tag2"])
+        self.assertEqual(payload["user_agent"], "LOVE")
+
+        # All the requests succeed
+        mock_ole_client.side_effect = None
+        mock_ole_client.return_value = requests.Response()
+        mock_ole_client.return_value.status_code = 201
+        mock_ole_client.return_value.json = lambda: {}
+        response = self.client.post(url, {**self.payload_full_exposure, "obs_id": ",".join(obs_ids[:2])})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        mock_ole_patcher.stop()
+
+    def test_multiple_exposurelog_update(self):
+        """Test exposurelog update for several messages."""
+        # Arrange:
+        mock_ole_patcher = patch("requests.Session.patch")
+        mock_ole_client = mock_ole_patcher.start()
+        response = requests.Response()
+        response.status_code = 200
+        response.json = lambda: {}
+        mock_ole_client.return_value = response
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+
+        # Act:
+        url = reverse("ExposureLogs-detail", args=["1,2,3"])
+        response = self.client.put(url, self.payload_full_exposure)
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["id"] for result in response.data["results"]], ["1", "2", "3"])
+        self.assertCountEqual(
+            [call_args.args[0].split("/")[-1] for call_args in mock_ole_client.call_args_list],
+            ["1", "2", "3"],
+        )
+
+        mock_ole_patcher.stop()
+
     def test_exposurelog_create_with_jira(self):
         """Test exposurelog create with jira."""
         # Arrange:
@@ -804,6 +944,219 @@ class NightReportTestCase(TestCase):
         mock_get_nightreport_observatory_status_from_efd_client.stop()
         mock_get_nightreport_cscs_status_from_efd_client.stop()
 
+    @override_settings(NIGHTREPORT_EFD_TIMEOUT=5, NIGHTREPORT_JIRA_TIMEOUT=0.3)
+    def test_nightreport_send_concurrent_stages(self):
+        """Test nightreport send gathers the report data concurrently."""
+        # Arrange:
+        response_patch = requests.Response()
+        response_patch.status_code = 200
+        response_patch.json = lambda: self.response_report
+
+        def slow_efd_query(*args):
+            time.sleep(0.2)
+            return {}
+
+        patchers = {
+            "requests.patch": response_patch,
+            "api.views.get_last_valid_night_report": self.response_report,
+            "api.views.get_nightreport_observatory_status_from_efd": None,
+            "api.views.get_nightreport_cscs_status_from_efd": None,
+            "api.views.get_jira_obs_report": [],
+            "api.views.render_nightreport_email": ("", ""),
+            "api.views.send_smtp_email": True,
+        }
+        mocks = {}
+        for target, return_value in patchers.items():
+            mocks[target] = patch(target).start()
+            mocks[target].return_value = return_value
+        mocks["api.views.get_nightreport_observatory_status_from_efd"].side_effect = slow_efd_query
+        mocks["api.views.get_nightreport_cscs_status_from_efd"].side_effect = slow_efd_query
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        url = reverse("OLE-nightreport-send-report", args=[self.response_report["id"]])
+
+        # Act:
+        start = time.monotonic()
+        response = self.client.post(url, data=self.send_report_payload, format="json")
+        elapsed = time.monotonic() - start
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        # EFD queries are not run one after the other
+        self.assertLess(elapsed, 0.39)
+        stages = [timing.split(";")[0] for timing in response["Server-Timing"].split(", ")]
+        self.assertEqual(
+            stages,
+            [
+                "report",
+                "observatory_status",
+                "cscs_status",
+                "obs_issues",
+                "email_content",
+                "email_send",
+                "report_update",
+            ],
+        )
+
+        # Jira query times out
+        mocks["api.views.get_jira_obs_report"].side_effect = lambda *args: time.sleep(1)
+        response = self.client.post(url, data=self.send_report_payload, format="json")
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.data, {"error": "Timeout after 0.3 seconds getting obs issues."})
+        self.assertIn("obs_issues;dur=", response["Server-Timing"])
+
+        patch.stopall()
+
+    @override_settings(EMAIL_OUTBOX_ENABLED=True)
+    def test_nightreport_send_email_outbox(self):
+        """Test nightreport send stores the email in the outbox
+        instead of sending it during the request."""
+        # Arrange:
+        response_patch = requests.Response()
+        response_patch.status_code = 200
+        response_patch.json = lambda: {**self.response_report}
+
+        patchers = {
+            "requests.patch": response_patch,
+            "api.views.get_last_valid_night_report": self.response_report,
+            "api.views.get_nightreport_observatory_status_from_efd": self.observatory_status_efd,
+            "api.views.get_nightreport_cscs_status_from_efd": self.cscs_status_efd,
+            "api.views.get_jira_obs_report": [],
+            "api.views.send_smtp_email": True,
+        }
+        mocks = {}
+        for target, return_value in patchers.items():
+            mocks[target] = patch(target).start()
+            mocks[target].return_value = return_value
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        url = reverse("OLE-nightreport-send-report", args=[self.response_report["id"]])
+
+        # Act:
+        response = self.client.post(url, data=self.send_report_payload, format="json")
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        mocks["api.views.send_smtp_email"].assert_not_called()
+        self.assertIn("date_sent", mocks["requests.patch"].call_args.kwargs["json"])
+
+        entry = EmailOutboxEntry.objects.get()
+        self.assertEqual(response.data["email_outbox"]["id"], entry.id)
+        self.assertEqual(response.data["email_outbox"]["status"], "pending")
+        self.assertTrue(entry.subject.startswith("Rubin Observatory Night Report"))
+        self.assertIn("email_enqueue;dur=", response["Server-Timing"])
+
+        patch.stopall()
+
+    @override_settings(NIGHTREPORT_SNAPSHOT_MAX_AGE=600)
+    def test_nightreport_send_status_snapshot(self):
+        """Test nightreport send uses the prefetched status snapshot
+        instead of querying the EFD."""
+        # Arrange:
+        response_patch = requests.Response()
+        response_patch.status_code = 200
+        response_patch.json = lambda: {**self.response_report}
+
+        patchers = {
+            "requests.patch": response_patch,
+            "api.views.get_last_valid_night_report": self.response_report,
+            "api.views.get_nightreport_observatory_status_from_efd": None,
+            "api.views.get_nightreport_cscs_status_from_efd": None,
+            "api.views.get_jira_obs_report": [],
+            "api.views.send_smtp_email": True,
+        }
+        mocks = {}
+        for target, return_value in patchers.items():
+            mocks[target] = patch(target).start()
+            mocks[target].return_value = return_value
+
+        report_obsday_end_tai = get_tai_from_utc(get_obsday_end_to_utc(int(self.response_report["day_obs"])))
+        cache.set(
+            get_nightreport_status_snapshot_key("summit_efd", self.response_report["day_obs"]),
+            {
+                "observatory_status": self.observatory_status_efd,
+                "cscs_status": self.cscs_status_efd,
+                "time_cut": report_obsday_end_tai - datetime.timedelta(seconds=120),
+            },
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        url = reverse("OLE-nightreport-send-report", args=[self.response_report["id"]])
+
+        # Act:
+        response = self.client.post(url, data=self.send_report_payload, format="json")
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status_snapshot_age"], 120)
+        mocks["api.views.get_nightreport_observatory_status_from_efd"].assert_not_called()
+        mocks["api.views.get_nightreport_cscs_status_from_efd"].assert_not_called()
+        self.assertNotIn("observatory_status;dur=", response["Server-Timing"])
+        html_content = mocks["api.views.send_smtp_email"].call_args[0][2]
+        self.assertIn("Observatory Status at", html_content)
+
+        # The EFD is queried when the snapshot is too old
+        mock_observatory_status = mocks["api.views.get_nightreport_observatory_status_from_efd"]
+        mock_observatory_status.return_value = self.observatory_status_efd
+        mocks["api.views.get_nightreport_cscs_status_from_efd"].return_value = self.cscs_status_efd
+        with override_settings(NIGHTREPORT_SNAPSHOT_MAX_AGE=60):
+            response = self.client.post(url, data=self.send_report_payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["status_snapshot_age"])
+        mock_observatory_status.assert_called_once()
+        mocks["api.views.get_nightreport_cscs_status_from_efd"].assert_called_once()
+
+        patch.stopall()
+
+    def test_nightreport_preview(self):
+        """Test nightreport preview reuses the status of the report."""
+        # Arrange:
+        patchers = {
+            "api.views.get_last_valid_night_report": self.response_report,
+            "api.views.get_nightreport_observatory_status_from_efd": self.observatory_status_efd,
+            "api.views.get_nightreport_cscs_status_from_efd": self.cscs_status_efd,
+            "api.views.get_jira_obs_report": [],
+        }
+        mocks = {}
+        for target, return_value in patchers.items():
+            mocks[target] = patch(target).start()
+            mocks[target].return_value = return_value
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+        url = reverse("OLE-nightreport-preview-report", args=[self.response_report["id"]])
+        day_obs = {"day_obs": self.response_report["day_obs"]}
+
+        # Act:
+        response = self.client.get(url, day_obs)
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["subject"], "Rubin Observatory Night Report 2025-09-30")
+        self.assertIn("CSCs Summary States", response.data["html"])
+        self.assertIn("MTMount:0: ENABLED", response.data["plain"])
+        self.assertIn("obs_issues;dur=", response["Server-Timing"])
+
+        # The report is read again but not its status
+        mocks["api.views.get_last_valid_night_report"].return_value = {
+            **self.response_report,
+            "summary": "updated summary",
+        }
+        response = self.client.get(url, day_obs)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("updated summary", response.data["plain"])
+        self.assertNotIn("obs_issues;dur=", response["Server-Timing"])
+        mocks["api.views.get_nightreport_observatory_status_from_efd"].assert_called_once()
+        mocks["api.views.get_nightreport_cscs_status_from_efd"].assert_called_once()
+        mocks["api.views.get_jira_obs_report"].assert_called_once()
+
+        # Night report is not the last valid one
+        mocks["api.views.get_last_valid_night_report"].return_value = None
+        response = self.client.get(url, day_obs)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {"error": NIGHT_REPORT_CONFLICT_MESSAGE})
+
+        patch.stopall()
+
     def test_nightreport_send_fail(self):
         """Test nightreport send fail."""
         # Arrange:
@@ -823,8 +1176,9 @@ class NightReportTestCase(TestCase):
         mock_get_jira_obs_report = patch("api.views.get_jira_obs_report")
         mock_get_jira_obs_report_client = mock_get_jira_obs_report.start()
 
-        mock_arrange_nightreport_email = patch("api.views.arrange_nightreport_email")
-        mock_arrange_nightreport_email_client = mock_arrange_nightreport_email.start()
+        mock_render_nightreport_email = patch("api.views.render_nightreport_email")
+        mock_render_nightreport_email_client = mock_render_nightreport_email.start()
+        mock_render_nightreport_email_client.return_value = ("", "")
 
         mock_send_smtp_email = patch("api.views.send_smtp_email")
         mock_send_smtp_email_client = mock_send_smtp_email.start()
@@ -896,19 +1250,19 @@ class NightReportTestCase(TestCase):
 
         # Arrange night report email raise error
         mock_get_jira_obs_report_client.side_effect = None
-        mock_arrange_nightreport_email_client.side_effect = Exception("Error arranging night report email")
+        mock_render_nightreport_email_client.side_effect = Exception("Error arranging night report email")
         response = self.client.post(url, data=self.send_report_payload, format="json")
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.data, {"error": "Error arranging night report email"})
 
         # SMTP email send fail
-        mock_arrange_nightreport_email_client.side_effect = None
+        mock_render_nightreport_email_client.side_effect = None
         mock_send_smtp_email_client.return_value = False
         response = self.client.post(url, data=self.send_report_payload, format="json")
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.data, {"error": "Error sending email"})
 
         mock_get_jira_obs_report.stop()
-        mock_arrange_nightreport_email.stop()
+        mock_render_nightreport_email.stop()
         mock_send_smtp_email.stop()
         mock_get_last_valid_night_report_patcher.stop()
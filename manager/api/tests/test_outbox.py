@@ -0,0 +1,481 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import os
+import smtplib
+from unittest.mock import patch
+
+import requests
+import rest_framework.response
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from manager.smtp_client import smtp_client
+from rest_framework.test import APIClient
+
+from api.models import EmailOutboxEntry, JiraOutboxEntry, Token
+from api.outbox import enqueue_email, process_email_outbox, process_jira_outbox
+
+JIRA_URL = "https://jira.lsstcorp.org/browse/OBS-1234"
+
+
+@override_settings(DEBUG=True, JIRA_OUTBOX_ENABLED=True)
+class JiraOutboxTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.client = APIClient()
+        self.user_normal = User.objects.create_user(
+            username="user-normal",
+            password="password",
+            email="test@user.cl",
+            first_name="user-normal",
+            last_name="",
+        )
+        self.token_user_normal = Token.objects.create(user=self.user_normal)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+
+        self.payload_exposure_with_jira_new = {
+            "request_type": "exposure",
+            "obs_id": "AT_O_20220208_000140",
+            "instrument": "LATISS",
+            "exposure_flag": "none",
+            "message_text": "Lorem ipsum",
+            "tags": "tag1, tag2",
+            "jira": "true",
+            "jira_new": "true",
+            "jira_issue_title": "Issue title",
+        }
+
+        self.jira_ticket_response = rest_framework.response.Response()
+        self.jira_ticket_response.status_code = 200
+        self.jira_ticket_response.data = {"ack": "Jira ticket created", "url": JIRA_URL}
+
+        self.ole_message_response = requests.Response()
+        self.ole_message_response.status_code = 200
+        self.ole_message_response.json = lambda: {"id": "message-1", "urls": ["https://lfa/file.png"]}
+
+        self.ole_update_response = requests.Response()
+        self.ole_update_response.status_code = 200
+        self.ole_update_response.json = lambda: {}
+
+    def create_entry(self, **kwargs):
+        return JiraOutboxEntry.objects.create(
+            payload={"jira_new": "true", "request_type": "exposure"},
+            ole_service="exposurelog",
+            ole_message_ids=["message-1"],
+            **kwargs,
+        )
+
+    def test_exposurelog_create_enqueues_jira_payload(self):
+        """Test the exposurelog create endpoint returns before
+        the JIRA payload is sent."""
+        # Arrange:
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+
+        mock_ole_patcher = patch("requests.post")
+        mock_ole_client = mock_ole_patcher.start()
+        response_ole = requests.Response()
+        response_ole.status_code = 201
+        response_ole.json = lambda: {"id": "message-1", "urls": []}
+        mock_ole_client.return_value = response_ole
+
+        # Act:
+        url = reverse("ExposureLogs-list")
+        response = self.client.post(url, self.payload_exposure_with_jira_new)
+
+        # Assert:
+        self.assertEqual(response.status_code, 201)
+        mock_jira_ticket.assert_not_called()
+        self.assertEqual(mock_ole_client.call_args.kwargs["json"]["urls"], [])
+
+        entry = JiraOutboxEntry.objects.get()
+        self.assertEqual(response.data["jira_outbox"]["id"], entry.id)
+        self.assertEqual(response.data["jira_outbox"]["status"], "pending")
+        self.assertEqual(entry.ole_service, "exposurelog")
+        self.assertEqual(entry.ole_message_ids, ["message-1"])
+        self.assertEqual(entry.payload["jira_issue_title"], "Issue title")
+        self.assertEqual(entry.payload["user_agent"], "LOVE")
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_patcher.stop()
+
+    def test_exposurelog_create_failure_does_not_enqueue_jira_payload(self):
+        """Test the exposurelog create endpoint does not store the JIRA payload
+        when the OLE message was not created."""
+        # Arrange:
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+
+        mock_ole_patcher = patch("requests.post")
+        mock_ole_client = mock_ole_patcher.start()
+        response_ole = requests.Response()
+        response_ole.status_code = 400
+        response_ole.json = lambda: {"detail": "Invalid message"}
+        mock_ole_client.return_value = response_ole
+
+        # Act:
+        url = reverse("ExposureLogs-list")
+        response = self.client.post(url, self.payload_exposure_with_jira_new)
+
+        # Assert:
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("jira_outbox", response.data)
+        self.assertEqual(JiraOutboxEntry.objects.count(), 0)
+        mock_jira_ticket.assert_not_called()
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_patcher.stop()
+
+    def test_log_update_failure_does_not_enqueue_jira_payload(self):
+        """Test the exposurelog and narrativelog update endpoints do not store
+        the JIRA payload when the OLE messages were not updated."""
+        # Arrange:
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+
+        mock_ole_patcher = patch("requests.patch")
+        mock_ole_client = mock_ole_patcher.start()
+        response_ole = requests.Response()
+        response_ole.status_code = 404
+        response_ole.json = lambda: {"detail": "Message not found"}
+        mock_ole_client.return_value = response_ole
+
+        payload_narrative_with_jira_new = {
+            **self.payload_exposure_with_jira_new,
+            "request_type": "narrative",
+            "date_begin": "2024-01-01T00:00:00.000000",
+            "date_end": "2024-01-01T00:10:00.000000",
+        }
+        del payload_narrative_with_jira_new["obs_id"]
+
+        # Act:
+        exposurelog_response = self.client.put(
+            reverse("ExposureLogs-detail", args=["message-1"]), self.payload_exposure_with_jira_new
+        )
+        narrativelog_response = self.client.put(
+            reverse("NarrativeLogs-detail", args=["message-1"]), payload_narrative_with_jira_new
+        )
+
+        # Assert:
+        self.assertEqual(mock_ole_client.call_count, 2)
+        self.assertEqual(exposurelog_response.status_code, 404)
+        self.assertNotIn("jira_outbox", exposurelog_response.data)
+        self.assertEqual(narrativelog_response.status_code, 404)
+        self.assertNotIn("jira_outbox", narrativelog_response.data)
+        self.assertEqual(JiraOutboxEntry.objects.count(), 0)
+        mock_jira_ticket.assert_not_called()
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_patcher.stop()
+
+    def test_exposurelog_create_invalid_jira_payload(self):
+        """Test the exposurelog create endpoint rejects a JIRA payload
+        without request type before storing the OLE message."""
+        # Arrange:
+        mock_ole_patcher = patch("requests.post")
+        mock_ole_client = mock_ole_patcher.start()
+        payload = {**self.payload_exposure_with_jira_new}
+        del payload["request_type"]
+
+        # Act:
+        url = reverse("ExposureLogs-list")
+        response = self.client.post(url, payload)
+
+        # Assert:
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["ack"], "Error reading request type")
+        mock_ole_client.assert_not_called()
+        self.assertEqual(JiraOutboxEntry.objects.count(), 0)
+
+        mock_ole_patcher.stop()
+
+    def test_process_jira_outbox(self):
+        """Test the worker sends the JIRA payload and adds
+        the Jira ticket url to the OLE messages."""
+        # Arrange:
+        entry = self.create_entry()
+
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+        mock_jira_ticket.return_value = self.jira_ticket_response
+
+        mock_ole_get_patcher = patch("requests.get")
+        mock_ole_get = mock_ole_get_patcher.start()
+        mock_ole_get.return_value = self.ole_message_response
+
+        mock_ole_patch_patcher = patch("requests.patch")
+        mock_ole_patch = mock_ole_patch_patcher.start()
+        mock_ole_patch.return_value = self.ole_update_response
+
+        # Act:
+        processed = process_jira_outbox()
+
+        # Assert:
+        self.assertEqual(processed, 1)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.DONE)
+        self.assertEqual(entry.jira_url, JIRA_URL)
+        mock_jira_ticket.assert_called_once_with(entry.payload)
+        mock_ole_patch.assert_called_once_with(
+            f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages/message-1",
+            json={"urls": [JIRA_URL, "https://lfa/file.png"]},
+            timeout=settings.UPSTREAM_TIMEOUT,
+        )
+
+        # Processed entries are not sent again
+        self.assertEqual(process_jira_outbox(), 0)
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_get_patcher.stop()
+        mock_ole_patch_patcher.stop()
+
+    @override_settings(QUEUE_BACKOFF=5, QUEUE_MAX_ATTEMPTS=2)
+    def test_process_jira_outbox_retry(self):
+        """Test the worker retries a failed entry with backoff
+        until the maximum number of attempts."""
+        # Arrange:
+        entry = self.create_entry()
+
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+        failed_response = rest_framework.response.Response()
+        failed_response.status_code = 400
+        failed_response.data = {"ack": "Jira ticket could not be created", "error": "Service unavailable"}
+        mock_jira_ticket.return_value = failed_response
+
+        # Act:
+        before = timezone.now()
+        process_jira_outbox()
+
+        # Assert:
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.PENDING)
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.last_error, "Jira ticket could not be created: Service unavailable")
+        self.assertGreaterEqual(entry.next_attempt_timestamp, before + datetime.timedelta(seconds=5))
+
+        # The entry is not retried before its backoff
+        self.assertEqual(process_jira_outbox(), 0)
+
+        # The entry fails after the maximum number of attempts
+        JiraOutboxEntry.objects.filter(id=entry.id).update(next_attempt_timestamp=timezone.now())
+        self.assertEqual(process_jira_outbox(), 1)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.FAILED)
+        self.assertEqual(entry.attempts, 2)
+
+        mock_jira_ticket_patcher.stop()
+
+    def test_process_jira_outbox_ole_failure(self):
+        """Test the Jira ticket is created only once when
+        the OLE messages could not be updated."""
+        # Arrange:
+        entry = self.create_entry()
+
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+        mock_jira_ticket.return_value = self.jira_ticket_response
+
+        mock_ole_get_patcher = patch("requests.get")
+        mock_ole_get = mock_ole_get_patcher.start()
+        failed_response = requests.Response()
+        failed_response.status_code = 500
+        mock_ole_get.return_value = failed_response
+
+        mock_ole_patch_patcher = patch("requests.patch")
+        mock_ole_patch = mock_ole_patch_patcher.start()
+        mock_ole_patch.return_value = self.ole_update_response
+
+        # Act:
+        process_jira_outbox()
+
+        # Assert:
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.PENDING)
+        self.assertEqual(entry.jira_url, JIRA_URL)
+        self.assertEqual(entry.last_error, "Error getting exposurelog message message-1")
+
+        # Retry once the OLE is available again
+        mock_ole_get.return_value = self.ole_message_response
+        JiraOutboxEntry.objects.filter(id=entry.id).update(next_attempt_timestamp=timezone.now())
+        call_command("process_tasks", "--once", "--max-workers", "1")
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.DONE)
+        mock_jira_ticket.assert_called_once()
+        mock_ole_patch.assert_called_once()
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_get_patcher.stop()
+        mock_ole_patch_patcher.stop()
+
+    def test_process_jira_outbox_stale_processing(self):
+        """Test entries left processing by a stopped worker are processed again."""
+        # Arrange:
+        entry = self.create_entry(status=JiraOutboxEntry.Status.PROCESSING)
+        JiraOutboxEntry.objects.filter(id=entry.id).update(
+            update_timestamp=timezone.now() - datetime.timedelta(hours=1)
+        )
+        recent_entry = self.create_entry(status=JiraOutboxEntry.Status.PROCESSING)
+
+        mock_jira_ticket_patcher = patch("manager.utils.jira_ticket")
+        mock_jira_ticket = mock_jira_ticket_patcher.start()
+        mock_jira_ticket.return_value = self.jira_ticket_response
+
+        mock_ole_get_patcher = patch("requests.get")
+        mock_ole_get = mock_ole_get_patcher.start()
+        mock_ole_get.return_value = self.ole_message_response
+
+        mock_ole_patch_patcher = patch("requests.patch")
+        mock_ole_patch = mock_ole_patch_patcher.start()
+        mock_ole_patch.return_value = self.ole_update_response
+
+        # Act:
+        processed = process_jira_outbox()
+
+        # Assert:
+        self.assertEqual(processed, 1)
+        entry.refresh_from_db()
+        recent_entry.refresh_from_db()
+        self.assertEqual(entry.status, JiraOutboxEntry.Status.DONE)
+        self.assertEqual(recent_entry.status, JiraOutboxEntry.Status.PROCESSING)
+
+        mock_jira_ticket_patcher.stop()
+        mock_ole_get_patcher.stop()
+        mock_ole_patch_patcher.stop()
+
+    def test_jira_outbox_entry_status(self):
+        """Test the Jira outbox entry status endpoint."""
+        # Arrange:
+        entry = self.create_entry(status=JiraOutboxEntry.Status.DONE, jira_url=JIRA_URL)
+
+        # Act:
+        response = self.client.get(reverse("Jira-outbox-entry", kwargs={"pk": entry.id}))
+        response_not_found = self.client.get(reverse("Jira-outbox-entry", kwargs={"pk": entry.id + 1}))
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["jira_url"], JIRA_URL)
+        self.assertEqual(response_not_found.status_code, 404)
+
+
+@override_settings(DEBUG=True, EMAIL_OUTBOX_ENABLED=True)
+@patch.dict(os.environ, {"SMTP_USER": "user@lsst.org", "SMTP_PASSWORD": "password"})
+class EmailOutboxTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.client = APIClient()
+        self.user_normal = User.objects.create_user(
+            username="user-normal",
+            password="password",
+            email="test@user.cl",
+            first_name="user-normal",
+            last_name="",
+        )
+        self.token_user_normal = Token.objects.create(user=self.user_normal)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token_user_normal.key)
+
+        self.mock_smtp_patcher = patch("smtplib.SMTP")
+        self.mock_smtp = self.mock_smtp_patcher.start()
+        self.mock_smtp_connection = self.mock_smtp.return_value
+
+    def tearDown(self):
+        """Close the mocked SMTP connection of the shared client."""
+        smtp_client.close()
+        self.mock_smtp_patcher.stop()
+
+    def test_process_email_outbox(self):
+        """Test the worker sends the emails reusing the SMTP connection."""
+        # Arrange:
+        first_entry = enqueue_email("night-log@lsst.org", "Night Report 1", "<p>Report 1</p>", "Report 1")
+        second_entry = enqueue_email("night-log@lsst.org", "Night Report 2", "<p>Report 2</p>", "Report 2")
+
+        # Act:
+        processed = process_email_outbox()
+
+        # Assert:
+        self.assertEqual(processed, 2)
+        first_entry.refresh_from_db()
+        second_entry.refresh_from_db()
+        self.assertEqual(first_entry.status, EmailOutboxEntry.Status.DONE)
+        self.assertEqual(second_entry.status, EmailOutboxEntry.Status.DONE)
+        self.mock_smtp.assert_called_once()
+        self.mock_smtp_connection.login.assert_called_once_with("user", "password")
+        self.assertEqual(self.mock_smtp_connection.sendmail.call_count, 2)
+        sender, to, _ = self.mock_smtp_connection.sendmail.call_args.args
+        self.assertEqual(sender, "user@lsst.org")
+        self.assertEqual(to, "night-log@lsst.org")
+
+    def test_process_email_outbox_reconnect(self):
+        """Test the worker opens a new SMTP connection
+        when the server closed the previous one."""
+        # Arrange:
+        entry = enqueue_email("night-log@lsst.org", "Night Report", "<p>Report</p>", "Report")
+        self.mock_smtp_connection.sendmail.side_effect = [smtplib.SMTPServerDisconnected(), {}]
+
+        # Act:
+        process_email_outbox()
+
+        # Assert:
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, EmailOutboxEntry.Status.DONE)
+        self.assertEqual(self.mock_smtp.call_count, 2)
+        self.assertEqual(self.mock_smtp_connection.sendmail.call_count, 2)
+
+    @override_settings(QUEUE_BACKOFF=5)
+    def test_process_email_outbox_retry(self):
+        """Test the worker retries an email the SMTP server rejected."""
+        # Arrange:
+        entry = enqueue_email("night-log@lsst.org", "Night Report", "<p>Report</p>", "Report")
+        self.mock_smtp_connection.sendmail.side_effect = smtplib.SMTPDataError(451, "Try again later")
+
+        # Act:
+        before = timezone.now()
+        process_email_outbox()
+
+        # Assert:
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, EmailOutboxEntry.Status.PENDING)
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("Try again later", entry.last_error)
+        self.assertGreaterEqual(entry.next_attempt_timestamp, before + datetime.timedelta(seconds=5))
+        self.mock_smtp_connection.quit.assert_called_once()
+
+    def test_email_outbox_entry_status(self):
+        """Test the email outbox entry status endpoint."""
+        # Arrange:
+        entry = enqueue_email("night-log@lsst.org", "Night Report", "<p>Report</p>", "Report")
+
+        # Act:
+        response = self.client.get(reverse("Email-outbox-entry", kwargs={"pk": entry.id}))
+        response_not_found = self.client.get(reverse("Email-outbox-entry", kwargs={"pk": entry.id + 1}))
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["subject"], "Night Report")
+        self.assertEqual(response_not_found.status_code, 404)
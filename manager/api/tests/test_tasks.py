@@ -0,0 +1,328 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework.test import APIClient
+
+from api.models import Task, Token
+from api.task_queue import claim_entries, enqueue_task, register_task, run_tasks
+from api.tasks import prefetch_nightreport_status
+
+
+class TaskQueueTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        registry_patcher = patch.dict("api.task_queue._registry", clear=True)
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        self.calls = []
+
+        @register_task(name="add")
+        def add(a, b=0):
+            self.calls.append((a, b))
+            return a + b
+
+        @register_task(name="fail", max_attempts=2)
+        def fail():
+            raise ValueError("Service unavailable")
+
+        @register_task(name="periodic", interval=60)
+        def periodic():
+            self.calls.append("periodic")
+            return timezone.now()
+
+    def test_run_task(self):
+        """Test a queued task is run and its result saved."""
+        # Arrange:
+        task = enqueue_task("add", args=[1], kwargs={"b": 2})
+
+        # Act:
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.DONE)
+        self.assertEqual(task.result, 3)
+        self.assertEqual(self.calls, [(1, 2), "periodic"])
+
+    def test_delayed_task(self):
+        """Test a delayed task is not run before its delay."""
+        # Arrange:
+        task = enqueue_task("add", args=[1], delay=60)
+
+        # Act:
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.PENDING)
+        self.assertNotIn((1, 0), self.calls)
+
+    @override_settings(QUEUE_BACKOFF=5)
+    def test_retry_task(self):
+        """Test a failed task is retried with backoff
+        until the maximum number of attempts."""
+        # Arrange:
+        task = enqueue_task("fail", unique_key="fail")
+
+        # Act:
+        before = timezone.now()
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertEqual(task.last_error, "Service unavailable")
+        self.assertGreaterEqual(task.next_attempt_timestamp, before + datetime.timedelta(seconds=5))
+
+        # The task fails after the maximum number of attempts
+        Task.objects.filter(id=task.id).update(next_attempt_timestamp=timezone.now())
+        run_tasks(max_workers=1, once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertIsNone(task.unique_key)
+
+    def test_periodic_task(self):
+        """Test a periodic task is queued once and run again after its interval."""
+        # Act:
+        run_tasks(max_workers=1, once=True)
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        task = Task.objects.get(name="periodic")
+        self.assertEqual(task.status, Task.Status.PENDING)
+        self.assertEqual(task.unique_key, "periodic:periodic")
+        self.assertGreater(task.next_attempt_timestamp, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertEqual(self.calls, ["periodic"])
+
+        # The task runs again after its interval
+        Task.objects.filter(id=task.id).update(next_attempt_timestamp=timezone.now())
+        run_tasks(max_workers=1, once=True)
+        self.assertEqual(self.calls, ["periodic", "periodic"])
+        self.assertEqual(Task.objects.filter(name="periodic").count(), 1)
+
+    def test_unique_task(self):
+        """Test a task with the key of a pending task is not queued again."""
+        # Act:
+        task = enqueue_task("add", args=[1], unique_key="add-1")
+        same_task = enqueue_task("add", args=[1], unique_key="add-1")
+
+        # Assert:
+        self.assertEqual(task.id, same_task.id)
+        self.assertEqual(Task.objects.filter(name="add").count(), 1)
+
+        # The key is released once the task is done
+        run_tasks(max_workers=1, once=True)
+        new_task = enqueue_task("add", args=[1], unique_key="add-1")
+        self.assertNotEqual(task.id, new_task.id)
+
+    def test_unknown_task(self):
+        """Test unknown tasks can not be queued, and fail if queued before."""
+        # Arrange:
+        task = Task.objects.create(name="removed")
+
+        # Act:
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        with self.assertRaises(ValueError):
+            enqueue_task("removed")
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertEqual(task.last_error, "Unknown task: removed")
+
+
+class TaskWorkersTestCase(TransactionTestCase):
+    """The tasks run by the workers use their own connections
+    to the database, so the test data must be committed."""
+
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        registry_patcher = patch.dict("api.task_queue._registry", clear=True)
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        self.calls = []
+
+        @register_task(name="add")
+        def add(a, b=0):
+            self.calls.append((a, b))
+            return a + b
+
+    def test_run_tasks_concurrently(self):
+        """Test the queued tasks are run by several workers."""
+        # Arrange:
+        tasks = [enqueue_task("add", args=[i]) for i in range(3)]
+
+        # Act:
+        run_tasks(max_workers=4, once=True)
+
+        # Assert:
+        for task in tasks:
+            task.refresh_from_db()
+            self.assertEqual(task.status, Task.Status.DONE)
+        self.assertEqual(sorted(self.calls), [(0, 0), (1, 0), (2, 0)])
+
+    @override_settings(QUEUE_PROCESSING_TIMEOUT=0.3)
+    def test_long_task_kept_claimed(self):
+        """Test a task running longer than the processing timeout
+        is not claimed again by another worker."""
+
+        # Arrange:
+        @register_task(name="slow")
+        def slow():
+            time.sleep(0.6)
+            # Another worker claims the entries ready to be processed
+            return [task.id for task in claim_entries(Task)]
+
+        task = enqueue_task("slow")
+
+        # Act:
+        run_tasks(max_workers=1, once=True)
+
+        # Assert:
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.DONE)
+        self.assertEqual(task.result, [])
+
+
+class TaskViewSetTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        registry_patcher = patch.dict("api.task_queue._registry", clear=True)
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="user-normal",
+            password="password",
+            email="test@user.cl",
+            first_name="user-normal",
+            last_name="",
+        )
+        self.token = Token.objects.create(user=self.user)
+
+        register_task(name="add")(lambda a, b=0: a + b)
+        self.task_done = enqueue_task("add", args=[1])
+        run_tasks(max_workers=1, once=True)
+        self.task_pending = enqueue_task("add", args=[2], delay=60)
+
+    def test_list_tasks(self):
+        """Test an authenticated user can list the tasks, filtered by status."""
+        # Arrange:
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+        # Act:
+        response = self.client.get(reverse("Tasks-list"))
+        filtered_response = self.client.get(reverse("Tasks-list"), {"status": "pending", "name": "add"})
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task["id"] for task in response.data], [self.task_pending.id, self.task_done.id])
+        self.assertEqual([task["id"] for task in filtered_response.data], [self.task_pending.id])
+
+    def test_retrieve_task(self):
+        """Test an authenticated user can get the result of a task."""
+        # Arrange:
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+        # Act:
+        response = self.client.get(reverse("Tasks-detail", args=[self.task_done.id]))
+
+        # Assert:
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["result"], 1)
+
+    def test_unauthenticated_tasks(self):
+        """Test an unauthenticated user can not list the tasks."""
+        # Act:
+        response = self.client.get(reverse("Tasks-list"))
+
+        # Assert:
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), "love-manager-tests-cache"),
+        }
+    }
+)
+class NightReportTasksTestCase(TestCase):
+    @override_settings(
+        NIGHTREPORT_SNAPSHOT_WINDOW=4,
+        NIGHTREPORT_SNAPSHOT_EFD_INSTANCES=["summit_efd", "base_efd"],
+    )
+    @patch("api.tasks.prefetch_nightreport_status_snapshot")
+    def test_prefetch_nightreport_status(self, mock_prefetch):
+        """Test the night report status is only prefetched
+        near the end of the observing day."""
+        # Act:
+        with freeze_time("2025-10-01 02:00:00"):
+            far_from_end = prefetch_nightreport_status()
+        with freeze_time("2025-10-01 09:00:00"):
+            near_end = prefetch_nightreport_status()
+
+        # Assert:
+        self.assertEqual(far_from_end, [])
+        self.assertEqual(near_end, ["summit_efd", "base_efd"])
+        self.assertEqual(mock_prefetch.call_count, 2)
+        mock_prefetch.assert_any_call("summit_efd", 20250930)
+        mock_prefetch.assert_any_call("base_efd", 20250930)
+
+        # The status is prefetched from the other instances if one fails
+        mock_prefetch.reset_mock()
+        mock_prefetch.side_effect = [Exception("EFD unavailable"), None]
+        with freeze_time("2025-10-01 09:00:00"):
+            with self.assertRaises(RuntimeError) as e:
+                prefetch_nightreport_status()
+        self.assertEqual(
+            str(e.exception), "Error prefetching the night report status from summit_efd: EFD unavailable"
+        )
+        self.assertEqual(mock_prefetch.call_count, 2)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    @patch("api.tasks.prefetch_nightreport_status_snapshot")
+    def test_prefetch_nightreport_status_without_shared_cache(self, mock_prefetch):
+        """Test the night report status is not prefetched
+        to a cache the web processes can not read."""
+        # Act:
+        with freeze_time("2025-10-01 09:00:00"):
+            prefetched = prefetch_nightreport_status()
+
+        # Assert:
+        self.assertEqual(prefetched, [])
+        mock_prefetch.assert_not_called()
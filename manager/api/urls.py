@@ -50,6 +50,7 @@ from api.views import (
     NarrativelogViewSet,
     NightReportViewSet,
     ScriptConfigurationViewSet,
+    TaskViewSet,
     UserViewSet,
 )
 
@@ -69,6 +70,8 @@ urlpatterns = [
     path("swap-user/<flags>/", api.views.CustomSwapAuthToken.as_view(), name="swap-user"),
     path("auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("cmd/", api.views.commander, name="commander"),
+    path("cmd/batch", api.views.commander_batch, name="commander-batch"),
+    path("upstreams/metrics", api.views.upstreams_metrics, name="upstreams-metrics"),
     path(
         "lovecsc/observinglog",
         api.views.lovecsc_observinglog,
@@ -111,11 +114,26 @@ urlpatterns = [
         api.views.ole_send_night_report,
         name="OLE-nightreport-send-report",
     ),
+    path(
+        "ole/nightreport/preview/<pk>/",
+        api.views.ole_preview_night_report,
+        name="OLE-nightreport-preview-report",
+    ),
     path(
         "jira/report/<project>/",
         api.views.get_jira_tickets_report,
         name="Jira-tickets-report",
     ),
+    path(
+        "jira/outbox/<int:pk>/",
+        api.views.get_jira_outbox_entry,
+        name="Jira-outbox-entry",
+    ),
+    path(
+        "email/outbox/<int:pk>/",
+        api.views.get_email_outbox_entry,
+        name="Email-outbox-entry",
+    ),
 ]
 router.register("user", UserViewSet)
 router.register("configfile", ConfigFileViewSet)
@@ -126,4 +144,5 @@ router.register("ole/narrativelog/messages", NarrativelogViewSet, basename="Narr
 router.register("ole/nightreport/reports", NightReportViewSet, basename="NightReportLogs")
 router.register("controllocation", ControlLocationViewSet, basename="ControlLocation")
 router.register("scriptconfiguration", ScriptConfigurationViewSet, basename="ScriptConfiguration")
+router.register("tasks", TaskViewSet, basename="Tasks")
 urlpatterns.append(path("", include(router.urls)))
@@ -28,13 +28,16 @@ import urllib
 import astropy.time
 import jsonschema
 import ldap
-import requests
 import yaml
+from django.conf import settings
 from django.contrib.auth.models import Group, User
+from django.core.cache import cache
 from django_auth_ldap.backend import LDAPBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from manager.mixins import ConditionalGetMixin
 from manager.permissions import CommandPermission
+from manager.resilience import get_upstreams_metrics, upstream_request
 from manager.settings import (
     AUTH_LDAP_1_SERVER_URI,
     AUTH_LDAP_2_SERVER_URI,
@@ -42,18 +45,29 @@ from manager.settings import (
 )
 from manager.utils import (
     DATETIME_ISO_FORMAT,
-    arrange_nightreport_email,
+    EFD_DOWNSAMPLING_METHODS,
+    StageTimer,
+    aggregate_upstream_results,
+    downsample_efd_timeseries,
+    gather_concurrently,
     get_efd_instance_from_request,
     get_jira_obs_report,
+    get_jira_payload_data,
     get_last_valid_night_report,
+    get_ole_listing,
     get_nightreport_cscs_status_from_efd,
     get_nightreport_observatory_status_from_efd,
+    get_nightreport_status_snapshot,
     get_obsday_end_to_utc,
     get_obsday_from_tai,
     get_obsday_iso,
     get_tai_from_utc,
     handle_jira_payload,
+    invalidate_ole_listings,
+    proxy_upstream_request,
+    render_nightreport_email,
     send_smtp_email,
+    send_upstream_requests,
     upload_to_lfa,
 )
 from rest_framework import status, viewsets
@@ -66,19 +80,26 @@ from rest_framework.response import Response
 from api.models import (
     ConfigFile,
     ControlLocation,
+    EmailOutboxEntry,
     EmergencyContact,
     ImageTag,
+    JiraOutboxEntry,
     ScriptConfiguration,
+    Task,
     Token,
 )
+from api.outbox import enqueue_email, enqueue_jira_payload, get_jira_payload_error
 from api.serializers import (
     ConfigFileContentSerializer,
     ConfigFileSerializer,
     ConfigSerializer,
     ControlLocationSerializer,
+    EmailOutboxEntrySerializer,
     EmergencyContactSerializer,
     ImageTagSerializer,
+    JiraOutboxEntrySerializer,
     ScriptConfigurationSerializer,
+    TaskSerializer,
     TokenSerializer,
     UserSerializer,
 )
@@ -90,6 +111,8 @@ invalid_response = openapi.Response("Invalid token")
 not_found_response = openapi.Response("Not found")
 
 
+COMMANDER_BATCH_MODES = ["concurrent", "sequential"]
+
 NIGHT_REPORT_CONFLICT_MESSAGE = "Conflict with the last valid night report. Please update your report data."
 
 
@@ -412,6 +435,32 @@ def validate_config_schema(request):
         )
 
 
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response("Upstream services metrics"),
+        401: openapi.Response("Unauthenticated"),
+    },
+)
+@api_view(["GET"])
+@permission_classes((IsAuthenticated,))
+def upstreams_metrics(request):
+    """Returns the circuit breaker state and request counters
+    of each upstream service (LOVE-commander, OLE, EFD, Jira, LFA).
+
+    Params
+    ------
+    request: Request
+        The Request object
+
+    Returns
+    -------
+    Response
+        Dictionary with the metrics of each upstream service
+    """
+    return Response(get_upstreams_metrics())
+
+
 @swagger_auto_schema(
     method="post",
     responses={
@@ -444,11 +493,110 @@ def commander(request):
     request_data["identity"] = f"{request.user.username}@{host_fqdn}"
 
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/cmd"
-    response = requests.post(url, json=request_data)
+    response = upstream_request("commander", "post", url, json=request_data)
 
     return Response(response.json(), status=response.status_code)
 
 
+@swagger_auto_schema(
+    method="post",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "commands": openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                description="List of commands, each one with the same format accepted by cmd/",
+            ),
+            "mode": openapi.Schema(
+                type=openapi.TYPE_STRING,
+                enum=COMMANDER_BATCH_MODES,
+                description="Send the commands concurrently (default) or sequentially",
+            ),
+            "stop_on_error": openapi.Schema(
+                type=openapi.TYPE_BOOLEAN,
+                description="In sequential mode, skip the remaining commands after a failed one",
+            ),
+        },
+        required=["commands"],
+    ),
+    responses={
+        200: openapi.Response("Commands sent"),
+        400: openapi.Response("Invalid batch"),
+        401: openapi.Response("Unauthenticated"),
+        403: openapi.Response("Unauthorized"),
+    },
+)
+@api_view(["POST"])
+@permission_classes((IsAuthenticated, CommandPermission))
+def commander_batch(request):
+    """Sends a batch of commands to the LOVE-commander.
+
+    The request is authenticated and authorized once for the whole batch,
+    the command identity is arranged as in `commander`, and the commands
+    share the same upstream connections.
+
+    Params
+    ------
+    request: Request
+        The Request object
+        Request should contain the following:
+            commands (required): List of commands, each one with
+                the same format accepted by the commander view
+            mode (optional): 'concurrent' (default) to send all the commands
+                at the same time or 'sequential' to send them in order
+            stop_on_error (optional): In sequential mode, whether or not
+                to skip the remaining commands after a failed one.
+                Default False
+
+    Returns
+    -------
+    Response
+        Dictionary with a "results" key containing, for each command
+        and in the same order, a dictionary with the following keys:
+            status: The status code of the request to the LOVE-Commander,
+                or None if the command was skipped
+            data: The response of the LOVE-Commander
+    """
+    commands = request.data.get("commands")
+    mode = request.data.get("mode", "concurrent")
+    stop_on_error = request.data.get("stop_on_error", False)
+    if not isinstance(commands, list) or not commands or not all(isinstance(c, dict) for c in commands):
+        return Response(
+            {"ack": "commands must be a non empty list of commands"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(commands) > settings.COMMANDER_BATCH_MAX_SIZE:
+        return Response(
+            {"ack": f"A batch can contain at most {settings.COMMANDER_BATCH_MAX_SIZE} commands"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if mode not in COMMANDER_BATCH_MODES:
+        return Response(
+            {"ack": f"mode must be one of {', '.join(COMMANDER_BATCH_MODES)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Arrange command indentity
+    host_fqdn = os.environ.get("SERVER_URL", None)
+    identity = f"{request.user.username}@{host_fqdn}"
+    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/cmd"
+    # Keep commander bulkhead slots free for the single commands sent meanwhile
+    bulkhead_limit = settings.UPSTREAM_BULKHEAD_LIMITS.get(
+        "commander", settings.UPSTREAM_BULKHEAD_DEFAULT_LIMIT
+    )
+    max_workers = max(1, min(settings.COMMANDER_BATCH_CONCURRENCY, bulkhead_limit - 1))
+    results = send_upstream_requests(
+        "commander",
+        "post",
+        [{"url": url, "json": {**command, "identity": identity}} for command in commands],
+        max_workers if mode == "concurrent" else 1,
+        stop_on_error=stop_on_error,
+    )
+
+    return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 @swagger_auto_schema(
     method="post",
     responses={
@@ -478,7 +626,7 @@ def lovecsc_observinglog(request):
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:"
         f"{os.environ.get('COMMANDER_PORT')}/lovecsc/observinglog"
     )
-    response = requests.post(url, json=request.data)
+    response = upstream_request("commander", "post", url, json=request.data)
 
     return Response(response.json(), status=response.status_code)
 
@@ -514,9 +662,7 @@ def salinfo_metadata(request):
         The response and status code of the request to the LOVE-Commander
     """
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/salinfo/metadata"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "get", url)
 
 
 @swagger_auto_schema(
@@ -563,9 +709,7 @@ def salinfo_topic_names(request):
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:"
         f"{os.environ.get('COMMANDER_PORT')}/salinfo/topic-names{query}"
     )
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "get", url)
 
 
 @swagger_auto_schema(
@@ -612,9 +756,7 @@ def salinfo_topic_data(request):
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:"
         f"{os.environ.get('COMMANDER_PORT')}/salinfo/topic-data{query}"
     )
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "get", url)
 
 
 @swagger_auto_schema(
@@ -691,7 +833,7 @@ def set_config_selected(request):
     return Response(serializer.data)
 
 
-class ConfigFileViewSet(viewsets.ModelViewSet):
+class ConfigFileViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances the ConfigFile model."""
 
     permission_classes = [
@@ -752,7 +894,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """Serializer used to serialize View objects"""
 
 
-class EmergencyContactViewSet(viewsets.ModelViewSet):
+class EmergencyContactViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances the EmergencyContact model."""
 
     queryset = EmergencyContact.objects.order_by("subsystem").all()
@@ -762,7 +904,7 @@ class EmergencyContactViewSet(viewsets.ModelViewSet):
     """Serializer used to serialize View objects"""
 
 
-class ImageTagViewSet(viewsets.ModelViewSet):
+class ImageTagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances of the ImageTag model."""
 
     queryset = ImageTag.objects.order_by("label").all()
@@ -788,9 +930,7 @@ def query_efd_clients(request):
         The response and status code of the request to the LOVE-Commander
     """
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/efd_clients"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("efd", "get", url)
 
 
 @api_view(["POST"])
@@ -823,6 +963,12 @@ def query_efd_timeseries(request, *args, **kwargs):
             resample (optional): The offset string representing target
                 resample conversion, e.g. '15min', '10S'
             efd_instance (required): The specific EFD instance to query
+            max_points (optional): Int specifying the maximum number
+                of samples to return per field. If not provided
+                the timeseries is returned as received from the Commander
+            downsample_method (optional): The method used to reduce
+                the samples when max_points is provided,
+                one of 'lttb' (default) or 'minmax'
     args: list
         List of additional arguments. Currently unused
     kwargs: dict
@@ -831,11 +977,45 @@ def query_efd_timeseries(request, *args, **kwargs):
     Returns
     -------
     Response
-        The response and status code of the request to the LOVE-Commander
+        The response and status code of the request to the LOVE-Commander.
+        If the timeseries was downsampled, the X-Downsampling-* headers
+        describe the applied reduction.
     """
+    data = request.data.copy()
+    max_points = data.pop("max_points", None)
+    downsample_method = data.pop("downsample_method", "lttb")
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except (TypeError, ValueError):
+            max_points = 0
+        if max_points < 3:
+            return Response(
+                {"ack": "max_points must be an integer greater than 2"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if downsample_method not in EFD_DOWNSAMPLING_METHODS:
+            return Response(
+                {"ack": f"downsample_method must be one of {', '.join(EFD_DOWNSAMPLING_METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/timeseries"
-    response = requests.post(url, json=request.data)
-    return Response(response.json(), status=response.status_code)
+    if max_points is None:
+        return proxy_upstream_request("efd", "post", url, json=data)
+
+    response = upstream_request("efd", "post", url, json=data)
+    if response.status_code != 200:
+        return Response(response.json(), status=response.status_code)
+
+    downsampled_data, info = downsample_efd_timeseries(response.json(), max_points, downsample_method)
+    headers = {
+        "X-Downsampling-Method": info["method"],
+        "X-Downsampling-Max-Points": str(info["max_points"]),
+        "X-Downsampling-Original-Points": str(info["original_points"]),
+        "X-Downsampling-Returned-Points": str(info["returned_points"]),
+    }
+    return Response(downsampled_data, status=response.status_code, headers=headers)
 
 
 @api_view(["POST"])
@@ -867,8 +1047,7 @@ def query_efd_most_recent_timeseries(request, *args, **kwargs):
     url = (
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/top_timeseries"
     )
-    response = requests.post(url, json=request.data)
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("efd", "post", url, json=request.data)
 
 
 @api_view(["POST"])
@@ -908,8 +1087,7 @@ def query_efd_logs(request, *args, **kwargs):
         The response and status code of the request to the LOVE-Commander
     """
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/logmessages"
-    response = requests.post(url, json=request.data)
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("efd", "post", url, json=request.data)
 
 
 @api_view(["POST"])
@@ -931,9 +1109,7 @@ def query_reports_m1m3_bump_tests(request):
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:"
         f"{os.environ.get('COMMANDER_PORT')}/reports/m1m3-bump-tests"
     )
-    response = requests.post(url, json=request.data)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "post", url, json=request.data)
 
 
 @api_view(["POST"])
@@ -966,7 +1142,7 @@ def tcs_aux_command(request, *args, **kwargs):
         The response and status code of the request to the LOVE-Commander
     """
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/aux"
-    response = requests.post(url, json=request.data)
+    response = upstream_request("commander", "post", url, json=request.data)
     return Response(response.json(), status=response.status_code)
 
 
@@ -992,8 +1168,7 @@ def tcs_aux_docstrings(request, *args, **kwargs):
     url = (
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/aux/docstrings"
     )
-    response = requests.get(url)
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "get", url)
 
 
 @api_view(["POST"])
@@ -1026,7 +1201,7 @@ def tcs_main_command(request, *args, **kwargs):
         The response and status code of the request to the LOVE-Commander
     """
     url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/main"
-    response = requests.post(url, json=request.data)
+    response = upstream_request("commander", "post", url, json=request.data)
     return Response(response.json(), status=response.status_code)
 
 
@@ -1053,8 +1228,7 @@ def tcs_main_docstrings(request, *args, **kwargs):
         f"http://{os.environ.get('COMMANDER_HOSTNAME')}:"
         f"{os.environ.get('COMMANDER_PORT')}/tcs/main/docstrings"
     )
-    response = requests.get(url)
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("commander", "get", url)
 
 
 @swagger_auto_schema(
@@ -1084,9 +1258,7 @@ def ole_exposurelog_exposures(request, *args, **kwargs):
 
     query_params_string = urllib.parse.urlencode(request.query_params)
     url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/exposures?{query_params_string}"
-    response = requests.get(url, json=request.data)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("ole", "get", url, json=request.data)
 
 
 @swagger_auto_schema(
@@ -1116,9 +1288,7 @@ def ole_exposurelog_instruments(request):
 
     query_params_string = urllib.parse.urlencode(request.query_params)
     url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/instruments?{query_params_string}"
-    response = requests.get(url, json=request.data)
-
-    return Response(response.json(), status=response.status_code)
+    return proxy_upstream_request("ole", "get", url, json=request.data)
 
 
 class ExposurelogViewSet(viewsets.ViewSet):
@@ -1142,10 +1312,7 @@ class ExposurelogViewSet(viewsets.ViewSet):
 
     @swagger_auto_schema(responses={200: "Exposure logs listed"})
     def list(self, request, *args, **kwargs):
-        query_params_string = urllib.parse.urlencode(request.query_params)
-        url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages?{query_params_string}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=response.status_code)
+        return get_ole_listing("exposurelog", "exposurelog/messages", request.query_params)
 
     @swagger_auto_schema(responses={201: "Exposure log added"})
     def create(self, request, *args, **kwargs):
@@ -1163,7 +1330,15 @@ class ExposurelogViewSet(viewsets.ViewSet):
 
         # Manage JIRA tickets
         jira_url = None
-        if request.data.get("jira") == "true":
+        jira_payload_data = None
+        if request.data.get("jira") == "true" and settings.JIRA_OUTBOX_ENABLED:
+            # The JIRA payload is sent in the background
+            # once the OLE messages are stored
+            jira_payload_data = get_jira_payload_data(request, lfa_urls=lfa_urls)
+            jira_payload_error = get_jira_payload_error(jira_payload_data)
+            if jira_payload_error is not None:
+                return Response({"ack": jira_payload_error}, 400)
+        elif request.data.get("jira") == "true":
             jira_response = handle_jira_payload(request, lfa_urls=lfa_urls)
             if jira_response.status_code == 400:
                 return Response(
@@ -1195,20 +1370,35 @@ class ExposurelogViewSet(viewsets.ViewSet):
 
         # Send the request to the OLE API
         # for each obs in the obs_id list
-        for obs in request.data.get("obs_id").split(","):
-            json_data["obs_id"] = obs
-            response = requests.post(url, json=json_data)
-        return Response(response.json(), status=response.status_code)
+        obs_ids = request.data.get("obs_id").split(",")
+        results = send_upstream_requests(
+            "ole",
+            "post",
+            [{"url": url, "json": {**dict(json_data.items()), "obs_id": obs}} for obs in obs_ids],
+            settings.OLE_FANOUT_MAX_WORKERS,
+        )
+        invalidate_ole_listings("exposurelog")
+        response = aggregate_upstream_results("obs_id", obs_ids, results)
+
+        created_ids = [result["data"].get("id") for result in results if result["status"] == 201]
+        created_ids = list(filter(None, created_ids))
+        # The Jira ticket is only filed for messages that exist
+        if jira_payload_data is not None and created_ids:
+            outbox_entry = enqueue_jira_payload(jira_payload_data, "exposurelog", created_ids)
+            response.data["jira_outbox"] = JiraOutboxEntrySerializer(outbox_entry).data
+        return response
 
     @swagger_auto_schema(responses={200: "Exposure log retrieved"})
     def retrieve(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages/{pk}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=response.status_code)
+        return proxy_upstream_request("ole", "get", url, json=request.data)
 
     @swagger_auto_schema(responses={200: "Exposure log edited"})
     def update(self, request, pk=None, *args, **kwargs):
-        url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages/{pk}"
+        # Several messages can be edited at once
+        # by passing a list of ids separated by comma
+        message_ids = pk.split(",")
+        url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages"
 
         # Upload files to the LFA
         lfa_urls = []
@@ -1221,7 +1411,15 @@ class ExposurelogViewSet(viewsets.ViewSet):
 
         # Manage JIRA tickets
         jira_url = None
-        if request.data.get("jira") == "true":
+        jira_payload_data = None
+        if request.data.get("jira") == "true" and settings.JIRA_OUTBOX_ENABLED:
+            # The JIRA payload is sent in the background
+            # once the OLE messages are stored
+            jira_payload_data = get_jira_payload_data(request, lfa_urls=lfa_urls)
+            jira_payload_error = get_jira_payload_error(jira_payload_data)
+            if jira_payload_error is not None:
+                return Response({"ack": jira_payload_error}, 400)
+        elif request.data.get("jira") == "true":
             jira_response = handle_jira_payload(request, lfa_urls=lfa_urls)
             if jira_response.status_code == 400:
                 return Response(
@@ -1254,13 +1452,30 @@ class ExposurelogViewSet(viewsets.ViewSet):
         json_data["urls"] = list(filter(None, json_data["urls"]))
 
         # Send the request to the OLE API
-        response = requests.patch(url, json=json_data)
-        return Response(response.json(), status=response.status_code)
+        # for each message in the ids list
+        results = send_upstream_requests(
+            "ole",
+            "patch",
+            [{"url": f"{url}/{message_id}", "json": dict(json_data.items())} for message_id in message_ids],
+            settings.OLE_FANOUT_MAX_WORKERS,
+        )
+        invalidate_ole_listings("exposurelog")
+        response = aggregate_upstream_results("id", message_ids, results)
+
+        updated_ids = [
+            message_id for message_id, result in zip(message_ids, results) if result["status"] == 200
+        ]
+        # The Jira ticket is only filed for messages that were updated
+        if jira_payload_data is not None and updated_ids:
+            outbox_entry = enqueue_jira_payload(jira_payload_data, "exposurelog", updated_ids)
+            response.data["jira_outbox"] = JiraOutboxEntrySerializer(outbox_entry).data
+        return response
 
     @swagger_auto_schema(responses={200: "Exposure log deleted"})
     def destroy(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/exposurelog/messages/{pk}"
-        response = requests.delete(url, json=request.data)
+        response = upstream_request("ole", "delete", url, json=request.data)
+        invalidate_ole_listings("exposurelog")
         if response.status_code == 204:
             return Response({"ack": "Exposure log deleted succesfully"}, status=200)
         return Response(response.json(), status=response.status_code)
@@ -1287,10 +1502,7 @@ class NarrativelogViewSet(viewsets.ViewSet):
 
     @swagger_auto_schema(responses={200: "Narrative logs listed"})
     def list(self, request, *args, **kwargs):
-        query_params_string = urllib.parse.urlencode(request.query_params)
-        url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/narrativelog/messages?{query_params_string}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=200)
+        return get_ole_listing("narrativelog", "narrativelog/messages", request.query_params, status=200)
 
     @swagger_auto_schema(responses={201: "Narrative log added"})
     def create(self, request, *args, **kwargs):
@@ -1308,7 +1520,15 @@ class NarrativelogViewSet(viewsets.ViewSet):
 
         # Manage JIRA tickets
         jira_url = None
-        if request.data.get("jira") == "true":
+        jira_payload_data = None
+        if request.data.get("jira") == "true" and settings.JIRA_OUTBOX_ENABLED:
+            # The JIRA payload is sent in the background
+            # once the OLE messages are stored
+            jira_payload_data = get_jira_payload_data(request, lfa_urls=lfa_urls)
+            jira_payload_error = get_jira_payload_error(jira_payload_data)
+            if jira_payload_error is not None:
+                return Response({"ack": jira_payload_error}, 400)
+        elif request.data.get("jira") == "true":
             jira_response = handle_jira_payload(request, lfa_urls=lfa_urls)
             if jira_response.status_code == 400:
                 return Response(
@@ -1346,14 +1566,21 @@ class NarrativelogViewSet(viewsets.ViewSet):
         json_data["user_agent"] = "LOVE"
         json_data["user_id"] = f"{request.user}@{request.get_host()}"
 
-        response = requests.post(url, json=json_data)
-        return Response(response.json(), status=response.status_code)
+        response = upstream_request("ole", "post", url, json=json_data)
+        invalidate_ole_listings("narrativelog")
+        response_data = response.json()
+
+        created_id = response_data.get("id") if response.status_code == 201 else None
+        # The Jira ticket is only filed for messages that exist
+        if jira_payload_data is not None and created_id:
+            outbox_entry = enqueue_jira_payload(jira_payload_data, "narrativelog", [created_id])
+            response_data["jira_outbox"] = JiraOutboxEntrySerializer(outbox_entry).data
+        return Response(response_data, status=response.status_code)
 
     @swagger_auto_schema(responses={200: "Narrative log retrieved"})
     def retrieve(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/narrativelog/messages/{pk}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=response.status_code)
+        return proxy_upstream_request("ole", "get", url, json=request.data)
 
     @swagger_auto_schema(responses={200: "Narrative log edited"})
     def update(self, request, pk=None, *args, **kwargs):
@@ -1370,7 +1597,15 @@ class NarrativelogViewSet(viewsets.ViewSet):
 
         # Manage JIRA tickets
         jira_url = None
-        if request.data.get("jira") == "true":
+        jira_payload_data = None
+        if request.data.get("jira") == "true" and settings.JIRA_OUTBOX_ENABLED:
+            # The JIRA payload is sent in the background
+            # once the OLE messages are stored
+            jira_payload_data = get_jira_payload_data(request, lfa_urls=lfa_urls)
+            jira_payload_error = get_jira_payload_error(jira_payload_data)
+            if jira_payload_error is not None:
+                return Response({"ack": jira_payload_error}, 400)
+        elif request.data.get("jira") == "true":
             jira_response = handle_jira_payload(request, lfa_urls=lfa_urls)
             if jira_response.status_code == 400:
                 return Response(
@@ -1417,13 +1652,21 @@ class NarrativelogViewSet(viewsets.ViewSet):
         json_data["urls"] = list(filter(None, json_data["urls"]))
 
         # Send the request to the OLE API
-        response = requests.patch(url, json=json_data)
-        return Response(response.json(), status=response.status_code)
+        response = upstream_request("ole", "patch", url, json=json_data)
+        invalidate_ole_listings("narrativelog")
+        response_data = response.json()
+
+        # The Jira ticket is only filed for a message that was updated
+        if jira_payload_data is not None and response.status_code == 200:
+            outbox_entry = enqueue_jira_payload(jira_payload_data, "narrativelog", [pk])
+            response_data["jira_outbox"] = JiraOutboxEntrySerializer(outbox_entry).data
+        return Response(response_data, status=response.status_code)
 
     @swagger_auto_schema(responses={200: "Narrative log deleted"})
     def destroy(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/narrativelog/messages/{pk}"
-        response = requests.delete(url, json=request.data)
+        response = upstream_request("ole", "delete", url, json=request.data)
+        invalidate_ole_listings("narrativelog")
         if response.status_code == 204:
             return Response(
                 {"ack": "Narrative log deleted succesfully"},
@@ -1432,6 +1675,177 @@ class NarrativelogViewSet(viewsets.ViewSet):
         return Response(response.json(), status=response.status_code)
 
 
+def gather_nightreport_status(day_obs, efd_instance, timer):
+    """Get the observatory status, CSCs status and observation issues
+    of a night report.
+
+    The observatory and CSCs status are read from the snapshot prefetched
+    by the `prefetch_nightreport_status` task if it is fresh enough,
+    otherwise they are queried from the EFD. The queries are independent
+    so they are run concurrently, each one with its own timeout.
+
+    Parameters
+    ----------
+    day_obs : `int`
+        The observing day of the night report in the format "YYYYMMDD"
+    efd_instance : `str`
+        The EFD instance to query
+    timer : `StageTimer`
+        The timer where the duration of each query is added
+
+    Returns
+    -------
+    dict
+        Dictionary with the observatory_status, cscs_status and obs_issues keys,
+        the status_time_cut key with the time cut (TAI) of the status and the
+        status_snapshot_age key with the age in seconds of the snapshot used,
+        None if the status was queried from the EFD
+
+    Raises
+    ------
+    TimeoutError
+        If a query timed out
+    Exception
+        The error of the first query that failed
+    """
+    # Set time cut (TAI) for EFD queries. If the report is for a past obs day,
+    # we set the cut to the end of that obs day.
+    report_obsday_end_tai = get_tai_from_utc(get_obsday_end_to_utc(day_obs))
+    curr_tai = astropy.time.Time.now().tai.datetime
+    efd_time_cut = min(curr_tai, report_obsday_end_tai)
+
+    queries = {}
+    snapshot = get_nightreport_status_snapshot(efd_instance, day_obs, efd_time_cut)
+    if snapshot is None:
+        queries["observatory_status"] = (
+            lambda: get_nightreport_observatory_status_from_efd(efd_instance, efd_time_cut),
+            settings.NIGHTREPORT_EFD_TIMEOUT,
+        )
+        queries["cscs_status"] = (
+            lambda: get_nightreport_cscs_status_from_efd(efd_instance, efd_time_cut),
+            settings.NIGHTREPORT_EFD_TIMEOUT,
+        )
+    queries["obs_issues"] = (
+        lambda: get_jira_obs_report({"day_obs": day_obs}),
+        settings.NIGHTREPORT_JIRA_TIMEOUT,
+    )
+
+    stages = gather_concurrently(queries)
+    for name, stage in stages.items():
+        timer.add(name, stage["duration"])
+    for stage in stages.values():
+        if stage["error"] is not None:
+            raise stage["error"]
+
+    report_status = {name: stage["result"] for name, stage in stages.items()}
+    if snapshot is None:
+        report_status["status_time_cut"] = efd_time_cut
+        report_status["status_snapshot_age"] = None
+    else:
+        report_status["observatory_status"] = snapshot["observatory_status"]
+        report_status["cscs_status"] = snapshot["cscs_status"]
+        report_status["status_time_cut"] = snapshot["time_cut"]
+        report_status["status_snapshot_age"] = snapshot["age"]
+    return report_status
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response("Night report email preview"),
+        401: openapi.Response("Unauthenticated"),
+        403: openapi.Response("Unauthorized"),
+        409: openapi.Response("Night report is not the last valid one"),
+    },
+)
+@api_view(["GET"])
+@permission_classes((IsAuthenticated,))
+def ole_preview_night_report(request, *args, **kwargs):
+    """Preview the email of a night report before sending it
+
+    Params
+    ------
+    request: Request
+        The Request object
+
+    args : `list`
+        List of additional arguments. Currently unused.
+
+    kwargs : `dict`
+        Dictionary with request arguments. Currently using the following keys:
+            pk (required): The primary key of the night report to preview.
+
+    Notes
+    -----
+    The observatory status, CSCs status and observation issues are
+    cached for `settings.NIGHTREPORT_PREVIEW_CACHE_TTL` seconds,
+    so the email can be previewed many times while the report is
+    written without querying the EFD and JIRA again. The report
+    itself is always read again, so its last changes are shown.
+
+    The observing day of the report is read from the day_obs
+    query parameter, the current observing day by default.
+
+    Returns
+    -------
+    Response
+        Dictionary with the subject, html and plain keys, with the subject
+        and the content of the email in HTML and plain text formats
+    """
+    pk = kwargs.get("pk", None)
+    timer = StageTimer()
+
+    def error_response(error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
+        return Response(
+            {"error": error},
+            status=status_code,
+            headers={"Server-Timing": timer.server_timing()},
+        )
+
+    day_obs = request.query_params.get("day_obs", None)
+    if not day_obs:
+        day_obs = get_obsday_from_tai(astropy.time.Time.now().tai.datetime)
+
+    with timer("report"):
+        last_valid_report = get_last_valid_night_report(int(day_obs))
+
+    if last_valid_report is None or last_valid_report["id"] != pk:
+        return Response(
+            {"error": NIGHT_REPORT_CONFLICT_MESSAGE},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    last_valid_report_obsday = int(last_valid_report["day_obs"])
+    efd_instance = get_efd_instance_from_request(request)
+    cache_key = f"nightreport-status-{efd_instance}-{last_valid_report_obsday}"
+    report_status = cache.get(cache_key)
+    if report_status is None:
+        try:
+            report_status = gather_nightreport_status(last_valid_report_obsday, efd_instance, timer)
+        except TimeoutError as e:
+            return error_response(str(e), status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            return error_response(str(e))
+        cache.set(cache_key, report_status, settings.NIGHTREPORT_PREVIEW_CACHE_TTL)
+    last_valid_report.update(report_status)
+
+    try:
+        with timer("email_content"):
+            html_content, plain_content = render_nightreport_email(last_valid_report)
+    except Exception as e:
+        return error_response(str(e))
+
+    return Response(
+        {
+            "subject": f"Rubin Observatory Night Report {get_obsday_iso(last_valid_report_obsday)}",
+            "html": html_content,
+            "plain": plain_content,
+        },
+        status=status.HTTP_200_OK,
+        headers={"Server-Timing": timer.server_timing()},
+    )
+
+
 @swagger_auto_schema(
     method="post",
     responses={
@@ -1458,21 +1872,39 @@ def ole_send_night_report(request, *args, **kwargs):
         Dictionary with request arguments. Currently using the following keys:
             pk (required): The primary key of the night report to be sent.
 
+    Notes
+    -----
+    The observatory status, CSCs status and observation issues are
+    gathered concurrently, each one with its own timeout. The observatory
+    and CSCs status are read from the prefetched snapshot if it is fresh
+    enough, see `gather_nightreport_status`.
+
     Returns
     -------
     Response
         The response and status code of the request
-        to the Open API nightreport service
+        to the Open API nightreport service, with the age in seconds
+        of the status snapshot used in the status_snapshot_age key.
+        The duration of each stage is returned in the Server-Timing header
     """
 
     pk = kwargs.get("pk", None)
+    timer = StageTimer()
+
+    def error_response(error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
+        return Response(
+            {"error": error},
+            status=status_code,
+            headers={"Server-Timing": timer.server_timing()},
+        )
 
     # Make a copy of the request data for payload cleaning
     # so it is json serializable
     json_data = request.data.copy()
 
     # Get current report
-    last_valid_report = get_last_valid_night_report(int(json_data["day_obs"]))
+    with timer("report"):
+        last_valid_report = get_last_valid_night_report(int(json_data["day_obs"]))
 
     if last_valid_report is None or last_valid_report["id"] != pk:
         return Response(
@@ -1484,66 +1916,56 @@ def ole_send_night_report(request, *args, **kwargs):
 
     last_valid_report_obsday = int(last_valid_report["day_obs"])
 
-    # Set time cut (TAI) for EFD queries. If the report is for a past obs day,
-    # we set the cut to the end of that obs day.
-    report_obsday_end_tai = get_tai_from_utc(get_obsday_end_to_utc(last_valid_report_obsday))
-    curr_tai = astropy.time.Time.now().tai.datetime
-    efd_time_cut = min(curr_tai, report_obsday_end_tai)
-
-    # Get observatory and CSCS status
+    # Get observatory and CSCS status and JIRA observation issues
     try:
-        efd_instance = get_efd_instance_from_request(request)
-        observatory_status = get_nightreport_observatory_status_from_efd(efd_instance, efd_time_cut)
-        cscs_status = get_nightreport_cscs_status_from_efd(efd_instance, efd_time_cut)
-        last_valid_report["observatory_status"] = observatory_status
-        last_valid_report["cscs_status"] = cscs_status
-    except Exception as e:
-        return Response(
-            {"error": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        report_status = gather_nightreport_status(
+            last_valid_report_obsday, get_efd_instance_from_request(request), timer
         )
-
-    # Get JIRA observation issues
-    try:
-        last_valid_report["obs_issues"] = get_jira_obs_report({"day_obs": last_valid_report_obsday})
+    except TimeoutError as e:
+        return error_response(str(e), status.HTTP_504_GATEWAY_TIMEOUT)
     except Exception as e:
-        return Response(
-            {"error": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(str(e))
+    last_valid_report.update(report_status)
 
-    # Arrange HMTl email content
+    # Arrange the email content, in HTML and plain text formats
     try:
-        html_content = arrange_nightreport_email(last_valid_report, plain=False)
-        plain_content = arrange_nightreport_email(last_valid_report, plain=True)
+        with timer("email_content"):
+            html_content, plain_content = render_nightreport_email(last_valid_report)
     except Exception as e:
-        return Response(
-            {"error": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        return error_response(str(e))
 
     # Handle email sending
     subject = f"Rubin Observatory Night Report {get_obsday_iso(last_valid_report_obsday)}"
-    email_sent = send_smtp_email(
-        os.environ.get("NIGHTREPORT_MAIL_ADDRESS", "rubin-night-log@lists.lsst.org"),
-        subject,
-        html_content,
-        plain_content,
-    )
-    if not email_sent:
-        return Response(
-            {"error": "Error sending email"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    email_address = os.environ.get("NIGHTREPORT_MAIL_ADDRESS", "rubin-night-log@lists.lsst.org")
+    email_outbox_entry = None
+    if settings.EMAIL_OUTBOX_ENABLED:
+        # The email is sent in the background once durably stored
+        with timer("email_enqueue"):
+            email_outbox_entry = enqueue_email(email_address, subject, html_content, plain_content)
+    else:
+        with timer("email_send"):
+            email_sent = send_smtp_email(email_address, subject, html_content, plain_content)
+        if not email_sent:
+            return error_response("Error sending email")
 
     # Set date_sent
     curr_tai = astropy.time.Time.now().tai.datetime
     json_data["date_sent"] = curr_tai.isoformat()
 
     url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports/{pk}"
-    response = requests.patch(url, json=json_data)
-
-    return Response(response.json(), status=response.status_code)
+    with timer("report_update"):
+        response = upstream_request("ole", "patch", url, json=json_data)
+    invalidate_ole_listings("nightreport")
+
+    response_data = response.json()
+    response_data["status_snapshot_age"] = last_valid_report["status_snapshot_age"]
+    if email_outbox_entry is not None:
+        response_data["email_outbox"] = EmailOutboxEntrySerializer(email_outbox_entry).data
+    return Response(
+        response_data,
+        status=response.status_code,
+        headers={"Server-Timing": timer.server_timing()},
+    )
 
 
 @api_view(["GET"])
@@ -1581,7 +2003,7 @@ def get_jira_tickets_report(request, *args, **kwargs):
 
     if project == "OBS":
         try:
-            issues = get_jira_obs_report({"day_obs": obs_day, "project": project})
+            issues = get_jira_obs_report({"day_obs": obs_day, "project": project}, use_cache=True)
             return Response(
                 issues,
                 status=status.HTTP_200_OK,
@@ -1617,10 +2039,7 @@ class NightReportViewSet(viewsets.ViewSet):
 
     @swagger_auto_schema(responses={200: "NightReport logs listed"})
     def list(self, request, *args, **kwargs):
-        query_params_string = urllib.parse.urlencode(request.query_params)
-        url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports?{query_params_string}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=200)
+        return get_ole_listing("nightreport", "nightreport/reports", request.query_params, status=200)
 
     @swagger_auto_schema(responses={201: "NightReport log added"})
     def create(self, request, *args, **kwargs):
@@ -1655,14 +2074,14 @@ class NightReportViewSet(viewsets.ViewSet):
         json_data["user_id"] = f"{request.user}@{request.get_host()}"
 
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports/"
-        response = requests.post(url, json=json_data)
+        response = upstream_request("ole", "post", url, json=json_data)
+        invalidate_ole_listings("nightreport")
         return Response(response.json(), status=response.status_code)
 
     @swagger_auto_schema(responses={200: "NightReport log retrieved"})
     def retrieve(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports/{pk}"
-        response = requests.get(url, json=request.data)
-        return Response(response.json(), status=response.status_code)
+        return proxy_upstream_request("ole", "get", url, json=request.data)
 
     @swagger_auto_schema(responses={200: "NightReport log edited"})
     def update(self, request, pk=None, *args, **kwargs):
@@ -1690,13 +2109,15 @@ class NightReportViewSet(viewsets.ViewSet):
 
         # Send the request to the OLE API
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports/{pk}"
-        response = requests.patch(url, json=json_data)
+        response = upstream_request("ole", "patch", url, json=json_data)
+        invalidate_ole_listings("nightreport")
         return Response(response.json(), status=response.status_code)
 
     @swagger_auto_schema(responses={200: "NightReport log deleted"})
     def destroy(self, request, pk=None, *args, **kwargs):
         url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports/{pk}"
-        response = requests.delete(url, json=request.data)
+        response = upstream_request("ole", "delete", url, json=request.data)
+        invalidate_ole_listings("nightreport")
         if response.status_code == 204:
             return Response(
                 {"ack": "NightReport log deleted succesfully"},
@@ -1727,6 +2148,31 @@ class ControlLocationViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
+class TaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows the background tasks to be viewed.
+
+    Notes
+    -----
+    The tasks are run by the `process_tasks` command, see `api.task_queue`.
+    They can be filtered by status and name with the
+    `status` and `name` query parameters.
+    """
+
+    serializer_class = TaskSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        queryset = Task.objects.order_by("-creation_timestamp")
+        task_status = self.request.query_params.get("status")
+        if task_status is not None:
+            queryset = queryset.filter(status=task_status)
+        name = self.request.query_params.get("name")
+        if name is not None:
+            queryset = queryset.filter(name=name)
+        return queryset
+
+
 class ScriptConfigurationViewSet(viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE
     instances of the ScriptConfiguration model."""
@@ -1847,3 +2293,72 @@ class ScriptConfigurationViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response("Jira outbox entry", JiraOutboxEntrySerializer),
+        401: openapi.Response("Unauthenticated"),
+        404: not_found_response,
+    },
+)
+@api_view(["GET"])
+@permission_classes((IsAuthenticated,))
+def get_jira_outbox_entry(request, pk, *args, **kwargs):
+    """Get the status of a Jira ticket or comment
+    sent in the background by the Jira outbox
+
+    Params
+    ------
+    request: `Request`
+        The Request object.
+
+    pk: `int`
+        The id of the Jira outbox entry.
+
+    Returns
+    -------
+    Response
+        The Jira outbox entry, including its status and
+        the url of the Jira ticket once it has been sent.
+    """
+    try:
+        outbox_entry = JiraOutboxEntry.objects.get(pk=pk)
+    except JiraOutboxEntry.DoesNotExist:
+        return Response({"error": "Jira outbox entry not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JiraOutboxEntrySerializer(outbox_entry).data)
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response("Email outbox entry", EmailOutboxEntrySerializer),
+        401: openapi.Response("Unauthenticated"),
+        404: not_found_response,
+    },
+)
+@api_view(["GET"])
+@permission_classes((IsAuthenticated,))
+def get_email_outbox_entry(request, pk, *args, **kwargs):
+    """Get the status of an email sent in the background by the email outbox
+
+    Params
+    ------
+    request: `Request`
+        The Request object.
+
+    pk: `int`
+        The id of the email outbox entry.
+
+    Returns
+    -------
+    Response
+        The email outbox entry, including its status
+        and the error of the last failed attempt.
+    """
+    try:
+        outbox_entry = EmailOutboxEntry.objects.get(pk=pk)
+    except EmailOutboxEntry.DoesNotExist:
+        return Response({"error": "Email outbox entry not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(EmailOutboxEntrySerializer(outbox_entry).data)
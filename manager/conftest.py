@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+from manager.jira_client import jira_client
+from manager.resilience import reset_upstreams
+
+
+@pytest.fixture(autouse=True)
+def reset_upstream_services():
+    """Discard the circuit breakers, bulkheads and cached upstream data between tests."""
+    reset_upstreams()
+    jira_client.clear_cache()
+    cache.clear()
+    yield
+    reset_upstreams()
+    jira_client.clear_cache()
+    cache.clear()
@@ -0,0 +1,179 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Client of the Rubin Observatory JIRA Cloud REST API.
+
+For more information on the REST API endpoints refer to:
+- https://developer.atlassian.com/cloud/jira/platform/rest/v3
+"""
+
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from manager.resilience import upstream_request
+from pytz import timezone
+
+
+class JiraRequestError(Exception):
+    """Raised when a request to the JIRA REST API fails."""
+
+
+class JiraClient:
+    """Client of the JIRA REST API.
+
+    Requests share a pool of connections, and the timezone of the
+    API user is cached for `settings.JIRA_TIMEZONE_CACHE_TTL` seconds.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._timezone = None
+        self._timezone_expiry = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hostname(self):
+        """The JIRA API hostname (`str`)."""
+        return os.environ.get("JIRA_API_HOSTNAME")
+
+    @property
+    def base_url(self):
+        """The base URL of the JIRA REST API (`str`)."""
+        return f"https://{self.hostname}/rest/api/latest"
+
+    @property
+    def headers(self):
+        """The headers of the JIRA REST API requests (`dict`)."""
+        return {
+            "Authorization": f"Basic {os.environ.get('JIRA_API_TOKEN')}",
+            "content-type": "application/json",
+        }
+
+    @property
+    def session(self):
+        """The session shared by the requests (`requests.Session`)."""
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                self._session.mount(
+                    "https://",
+                    requests.adapters.HTTPAdapter(pool_maxsize=settings.UPSTREAM_BULKHEAD_LIMITS["jira"]),
+                )
+            return self._session
+
+    def get(self, url):
+        """Send a GET request to the JIRA REST API.
+
+        Parameters
+        ----------
+        url : `str`
+            The URL of the request
+
+        Returns
+        -------
+        `requests.Response`
+            The JIRA API response
+        """
+        return upstream_request("jira", "get", url, session=self.session, headers=self.headers)
+
+    def get_user_timezone(self):
+        """Return the timezone of the JIRA API user.
+
+        Notes
+        -----
+        The JIRA REST API queries are based on the user timezone.
+
+        Returns
+        -------
+        `pytz.timezone`
+            The user timezone
+
+        Raises
+        ------
+        JiraRequestError
+            If the user data could not be retrieved
+        """
+        with self._lock:
+            if self._timezone is not None and time.monotonic() < self._timezone_expiry:
+                return self._timezone
+
+        response = self.get(f"{self.base_url}/myself")
+        if response.status_code != 200:
+            raise JiraRequestError(f"Error getting user timezone from {self.hostname}")
+        user_timezone = timezone(response.json()["timeZone"])
+
+        with self._lock:
+            self._timezone = user_timezone
+            self._timezone_expiry = time.monotonic() + settings.JIRA_TIMEZONE_CACHE_TTL
+        return user_timezone
+
+    def search(self, jql_query, fields):
+        """Return all the issues matching a JQL query.
+
+        Parameters
+        ----------
+        jql_query : `str`
+            The JQL query
+        fields : `str`
+            Comma separated list of the issue fields to return
+
+        Notes
+        -----
+        The search endpoint is paginated with a cursor (nextPageToken),
+        so the pages are requested one after the other until the last one.
+
+        Returns
+        -------
+        `list`
+            The issues, as returned by the JIRA API
+
+        Raises
+        ------
+        JiraRequestError
+            If any page could not be retrieved
+        """
+        url = f"{self.base_url}/search/jql?jql={quote(jql_query)}&fields={fields}"
+        issues = []
+        next_page_token = None
+        for _ in range(settings.JIRA_SEARCH_MAX_PAGES):
+            page_url = url if next_page_token is None else f"{url}&nextPageToken={quote(next_page_token)}"
+            response = self.get(page_url)
+            if response.status_code != 200:
+                raise JiraRequestError(f"Error getting issues from {self.hostname}")
+            page = response.json()
+            issues.extend(page["issues"])
+            next_page_token = page.get("nextPageToken")
+            if page.get("isLast") or not next_page_token:
+                break
+        return issues
+
+    def clear_cache(self):
+        """Discard the cached user timezone."""
+        with self._lock:
+            self._timezone = None
+            self._timezone_expiry = 0
+
+
+jira_client = JiraClient()
+"""Shared client of the JIRA REST API (`JiraClient`)."""
@@ -0,0 +1,154 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Mixins shared by the viewsets of the different apps."""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """Mixin for the ModelViewSets of models with an `update_timestamp`,
+    which answers 304 Not Modified to the conditional `list` and
+    `retrieve` requests (If-None-Match, If-Modified-Since) before
+    the objects are serialized.
+
+    The ETag of a list is computed from the maximum `update_timestamp`
+    and the number of the listed objects, so added, edited and deleted objects
+    change it. Lists are sent without Last-Modified, since deleting an object
+    other than the newest one does not change their maximum `update_timestamp`.
+    The validators of an object are computed from its own `update_timestamp`.
+    Override `get_related_conditional_querysets` when the serialized objects
+    include data from other models.
+    """
+
+    def get_related_conditional_querysets(self, queryset):
+        """Return the querysets of other models whose changes also change
+        the serialized objects, e.g. the rows of a through model.
+
+        Parameters
+        ----------
+        queryset : `QuerySet`
+            The objects to serialize
+
+        Returns
+        -------
+        `list`
+            The querysets, of models with an `update_timestamp`
+        """
+        return []
+
+    def get_conditional_validators(self, request, versions, with_last_modified=True):
+        """Return the ETag and Last-Modified validators of a response.
+
+        Parameters
+        ----------
+        request : `Request`
+            The request object
+        versions : `list`
+            The (maximum update timestamp, count) of each serialized queryset
+        with_last_modified : `bool`
+            Whether the response has a Last-Modified validator
+
+        Returns
+        -------
+        `tuple`
+            The quoted ETag and the Last-Modified timestamp,
+            or None if no object or `with_last_modified` is False
+        """
+        timestamps = [timestamp for timestamp, _ in versions if timestamp is not None]
+        last_modified = int(max(timestamps).timestamp()) if timestamps and with_last_modified else None
+        etag_source = "|".join(
+            [request.get_full_path(), *[f"{timestamp}:{count}" for timestamp, count in versions]]
+        )
+        return quote_etag(hashlib.md5(etag_source.encode()).hexdigest()), last_modified
+
+    def get_conditional_response(self, request, versions, get_response, with_last_modified=True):
+        """Return a 304 Not Modified response if the client has the current
+        version of the response, otherwise return the response with its validators.
+
+        Parameters
+        ----------
+        request : `Request`
+            The request object
+        versions : `list`
+            The (maximum update timestamp, count) of each serialized queryset
+        get_response : `callable`
+            Function returning the response, called only if it was modified
+        with_last_modified : `bool`
+            Whether the response has a Last-Modified validator, otherwise
+            only its ETag is compared
+
+        Returns
+        -------
+        `Response` or `django.http.HttpResponseNotModified`
+            The response
+        """
+        etag, last_modified = self.get_conditional_validators(request, versions, with_last_modified)
+        not_modified_response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified_response is not None:
+            not_modified_response["ETag"] = etag
+            return not_modified_response
+
+        response = get_response()
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # Clients must revalidate the response before reusing it
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @staticmethod
+    def _get_queryset_version(queryset):
+        """Return the maximum update timestamp and the count of a queryset."""
+        version = queryset.order_by().aggregate(timestamp=Max("update_timestamp"), count=Count("pk"))
+        return version["timestamp"], version["count"]
+
+    def list(self, request, *args, **kwargs):
+        """List the objects, or answer 304 Not Modified
+        if they did not change since the client's version."""
+        queryset = self.filter_queryset(self.get_queryset())
+        versions = [
+            self._get_queryset_version(queryset),
+            *[self._get_queryset_version(qs) for qs in self.get_related_conditional_querysets(queryset)],
+        ]
+        return self.get_conditional_response(
+            request,
+            versions,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            with_last_modified=False,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an object, or answer 304 Not Modified
+        if it did not change since the client's version."""
+        instance = self.get_object()
+        related_querysets = self.get_related_conditional_querysets(self.get_queryset().filter(pk=instance.pk))
+        versions = [
+            (instance.update_timestamp, 1),
+            *[self._get_queryset_version(qs) for qs in related_querysets],
+        ]
+        return self.get_conditional_response(
+            request, versions, lambda: Response(self.get_serializer(instance).data)
+        )
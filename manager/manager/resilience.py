@@ -0,0 +1,356 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Isolation of the upstream services the LOVE-manager depends on.
+
+Every request to an upstream service (LOVE-commander, OLE, EFD, Jira, LFA)
+goes through a `CircuitBreaker`, which fails fast while the service
+is known to be down, and a `Bulkhead`, which limits the number of
+concurrent requests to the service so a slow dependency cannot exhaust
+the workers shared with the rest of the endpoints.
+"""
+
+import threading
+import time
+
+import requests
+from django.conf import settings
+from rest_framework.exceptions import APIException
+
+UPSTREAM_SERVICES = ["commander", "ole", "efd", "jira", "lfa"]
+
+UPSTREAM_FAILURE_STATUS_CODES = [502, 503, 504]
+
+
+class UpstreamUnavailable(APIException):
+    """Raised when a request to an upstream service is rejected
+    by its circuit breaker or bulkhead."""
+
+    status_code = 503
+    default_detail = "Upstream service temporarily unavailable, try again later."
+    default_code = "upstream_unavailable"
+
+
+class CircuitBreaker:
+    """Circuit breaker of an upstream service.
+
+    The breaker starts closed. After ``failure_threshold`` consecutive
+    failures it opens and every request is rejected. Once
+    ``recovery_timeout`` seconds have passed it becomes half-open and
+    a single trial request is allowed: if it succeeds the breaker closes,
+    otherwise it opens again.
+
+    Parameters
+    ----------
+    failure_threshold : `int`
+        Number of consecutive failures needed to open the breaker
+    recovery_timeout : `float`
+        Seconds to wait before allowing a trial request
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold, recovery_timeout):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """The current state of the breaker (`str`)."""
+        with self._lock:
+            return self._get_state()
+
+    def _get_state(self):
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """Return whether or not a request can be sent to the upstream.
+
+        Returns
+        -------
+        `bool`
+            True if the breaker is closed, or if it is half-open
+            and no trial request is in flight
+        """
+        with self._lock:
+            state = self._get_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def cancel_request(self):
+        """Release the trial of a request that was allowed
+        but never sent to the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        """Close the breaker after a successful request."""
+        with self._lock:
+            self.consecutive_failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failed request, opening the breaker if needed."""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class Bulkhead:
+    """Limit of concurrent requests to an upstream service.
+
+    Parameters
+    ----------
+    max_concurrent : `int`
+        Maximum number of requests in flight
+    max_wait : `float`
+        Seconds to wait for a free slot before rejecting a request
+    """
+
+    def __init__(self, max_concurrent, max_wait):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for a free slot.
+
+        Returns
+        -------
+        `bool`
+            True if a slot was acquired, False if the wait timed out
+        """
+        if not self._semaphore.acquire(timeout=self.max_wait):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        """Free a slot acquired with `acquire`."""
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+
+class Upstream:
+    """Upstream service guarded by a circuit breaker and a bulkhead.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the upstream service, one of `UPSTREAM_SERVICES`
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+            settings.UPSTREAM_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.bulkhead = Bulkhead(
+            settings.UPSTREAM_BULKHEAD_LIMITS.get(name, settings.UPSTREAM_BULKHEAD_DEFAULT_LIMIT),
+            settings.UPSTREAM_BULKHEAD_MAX_WAIT,
+        )
+        self.requests = 0
+        self.failures = 0
+        self.rejected_open = 0
+        self.rejected_full = 0
+        self._lock = threading.Lock()
+
+    def _count(self, metric):
+        with self._lock:
+            setattr(self, metric, getattr(self, metric) + 1)
+
+    def request(self, method, url, session=None, **kwargs):
+        """Send a request to the upstream service.
+
+        A request fails if it raises an exception, e.g. a
+        `requests.RequestException`, or if the upstream answers with one of
+        `UPSTREAM_FAILURE_STATUS_CODES`. The exceptions are propagated unchanged.
+
+        Parameters
+        ----------
+        method : `str`
+            The HTTP method of the request, e.g. "get", "post"
+        url : `str`
+            The URL of the request
+        session : `requests.Session`, optional
+            Session used to send the request, so its connections are
+            reused. If not provided a new connection is opened
+        **kwargs
+            Additional arguments passed to `requests`
+
+        Returns
+        -------
+        `requests.Response`
+            The upstream response
+
+        Raises
+        ------
+        UpstreamUnavailable
+            If the circuit breaker is open or the bulkhead is full
+        """
+        if not self.breaker.allow_request():
+            self._count("rejected_open")
+            raise UpstreamUnavailable(f"The {self.name} service is unavailable, try again later.")
+        if not self.bulkhead.acquire():
+            self.breaker.cancel_request()
+            self._count("rejected_full")
+            raise UpstreamUnavailable(f"Too many concurrent requests to the {self.name} service.")
+
+        self._count("requests")
+        if settings.UPSTREAM_TIMEOUT is not None:
+            kwargs.setdefault("timeout", settings.UPSTREAM_TIMEOUT)
+        try:
+            response = getattr(session or requests, method)(url, **kwargs)
+        except Exception:
+            # Any exception also ends a trial request of the half-open breaker
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.bulkhead.release()
+
+        if response.status_code in UPSTREAM_FAILURE_STATUS_CODES:
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get_metrics(self):
+        """Return the breaker state and counters of the upstream.
+
+        Returns
+        -------
+        `dict`
+            Dictionary with the following keys:
+            - state: The state of the circuit breaker
+            - consecutive_failures: Current number of consecutive failures
+            - requests: Number of requests sent to the upstream
+            - failures: Number of failed requests
+            - rejected_open: Number of requests rejected by the breaker
+            - rejected_full: Number of requests rejected by the bulkhead
+            - in_flight: Number of requests in flight
+            - max_concurrent: Maximum number of requests in flight
+        """
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected_open": self.rejected_open,
+            "rejected_full": self.rejected_full,
+            "in_flight": self.bulkhead.in_flight,
+            "max_concurrent": self.bulkhead.max_concurrent,
+        }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name):
+    """Return the `Upstream` of a service, creating it if needed.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the upstream service, one of `UPSTREAM_SERVICES`
+
+    Returns
+    -------
+    `Upstream`
+        The guarded upstream service
+
+    Raises
+    ------
+    ValueError
+        If the upstream service is unknown
+    """
+    if name not in UPSTREAM_SERVICES:
+        raise ValueError(f"Unknown upstream service: {name}")
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = Upstream(name)
+        return _upstreams[name]
+
+
+def upstream_request(name, method, url, session=None, **kwargs):
+    """Send a request to an upstream service through
+    its circuit breaker and bulkhead.
+
+    Parameters
+    ----------
+    name : `str`
+        Name of the upstream service, one of `UPSTREAM_SERVICES`
+    method : `str`
+        The HTTP method of the request, e.g. "get", "post"
+    url : `str`
+        The URL of the request
+    session : `requests.Session`, optional
+        Session used to send the request, see `Upstream.request`
+    **kwargs
+        Additional arguments passed to `requests`
+
+    Returns
+    -------
+    `requests.Response`
+        The upstream response
+    """
+    return get_upstream(name).request(method, url, session=session, **kwargs)
+
+
+def get_upstreams_metrics():
+    """Return the metrics of every upstream service.
+
+    Returns
+    -------
+    `dict`
+        Dictionary with the metrics of each service, see `Upstream.get_metrics`
+    """
+    return {name: get_upstream(name).get_metrics() for name in UPSTREAM_SERVICES}
+
+
+def reset_upstreams():
+    """Discard the state of every upstream service."""
+    with _upstreams_lock:
+        _upstreams.clear()
@@ -134,6 +134,9 @@ INSTALLED_APPS = [
     "ui_framework",
     "redirect",
 ]
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    # Full-text and trigram lookups used to search the Views
+    INSTALLED_APPS.append("django.contrib.postgres")
 
 
 MIDDLEWARE = [
@@ -170,6 +173,13 @@ TEMPLATES = [
 # CORS Configuration
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = [
+    "X-Downsampling-Method",
+    "X-Downsampling-Max-Points",
+    "X-Downsampling-Original-Points",
+    "X-Downsampling-Returned-Points",
+    "Server-Timing",
+]
 
 WSGI_APPLICATION = "manager.wsgi.application"
 
@@ -272,6 +282,21 @@ else:
         "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
     }
 
+# Cache
+if REDIS_HOST and not TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://:" + REDIS_PASS + "@" + REDIS_HOST + ":" + REDIS_PORT + "/1",
+        },
+    }
+    """Django cache configuration, shared by the manager instances (`dict`)"""
+
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
@@ -325,6 +350,11 @@ Read from `SHOW_TRACE_TIMESTAMPS` environment variable (`bool`)"""
 # Check HeartBeat Commanded
 HEARTBEAT_QUERY_COMMANDER = os.environ.get("HEARTBEAT_QUERY_COMMANDER", "true").lower() == "true"
 
+TIME_DATA_BROADCAST_INTERVAL = float(os.environ.get("TIME_DATA_BROADCAST_INTERVAL", 1))
+"""Seconds between the time measures published to the `time-data` group,
+see `subscription.time_data_broadcaster`. 0 disables the broadcast.
+Read from `TIME_DATA_BROADCAST_INTERVAL` environment variable (`float`)"""
+
 # LOVE-PRODUCER-CONFIGURATION
 """Defines wether or not ussing the legacy LOVE-producer version,
 i.e. not the LOVE CSC Producer"""
@@ -340,3 +370,207 @@ NIGHTLYDIGEST_BASE_URL = os.environ.get(
 )
 """Base URL for the Nightly Digest application, read from
 the `NIGHTLYDIGEST_BASE_URL` environment variable (`string`)"""
+
+PROXY_STREAMING_PASSTHROUGH = os.environ.get("PROXY_STREAMING_PASSTHROUGH", "false").lower() == "true"
+"""Define wether or not to stream the responses of the upstream services
+(LOVE-commander, OLE) to the client without decoding them.
+Read from `PROXY_STREAMING_PASSTHROUGH` environment variable (`bool`)"""
+
+PROXY_STREAMING_CHUNK_SIZE = int(os.environ.get("PROXY_STREAMING_CHUNK_SIZE", 65536))
+"""Size in bytes of the chunks forwarded to the client when
+`PROXY_STREAMING_PASSTHROUGH` is enabled.
+Read from `PROXY_STREAMING_CHUNK_SIZE` environment variable (`int`)"""
+
+UPSTREAM_TIMEOUT = (
+    float(os.environ.get("UPSTREAM_TIMEOUT")) if os.environ.get("UPSTREAM_TIMEOUT") else (5, 30)
+)
+"""Timeout in seconds of the requests to the upstream services, by default
+5 seconds to connect and 30 seconds to read, so a stalled upstream counts
+as a failure of its circuit breaker.
+Read from `UPSTREAM_TIMEOUT` environment variable (`float`), which sets both"""
+
+UPSTREAM_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("UPSTREAM_BREAKER_FAILURE_THRESHOLD", 5))
+"""Number of consecutive failed requests to an upstream service
+needed to open its circuit breaker.
+Read from `UPSTREAM_BREAKER_FAILURE_THRESHOLD` environment variable (`int`)"""
+
+UPSTREAM_BREAKER_RECOVERY_TIMEOUT = float(os.environ.get("UPSTREAM_BREAKER_RECOVERY_TIMEOUT", 30))
+"""Seconds an open circuit breaker waits before allowing a trial request.
+Read from `UPSTREAM_BREAKER_RECOVERY_TIMEOUT` environment variable (`float`)"""
+
+UPSTREAM_BULKHEAD_DEFAULT_LIMIT = int(os.environ.get("UPSTREAM_BULKHEAD_DEFAULT_LIMIT", 10))
+"""Default maximum number of concurrent requests to an upstream service.
+Read from `UPSTREAM_BULKHEAD_DEFAULT_LIMIT` environment variable (`int`)"""
+
+UPSTREAM_BULKHEAD_LIMITS = {
+    name: int(os.environ.get(f"UPSTREAM_{name.upper()}_MAX_CONCURRENT", UPSTREAM_BULKHEAD_DEFAULT_LIMIT))
+    for name in ["commander", "ole", "efd", "jira", "lfa"]
+}
+"""Maximum number of concurrent requests to each upstream service.
+Read from the `UPSTREAM_<SERVICE>_MAX_CONCURRENT` environment variables (`dict`)"""
+
+UPSTREAM_BULKHEAD_MAX_WAIT = float(os.environ.get("UPSTREAM_BULKHEAD_MAX_WAIT", 0.5))
+"""Seconds a request waits for a free slot of the upstream bulkhead
+before being rejected.
+Read from `UPSTREAM_BULKHEAD_MAX_WAIT` environment variable (`float`)"""
+
+COMMANDER_BATCH_MAX_SIZE = int(os.environ.get("COMMANDER_BATCH_MAX_SIZE", 100))
+"""Maximum number of commands accepted by the commander batch endpoint.
+Read from `COMMANDER_BATCH_MAX_SIZE` environment variable (`int`)"""
+
+COMMANDER_BATCH_CONCURRENCY = int(
+    os.environ.get("COMMANDER_BATCH_CONCURRENCY", max(1, UPSTREAM_BULKHEAD_LIMITS["commander"] // 2))
+)
+"""Maximum number of commands of a concurrent batch sent at the same time,
+by default half the commander bulkhead, which is left to the other commands.
+Read from `COMMANDER_BATCH_CONCURRENCY` environment variable (`int`)"""
+
+OLE_FANOUT_MAX_WORKERS = int(os.environ.get("OLE_FANOUT_MAX_WORKERS", 4))
+"""Maximum number of concurrent requests sent to the OLE API when
+a message is created or edited for several exposures at once.
+Read from `OLE_FANOUT_MAX_WORKERS` environment variable (`int`)"""
+
+OLE_LISTING_CACHE_TTL = float(os.environ.get("OLE_LISTING_CACHE_TTL", 5))
+"""Seconds a listing of the OLE API (exposurelog, narrativelog and nightreport)
+is shared between the clients before being refreshed. 0 disables the cache.
+Read from `OLE_LISTING_CACHE_TTL` environment variable (`float`)"""
+
+OLE_LISTING_FULL_REFRESH_INTERVAL = int(os.environ.get("OLE_LISTING_FULL_REFRESH_INTERVAL", 300))
+"""Seconds after which a cached OLE listing is requested again in full,
+instead of requesting only the entries added since the last refresh.
+Read from `OLE_LISTING_FULL_REFRESH_INTERVAL` environment variable (`int`)"""
+
+LFA_UPLOAD_MAX_WORKERS = int(os.environ.get("LFA_UPLOAD_MAX_WORKERS", 4))
+"""Maximum number of files uploaded to the LFA at the same time.
+Read from `LFA_UPLOAD_MAX_WORKERS` environment variable (`int`)"""
+
+NIGHTREPORT_EFD_TIMEOUT = float(os.environ.get("NIGHTREPORT_EFD_TIMEOUT", 30))
+"""Seconds to wait for the observatory and CSCs status from the EFD
+when sending a night report.
+Read from `NIGHTREPORT_EFD_TIMEOUT` environment variable (`float`)"""
+
+NIGHTREPORT_JIRA_TIMEOUT = float(os.environ.get("NIGHTREPORT_JIRA_TIMEOUT", 30))
+"""Seconds to wait for the observation issues from Jira
+when sending a night report.
+Read from `NIGHTREPORT_JIRA_TIMEOUT` environment variable (`float`)"""
+
+NIGHTREPORT_PREVIEW_CACHE_TTL = int(os.environ.get("NIGHTREPORT_PREVIEW_CACHE_TTL", 300))
+"""Seconds the observatory status, CSCs status and observation issues
+of a night report are cached for its email preview.
+Read from `NIGHTREPORT_PREVIEW_CACHE_TTL` environment variable (`int`)"""
+
+NIGHTREPORT_SNAPSHOT_EFD_INSTANCES = os.environ.get("NIGHTREPORT_SNAPSHOT_EFD_INSTANCES", "summit_efd").split(
+    ","
+)
+"""EFD instances the observatory and CSCs status snapshots are prefetched from.
+The snapshots are cached by the `process_tasks` worker for the web processes,
+so they are only prefetched with a shared cache, i.e. with `REDIS_HOST` defined.
+Read from `NIGHTREPORT_SNAPSHOT_EFD_INSTANCES` environment variable, comma separated (`list`)"""
+
+NIGHTREPORT_SNAPSHOT_INTERVAL = float(os.environ.get("NIGHTREPORT_SNAPSHOT_INTERVAL", 300))
+"""Seconds between the prefetches of the observatory and CSCs status snapshots.
+Read from `NIGHTREPORT_SNAPSHOT_INTERVAL` environment variable (`float`)"""
+
+NIGHTREPORT_SNAPSHOT_WINDOW = float(os.environ.get("NIGHTREPORT_SNAPSHOT_WINDOW", 4))
+"""Hours before the end of the observing day during which
+the status snapshots are prefetched.
+Read from `NIGHTREPORT_SNAPSHOT_WINDOW` environment variable (`float`)"""
+
+NIGHTREPORT_SNAPSHOT_MAX_AGE = float(os.environ.get("NIGHTREPORT_SNAPSHOT_MAX_AGE", 600))
+"""Maximum age in seconds of a status snapshot used when sending a night report,
+otherwise the status is queried from the EFD.
+Read from `NIGHTREPORT_SNAPSHOT_MAX_AGE` environment variable (`float`)"""
+
+NIGHTREPORT_SNAPSHOT_CACHE_TTL = int(os.environ.get("NIGHTREPORT_SNAPSHOT_CACHE_TTL", 86400))
+"""Seconds the status snapshots are cached.
+Read from `NIGHTREPORT_SNAPSHOT_CACHE_TTL` environment variable (`int`)"""
+
+TIME_SERVICE_RESOLUTION = float(os.environ.get("TIME_SERVICE_RESOLUTION", 0.1))
+"""Seconds the time measures sent to the clients are reused for,
+see `manager.time_service.get_times`. 0 disables the memoization.
+Read from `TIME_SERVICE_RESOLUTION` environment variable (`float`)"""
+
+WORKSPACES_CACHE_TTL = int(os.environ.get("WORKSPACES_CACHE_TTL", 3600))
+"""Seconds the serialized Workspaces loaded by the frontend are cached,
+they are also invalidated when a Workspace, View or WorkspaceView changes.
+Read from `WORKSPACES_CACHE_TTL` environment variable (`int`)"""
+
+VIEW_SEARCH_PAGE_SIZE = int(os.environ.get("VIEW_SEARCH_PAGE_SIZE", 20))
+"""Default number of Views of each page of the search results,
+the clients can request up to `VIEW_SEARCH_MAX_PAGE_SIZE`.
+Read from `VIEW_SEARCH_PAGE_SIZE` environment variable (`int`)"""
+
+VIEW_SEARCH_MAX_PAGE_SIZE = int(os.environ.get("VIEW_SEARCH_MAX_PAGE_SIZE", 100))
+"""Maximum number of Views of each page of the search results.
+Read from `VIEW_SEARCH_MAX_PAGE_SIZE` environment variable (`int`)"""
+
+THUMBNAIL_VARIANTS_CACHE_MAX_AGE = int(os.environ.get("THUMBNAIL_VARIANTS_CACHE_MAX_AGE", 31536000))
+"""Seconds the clients cache the thumbnail variants of the Views,
+which never change as they are named after their source image.
+Read from `THUMBNAIL_VARIANTS_CACHE_MAX_AGE` environment variable (`int`)"""
+
+JIRA_TIMEZONE_CACHE_TTL = int(os.environ.get("JIRA_TIMEZONE_CACHE_TTL", 3600))
+"""Seconds the timezone of the JIRA API user is cached.
+Read from `JIRA_TIMEZONE_CACHE_TTL` environment variable (`int`)"""
+
+JIRA_OBS_REPORT_CACHE_TTL = int(os.environ.get("JIRA_OBS_REPORT_CACHE_TTL", 60))
+"""Seconds the JIRA observation issues of an obs day are cached
+for the night report panels.
+Read from `JIRA_OBS_REPORT_CACHE_TTL` environment variable (`int`)"""
+
+JIRA_SEARCH_MAX_PAGES = int(os.environ.get("JIRA_SEARCH_MAX_PAGES", 50))
+"""Maximum number of pages requested in a JIRA search.
+Read from `JIRA_SEARCH_MAX_PAGES` environment variable (`int`)"""
+
+# Outboxes
+JIRA_OUTBOX_ENABLED = os.environ.get("JIRA_OUTBOX_ENABLED", "false").lower() == "true"
+"""Define wether or not the Jira tickets and comments of the OLE messages
+are sent in the background by the `process_tasks` command,
+instead of during the request.
+Read from `JIRA_OUTBOX_ENABLED` environment variable (`bool`)"""
+
+EMAIL_OUTBOX_ENABLED = os.environ.get("EMAIL_OUTBOX_ENABLED", "false").lower() == "true"
+"""Define wether or not the night report emails are sent in the background
+by the `process_tasks` command, instead of during the request.
+Read from `EMAIL_OUTBOX_ENABLED` environment variable (`bool`)"""
+
+OUTBOX_INTERVAL = float(os.environ.get("OUTBOX_INTERVAL", 5))
+"""Seconds between the checks of the outboxes by the background tasks.
+Read from `OUTBOX_INTERVAL` environment variable (`float`)"""
+
+# Background tasks
+TASKS_MAX_WORKERS = int(os.environ.get("TASKS_MAX_WORKERS", 4))
+"""Maximum number of background tasks run concurrently by each `process_tasks` worker.
+Read from `TASKS_MAX_WORKERS` environment variable (`int`)"""
+
+TASKS_POLL_INTERVAL = float(os.environ.get("TASKS_POLL_INTERVAL", 1))
+"""Seconds the `process_tasks` worker waits when there are no tasks ready to be run.
+Read from `TASKS_POLL_INTERVAL` environment variable (`float`)"""
+
+TASKS_RETENTION_DAYS = int(os.environ.get("TASKS_RETENTION_DAYS", 7))
+"""Days the finished background tasks are kept before being deleted.
+Read from `TASKS_RETENTION_DAYS` environment variable (`int`)"""
+
+QUEUE_MAX_ATTEMPTS = int(os.environ.get("QUEUE_MAX_ATTEMPTS", 8))
+"""Number of failed attempts after which a background task
+or outbox entry is marked as failed.
+Read from `QUEUE_MAX_ATTEMPTS` environment variable (`int`)"""
+
+QUEUE_BACKOFF = float(os.environ.get("QUEUE_BACKOFF", 5))
+"""Seconds to wait before retrying a failed background task or outbox entry,
+doubled after each failed attempt.
+Read from `QUEUE_BACKOFF` environment variable (`float`)"""
+
+QUEUE_MAX_BACKOFF = float(os.environ.get("QUEUE_MAX_BACKOFF", 600))
+"""Maximum seconds to wait before retrying a failed background task or outbox entry.
+Read from `QUEUE_MAX_BACKOFF` environment variable (`float`)"""
+
+QUEUE_PROCESSING_TIMEOUT = float(os.environ.get("QUEUE_PROCESSING_TIMEOUT", 300))
+"""Seconds after which a background task or outbox entry left processing,
+e.g. by a worker that was stopped, is pending again. The entries being
+processed are kept claimed by refreshing them every third of this time.
+Read from `QUEUE_PROCESSING_TIMEOUT` environment variable (`float`)"""
+
+QUEUE_BATCH_SIZE = int(os.environ.get("QUEUE_BATCH_SIZE", 20))
+"""Maximum number of entries of each outbox processed by each run of the outbox tasks.
+Read from `QUEUE_BATCH_SIZE` environment variable (`int`)"""
@@ -0,0 +1,179 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Client of the Rubin Observatory SMTP server."""
+
+import os
+import smtplib
+import threading
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+SMTP_HOST = "exch-ls.lsst.org"
+
+SMTP_PORT = "587"
+
+
+def get_smtp_credentials():
+    """Return the credentials of the SMTP user.
+
+    Notes
+    -----
+    The following environment variables are required to send emails:
+    - SMTP_USER: The SMTP user name
+    - SMTP_PASSWORD: The SMTP user password
+
+    If the SMTP_USER has the @lsst.org sufix, then it is stripped.
+
+    Raises
+    ------
+    ValueError
+        If the SMTP_USER or SMTP_PASSWORD environment variables are not set
+
+    Returns
+    -------
+    `tuple`
+        The SMTP user name and password
+    """
+    smtp_user = os.environ.get("SMTP_USER")
+    if not smtp_user:
+        raise ValueError("SMTP_USER environment variable is not set")
+
+    smtp_password = os.environ.get("SMTP_PASSWORD")
+    if not smtp_password:
+        raise ValueError("SMTP_PASSWORD environment variable is not set")
+
+    if smtp_user.endswith("@lsst.org"):
+        smtp_user = smtp_user.replace("@lsst.org", "")
+    return smtp_user, smtp_password
+
+
+def create_email_message(smtp_user, to, subject, html_content, plain_content):
+    """Create an email message with HTML and plain text alternatives.
+
+    Parameters
+    ----------
+    smtp_user : `str`
+        The SMTP user name, the sender is f"{smtp_user}@lsst.org"
+    to : `str`
+        The email address of the recipient
+    subject : `str`
+        The subject of the email
+    html_content : `str`
+        The content of the email in HTML format
+    plain_content : `str`
+        The content of the email in plain text format
+
+    Returns
+    -------
+    `email.mime.multipart.MIMEMultipart`
+        The email message
+    """
+    # Create message container - the correct MIME type
+    # is multipart/alternative.
+    msg = MIMEMultipart("alternative")
+    part1 = MIMEText(plain_content, "plain")
+    part2 = MIMEText(html_content, "html")
+
+    # Attach parts into message container.
+    # According to RFC 2046, the last part of
+    # a multipart message, in this case
+    # the HTML message, is best and preferred.
+    msg.attach(part1)
+    msg.attach(part2)
+
+    msg["Subject"] = subject
+    msg["From"] = f"{smtp_user}@lsst.org"
+    msg["To"] = to
+    return msg
+
+
+class SmtpClient:
+    """Client of the SMTP server which reuses
+    an authenticated connection between emails.
+
+    If the server closed the connection, e.g. after being idle,
+    a new connection is opened and the email is sent again.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self, smtp_user, smtp_password):
+        connection = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        connection.starttls()
+        connection.login(smtp_user, smtp_password)
+        return connection
+
+    def send(self, to, subject, html_content, plain_content):
+        """Send an email.
+
+        Parameters
+        ----------
+        to : `str`
+            The email address of the recipient
+        subject : `str`
+            The subject of the email
+        html_content : `str`
+            The content of the email in HTML format
+        plain_content : `str`
+            The content of the email in plain text format
+
+        Raises
+        ------
+        ValueError
+            If the SMTP credentials are not set, see `get_smtp_credentials`
+        smtplib.SMTPException
+            If the email could not be sent
+        """
+        smtp_user, smtp_password = get_smtp_credentials()
+        msg = create_email_message(smtp_user, to, subject, html_content, plain_content)
+        with self._lock:
+            for retry in (False, True):
+                if self._connection is None:
+                    self._connection = self._connect(smtp_user, smtp_password)
+                try:
+                    self._connection.sendmail(msg["From"], msg["To"], msg.as_string())
+                    return
+                except smtplib.SMTPServerDisconnected:
+                    self._connection = None
+                    if retry:
+                        raise
+                except Exception:
+                    self._close()
+                    raise
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except smtplib.SMTPException:
+                pass
+            self._connection = None
+
+    def close(self):
+        """Close the connection to the SMTP server, if any."""
+        with self._lock:
+            self._close()
+
+
+smtp_client = SmtpClient()
+"""Shared client of the SMTP server (`SmtpClient`)."""
@@ -0,0 +1,177 @@
+import threading
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from manager.resilience import (
+    CircuitBreaker,
+    UpstreamUnavailable,
+    get_upstream,
+    reset_upstreams,
+    upstream_request,
+)
+from rest_framework.test import APIClient
+
+from api.models import Token
+
+
+@override_settings(
+    UPSTREAM_BREAKER_FAILURE_THRESHOLD=2,
+    UPSTREAM_BREAKER_RECOVERY_TIMEOUT=60,
+    UPSTREAM_BULKHEAD_LIMITS={"ole": 1},
+    UPSTREAM_BULKHEAD_MAX_WAIT=0.01,
+)
+class ResilienceTestCase(TestCase):
+    def setUp(self):
+        reset_upstreams()
+
+    def tearDown(self):
+        reset_upstreams()
+
+    @patch("requests.get")
+    def test_circuit_breaker_opens(self, mock_requests_get):
+        mock_requests_get.side_effect = requests.exceptions.ConnectionError("Connection refused")
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                upstream_request("efd", "get", "http://foo:bar/efd/efd_clients")
+        assert get_upstream("efd").breaker.state == CircuitBreaker.OPEN
+
+        # Requests fail fast while the breaker is open
+        with self.assertRaises(UpstreamUnavailable):
+            upstream_request("efd", "get", "http://foo:bar/efd/efd_clients")
+        assert mock_requests_get.call_count == 2
+
+        # Other upstreams are not affected
+        mock_requests_get.side_effect = None
+        mock_requests_get.return_value.status_code = 200
+        upstream_request("commander", "get", "http://foo:bar/salinfo/metadata")
+        assert get_upstream("commander").breaker.state == CircuitBreaker.CLOSED
+
+        metrics = get_upstream("efd").get_metrics()
+        assert metrics["state"] == CircuitBreaker.OPEN
+        assert metrics["failures"] == 2
+        assert metrics["rejected_open"] == 1
+
+    @patch("requests.get")
+    def test_circuit_breaker_half_open(self, mock_requests_get):
+        mock_requests_get.return_value.status_code = 503
+        for _ in range(2):
+            upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        breaker = get_upstream("ole").breaker
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # After the recovery timeout a single trial request is allowed
+        breaker.opened_at -= 60
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.cancel_request()
+
+        # A failed trial opens the breaker again
+        upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # A successful trial closes the breaker
+        breaker.opened_at -= 60
+        mock_requests_get.return_value.status_code = 200
+        upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.consecutive_failures == 0
+
+    @patch("requests.get")
+    def test_circuit_breaker_half_open_unexpected_error(self, mock_requests_get):
+        mock_requests_get.return_value.status_code = 503
+        for _ in range(2):
+            upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        breaker = get_upstream("ole").breaker
+
+        # An unexpected error in the trial request opens the breaker again
+        breaker.opened_at -= 60
+        mock_requests_get.side_effect = ValueError("Unexpected error")
+        with self.assertRaises(ValueError):
+            upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # and releases the trial, so another one is allowed after the recovery timeout
+        breaker.opened_at -= 60
+        mock_requests_get.side_effect = None
+        mock_requests_get.return_value.status_code = 200
+        upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @patch("requests.get")
+    def test_bulkhead_rejects_when_full(self, mock_requests_get):
+        request_started = threading.Event()
+        release_request = threading.Event()
+
+        def slow_request(*args, **kwargs):
+            request_started.set()
+            release_request.wait(5)
+            return mock_requests_get.return_value
+
+        mock_requests_get.side_effect = slow_request
+        mock_requests_get.return_value.status_code = 200
+
+        thread = threading.Thread(
+            target=upstream_request, args=("ole", "get", "http://foo:bar/nightreport/reports")
+        )
+        thread.start()
+        request_started.wait(5)
+
+        with self.assertRaises(UpstreamUnavailable):
+            upstream_request("ole", "get", "http://foo:bar/nightreport/reports")
+
+        release_request.set()
+        thread.join()
+
+        metrics = get_upstream("ole").get_metrics()
+        assert metrics["rejected_full"] == 1
+        assert metrics["in_flight"] == 0
+        assert metrics["state"] == CircuitBreaker.CLOSED
+
+    @patch("requests.get")
+    def test_stalled_upstream_opens_circuit_breaker(self, mock_requests_get):
+        def stalled_request(url, timeout=None, **kwargs):
+            # Without a timeout the request would wait indefinitely
+            assert timeout is not None
+            raise requests.exceptions.ReadTimeout("Read timed out")
+
+        mock_requests_get.side_effect = stalled_request
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                upstream_request("efd", "get", "http://foo:bar/efd/efd_clients")
+
+        assert get_upstream("efd").breaker.state == CircuitBreaker.OPEN
+        mock_requests_get.assert_called_with("http://foo:bar/efd/efd_clients", timeout=(5, 30))
+
+    @override_settings(UPSTREAM_TIMEOUT=5)
+    @patch("requests.post")
+    def test_upstream_timeout(self, mock_requests_post):
+        upstream_request("commander", "post", "http://foo:bar/cmd", json={})
+        mock_requests_post.assert_called_with("http://foo:bar/cmd", json={}, timeout=5)
+
+    @patch("requests.get")
+    def test_open_circuit_responds_service_unavailable(self, mock_requests_get):
+        user = User.objects.create_user(username="user", password="password", email="test@user.cl")
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+
+        mock_requests_get.side_effect = requests.exceptions.ConnectTimeout("Timeout")
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                upstream_request("efd", "get", "http://foo:bar/efd/efd_clients")
+
+        response = client.get(reverse("EFD-clients"))
+        assert response.status_code == 503
+        assert mock_requests_get.call_count == 2
+
+        response = client.get(reverse("upstreams-metrics"))
+        assert response.status_code == 200
+        assert set(response.data.keys()) == {"commander", "ole", "efd", "jira", "lfa"}
+        assert response.data["efd"]["state"] == CircuitBreaker.OPEN
+        assert response.data["efd"]["rejected_open"] == 1
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+import numpy as np
+from astropy.time import Time
+from api.management.commands.benchmark_time_service import get_times_with_astropy
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+from manager import time_service
+
+
+class TimeServiceTestCase(TestCase):
+    def setUp(self):
+        last_times_patcher = patch("manager.time_service._last_times", (None, None))
+        last_times_patcher.start()
+        self.addCleanup(last_times_patcher.stop)
+
+    def test_accuracy(self):
+        """Test the time measures match the ones computed with astropy."""
+        # Arrange:
+        utc = np.linspace(Time("2016-06-01").unix, Time("2026-06-01").unix, 500)
+        t = Time(utc, format="unix", scale="utc")
+
+        # Act:
+        times = time_service.compute_times(utc)
+
+        # Assert:
+        # Sidereal times within 10 ms
+        for key, longitude in [("sidereal_summit", -70.749417), ("sidereal_greenwich", "greenwich")]:
+            expected = t.sidereal_time("apparent", longitude=longitude, model=None).value
+            difference = np.abs(times[key] - expected)
+            np.testing.assert_array_less(np.minimum(difference, 24 - difference) * 3600, 0.01)
+        np.testing.assert_allclose(times["mjd"], t.mjd, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(times["tai"] - utc, (t.tai.mjd - t.mjd) * 86400, rtol=0, atol=1e-3)
+        # The leap second at the end of 2016
+        self.assertEqual(times["tai_to_utc"][0], -36)
+        self.assertEqual(times["tai_to_utc"][-1], -37)
+
+    def test_get_times(self):
+        """Test the time measures of the current time."""
+        # Act:
+        with freeze_time("2024-03-01 11:59:40"):
+            times = time_service.get_times()
+
+        # Assert:
+        self.assertEqual(times["utc"], Time("2024-03-01T11:59:40", scale="utc").unix)
+        self.assertEqual(times["tai"], times["utc"] + 37)
+        self.assertEqual(times["tai_to_utc"], -37)
+        # The observing day changes at 12:00 TAI
+        self.assertEqual(times["observing_day"], "20240301")
+        for value in times.values():
+            self.assertIsInstance(value, (float, str))
+
+    @override_settings(TIME_SERVICE_RESOLUTION=0.5)
+    def test_get_times_memoized(self):
+        """Test the time measures are reused within the resolution."""
+        # Act:
+        with freeze_time("2024-03-01 00:00:00.1") as frozen_time:
+            times = time_service.get_times()
+            frozen_time.tick(0.3)
+            same_times = time_service.get_times()
+            frozen_time.tick(0.3)
+            new_times = time_service.get_times()
+
+        # Assert:
+        self.assertEqual(same_times, times)
+        self.assertAlmostEqual(new_times["utc"] - times["utc"], 0.6, places=3)
+
+    @override_settings(TIME_SERVICE_RESOLUTION=0)
+    def test_get_times_astropy(self):
+        """Test the time measures of the current time match the ones
+        computed with astropy, without memoization."""
+        # Act:
+        with freeze_time("2025-10-01 03:27:12.345"):
+            times = time_service.get_times()
+            expected_times = get_times_with_astropy()
+
+        # Assert:
+        self.assertAlmostEqual(times["mjd"], expected_times["mjd"], places=9)
+        # Sidereal times within 10 ms
+        for key in ("sidereal_summit", "sidereal_greenwich"):
+            self.assertAlmostEqual(times[key], expected_times[key], delta=0.01 / 3600)
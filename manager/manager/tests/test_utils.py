@@ -1,6 +1,9 @@
+import datetime
 import random
+import time
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 import requests
 from django.test import TestCase
@@ -11,14 +14,38 @@ from manager.utils import (
     MTMOUNT_DEPLOYABLE_MOTION_STATE_MAP,
     MTMOUNT_MT_MOUNT_ELEVATION_LOCKING_PIN_MOTION_STATE_MAP,
     MTMOUNT_POWER_STATE_MAP,
+    NIGHT_REPORT_CSCS,
     arrange_nightlydigest_urls_for_obsday,
+    downsample_efd_timeseries,
+    downsample_lttb,
+    downsample_minmax,
+    gather_concurrently,
     get_efd_instance_from_request,
     get_last_valid_night_report,
     get_nightreport_cscs_status_from_efd,
     get_nightreport_observatory_status_from_efd,
+    get_nightreport_status_snapshot,
     get_obsday_end_to_utc,
+    get_tai_from_utc,
+    prefetch_nightreport_status_snapshot,
+    render_nightreport_email,
 )
 
+observatory_status_keys = [
+    "simonyiAzimuth",
+    "simonyiElevation",
+    "simonyiDomeAzimuth",
+    "simonyiRotator",
+    "simonyiMirrorCoversState",
+    "simonyiOilSupplySystemState",
+    "simonyiPowerSupplySystemState",
+    "simonyiLockingPinsSystemState",
+    "auxtelAzimuth",
+    "auxtelElevation",
+    "auxtelDomeAzimuth",
+    "auxtelMirrorCoversState",
+]
+
 observatory_status_efd_response = {
     "MTMount-0-azimuth": {
         "actualPosition": [{"ts": "2025-10-24 19:22:12.914495+00:00", "value": -32.0348721139252}]
@@ -374,3 +401,195 @@ class UtilsTestCase(TestCase):
         for obsday in invalid_obsdays:
             with pytest.raises(ValueError):
                 get_obsday_end_to_utc(obsday)
+
+    def test_downsample_lttb(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.sin(x / 50)
+        y[500] = 10
+
+        indices = downsample_lttb(x, y, 100)
+        assert len(indices) == 100
+        assert indices[0] == 0 and indices[-1] == 999
+        assert np.all(np.diff(indices) > 0)
+        assert 500 in indices
+
+        # Series shorter than max_points are not decimated
+        assert np.array_equal(downsample_lttb(x[:50], y[:50], 100), np.arange(50))
+
+    def test_downsample_minmax(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.sin(x / 50)
+        y[500] = 10
+        y[700] = -10
+        y[10:30] = np.nan
+
+        indices = downsample_minmax(x, y, 100)
+        assert len(indices) <= 100
+        assert indices[0] == 0 and indices[-1] == 999
+        assert 500 in indices and 700 in indices
+        assert not np.any(np.isnan(y[indices[1:-1]]))
+
+    def test_downsample_efd_timeseries(self):
+        samples = [
+            {"ts": f"2025-10-24 19:22:{i // 100:02d}.{i % 100:06d}+00:00", "value": i} for i in range(300)
+        ]
+        data = {
+            "ATDome-0-position": {
+                "azimuthPosition": samples,
+                "dropoutDoorState": samples[:10],
+                "name": [{"ts": sample["ts"], "value": "foo"} for sample in samples],
+            }
+        }
+
+        for method in ["lttb", "minmax"]:
+            downsampled, info = downsample_efd_timeseries(data, 30, method)
+            assert len(downsampled["ATDome-0-position"]["azimuthPosition"]) <= 30
+            # Short and non numeric series are returned unchanged
+            assert downsampled["ATDome-0-position"]["dropoutDoorState"] == samples[:10]
+            assert downsampled["ATDome-0-position"]["name"] == data["ATDome-0-position"]["name"]
+            assert info["method"] == method
+            assert info["original_points"] == 610
+            assert info["downsampled"]
+
+        with pytest.raises(ValueError):
+            downsample_efd_timeseries(data, 30, "foo")
+
+    def test_gather_concurrently(self):
+        def slow_task(value, delay):
+            time.sleep(delay)
+            return value
+
+        def failing_task():
+            raise ValueError("Task failed")
+
+        start = time.monotonic()
+        results = gather_concurrently(
+            {
+                "first": (lambda: slow_task(1, 0.1), 5),
+                "second": (lambda: slow_task(2, 0.1), 5),
+                "failing": (failing_task, 5),
+                "slow": (lambda: slow_task(3, 1), 0.2),
+            }
+        )
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 0.5
+        assert results["first"]["result"] == 1 and results["first"]["error"] is None
+        assert results["second"]["result"] == 2 and results["second"]["error"] is None
+        assert results["first"]["duration"] >= 0.1
+        assert isinstance(results["failing"]["error"], ValueError)
+        assert results["failing"]["result"] is None
+        assert isinstance(results["slow"]["error"], TimeoutError)
+        assert results["slow"]["result"] is None
+
+    def test_render_nightreport_email(self):
+        report = {
+            "day_obs": 20250930,
+            "summary": "First line\nSecond line <b>",
+            "weather": "Clear",
+            "maintel_summary": "Simonyi summary",
+            "auxtel_summary": "AuxTel summary",
+            "confluence_url": None,
+            "obs_issues": [
+                {"key": "OBS-1", "summary": "Issue", "reporter": "User1", "created": "2025-09-30"},
+            ],
+            "observers_crew": ["User1", "User2"],
+            "observatory_status": {
+                "simonyiAzimuth": 100,
+                "simonyiElevation": 45,
+                "simonyiDomeAzimuth": 150,
+                "simonyiRotator": 90,
+                "simonyiMirrorCoversState": "OPENED",
+                "simonyiOilSupplySystemState": "ON",
+                "simonyiPowerSupplySystemState": "ON",
+                "simonyiLockingPinsSystemState": "UNLOCKED",
+                "auxtelAzimuth": 200,
+                "auxtelElevation": 60,
+                "auxtelDomeAzimuth": 250,
+                "auxtelMirrorCoversState": "CLOSED",
+            },
+            "cscs_status": {csc: "ENABLED" for csc in NIGHT_REPORT_CSCS},
+        }
+        report["cscs_status"]["ATSpectrograph:0"] = "FAULT"
+
+        html_content, plain_content = render_nightreport_email(report)
+
+        # HTML content is escaped and keeps the line breaks
+        assert "First line<br>Second line &lt;b&gt;" in html_content
+        assert '<a href="https://' in html_content and ">OBS-1</a>" in html_content
+        assert "<td>45</td>" in html_content and "<td>N/A</td>" in html_content
+        assert 'background-color: #f8d7da;border-radius: 4px;padding: 2px;">FAULT</div>' in html_content
+        assert html_content.count('<td style="font-weight: bold;">') == len(NIGHT_REPORT_CSCS)
+        assert "Link to night plan page" not in html_content
+        assert "User1, User2" in html_content
+
+        # Plain text content is not escaped
+        assert "Summary:\nFirst line\nSecond line <b>\n" in plain_content
+        assert "Simonyi Telescope: el = 45°, az = 100°, dome az = 150°, rotator = 90°." in plain_content
+        assert "AuxTel Telescope: el = 60°, az = 200°, dome az = 250°." in plain_content
+        assert "Mirror covers: CLOSED." in plain_content
+        assert "MTMount:0: ENABLED\n" in plain_content and "ATSpectrograph:0: FAULT\n" in plain_content
+        assert "OBS-1 - Issue: Created by User1" in plain_content
+        assert "Observatory status:\nSimonyi Telescope" in plain_content
+        assert "Link to night plan page" not in plain_content
+        assert plain_content.strip().endswith("Submitted by:\nUser1, User2")
+
+        # Report without issues
+        html_content, plain_content = render_nightreport_email({**report, "obs_issues": []})
+        assert "No issues reported." in html_content
+        assert "Detailed issue report:\nNo issues reported." in plain_content
+
+    def test_render_nightreport_email_missing_keys(self):
+        with pytest.raises(ValueError) as e:
+            render_nightreport_email({"day_obs": 20250930})
+        assert str(e.value).startswith("Missing keys in report: summary, weather")
+
+    def test_render_nightreport_email_status_time(self):
+        report = {
+            "day_obs": 20250930,
+            "summary": "",
+            "weather": "",
+            "maintel_summary": "",
+            "auxtel_summary": "",
+            "confluence_url": None,
+            "obs_issues": [],
+            "observers_crew": [],
+            "observatory_status": {key: 0 for key in observatory_status_keys},
+            "cscs_status": {csc: "ENABLED" for csc in NIGHT_REPORT_CSCS},
+            "status_time_cut": datetime.datetime(2025, 10, 1, 9, 30),
+        }
+
+        html_content, plain_content = render_nightreport_email(report)
+
+        assert "Observatory Status at 2025-10-01 09:30:00 TAI" in html_content
+        assert "Observatory status:\nAt 2025-10-01 09:30:00 TAI.\nSimonyi Telescope" in plain_content
+
+    @override_settings(NIGHTREPORT_SNAPSHOT_MAX_AGE=600)
+    @patch("manager.utils.get_nightreport_cscs_status_from_efd")
+    @patch("manager.utils.get_nightreport_observatory_status_from_efd")
+    def test_nightreport_status_snapshot(self, mock_observatory_status, mock_cscs_status):
+        mock_observatory_status.return_value = {"simonyiAzimuth": 100}
+        mock_cscs_status.return_value = {"MTMount:0": "ENABLED"}
+        obsday_end_tai = get_tai_from_utc(get_obsday_end_to_utc(20250930))
+
+        # Snapshot of an observing day that already ended
+        snapshot = prefetch_nightreport_status_snapshot("summit_efd", 20250930)
+        assert snapshot["time_cut"] == obsday_end_tai
+        mock_observatory_status.assert_called_once_with("summit_efd", obsday_end_tai)
+        mock_cscs_status.assert_called_once_with("summit_efd", obsday_end_tai)
+
+        cached_snapshot = get_nightreport_status_snapshot("summit_efd", 20250930, obsday_end_tai)
+        assert cached_snapshot["observatory_status"] == {"simonyiAzimuth": 100}
+        assert cached_snapshot["cscs_status"] == {"MTMount:0": "ENABLED"}
+        assert cached_snapshot["age"] == 0
+
+        # Snapshot older than the maximum age
+        later_time_cut = obsday_end_tai + datetime.timedelta(seconds=601)
+        assert get_nightreport_status_snapshot("summit_efd", 20250930, later_time_cut) is None
+        assert (
+            get_nightreport_status_snapshot("summit_efd", 20250930, later_time_cut, max_age=700)["age"] == 601
+        )
+
+        # Snapshots are kept per EFD instance and observing day
+        assert get_nightreport_status_snapshot("base_efd", 20250930, obsday_end_tai) is None
+        assert get_nightreport_status_snapshot("summit_efd", 20251001, obsday_end_tai) is None
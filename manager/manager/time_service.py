@@ -0,0 +1,276 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Computation of the time measures sent to the clients
+(UTC, TAI, MJD, observing day and sidereal times).
+
+Building an astropy `Time` and evaluating its apparent sidereal time takes
+a few milliseconds, and the time measures are requested by every client.
+Here the offsets between UTC, TAI and UT1 are read from astropy once per day
+and the sidereal times are evaluated with closed-form expressions:
+the IAU 2006 Greenwich mean sidereal time plus the equation of the equinoxes
+from the largest terms of the nutation in longitude. The functions accept
+numpy arrays of timestamps, and `get_times` memoizes the measures of the
+current time for `settings.TIME_SERVICE_RESOLUTION` seconds.
+"""
+
+import functools
+import time
+import warnings
+from datetime import datetime, timezone
+
+import erfa
+import numpy as np
+from astropy.time import Time
+from django.conf import settings
+
+SUMMIT_LONGITUDE = -70.749417
+"""Longitude of the summit in degrees, east positive"""
+
+SECONDS_PER_DAY = 86400.0
+
+UNIX_EPOCH_JD = 2440587.5
+"""Julian date of the unix epoch"""
+
+MJD_OFFSET = 2400000.5
+"""Difference between julian dates and modified julian dates"""
+
+J2000_JD = 2451545.0
+"""Julian date of the J2000.0 epoch"""
+
+TT_MINUS_TAI = 32.184
+"""Difference in seconds between the TT and TAI scales"""
+
+ARCSEC_TO_RAD = np.pi / (180.0 * 3600.0)
+
+RAD_TO_HOURS = 12.0 / np.pi
+
+NUTATION_ARGUMENTS = np.array(
+    [
+        [134.96340251, 477198.8675605],
+        [357.52910918, 35999.0502911],
+        [93.27209062, 483202.0174577],
+        [297.85019547, 445267.1114469],
+        [125.04455501, -1934.1362619],
+    ]
+)
+"""Fundamental arguments of the nutation (mean anomalies of the Moon and
+the Sun, argument of latitude of the Moon, mean elongation of the Moon
+from the Sun and longitude of the ascending node of the Moon), as
+(degrees, degrees per julian century) of TT since J2000.0"""
+
+NUTATION_LONGITUDE_TERMS = np.array(
+    [
+        [0, 0, 0, 0, 1, -171996.0, -174.2],
+        [0, 0, 2, -2, 2, -13187.0, -1.6],
+        [0, 0, 2, 0, 2, -2274.0, -0.2],
+        [0, 0, 0, 0, 2, 2062.0, 0.2],
+        [0, 1, 0, 0, 0, 1426.0, -3.4],
+        [1, 0, 0, 0, 0, 712.0, 0.1],
+        [0, 1, 2, -2, 2, -517.0, 1.2],
+        [0, 0, 2, 0, 1, -386.0, -0.4],
+        [1, 0, 2, 0, 2, -301.0, 0.0],
+        [0, -1, 2, -2, 2, 217.0, -0.5],
+        [1, 0, 0, -2, 0, -158.0, 0.0],
+        [0, 0, 2, -2, 1, 129.0, 0.1],
+        [-1, 0, 2, 0, 2, 123.0, 0.0],
+    ]
+)
+"""Largest terms of the nutation in longitude (IAU 1980): multipliers of the
+fundamental arguments, followed by the amplitude of the sine in units of
+0.1 milliarcseconds and its rate per julian century"""
+
+_last_times = (None, None)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_day_offsets(day):
+    """Return the offsets of the TAI and UT1 scales from UTC
+    during an UTC day.
+
+    Leap seconds are only inserted at the end of a day, so TAI - UTC is
+    constant during the day, and UT1 - UTC changes by a few milliseconds.
+
+    Parameters
+    ----------
+    day : `int`
+        Number of days since the unix epoch
+
+    Returns
+    -------
+    `tuple`
+        TAI - UTC and UT1 - UTC in seconds
+    """
+    noon = datetime.fromtimestamp((day + 0.5) * SECONDS_PER_DAY, tz=timezone.utc)
+    with warnings.catch_warnings():
+        # Dates after the last update of the leap seconds table are
+        # flagged as dubious, the offset of the last leap second is used
+        warnings.simplefilter("ignore", erfa.ErfaWarning)
+        tai_minus_utc = float(erfa.dat(noon.year, noon.month, noon.day, 0.5))
+        ut1_minus_utc = float(Time(noon, scale="utc").delta_ut1_utc)
+    return tai_minus_utc, ut1_minus_utc
+
+
+def get_utc_offsets(utc):
+    """Return the offsets of the TAI and UT1 scales from UTC.
+
+    Parameters
+    ----------
+    utc : `float` or `numpy.ndarray`
+        UTC unix timestamps (seconds)
+
+    Returns
+    -------
+    `tuple`
+        TAI - UTC and UT1 - UTC in seconds, with the shape of `utc`
+    """
+    days, indices = np.unique(np.floor_divide(utc, SECONDS_PER_DAY).astype(int), return_inverse=True)
+    offsets = np.array([_get_day_offsets(int(day)) for day in days])[indices.reshape(np.shape(utc))]
+    return offsets[..., 0], offsets[..., 1]
+
+
+def get_greenwich_mean_sidereal_time(jd_ut1, jd_tt):
+    """Return the Greenwich mean sidereal time (IAU 2006).
+
+    Parameters
+    ----------
+    jd_ut1 : `float` or `numpy.ndarray`
+        Julian dates in the UT1 scale
+    jd_tt : `float` or `numpy.ndarray`
+        Julian dates in the TT scale
+
+    Returns
+    -------
+    `float` or `numpy.ndarray`
+        The mean sidereal time in radians
+    """
+    days_ut1 = jd_ut1 - J2000_JD
+    # Earth rotation angle, the fractional part of the days
+    # is added separately to keep the precision
+    earth_rotation_angle = (
+        2 * np.pi * (np.mod(days_ut1, 1.0) + 0.7790572732640 + 0.00273781191135448 * days_ut1)
+    )
+    t = (jd_tt - J2000_JD) / 36525.0
+    precession = (
+        0.014506
+        + (4612.156534 + (1.3915817 + (-0.00000044 + (-0.000029956 - 0.0000000368 * t) * t) * t) * t) * t
+    )
+    return earth_rotation_angle + precession * ARCSEC_TO_RAD
+
+
+def get_equation_of_equinoxes(jd_tt):
+    """Return the equation of the equinoxes, the difference between
+    the apparent and the mean sidereal times.
+
+    Parameters
+    ----------
+    jd_tt : `float` or `numpy.ndarray`
+        Julian dates in the TT scale
+
+    Returns
+    -------
+    `float` or `numpy.ndarray`
+        The equation of the equinoxes in radians
+    """
+    t = np.asarray((jd_tt - J2000_JD) / 36525.0)
+    arguments = np.radians(NUTATION_ARGUMENTS[:, 0, None] + NUTATION_ARGUMENTS[:, 1, None] * t.ravel())
+    phases = NUTATION_LONGITUDE_TERMS[:, :5] @ arguments
+    amplitudes = NUTATION_LONGITUDE_TERMS[:, 5, None] + NUTATION_LONGITUDE_TERMS[:, 6, None] * t.ravel()
+    nutation_longitude = (amplitudes * np.sin(phases)).sum(axis=0) * 1e-4 * ARCSEC_TO_RAD
+    mean_obliquity = (84381.406 - 46.836769 * t.ravel()) * ARCSEC_TO_RAD
+    return (nutation_longitude * np.cos(mean_obliquity)).reshape(t.shape)
+
+
+def compute_times(utc):
+    """Return the time measures of UTC timestamps.
+
+    Parameters
+    ----------
+    utc : `float` or `numpy.ndarray`
+        UTC unix timestamps (seconds)
+
+    Returns
+    -------
+    `dict`
+        Dictionary containing the following keys, with the shape of `utc`:
+        - tai: time in TAI scale as a unix timestamp (seconds)
+        - mjd: time as a modified julian date
+        - sidereal_summit: apparent sidereal time
+        w/respect to the summit location (hourangles)
+        - sidereal_greenwich: apparent sidereal time
+        w/respect to Greenwich location (hourangles)
+        - tai_to_utc: The number of seconds of difference
+        between TAI and UTC times (seconds)
+    """
+    utc = np.asarray(utc, dtype=float)
+    tai_minus_utc, ut1_minus_utc = get_utc_offsets(utc)
+    jd_utc = utc / SECONDS_PER_DAY + UNIX_EPOCH_JD
+    jd_ut1 = jd_utc + ut1_minus_utc / SECONDS_PER_DAY
+    jd_tt = jd_utc + (tai_minus_utc + TT_MINUS_TAI) / SECONDS_PER_DAY
+    sidereal_greenwich = np.mod(
+        (get_greenwich_mean_sidereal_time(jd_ut1, jd_tt) + get_equation_of_equinoxes(jd_tt)) * RAD_TO_HOURS,
+        24.0,
+    )
+    return {
+        "tai": utc + tai_minus_utc,
+        "mjd": jd_utc - MJD_OFFSET,
+        "sidereal_summit": np.mod(sidereal_greenwich + SUMMIT_LONGITUDE / 15.0, 24.0),
+        "sidereal_greenwich": sidereal_greenwich,
+        "tai_to_utc": -tai_minus_utc,
+    }
+
+
+def get_times():
+    """Return relevant time measures of the current time.
+
+    The measures are memoized for `settings.TIME_SERVICE_RESOLUTION`
+    seconds, so the clients requesting them at the same time
+    share the computation.
+
+    Returns
+    -------
+    Dict
+        Dictionary containing the following keys:
+        - utc: current time in UTC scale as a unix timestamp (seconds)
+        - tai: current time in TAI scale as a unix timestamp (seconds)
+        - mjd: current time as a modified julian date
+        - observing_day: current observing day in the format "YYYYMMDD"
+        - sidereal_summit: current time as a sidereal_time
+        w/respect to the summit location (hourangles)
+        - sidereal_greenwich: current time as a sidereal_time
+        w/respect to Greenwich location (hourangles)
+        - tai_to_utc: The number of seconds of difference
+        between TAI and UTC times (seconds)
+    """
+    global _last_times
+
+    utc = time.time()
+    resolution = settings.TIME_SERVICE_RESOLUTION
+    step = int(utc // resolution) if resolution else None
+    last_step, last_times = _last_times
+    if step is not None and step == last_step:
+        return dict(last_times)
+
+    times = {key: float(value) for key, value in compute_times(utc).items()}
+    # The observing day starts at 12:00 TAI
+    observing_day = datetime.fromtimestamp(times["tai"] - 12 * 3600, tz=timezone.utc).strftime("%Y%m%d")
+    times = {"utc": utc, **times, "observing_day": observing_day}
+    _last_times = (step, times)
+    return dict(times)
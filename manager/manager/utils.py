@@ -18,24 +18,36 @@
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
 
+import hashlib
 import json
 import os
 import re
 import smtplib
+import time
 import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from tempfile import TemporaryFile
-from urllib.parse import quote
+from urllib.parse import urlencode
 
 import astropy.time
+import numpy as np
 import requests
+from asgiref.sync import sync_to_async
 from astropy.time import Time
-from astropy.units import hour
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.storage import Storage
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+from manager import time_service
+from manager.jira_client import JiraRequestError, jira_client
+from manager.resilience import UpstreamUnavailable, upstream_request
+from manager.smtp_client import SMTP_HOST, SMTP_PORT, create_email_message, get_smtp_credentials
 from pytz import timezone
 from rest_framework.response import Response
 
@@ -127,6 +139,34 @@ NIGHT_REPORT_CSCS = [
     "ATSpectrograph:0",
 ]
 
+NIGHT_REPORT_CSC_STATE_COLORS = {
+    "ENABLED": "#d4edda",  # Green
+    "STANDBY": "#fff3cd",  # Yellow
+    "FAULT": "#f8d7da",  # Red
+    "DISABLED": "#d6d8d9",  # Grey
+    "UNKNOWN": "#d6d8d9",  # Grey
+}
+
+# Label, Simonyi and AuxTel keys of each row of the observatory status table
+NIGHT_REPORT_OBSERVATORY_STATUS_ROWS = [
+    ("Elevation", "simonyiElevation", "auxtelElevation"),
+    ("Azimuth", "simonyiAzimuth", "auxtelAzimuth"),
+    ("Dome Azimuth", "simonyiDomeAzimuth", "auxtelDomeAzimuth"),
+    ("Rotator", "simonyiRotator", None),
+    ("Mirror Covers State", "simonyiMirrorCoversState", "auxtelMirrorCoversState"),
+    ("Oil Supply System State", "simonyiOilSupplySystemState", None),
+    ("Power Supply System State", "simonyiPowerSupplySystemState", None),
+    ("Locking Pins System State", "simonyiLockingPinsSystemState", None),
+]
+
+NIGHT_REPORT_OBS_TICKETS_URL = "https://rubinobs.atlassian.net/jira/software/c/projects/OBS/boards/232"
+
+EFD_DOWNSAMPLING_METHODS = ["lttb", "minmax"]
+
+OLE_LISTING_INCREMENTAL_ORDERS = {"date_added": False, "-date_added": True}
+"""Orders of the OLE listings that can be refreshed incrementally,
+mapped to whether the entries are sorted in descending order."""
+
 EFD_INSTACES = {
     "summit-lsp.lsst.codes": "summit_efd",
     "base-lsp.lsst.codes": "base_efd",
@@ -165,7 +205,7 @@ class RemoteStorage(Storage):
         self._validate_LFA_url(name)
 
         # Make request to remote server
-        response = requests.get(name)
+        response = upstream_request("lfa", "get", name)
         if response.status_code != 200:
             raise FileNotFoundError(f"Error requesting file at: {name}.")
 
@@ -215,7 +255,7 @@ class RemoteStorage(Storage):
         # Before sending the file,
         # we need to reset the file pointer to the beginning
         content.seek(0)
-        upload_file_response = requests.post(url, files={"uploaded_file": content})
+        upload_file_response = upstream_request("lfa", "post", url, files={"uploaded_file": content})
         if upload_file_response.status_code != 200:
             raise ValueError("Error uploading file to the LFA.")
         return upload_file_response.json()["url"]
@@ -233,9 +273,71 @@ class RemoteStorage(Storage):
         return f"{settings.MEDIA_URL}{name}"
 
 
+class MultipartFileStream:
+    """File-like multipart/form-data body with a single file.
+
+    The file is read in chunks as the body is consumed, so it can be
+    passed as the `data` of a `requests` call to stream the upload
+    without building the whole body in memory.
+
+    Parameters
+    ----------
+    field_name : `str`
+        Name of the form field of the file
+    file : `django.core.files.File`
+        The file to upload, e.g. an `UploadedFile`
+    chunk_size : `int`
+        Size in bytes of the chunks read from the file
+    """
+
+    def __init__(self, field_name, file, chunk_size=65536):
+        self.file = file
+        self.file_name = os.path.basename(file.name)
+        self.size = file.size
+        self.chunk_size = chunk_size
+
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        escaped_file_name = self.file_name.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+        file_content_type = getattr(file, "content_type", None) or "application/octet-stream"
+        self._preamble = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{escaped_file_name}"\r\n'
+            f"Content-Type: {file_content_type}\r\n\r\n"
+        ).encode()
+        self._epilogue = f"\r\n--{boundary}--\r\n".encode()
+        self._parts = self._iter_parts()
+        self._buffer = b""
+
+    def __len__(self):
+        return len(self._preamble) + self.size + len(self._epilogue)
+
+    def _iter_parts(self):
+        yield self._preamble
+        yield from self.file.chunks(self.chunk_size)
+        yield self._epilogue
+
+    def read(self, size=-1):
+        """Read up to `size` bytes of the body, or the rest
+        of the body if `size` is negative."""
+        while size < 0 or len(self._buffer) < size:
+            part = next(self._parts, None)
+            if part is None:
+                break
+            self._buffer += part
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
 def upload_to_lfa(request, *args, **kwargs):
     """Connects to LFA API to upload a new file
 
+    Files are streamed to the LFA concurrently,
+    up to `settings.LFA_UPLOAD_MAX_WORKERS` at a time.
+
     Params
     ------
     request: Request
@@ -243,13 +345,17 @@ def upload_to_lfa(request, *args, **kwargs):
     args: list
         List of additional arguments. Currently unused
     kwargs: dict
-        Dictionary with request arguments. Currently unused
+        Dictionary with request arguments:
+            option: The LFA API option, e.g. "upload-file"
 
     Returns
     -------
     Response
         The response and status code
-        of the request to the LOVE-commander LFA API
+        of the request to the LOVE-commander LFA API.
+        If any file fails, the response also contains the urls of the
+        files uploaded correctly and, under the "files" key, the name,
+        size, status code and url of each file
     """
 
     option = kwargs.get("option", None)
@@ -259,15 +365,38 @@ def upload_to_lfa(request, *args, **kwargs):
         return Response({"ack": "No files to upload"}, status=400)
 
     if option == "upload-file":
-        uploaded_files_urls = []
         files_to_upload = request.FILES.getlist("file[]")
-        for file in files_to_upload:
-            upload_file_response = requests.post(url, files={"uploaded_file": file})
-            if upload_file_response.status_code == 200:
-                uploaded_files_urls.append(upload_file_response.json().get("url"))
+        streams = [MultipartFileStream("uploaded_file", file) for file in files_to_upload]
+        results = send_upstream_requests(
+            "lfa",
+            "post",
+            [
+                {"url": url, "data": stream, "headers": {"Content-Type": stream.content_type}}
+                for stream in streams
+            ],
+            settings.LFA_UPLOAD_MAX_WORKERS,
+        )
+
+        uploaded_files = [
+            {
+                "name": stream.file_name,
+                "size": stream.size,
+                "status": result["status"],
+                "url": result["data"].get("url") if result["status"] == 200 else None,
+            }
+            for stream, result in zip(streams, results)
+        ]
+        uploaded_files_urls = [file["url"] for file in uploaded_files if file["url"]]
 
         if len(uploaded_files_urls) != len(files_to_upload):
-            return Response({"ack": "Error when uploading files"}, status=400)
+            return Response(
+                {
+                    "ack": "Error when uploading files",
+                    "urls": uploaded_files_urls,
+                    "files": uploaded_files,
+                },
+                status=400,
+            )
 
         return Response(
             {"ack": "All files uploaded correctly", "urls": uploaded_files_urls},
@@ -492,7 +621,7 @@ def jira_ticket(request_data):
         "content-type": "application/json",
     }
     url = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/issue/"
-    response = requests.post(url, json=jira_payload, headers=headers)
+    response = upstream_request("jira", "post", url, json=jira_payload, headers=headers)
     response_data = response.json()
     if response.status_code == 201:
         return Response(
@@ -535,7 +664,7 @@ def update_time_lost(jira_id: int, add_time_lost: float = 0.0) -> Response:
         "content-type": "application/json",
     }
     url = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/issue/{jira_id}/"
-    response = requests.get(url, headers=headers)
+    response = upstream_request("jira", "get", url, headers=headers)
 
     if response.status_code == 200:
         jira_ticket_fields = response.json().get("fields", {})
@@ -546,7 +675,7 @@ def update_time_lost(jira_id: int, add_time_lost: float = 0.0) -> Response:
                 OBS_TIME_LOST_FIELD: existent_time_lost + add_time_lost,
             },
         }
-        response = requests.put(url, json=jira_payload, headers=headers)
+        response = upstream_request("jira", "put", url, json=jira_payload, headers=headers)
         if response.status_code == 204:
             return Response(
                 {
@@ -615,7 +744,7 @@ def jira_comment(request_data):
         "content-type": "application/json",
     }
     url = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/issue/{jira_id}/comment"
-    response = requests.post(url, json=jira_payload, headers=headers)
+    response = upstream_request("jira", "post", url, json=jira_payload, headers=headers)
 
     if response.status_code == 201:
         return Response(
@@ -633,8 +762,8 @@ def jira_comment(request_data):
     )
 
 
-def handle_jira_payload(request, lfa_urls=[]):
-    """Handle the JIRA payload and send it to the JIRA API
+def get_jira_payload_data(request, lfa_urls=[]):
+    """Return the data of the JIRA payload of an OLE request
 
     Parameters
     ----------
@@ -646,20 +775,55 @@ def handle_jira_payload(request, lfa_urls=[]):
 
     Returns
     -------
-    Response
-        The response and status code of the request to the JIRA API
+    dict
+        The request data with the user and LFA files urls added
     """
     payload_data = request.data.copy()
     payload_data["user_agent"] = "LOVE"
     payload_data["user_id"] = f"{request.user}@{request.get_host()}"
     payload_data["lfa_files_urls"] = lfa_urls
+    return payload_data
+
 
-    if request.data.get("jira_new") == "true":
+def send_jira_payload(payload_data):
+    """Send a JIRA payload to the JIRA API, either to create a new ticket
+    or to comment on an existent one
+
+    Parameters
+    ----------
+    payload_data : dict
+        The data of the JIRA payload, see `get_jira_payload_data`
+
+    Returns
+    -------
+    Response
+        The response and status code of the request to the JIRA API
+    """
+    if payload_data.get("jira_new") == "true":
         return jira_ticket(payload_data)
     return jira_comment(payload_data)
 
 
-def get_jira_obs_report(request_data):
+def handle_jira_payload(request, lfa_urls=[]):
+    """Handle the JIRA payload and send it to the JIRA API
+
+    Parameters
+    ----------
+    request : Request
+        The request object
+    lfa_urls : list
+        List of urls of the files uploaded to the LFA
+        Which will be attached to the Jira ticket
+
+    Returns
+    -------
+    Response
+        The response and status code of the request to the JIRA API
+    """
+    return send_jira_payload(get_jira_payload_data(request, lfa_urls=lfa_urls))
+
+
+def get_jira_obs_report(request_data, use_cache=False):
     """Connect to the Rubin Observatory JIRA Cloud REST API to
     query all issues of the OBS project for a certain obs day.
 
@@ -672,6 +836,10 @@ def get_jira_obs_report(request_data):
     ----------
     request_data : `dict`
         The request data
+    use_cache : `bool`
+        Whether or not to return the issues cached by a previous call
+        for the same obs day, if they are not older than
+        `settings.JIRA_OBS_REPORT_CACHE_TTL` seconds
 
     Notes
     -----
@@ -692,18 +860,17 @@ def get_jira_obs_report(request_data):
     intitial_day_obs_utc = get_obsday_start_to_utc(request_data.get("day_obs"))
     final_day_obs_utc = intitial_day_obs_utc + timedelta(days=1)
 
-    headers = {
-        "Authorization": f"Basic {os.environ.get('JIRA_API_TOKEN')}",
-        "content-type": "application/json",
-    }
+    cache_key = f"jira-obs-report-{request_data.get('day_obs')}"
+    if use_cache:
+        cached_report = cache.get(cache_key)
+        if cached_report is not None:
+            return cached_report
 
     # Get user timezone
-    url = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest/myself"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        user_timezone = timezone(response.json()["timeZone"])
-    else:
-        raise Exception(f"Error getting user timezone from {os.environ.get('JIRA_API_HOSTNAME')}")
+    try:
+        user_timezone = jira_client.get_user_timezone()
+    except JiraRequestError as e:
+        raise Exception(str(e))
 
     start_date_user_datetime = intitial_day_obs_utc.replace(tzinfo=timezone("UTC")).astimezone(user_timezone)
     end_date_user_datetime = final_day_obs_utc.replace(tzinfo=timezone("UTC")).astimezone(user_timezone)
@@ -720,35 +887,35 @@ def get_jira_obs_report(request_data):
         f"AND created <= '{final_day_obs_string} {end_date_user_time_string}'"
     )
 
-    url = (
-        f"https://{os.environ.get('JIRA_API_HOSTNAME')}/rest/api/latest"
-        f"/search/jql?jql={quote(jql_query)}&fields={OBS_TICKETS_FIELDS}"
-    )
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        issues = response.json()["issues"]
-        try:
-            return [
-                {
-                    "key": issue["key"],
-                    "summary": issue["fields"]["summary"],
-                    "time_lost": (
-                        issue["fields"][OBS_TIME_LOST_FIELD]
-                        if issue["fields"][OBS_TIME_LOST_FIELD] is not None
-                        else 0.0
-                    ),
-                    "reporter": issue["fields"]["creator"]["displayName"],
-                    "created": issue["fields"]["created"].split(".")[0],
-                    "systems": parse_obs_issue_systems(issue)
-                    if issue["fields"][OBS_SYSTEMS_FIELD] is not None
-                    else [],
-                }
-                for issue in issues
-            ]
-        except KeyError as e:
-            traceback.print_exc()
-            raise Exception(f"{ERROR_OBS_TICKETS}. Parsing JIRA response failed: missing field {e}")
-    raise Exception(ERROR_OBS_TICKETS)
+    try:
+        issues = jira_client.search(jql_query, OBS_TICKETS_FIELDS)
+    except JiraRequestError:
+        raise Exception(ERROR_OBS_TICKETS)
+
+    try:
+        report = [
+            {
+                "key": issue["key"],
+                "summary": issue["fields"]["summary"],
+                "time_lost": (
+                    issue["fields"][OBS_TIME_LOST_FIELD]
+                    if issue["fields"][OBS_TIME_LOST_FIELD] is not None
+                    else 0.0
+                ),
+                "reporter": issue["fields"]["creator"]["displayName"],
+                "created": issue["fields"]["created"].split(".")[0],
+                "systems": parse_obs_issue_systems(issue)
+                if issue["fields"][OBS_SYSTEMS_FIELD] is not None
+                else [],
+            }
+            for issue in issues
+        ]
+    except KeyError as e:
+        traceback.print_exc()
+        raise Exception(f"{ERROR_OBS_TICKETS}. Parsing JIRA response failed: missing field {e}")
+
+    cache.set(cache_key, report, settings.JIRA_OBS_REPORT_CACHE_TTL)
+    return report
 
 
 def get_client_ip(request):
@@ -880,13 +1047,17 @@ def get_tai_from_utc(utc):
 def get_times():
     """Return relevant time measures.
 
+    The measures are computed by `manager.time_service.get_times`,
+    see its documentation for the details.
+
     Returns
     -------
     Dict
         Dictionary containing the following keys:
         - utc: current time in UTC scale as a unix timestamp (seconds)
-        - tai: current time in UTC scale as a unix timestamp (seconds)
+        - tai: current time in TAI scale as a unix timestamp (seconds)
         - mjd: current time as a modified julian date
+        - observing_day: current observing day in the format "YYYYMMDD"
         - sidereal_summit: current time as a sidereal_time
         w/respect to the summit location (hourangles)
         - sidereal_greenwich: current time as a sidereal_time
@@ -894,22 +1065,7 @@ def get_times():
         - tai_to_utc: The number of seconds of difference
         between TAI and UTC times (seconds)
     """
-    t = Time.now()
-    t_utc = t.datetime.timestamp()
-    t_tai = t.tai.datetime.timestamp()
-    shifted_iso = (t.tai - 12 * hour).iso
-    observing_day = shifted_iso[0:10].replace("-", "")
-    sidereal_summit = t.sidereal_time("apparent", longitude=-70.749417, model=None)
-    sidereal_greenwich = t.sidereal_time("apparent", longitude="greenwich", model=None)
-    return {
-        "utc": t_utc,
-        "tai": t_tai,
-        "mjd": t.mjd,
-        "observing_day": observing_day,
-        "sidereal_summit": sidereal_summit.value,
-        "sidereal_greenwich": sidereal_greenwich.value,
-        "tai_to_utc": t_utc - t_tai,
-    }
+    return time_service.get_times()
 
 
 def assert_time_data(time_data):
@@ -992,36 +1148,11 @@ def send_smtp_email(to, subject, html_content, plain_content):
     bool
         True if the email was sent successfully, False if not
     """
-    smtp_user = os.environ.get("SMTP_USER")
-    if not smtp_user:
-        raise ValueError("SMTP_USER environment variable is not set")
-
-    smtp_password = os.environ.get("SMTP_PASSWORD")
-    if not smtp_password:
-        raise ValueError("SMTP_PASSWORD environment variable is not set")
-
-    if smtp_user.endswith("@lsst.org"):
-        smtp_user = smtp_user.replace("@lsst.org", "")
+    smtp_user, smtp_password = get_smtp_credentials()
 
     try:
-        # Create message container - the correct MIME type
-        # is multipart/alternative.
-        msg = MIMEMultipart("alternative")
-        part1 = MIMEText(plain_content, "plain")
-        part2 = MIMEText(html_content, "html")
-
-        # Attach parts into message container.
-        # According to RFC 2046, the last part of
-        # a multipart message, in this case
-        # the HTML message, is best and preferred.
-        msg.attach(part1)
-        msg.attach(part2)
-
-        msg["Subject"] = subject
-        msg["From"] = f"{smtp_user}@lsst.org"
-        msg["To"] = to
-
-        s = smtplib.SMTP("exch-ls.lsst.org", "587")
+        msg = create_email_message(smtp_user, to, subject, html_content, plain_content)
+        s = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
         s.starttls()
         s.login(smtp_user, smtp_password)
         s.sendmail(msg["From"], msg["To"], msg.as_string())
@@ -1031,9 +1162,12 @@ def send_smtp_email(to, subject, html_content, plain_content):
         return False
 
 
-def arrange_nightreport_email(report, plain=False):
-    """Arrange the night report email in HTML format
-    or plain text format if specified.
+def get_nightreport_email_model(report):
+    """Build the model of the night report email.
+
+    The model holds everything needed to render the email, so it is
+    built once and rendered in both HTML and plain text formats,
+    see `render_nightreport_email`.
 
     Parameters
     ----------
@@ -1051,15 +1185,27 @@ def arrange_nightreport_email(report, plain=False):
     - confluence_url: The URL of the confluence page with the full report
     - obs_issues: The list of OBS issues during the night
     - observers_crew: The list of observers that participated during the night
-    - observatory_status: The status of the observatory during the night
-    - cscs_status: The status of the CSCs during the night
+    - observatory_status: The status of the observatory during the night,
+      see `get_nightreport_observatory_status_from_efd`
+    - cscs_status: The status of the CSCs during the night,
+      see `get_nightreport_cscs_status_from_efd`
+
+    - status_time_cut: Optional, the time cut (TAI) of the observatory
+      and CSCs status, shown in the email
+
+    Each element of the obs_issues list is a dictionary with the key,
+    summary, reporter and created keys. Missing keys are replaced by a dash "-".
 
     Returns
     -------
-    str
-        The night report email in HTML format or plain text format
-    """
+    dict
+        The model of the night report email
 
+    Raises
+    ------
+    ValueError
+        If a key of the report is missing
+    """
     expected_keys = [
         "day_obs",
         "summary",
@@ -1076,233 +1222,86 @@ def arrange_nightreport_email(report, plain=False):
     if missing_keys:
         raise ValueError(f"Missing keys in report: {', '.join(missing_keys)}")
 
-    url_jira_obs_tickets = "https://rubinobs.atlassian.net/jira/software/c/projects/OBS/boards/232"
-    nightlydigest_urls = arrange_nightlydigest_urls_for_obsday(report["day_obs"])
-
-    NIGHTLYDIGEST_TITLE = "Nightly Digest:"
-    SUMMARY_TITLE = "Summary:"
-    WEATHER_TITLE = "Weather summary:"
-    MAINTEL_SUMMARY_TITLE = "Simonyi summary:"
-    AUXTEL_SUMMARY_TITLE = "AuxTel summary:"
-    ADDITIONAL_RESOURCES_TITLE = "Additional resources:"
-    SIGNED_MSG = "Submitted by:"
-    LINK_MSG_OBS = "OBS fault reports from last 24 hours:"
-    LINK_MSG_CONFLUENCE = "Link to night plan page:"
-    DETAILED_ISSUE_REPORT_TITLE = "Detailed issue report:"
-    OBSERVATORY_STATUS_TITLE = "Observatory status:"
-    CSCS_STATUS_TITLE = "CSCs status:"
-
-    if plain:
-        return f"""{NIGHTLYDIGEST_TITLE}
-{nightlydigest_urls["simonyi"]}
-
-{SUMMARY_TITLE}
-{report["summary"]}
-
-{WEATHER_TITLE}
-{report["weather"]}
-
-{MAINTEL_SUMMARY_TITLE}
-{report["maintel_summary"]}
-
-{AUXTEL_SUMMARY_TITLE}
-{report["auxtel_summary"]}
-
-{OBSERVATORY_STATUS_TITLE}
-{parse_observatory_status_to_plain_text(report["observatory_status"])}
-
-{CSCS_STATUS_TITLE}
-{parse_cscs_status_to_plain_text(report["cscs_status"])}
-
-{ADDITIONAL_RESOURCES_TITLE}
-- {LINK_MSG_OBS} {url_jira_obs_tickets}
-{f"- {LINK_MSG_CONFLUENCE} {report['confluence_url']}" if report["confluence_url"] is not None else ""}
-
-{DETAILED_ISSUE_REPORT_TITLE}
-{
-            parse_obs_issues_array_to_plain_text(report["obs_issues"])
-            if len(report["obs_issues"]) > 0
-            else "No issues reported."
+    observatory_status = report["observatory_status"]
+    cscs_status = [
+        {
+            "name": csc,
+            "status": report["cscs_status"][csc],
+            "color": NIGHT_REPORT_CSC_STATE_COLORS.get(report["cscs_status"][csc], "#d6d8d9"),
         }
+        for csc in NIGHT_REPORT_CSCS
+    ]
+    # The HTML table shows 4 CSCs per row
+    cscs_status_rows = [cscs_status[i : i + 4] for i in range(0, len(cscs_status), 4)]
+    cscs_status_rows[-1] += [None] * (4 - len(cscs_status_rows[-1]))
 
-{SIGNED_MSG}
-{", ".join(report["observers_crew"])}"""
-
-    new_line_character = "\n"
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            table {{
-                font-family: Arial, sans-serif;
-                border-collapse: collapse;
-                width: 100%;
-            }}
-            th {{
-                background-color: #f2f2f2;
-            }}
-            th, td {{
-                border: 1px solid #dddddd;
-                text-align: left;
-                padding: 8px;
-            }}
-        </style>
-    </head>
-    <body>
-        <p>
-            <span style="font-weight: bold;">{NIGHTLYDIGEST_TITLE}</span>
-            <br>
-            <a href="{nightlydigest_urls["simonyi"]}">{nightlydigest_urls["simonyi"]}</a>
-        </p>
-        <p>
-            <span style="font-weight: bold;">{SUMMARY_TITLE}</span>
-            <br>
-            {report["summary"].replace(new_line_character, "<br>")}
-        </p>
-        <p>
-            <span style="font-weight: bold;">{WEATHER_TITLE}</span>
-            <br>
-            {report["weather"].replace(new_line_character, "<br>")}
-        </p>
-        <p>
-            <span style="font-weight: bold;">{MAINTEL_SUMMARY_TITLE}</span>
-            <br>
-            {report["maintel_summary"].replace(new_line_character, "<br>")}
-        </p>
-        <p>
-            <span style="font-weight: bold;">{AUXTEL_SUMMARY_TITLE}</span>
-            <br>
-            {report["auxtel_summary"].replace(new_line_character, "<br>")}
-        </p>
-        <br>
-        {parse_observatory_status_to_html_table(report["observatory_status"])}
-        <br>
-        {parse_cscs_status_to_html_table(report["cscs_status"])}
-        <br>
-        <p>
-            <span style="font-weight: bold;">{ADDITIONAL_RESOURCES_TITLE}</span>
-        </p>
-        <ul>
-            <li>
-                {LINK_MSG_OBS}
-                <a href="{url_jira_obs_tickets}">{url_jira_obs_tickets}</a>
-            </li>
+    obs_issues = []
+    for issue in report["obs_issues"]:
+        issue_key = issue.get("key", "-")
+        obs_issues.append(
             {
-        f'''<li>
-                {LINK_MSG_CONFLUENCE}
-                <a href="{report["confluence_url"]}">{report["confluence_url"]}</a>
-            </li>'''
-        if report["confluence_url"] is not None
-        else ""
-    }
-        </ul>
-        <p>
-            <span style="font-weight: bold;">{DETAILED_ISSUE_REPORT_TITLE}</span>
-            <br>
+                "key": issue_key,
+                "url": f"https://{os.environ.get('JIRA_API_HOSTNAME')}/browse/{issue_key}",
+                "summary": issue.get("summary", "-"),
+                "reporter": issue.get("reporter", "-"),
+                "created": issue.get("created", "-"),
+            }
+        )
+
+    return {
+        "nightlydigest_url": arrange_nightlydigest_urls_for_obsday(report["day_obs"])["simonyi"],
+        "summary": report["summary"],
+        "weather": report["weather"],
+        "maintel_summary": report["maintel_summary"],
+        "auxtel_summary": report["auxtel_summary"],
+        "confluence_url": report["confluence_url"],
+        "obs_tickets_url": NIGHT_REPORT_OBS_TICKETS_URL,
+        "obs_issues": obs_issues,
+        "observers_crew": ", ".join(report["observers_crew"]),
+        "observatory_status": [
             {
-        parse_obs_issues_array_to_html_table(report["obs_issues"])
-        if len(report["obs_issues"]) > 0
-        else "No issues reported."
+                "label": label,
+                "simonyi": observatory_status[simonyi_key],
+                "auxtel": observatory_status[auxtel_key] if auxtel_key else "N/A",
+            }
+            for label, simonyi_key, auxtel_key in NIGHT_REPORT_OBSERVATORY_STATUS_ROWS
+        ],
+        "observatory_status_values": observatory_status,
+        "status_time": (
+            f"{report['status_time_cut']:%Y-%m-%d %H:%M:%S} TAI" if report.get("status_time_cut") else None
+        ),
+        "cscs_status": cscs_status,
+        "cscs_status_rows": cscs_status_rows,
     }
-        </p>
-        <p>
-            <span style="font-weight: bold;">{SIGNED_MSG}</span>
-            <br>
-            {", ".join(report["observers_crew"])}
-        </p>
-    </body>
-    </html>
-    """
 
-    return html_content
 
+def render_nightreport_email(report):
+    """Render the night report email in HTML and plain text formats.
 
-def parse_obs_issues_array_to_html_table(obs_issues):
-    """Parse the OBS issues array to an HTML table.
+    The model of the email is built once, see `get_nightreport_email_model`,
+    and rendered with the `api/nightreport_email.html` and
+    `api/nightreport_email.txt` templates, which are compiled
+    once and then reused by the template loader.
 
     Parameters
     ----------
-    obs_issues : `list`
-        List of OBS issues
-
-    Notes
-    -----
-    Each element of the obs_issues list must be dictionary
-    with the following keys:
-    - key: The key of the issue
-    - summary: The summary of the issue
-    - time_lost: The time lost in hours
-    - reporter: The reporter of the issue
-    - created: The creation date of the issue
-
-    If a key is missing, it will be replaced by a dash "-".
+    report : `dict`
+        The night report data, see `get_nightreport_email_model`
 
     Returns
     -------
-    str
-        The OBS issues in HTML table format
-    """
-
-    html_table = """
-    <table style="width:100%">
-        <tr>
-            <th>Key</th>
-            <th>Summary</th>
-            <th>Reporter</th>
-            <th>Created</th>
-        </tr>
-    """
-
-    for issue in obs_issues:
-        issue_key = issue.get("key", "-")
-        issue_url = f"https://{os.environ.get('JIRA_API_HOSTNAME')}/browse/{issue_key}"
-        html_table += f"""
-        <tr>
-            <td><a href="{issue_url}">{issue_key}</a></td>
-            <td>{issue.get("summary", "-")}</td>
-            <td>{issue.get("reporter", "-")}</td>
-            <td>{issue.get("created", "-")}</td>
-        </tr>
-        """
-
-    html_table += "</table>"
-    return html_table
-
-
-def parse_obs_issues_array_to_plain_text(obs_issues):
-    """Parse the OBS issues array to plain text.
-
-    Parameters
-    ----------
-    obs_issues : `list`
-        List of OBS issues
-
-    Notes
-    -----
-    Each element of the obs_issues list must be dictionary
-    with the following keys:
-    - key: The key of the issue
-    - summary: The summary of the issue
-    - time_lost: The time lost in hours
-    - reporter: The reporter of the issue
-    - created: The creation date of the issue
-
-    If a key is missing, it will be replaced by a "None".
+    tuple
+        The night report email in HTML format and in plain text format
 
-    Returns
-    -------
-    str
-        The OBS issues in plain text format
+    Raises
+    ------
+    ValueError
+        If a key of the report is missing
     """
-
-    plain_text = ""
-    for issue in obs_issues:
-        plain_text += f"{issue.get('key')} - {issue.get('summary')}: "
-        plain_text += f"Created by {issue.get('reporter')}\n"
-
-    return plain_text
+    model = get_nightreport_email_model(report)
+    html_content = render_to_string("api/nightreport_email.html", model)
+    plain_content = render_to_string("api/nightreport_email.txt", model)
+    return html_content, plain_content
 
 
 def parse_obs_issue_systems(issue):
@@ -1431,7 +1430,7 @@ def get_nightreport_observatory_status_from_efd(efd_instance="summit_efd", time_
         "time_cut": time_cut.isoformat(),
         "efd_instance": efd_instance,
     }
-    response = requests.post(url, json=payload)
+    response = upstream_request("efd", "post", url, json=payload)
 
     if response.ok:
         data = response.json()
@@ -1601,7 +1600,7 @@ def get_nightreport_cscs_status_from_efd(efd_instance="summit_efd", time_cut=Non
         "time_cut": time_cut.isoformat(),
         "efd_instance": efd_instance,
     }
-    response = requests.post(url, json=payload)
+    response = upstream_request("efd", "post", url, json=payload)
     if response.ok:
         data = response.json()
         cscs_status = {}
@@ -1613,316 +1612,97 @@ def get_nightreport_cscs_status_from_efd(efd_instance="summit_efd", time_cut=Non
     raise Exception("Error getting CSCS status from EFD.")
 
 
-def parse_observatory_status_to_html_table(observatory_status):
-    """Parse the observatory status to an HTML table.
+def get_nightreport_status_snapshot_key(efd_instance, day_obs):
+    """Return the cache key of the status snapshot of an observing day.
 
     Parameters
     ----------
-    observatory_status : `dict`
-        Dict with observatory status with the following keys:
-        - simonyiAzimuth
-        - simonyiElevation
-        - simonyiDomeAzimuth
-        - simonyiRotator
-        - simonyiMirrorCoversState
-        - simonyiOilSupplySystemState
-        - simonyiPowerSupplySystemState
-        - simonyiLockingPinsSystemState
-        - auxtelAzimuth
-        - auxtelElevation
-        - auxtelDomeAzimuth
-        - auxtelMirrorCoversState
-
-    Returns
-    -------
-    str
-        The observatory status in HTML table format
-    """
-    html_table = f"""
-    <table
-        style="width:100%;border-collapse: collapse;border:1px solid #e5e7eb;table-layout: auto;"
-        cellpadding="0" cellspacing="0">
-        <tr style="background-color: #058B8C;color: #F5F5F5;">
-            <td colspan="3" style="text-align: center;font-weight:bold;">Observatory Status</td>
-        </tr>
-        <tr style="background-color:#00BABC; color: #F5F5F5;">
-            <td style="white-space:nowrap; width:1%;"></td>
-            <td style="text-align: center;font-weight:bold;">Simonyi Telescope</td>
-            <td style="text-align: center;font-weight:bold;">Auxiliary Telescope</td>
-        </tr>
-        <tr style="background-color:#ffffff;">
-            <td style="white-space:nowrap;font-weight: bold;">Elevation</td>
-            <td>{observatory_status["simonyiElevation"]}</td>
-            <td>{observatory_status["auxtelElevation"]}</td>
-        </tr>
-        <tr style="background-color:#fafafa;">
-            <td style="white-space:nowrap;font-weight: bold;">Azimuth</td>
-            <td>{observatory_status["simonyiAzimuth"]}</td>
-            <td>{observatory_status["auxtelAzimuth"]}</td>
-        </tr>
-        <tr style="background-color:#ffffff;">
-            <td style="white-space:nowrap;font-weight: bold;">Dome Azimuth</td>
-            <td>{observatory_status["simonyiDomeAzimuth"]}</td>
-            <td>{observatory_status["auxtelDomeAzimuth"]}</td>
-        </tr>
-        <tr style="background-color:#fafafa;">
-            <td style="white-space:nowrap;font-weight: bold;">Rotator</td>
-            <td>{observatory_status["simonyiRotator"]}</td>
-            <td>N/A</td>
-        </tr>
-        <tr style="background-color:#ffffff;">
-            <td style="white-space:nowrap;font-weight: bold;">Mirror Covers State</td>
-            <td>{observatory_status["simonyiMirrorCoversState"]}</td>
-            <td>{observatory_status["auxtelMirrorCoversState"]}</td>
-        </tr>
-        <tr style="background-color:#fafafa;">
-            <td style="white-space:nowrap;font-weight: bold;">Oil Supply System State</td>
-            <td>{observatory_status["simonyiOilSupplySystemState"]}</td>
-            <td>N/A</td>
-        </tr>
-        <tr style="background-color:#ffffff;">
-            <td style="white-space:nowrap;font-weight: bold;">Power Supply System State</td>
-            <td>{observatory_status["simonyiPowerSupplySystemState"]}</td>
-            <td>N/A</td>
-        </tr>
-        <tr style="background-color:#fafafa;">
-            <td style="white-space:nowrap;font-weight: bold;">Locking Pins System State</td>
-            <td>{observatory_status["simonyiLockingPinsSystemState"]}</td>
-            <td>N/A</td>
-        </tr>
-    </table>"""
-
-    return html_table
-
-
-def parse_observatory_status_to_plain_text(observatory_status):
-    """Parse the observatory status to plain text.
-
-    Parameters
-    ----------
-    observatory_status : `dict`
-        Dict with observatory status with the following keys:
-        - simonyiAzimuth
-        - simonyiElevation
-        - simonyiDomeAzimuth
-        - simonyiRotator
-        - simonyiMirrorCoversState
-        - simonyiOilSupplySystemState
-        - simonyiPowerSupplySystemState
-        - simonyiLockingPinsSystemState
-        - auxtelAzimuth
-        - auxtelElevation
-        - auxtelDomeAzimuth
-        - auxtelMirrorCoversState
+    efd_instance : `str`
+        Name of the EFD instance the status is queried from
+    day_obs : `int`
+        The observing day in the format "YYYYMMDD"
 
     Returns
     -------
     str
-        The observatory status in plain text format
+        The cache key of the snapshot
     """
-    maintel_params_units = {
-        "simonyiAzimuth": "°",
-        "simonyiElevation": "°",
-        "simonyiDomeAzimuth": "°",
-        "simonyiRotator": "°",
-    }
-    auxtel_params_units = {
-        "auxtelAzimuth": "°",
-        "auxtelElevation": "°",
-        "auxtelDomeAzimuth": "°",
-    }
-
-    plain_text = ""
-    plain_text += "Simonyi Telescope: "
-    plain_text += f"el = {observatory_status['simonyiElevation']}{maintel_params_units['simonyiElevation']}, "
-    plain_text += f"az = {observatory_status['simonyiAzimuth']}{maintel_params_units['simonyiAzimuth']}, "
-    plain_text += (
-        f"dome az = {observatory_status['simonyiDomeAzimuth']}{maintel_params_units['simonyiDomeAzimuth']}, "
-    )
-    plain_text += f"rotator = {observatory_status['simonyiRotator']}{maintel_params_units['simonyiRotator']}."
-    plain_text += "\n"
-    plain_text += f"Mirror covers: {observatory_status['simonyiMirrorCoversState']}, "
-    plain_text += f"Oil supply system: {observatory_status['simonyiOilSupplySystemState']}, "
-    plain_text += f"Power supply system: {observatory_status['simonyiPowerSupplySystemState']}, "
-    plain_text += f"Locking pins system: {observatory_status['simonyiLockingPinsSystemState']}.\n"
-    plain_text += "AuxTel Telescope: "
-    plain_text += f"el = {observatory_status['auxtelElevation']}{auxtel_params_units['auxtelElevation']}, "
-    plain_text += f"az = {observatory_status['auxtelAzimuth']}{auxtel_params_units['auxtelAzimuth']}, "
-    plain_text += (
-        f"dome az = {observatory_status['auxtelDomeAzimuth']}{auxtel_params_units['auxtelDomeAzimuth']}."
-    )
-    plain_text += "\n"
-    plain_text += f"Mirror covers: {observatory_status['auxtelMirrorCoversState']}.\n"
+    return f"nightreport-status-snapshot-{efd_instance}-{day_obs}"
 
-    return plain_text.strip()
 
+def prefetch_nightreport_status_snapshot(efd_instance="summit_efd", day_obs=None):
+    """Query the observatory and CSCs status of a night report
+    from the EFD and cache them as a snapshot.
 
-def parse_cscs_status_to_html_table(cscs_status):
-    """Parse the CSCS status to an HTML table.
+    The status is queried with the same time cut used when
+    sending the night report: the current time (TAI),
+    or the end of the observing day if it already ended.
 
     Parameters
     ----------
-    cscs_status : `dict`
-        Dict with CSCs status with the following keys:
-        - MTMount:0
-        - MTM1M3:0
-        - MTAOS:0
-        - MTM2:0
-        - MTDome:0
-        - MTDomeTrajectory:0
-        - MTHexapod:1
-        - MTHexapod:2
-        - MTRotator:0
-        - MTPtg:0
-        - MTM1M3TS:0
-        - MTCamera:0
-        - ATMCS:0
-        - ATPtg:0
-        - ATDome:0
-        - ATDomeTrajectory:0
-        - ATAOS:0
-        - ATPneumatics:0
-        - ATHexapod:0
-        - ATCamera:0
-        - ATOODS:0
-        - ATHeaderService:0
-        - ATSpectrograph:0
+    efd_instance : `str`
+        Name of the EFD instance to query (defaults to "summit_efd")
+    day_obs : `int`, optional
+        The observing day in the format "YYYYMMDD",
+        the current observing day by default
 
     Returns
     -------
-    str
-        The CSCs status in HTML table format
+    dict
+        The snapshot, with the following keys:
+        - observatory_status: see `get_nightreport_observatory_status_from_efd`
+        - cscs_status: see `get_nightreport_cscs_status_from_efd`
+        - time_cut: The time cut (TAI) of the EFD queries
     """
+    curr_tai = astropy.time.Time.now().tai.datetime
+    if day_obs is None:
+        day_obs = int(get_obsday_from_tai(curr_tai))
+    time_cut = min(curr_tai, get_tai_from_utc(get_obsday_end_to_utc(day_obs)))
+
+    snapshot = {
+        "observatory_status": get_nightreport_observatory_status_from_efd(efd_instance, time_cut),
+        "cscs_status": get_nightreport_cscs_status_from_efd(efd_instance, time_cut),
+        "time_cut": time_cut,
+    }
+    cache.set(
+        get_nightreport_status_snapshot_key(efd_instance, day_obs),
+        snapshot,
+        settings.NIGHTREPORT_SNAPSHOT_CACHE_TTL,
+    )
+    return snapshot
 
-    def render_status_cell(status):
-        color_map = {
-            "ENABLED": "#d4edda",  # Green
-            "STANDBY": "#fff3cd",  # Yellow
-            "FAULT": "#f8d7da",  # Red
-            "DISABLED": "#d6d8d9",  # Grey
-            "UNKNOWN": "#d6d8d9",  # Grey
-        }
-        color = color_map.get(status, "#d6d8d9")
-        return f"""
-        <td style="text-align: center;">
-            <div style="background-color: {color};border-radius: 4px;padding: 2px;">{status}</div>
-        </td>
-        """
 
-    html_table = f"""
-    <table
-        style="width:100%;border-collapse: collapse;border:1px solid #e5e7eb;table-layout: auto;"
-        cellpadding="0" cellspacing="0">
-        <tr style="background-color: #058B8C;color: #F5F5F5;">
-            <td colspan="8" style="text-align: center;font-weight: bold;">CSCs Summary States</td>
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">MTMount:0</td>
-            {render_status_cell(cscs_status["MTMount:0"])}
-            <td style="font-weight: bold;">MTM1M3:0</td>
-            {render_status_cell(cscs_status["MTM1M3:0"])}
-            <td style="font-weight: bold;">MTAOS:0</td>
-            {render_status_cell(cscs_status["MTAOS:0"])}
-            <td style="font-weight: bold;">MTM2:0</td>
-            {render_status_cell(cscs_status["MTM2:0"])}
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">MTDome:0</td>
-            {render_status_cell(cscs_status["MTDome:0"])}
-            <td style="font-weight: bold;">MTDomeTrajectory:0</td>
-            {render_status_cell(cscs_status["MTDomeTrajectory:0"])}
-            <td style="font-weight: bold;">MTHexapod:1</td>
-            {render_status_cell(cscs_status["MTHexapod:1"])}
-            <td style="font-weight: bold;">MTHexapod:2</td>
-            {render_status_cell(cscs_status["MTHexapod:2"])}
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">MTRotator:0</td>
-            {render_status_cell(cscs_status["MTRotator:0"])}
-            <td style="font-weight: bold;">MTPtg:0</td>
-            {render_status_cell(cscs_status["MTPtg:0"])}
-            <td style="font-weight: bold;">MTM1M3TS:0</td>
-            {render_status_cell(cscs_status["MTM1M3TS:0"])}
-            <td style="font-weight: bold;">MTCamera:0</td>
-            {render_status_cell(cscs_status["MTCamera:0"])}
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">ATMCS:0</td>
-            {render_status_cell(cscs_status["ATMCS:0"])}
-            <td style="font-weight: bold;">ATPtg:0</td>
-            {render_status_cell(cscs_status["ATPtg:0"])}
-            <td style="font-weight: bold;">ATDome:0</td>
-            {render_status_cell(cscs_status["ATDome:0"])}
-            <td style="font-weight: bold;">ATDomeTrajectory:0</td>
-            {render_status_cell(cscs_status["ATDomeTrajectory:0"])}
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">ATAOS:0</td>
-            {render_status_cell(cscs_status["ATAOS:0"])}
-            <td style="font-weight: bold;">ATPneumatics:0</td>
-            {render_status_cell(cscs_status["ATPneumatics:0"])}
-            <td style="font-weight: bold;">ATHexapod:0</td>
-            {render_status_cell(cscs_status["ATHexapod:0"])}
-            <td style="font-weight: bold;">ATCamera:0</td>
-            {render_status_cell(cscs_status["ATCamera:0"])}
-        </tr>
-        <tr>
-            <td style="font-weight: bold;">ATOODS:0</td>
-            {render_status_cell(cscs_status["ATOODS:0"])}
-            <td style="font-weight: bold;">ATHeaderService:0</td>
-            {render_status_cell(cscs_status["ATHeaderService:0"])}
-            <td style="font-weight: bold;">ATSpectrograph:0</td>
-            {render_status_cell(cscs_status["ATSpectrograph:0"])}
-            <td></td>
-            <td></td>
-        </tr>
-    </table>"""
-
-    return html_table
-
-
-def parse_cscs_status_to_plain_text(cscs_status):
-    """Parse the CSCS status to plain text.
+def get_nightreport_status_snapshot(efd_instance, day_obs, time_cut, max_age=None):
+    """Return the cached status snapshot of an observing day,
+    if it is fresh enough for the given time cut.
 
     Parameters
     ----------
-    cscs_status : `dict`
-        Dict with CSCs status with the following keys:
-        - MTMount:0
-        - MTM1M3:0
-        - MTAOS:0
-        - MTM2:0
-        - MTDome:0
-        - MTDomeTrajectory:0
-        - MTHexapod:1
-        - MTHexapod:2
-        - MTRotator:0
-        - MTPtg:0
-        - MTM1M3TS:0
-        - MTCamera:0
-        - ATMCS:0
-        - ATPtg:0
-        - ATDome:0
-        - ATDomeTrajectory:0
-        - ATAOS:0
-        - ATPneumatics:0
-        - ATHexapod:0
-        - ATCamera:0
-        - ATOODS:0
-        - ATHeaderService:0
-        - ATSpectrograph:0
+    efd_instance : `str`
+        Name of the EFD instance the status is queried from
+    day_obs : `int`
+        The observing day in the format "YYYYMMDD"
+    time_cut : `datetime.datetime`
+        The time cut (TAI) the status is needed for
+    max_age : `float`, optional
+        Maximum seconds between the time cut of the snapshot and the
+        given time cut, `settings.NIGHTREPORT_SNAPSHOT_MAX_AGE` by default
 
     Returns
     -------
-    str
-        The CSCs status in plain text format
+    dict or None
+        The snapshot, see `prefetch_nightreport_status_snapshot`,
+        with its age in seconds in the age key.
+        None if there is no snapshot or it is too old
     """
+    snapshot = cache.get(get_nightreport_status_snapshot_key(efd_instance, day_obs))
+    if snapshot is None:
+        return None
 
-    plain_text = ""
-    for csc in NIGHT_REPORT_CSCS:
-        plain_text += f"{csc}: {cscs_status[csc]}\n"
-
-    return plain_text.strip()
+    age = max((time_cut - snapshot["time_cut"]).total_seconds(), 0)
+    if age > (max_age if max_age is not None else settings.NIGHTREPORT_SNAPSHOT_MAX_AGE):
+        return None
+    return {**snapshot, "age": age}
 
 
 def arrange_nightlydigest_urls_for_obsday(obsday):
@@ -1996,7 +1776,7 @@ def get_last_valid_night_report(day_obs=None):
 
     query_params = f"?min_day_obs={day_obs}&max_day_obs={next_day_obs}&order_by=-date_added"
     url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/nightreport/reports{query_params}"
-    response = requests.get(url)
+    response = upstream_request("ole", "get", url)
     if response.ok:
         reports = response.json()
         if len(reports) == 0:
@@ -2005,6 +1785,198 @@ def get_last_valid_night_report(day_obs=None):
     raise Exception("Error getting the current night report from the Nightreport API.")
 
 
+def _parse_efd_timestamps(timestamps):
+    """Convert a list of EFD timestamps to an array of floats.
+
+    Parameters
+    ----------
+    timestamps : `list`
+        List of timestamps as returned by the LOVE-commander EFD endpoints,
+        e.g. "2025-10-24 19:22:12.914495+00:00".
+
+    Returns
+    -------
+    `numpy.ndarray`
+        The timestamps as microseconds since the epoch. If the timestamps
+        cannot be parsed, the position of each sample is returned instead.
+    """
+    try:
+        normalized = [str(ts).replace("+00:00", "").rstrip("Z") for ts in timestamps]
+        return np.array(normalized, dtype="datetime64[us]").astype(np.float64)
+    except ValueError:
+        return np.arange(len(timestamps), dtype=np.float64)
+
+
+def downsample_lttb(x, y, max_points):
+    """Select the samples of a series with the
+    Largest-Triangle-Three-Buckets (LTTB) algorithm.
+
+    The first and last samples are always kept. The remaining samples are
+    split in ``max_points - 2`` buckets, and for each bucket the sample that
+    forms the largest triangle with the previously selected sample and the
+    average of the next bucket is kept. The areas of each bucket are computed
+    at once with NumPy.
+
+    Parameters
+    ----------
+    x : `numpy.ndarray`
+        The x coordinates of the series (e.g. timestamps), sorted.
+    y : `numpy.ndarray`
+        The y coordinates of the series.
+    max_points : `int`
+        The maximum number of samples to keep, at least 3.
+
+    Returns
+    -------
+    `numpy.ndarray`
+        The sorted indices of the selected samples.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_values = y[next_start:next_end]
+        next_y = np.nanmean(next_values) if np.any(~np.isnan(next_values)) else y[prev]
+
+        areas = np.abs(
+            (x[prev] - next_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (next_y - y[prev])
+        )
+        areas = np.nan_to_num(areas, nan=-1.0)
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+
+    return selected
+
+
+def downsample_minmax(x, y, max_points):
+    """Select the samples of a series keeping the
+    minimum and maximum of each bucket.
+
+    The series is split in ``max_points // 2`` buckets of consecutive
+    samples, and the samples with the minimum and maximum value of each bucket
+    are kept, so peaks are never lost. The first and last samples
+    are always kept.
+
+    Parameters
+    ----------
+    x : `numpy.ndarray`
+        The x coordinates of the series (e.g. timestamps), sorted.
+    y : `numpy.ndarray`
+        The y coordinates of the series.
+    max_points : `int`
+        The maximum number of samples to keep, at least 3.
+
+    Returns
+    -------
+    `numpy.ndarray`
+        The sorted indices of the selected samples.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    n_buckets = max(1, (max_points - 2) // 2)
+    bucket = (np.arange(n) * n_buckets) // n
+    # Sort by bucket and then by value; NaN values are sorted last
+    # so they are never selected as the maximum of a bucket.
+    values = np.where(np.isnan(y), np.inf, y)
+    order = np.lexsort((values, bucket))
+    bucket_sorted = bucket[order]
+    first = np.flatnonzero(np.r_[True, bucket_sorted[1:] != bucket_sorted[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    maxima = np.where(np.isinf(values[order[last]]), order[first], order[last])
+
+    return np.unique(np.concatenate(([0, n - 1], order[first], maxima)))
+
+
+def downsample_efd_timeseries(data, max_points, method="lttb"):
+    """Downsample every series of an EFD timeseries response.
+
+    Parameters
+    ----------
+    data : `dict`
+        The EFD timeseries as returned by the LOVE-commander, of the form:
+        {
+            "<CSC>-<index>-<topic>": {
+                "<field>": [{"ts": "<timestamp>", "value": <value>}, ...],
+            },
+        }
+    max_points : `int`
+        The maximum number of samples to keep per series.
+    method : `str`
+        The downsampling method, one of `EFD_DOWNSAMPLING_METHODS`.
+
+    Notes
+    -----
+    Series whose values are not numeric (e.g. arrays or strings)
+    are returned unchanged.
+
+    Returns
+    -------
+    `tuple`
+        The downsampled data (same structure as `data`) and a dictionary with
+        the following keys:
+        - method: The downsampling method
+        - max_points: The maximum number of samples per series
+        - original_points: The total number of samples received
+        - returned_points: The total number of samples returned
+        - downsampled: Whether or not any series was decimated
+
+    Raises
+    ------
+    ValueError
+        If the method is not supported
+    """
+    if method not in EFD_DOWNSAMPLING_METHODS:
+        raise ValueError(f"Invalid downsampling method: {method}")
+    downsample = downsample_lttb if method == "lttb" else downsample_minmax
+
+    original_points = 0
+    returned_points = 0
+    downsampled_data = {}
+    for topic, fields in data.items():
+        if not isinstance(fields, dict):
+            downsampled_data[topic] = fields
+            continue
+        downsampled_data[topic] = {}
+        for field, samples in fields.items():
+            original_points += len(samples)
+            if len(samples) <= max_points:
+                downsampled_data[topic][field] = samples
+                returned_points += len(samples)
+                continue
+            try:
+                y = np.array([sample["value"] for sample in samples], dtype=np.float64)
+            except (KeyError, TypeError, ValueError):
+                downsampled_data[topic][field] = samples
+                returned_points += len(samples)
+                continue
+            x = _parse_efd_timestamps([sample["ts"] for sample in samples])
+            indices = downsample(x, y, max_points)
+            downsampled_data[topic][field] = [samples[i] for i in indices]
+            returned_points += len(indices)
+
+    info = {
+        "method": method,
+        "max_points": max_points,
+        "original_points": original_points,
+        "returned_points": returned_points,
+        "downsampled": returned_points < original_points,
+    }
+    return downsampled_data, info
+
+
 def get_efd_instance_from_request(request):
     """Get the EFD instance in base to the host
     in the request headers.
@@ -2035,3 +2007,465 @@ def validate_json_file(value):
         json.loads(value.read().decode("ascii"))
     except Exception:
         raise ValidationError("Malformatted JSON object.")
+
+
+async def _iter_upstream_content(response, chunk_size):
+    """Iterate asynchronously over the body of an upstream response.
+
+    Each chunk is read in a worker thread, so only one chunk
+    is held in memory at a time. The upstream connection
+    is released once the iteration finishes or is interrupted.
+
+    Parameters
+    ----------
+    response : `requests.Response`
+        The upstream response, requested with `stream=True`
+    chunk_size : `int`
+        The size in bytes of each chunk
+
+    Yields
+    ------
+    `bytes`
+        The next chunk of the upstream body
+    """
+    chunks = response.iter_content(chunk_size=chunk_size)
+    read_chunk = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await read_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(response.close, thread_sensitive=False)()
+
+
+def proxy_upstream_request(upstream, method, url, status=None, **kwargs):
+    """Send a request to an upstream service (LOVE-commander, OLE)
+    and return its response to the client.
+
+    If `settings.PROXY_STREAMING_PASSTHROUGH` is enabled the upstream body
+    is forwarded in chunks without being decoded, otherwise it is parsed
+    as JSON and returned as a DRF `Response`.
+
+    Parameters
+    ----------
+    upstream : `str`
+        Name of the upstream service, one of
+        `manager.resilience.UPSTREAM_SERVICES`
+    method : `str`
+        The HTTP method of the request, e.g. "get", "post"
+    url : `str`
+        The URL of the upstream endpoint
+    status : `int`, optional
+        Status code of the response. If not provided,
+        the status code of the upstream response is used
+    **kwargs
+        Additional arguments passed to `requests`, e.g. `json`
+
+    Returns
+    -------
+    `Response` or `django.http.StreamingHttpResponse`
+        The upstream response and status code
+    """
+    if not settings.PROXY_STREAMING_PASSTHROUGH:
+        response = upstream_request(upstream, method, url, **kwargs)
+        return Response(response.json(), status=status or response.status_code)
+
+    response = upstream_request(upstream, method, url, stream=True, **kwargs)
+    return StreamingHttpResponse(
+        _iter_upstream_content(response, settings.PROXY_STREAMING_CHUNK_SIZE),
+        status=status or response.status_code,
+        content_type=response.headers.get("content-type", "application/json"),
+    )
+
+
+def get_ole_listing_generation(service):
+    """Return the generation of the cached listings of an OLE service.
+
+    The generation is part of the cache keys of the listings,
+    so changing it invalidates all the listings of the service.
+
+    Parameters
+    ----------
+    service : `str`
+        The OLE service, e.g. "exposurelog"
+
+    Returns
+    -------
+    `int`
+        The current generation
+    """
+    return cache.get_or_set(f"ole-listing-generation-{service}", time.time_ns, None)
+
+
+def invalidate_ole_listings(service):
+    """Invalidate the cached listings of an OLE service,
+    after its entries were created, edited or deleted.
+
+    Parameters
+    ----------
+    service : `str`
+        The OLE service, e.g. "exposurelog"
+    """
+    cache.set(f"ole-listing-generation-{service}", time.time_ns(), None)
+
+
+def _get_incremental_ole_listing_params(params, results):
+    """Return the query parameters to request only the entries
+    of an OLE listing added after the cached ones.
+
+    Parameters
+    ----------
+    params : `list`
+        The (key, value) query parameters of the listing
+    results : `list`
+        The cached entries of the listing
+
+    Returns
+    -------
+    `list` or `None`
+        The query parameters, or None if the listing
+        can not be refreshed incrementally
+    """
+    order_by = [value for key, value in params if key == "order_by"]
+    if len(order_by) != 1 or order_by[0] not in OLE_LISTING_INCREMENTAL_ORDERS:
+        return None
+    if any(key == "offset" and value not in ("", "0") for key, value in params):
+        return None
+    if not results or any("id" not in entry or "date_added" not in entry for entry in results):
+        return None
+
+    # The entries added at the same time as the last seen one
+    # are requested again, they are merged by id
+    min_date_added = max(
+        [
+            *[entry["date_added"] for entry in results],
+            *[value for key, value in params if key == "min_date_added"],
+        ]
+    )
+    incremental_params = [(key, value) for key, value in params if key != "min_date_added"]
+    return [*incremental_params, ("min_date_added", min_date_added)]
+
+
+def _merge_ole_listing(params, results, new_results):
+    """Merge the entries added to an OLE listing with the cached ones.
+
+    Parameters
+    ----------
+    params : `list`
+        The (key, value) query parameters of the listing
+    results : `list`
+        The cached entries of the listing
+    new_results : `list`
+        The entries added after the cached ones
+
+    Returns
+    -------
+    `list`
+        The merged entries, sorted and limited as requested
+    """
+    order_by = next(value for key, value in params if key == "order_by")
+    entries = {entry["id"]: entry for entry in results}
+    entries.update({entry["id"]: entry for entry in new_results})
+    merged = sorted(
+        entries.values(),
+        key=lambda entry: entry["date_added"],
+        reverse=OLE_LISTING_INCREMENTAL_ORDERS[order_by],
+    )
+    limit = next((value for key, value in params if key == "limit"), None)
+    if limit is not None and limit.isdigit():
+        merged = merged[: int(limit)]
+    return merged
+
+
+def get_ole_listing(service, path, query_params, status=None):
+    """Return a listing of an OLE service, e.g. the exposurelog messages,
+    shared between the clients polling the same query.
+
+    A cached listing is returned as is for `settings.OLE_LISTING_CACHE_TTL`
+    seconds. Then, if the listing is sorted by `date_added`, only the entries
+    added after the last cached one are requested and merged, otherwise the
+    whole listing is requested again. The whole listing is also requested
+    every `settings.OLE_LISTING_FULL_REFRESH_INTERVAL` seconds, to pick up
+    the changes made outside of the manager. The changes made through the
+    manager invalidate the listings, see `invalidate_ole_listings`.
+
+    Parameters
+    ----------
+    service : `str`
+        The OLE service, e.g. "exposurelog"
+    path : `str`
+        The path of the listing endpoint, e.g. "exposurelog/messages"
+    query_params : `QueryDict`
+        The query parameters of the listing
+    status : `int`, optional
+        Status code of the response. If not provided,
+        the status code of the upstream response is used
+
+    Returns
+    -------
+    `Response` or `django.http.StreamingHttpResponse`
+        The listing and status code
+    """
+    url = f"http://{os.environ.get('OLE_API_HOSTNAME')}/{path}"
+    params = sorted((key, value) for key, values in query_params.lists() for value in values)
+    if not settings.OLE_LISTING_CACHE_TTL:
+        return proxy_upstream_request("ole", "get", f"{url}?{urlencode(params)}", status=status)
+
+    query_hash = hashlib.sha1(urlencode(params).encode()).hexdigest()
+    cache_key = f"ole-listing-{service}-{get_ole_listing_generation(service)}-{query_hash}"
+    listing = cache.get(cache_key)
+    now = time.time()
+    if listing is not None and now - listing["refreshed"] < settings.OLE_LISTING_CACHE_TTL:
+        return Response(listing["results"], status=status or 200)
+
+    incremental_params = None
+    if listing is not None and now - listing["full_refreshed"] < settings.OLE_LISTING_FULL_REFRESH_INTERVAL:
+        incremental_params = _get_incremental_ole_listing_params(params, listing["results"])
+
+    response = upstream_request("ole", "get", f"{url}?{urlencode(incremental_params or params)}")
+    response_data = response.json()
+    if response.status_code != 200 or not isinstance(response_data, list):
+        return Response(response_data, status=status or response.status_code)
+
+    if incremental_params is not None:
+        results = _merge_ole_listing(params, listing["results"], response_data)
+        full_refreshed = listing["full_refreshed"]
+    else:
+        results = response_data
+        full_refreshed = now
+    cache.set(
+        cache_key,
+        {"results": results, "refreshed": now, "full_refreshed": full_refreshed},
+        settings.OLE_LISTING_FULL_REFRESH_INTERVAL,
+    )
+    return Response(results, status=status or 200)
+
+
+def map_concurrently(func, items, max_workers):
+    """Apply a function to every item using a pool of threads.
+
+    Parameters
+    ----------
+    func : `callable`
+        Function called with each item
+    items : `list`
+        Items to process
+    max_workers : `int`
+        Maximum number of items processed at the same time
+
+    Returns
+    -------
+    `list`
+        The results of `func`, in the same order as `items`
+    """
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def send_upstream_requests(upstream, method, requests_kwargs, max_workers, stop_on_error=False):
+    """Send several requests to an upstream service, sharing
+    the same connections.
+
+    Parameters
+    ----------
+    upstream : `str`
+        Name of the upstream service, one of
+        `manager.resilience.UPSTREAM_SERVICES`
+    method : `str`
+        The HTTP method of the requests, e.g. "post", "patch"
+    requests_kwargs : `list`
+        List with the arguments of each request, e.g.
+        [{"url": "http://...", "json": {...}}, ...]
+    max_workers : `int`
+        Maximum number of requests in flight. If 1 the requests
+        are sent sequentially, in order
+    stop_on_error : `bool`
+        When sending the requests sequentially, whether or not
+        to skip the remaining requests after a failed one
+
+    Notes
+    -----
+    A single request is sent without opening a session.
+
+    Returns
+    -------
+    `list`
+        For each request and in the same order, a dictionary
+        with the following keys:
+        - status: The status code of the upstream response,
+            or None if the request was skipped
+        - data: The upstream response
+    """
+    if len(requests_kwargs) == 1:
+        return [_send_upstream_request(upstream, method, None, requests_kwargs[0])]
+
+    with requests.Session() as session:
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max_workers))
+
+        def send_request(kwargs):
+            return _send_upstream_request(upstream, method, session, kwargs)
+
+        if max_workers > 1:
+            return map_concurrently(send_request, requests_kwargs, max_workers)
+
+        results = []
+        failed = False
+        for kwargs in requests_kwargs:
+            if stop_on_error and failed:
+                results.append({"status": None, "data": {"ack": "Request skipped"}})
+                continue
+            result = send_request(kwargs)
+            failed = not 200 <= result["status"] < 300
+            results.append(result)
+        return results
+
+
+def _send_upstream_request(upstream, method, session, kwargs):
+    """Send a request of `send_upstream_requests`, returning
+    its status code and response data."""
+    try:
+        response = upstream_request(upstream, method, session=session, **kwargs)
+    except UpstreamUnavailable as e:
+        return {"status": e.status_code, "data": {"ack": str(e.detail)}}
+    except requests.RequestException as e:
+        return {"status": 502, "data": {"ack": str(e)}}
+    try:
+        data = response.json()
+    except ValueError:
+        data = {"ack": response.text}
+    return {"status": response.status_code, "data": data}
+
+
+def aggregate_upstream_results(key_name, keys, results):
+    """Arrange the results of `send_upstream_requests` in a single response.
+
+    Parameters
+    ----------
+    key_name : `str`
+        Name of the key identifying each request, e.g. "obs_id"
+    keys : `list`
+        The key of each request, in the same order as `results`
+    results : `list`
+        The results returned by `send_upstream_requests`
+
+    Returns
+    -------
+    `Response`
+        If there is a single result, the upstream response and status code.
+        Otherwise a dictionary with a "results" key containing, for each
+        request, its key and the upstream response and status code.
+        The status code is the upstream one if every request succeeded,
+        or 207 (Multi-Status) if any request failed
+    """
+    if len(results) == 1:
+        return Response(results[0]["data"], status=results[0]["status"])
+
+    aggregated_results = [{key_name: key, **result} for key, result in zip(keys, results)]
+    if all(200 <= result["status"] < 300 for result in results):
+        response_status = results[0]["status"]
+    else:
+        response_status = 207
+    return Response({"results": aggregated_results}, status=response_status)
+
+
+class StageTimer:
+    """Record the duration of the stages of a request.
+
+    Examples
+    --------
+    >>> timer = StageTimer()
+    >>> with timer("report"):
+    ...     report = get_last_valid_night_report()
+    >>> timer.server_timing()
+    'report;dur=120.5'
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.monotonic() - start
+
+    def add(self, name, duration):
+        """Record the duration of a stage measured elsewhere.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the stage
+        duration : `float`
+            Duration of the stage in seconds
+        """
+        self.timings[name] = duration
+
+    def server_timing(self):
+        """Return the recorded durations as the value of
+        a Server-Timing HTTP header.
+
+        Returns
+        -------
+        `str`
+            The duration of each stage in milliseconds,
+            e.g. "report;dur=120.5, obs_issues;dur=830.2"
+        """
+        return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in self.timings.items())
+
+
+def _timed_call(func):
+    start = time.monotonic()
+    try:
+        return func(), None, time.monotonic() - start
+    except Exception as e:
+        return None, e, time.monotonic() - start
+
+
+def gather_concurrently(tasks):
+    """Run several independent tasks at the same time,
+    each one with its own timeout.
+
+    Parameters
+    ----------
+    tasks : `dict`
+        Dictionary of the form {name: (function, timeout)}, where
+        function is called without arguments and timeout is the maximum
+        number of seconds to wait for its result
+
+    Notes
+    -----
+    Tasks that time out are not interrupted, their threads finish in the
+    background but their results are discarded.
+
+    Returns
+    -------
+    `dict`
+        Dictionary with the same keys as `tasks`, and for each task
+        a dictionary with the following keys:
+        - result: The value returned by the function, None if it failed
+        - error: The exception raised by the function, a `TimeoutError`
+            if it timed out, or None if it succeeded
+        - duration: Seconds the task took, or waited for if it timed out
+    """
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    start = time.monotonic()
+    futures = {name: executor.submit(_timed_call, func) for name, (func, _) in tasks.items()}
+    results = {}
+    for name, (_, timeout) in tasks.items():
+        remaining = max(0, timeout - (time.monotonic() - start))
+        try:
+            result, error, duration = futures[name].result(timeout=remaining)
+        except FuturesTimeoutError:
+            result = None
+            error = TimeoutError(f"Timeout after {timeout} seconds getting {name.replace('_', ' ')}.")
+            duration = time.monotonic() - start
+        results[name] = {"result": result, "error": error, "duration": duration}
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
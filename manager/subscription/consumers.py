@@ -22,6 +22,7 @@
 that handle the reception/sending of channels messages."""
 
 import asyncio
+import collections
 import json
 
 from astropy.time import Time
@@ -30,6 +31,8 @@ from django.conf import settings
 
 from manager import utils
 from subscription.heartbeat_manager import HeartbeatManager
+from subscription.time_data_broadcaster import TIME_DATA_GROUP, TimeDataBroadcaster
+from ui_framework.models import View
 
 
 class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
@@ -40,10 +43,14 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         self.first_connection = asyncio.Future()
         self.heartbeat_manager = HeartbeatManager()
         self.heartbeat_manager.initialize()
+        self.time_data_broadcaster = TimeDataBroadcaster()
+        self.time_data_broadcaster.initialize()
 
     async def connect(self):
         """Handle connection, rejects connection if no authenticated user."""
         self.stream_group_names = []
+        self.view_stream_group_names = {}
+        self.time_data_subscribed = False
 
         # Reject connection if no authenticated user:
         if self.scope["user"].is_anonymous:
@@ -61,7 +68,14 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
 
     async def disconnect(self, close_code):
         """Handle disconnection."""
-        await asyncio.gather(*[self._leave_group(*stream) for stream in self.stream_group_names])
+        streams = self.stream_group_names + [
+            stream for view_streams in self.view_stream_group_names.values() for stream in view_streams
+        ]
+        self.stream_group_names = []
+        self.view_stream_group_names = {}
+        await self._leave_groups(streams)
+        if self.time_data_subscribed:
+            await self.channel_layer.group_discard(TIME_DATA_GROUP, self.channel_name)
 
     async def receive_json(self, message):
         """Handle a received message.
@@ -105,8 +119,20 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
                     "stream": "stream1",
                 }
 
+            Or, to subscribe to all the streams of the components of a View:
+
+            .. code-block:: json
+
+                {
+                    "option": "subscribe/unsubscribe",
+                    "view": 1,
+                }
+
         """
         option = message["option"]
+        if "view" in message:
+            await self.handle_view_subscription_message(option, message["view"])
+            return
         category = message["category"]
 
         if option == "subscribe":
@@ -129,6 +155,47 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
                 {"data": "Successfully unsubscribed to %s-%s-%s-%s" % (category, csc, salindex, stream)}
             )
 
+    async def handle_view_subscription_message(self, option, view_id):
+        """Handle a subscription/unsubscription message to a View.
+
+        Makes the consumer join or leave at once all the groups
+        the components of the View subscribe to,
+        see `ui_framework.view_subscriptions`.
+        The groups joined with the View are left when unsubscribing,
+        except the ones subscribed individually or with other Views.
+
+        Parameters
+        ----------
+        option: `string`
+            "subscribe" or "unsubscribe"
+        view_id: `int`
+            id of the View
+        """
+        if option == "subscribe":
+            try:
+                view = await View.objects.only("subscriptions").aget(pk=view_id)
+            except (View.DoesNotExist, TypeError, ValueError):
+                await self.send_json({"data": "View %s not found" % view_id})
+                return
+            subscriptions = view.subscriptions
+            # The View may have changed since it was subscribed
+            previous_subscriptions = self.view_stream_group_names.get(str(view.pk), [])
+            await self._join_groups(subscriptions, view_id=str(view.pk))
+            await self._leave_groups(previous_subscriptions)
+            result = "subscribed"
+        elif option == "unsubscribe":
+            subscriptions = self.view_stream_group_names.pop(str(view_id), [])
+            await self._leave_groups(subscriptions)
+            result = "unsubscribed"
+        else:
+            return
+        await self.send_json(
+            {
+                "data": "Successfully %s to view %s" % (result, view_id),
+                "subscriptions": ["-".join(stream) for stream in subscriptions],
+            }
+        )
+
     async def handle_action_message(self, message):
         """Handle an action message.
 
@@ -170,6 +237,22 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
                     the request time, e.g. 123243423.123>"
                 }
 
+        - subscribe_time_data: joins the `time-data` group, which receives
+        the time_data periodically (without request_time), and sends
+        the current time_data. The request_time is passed through
+        if received with the message, to estimate the latency.
+
+            - Expected input message:
+            .. code-block:: json
+
+                {
+                    "action": "subscribe_time_data",
+                    "request_time": "<optional timestamp with the request time,
+                    e.g. 123243423.123>"
+                }
+
+        - unsubscribe_time_data: leaves the `time-data` group.
+
         Parameters
         ----------
         message: `dict`
@@ -187,6 +270,16 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
             request_time = message["request_time"]
             time_data = utils.get_times()
             await self.send_json({"time_data": time_data, "request_time": request_time})
+        elif message["action"] == "subscribe_time_data":
+            await self.channel_layer.group_add(TIME_DATA_GROUP, self.channel_name)
+            self.time_data_subscribed = True
+            response = {"time_data": utils.get_times()}
+            if "request_time" in message:
+                response["request_time"] = message["request_time"]
+            await self.send_json(response)
+        elif message["action"] == "unsubscribe_time_data":
+            await self.channel_layer.group_discard(TIME_DATA_GROUP, self.channel_name)
+            self.time_data_subscribed = False
 
     async def handle_data_message(self, message, manager_rcv):
         """Handle a data message.
@@ -302,28 +395,51 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         stream : `string`
             Stream to subscribe to. E.g. 'stream_1'
         """
-        key = "-".join([category, csc, salindex, stream])
-        if [category, csc, salindex, stream] not in self.stream_group_names:
-            self.stream_group_names.append([category, csc, salindex, stream])
-        await self.channel_layer.group_add(key, self.channel_name)
-
-        # If subscribing to an event, send the initial_state
-        if category == "event":
-            csc_group_key = csc if not settings.LOVE_PRODUCER_LEGACY else "all"
-            await self.channel_layer.group_send(
-                f"initial_state-{csc_group_key}-all-all",
-                {
-                    "type": "subscription_all_data",
-                    "category": "initial_state",
-                    "data": [
-                        {
-                            "csc": csc,
-                            "salindex": (int(salindex) if salindex != "all" else salindex),
-                            "data": {"event_name": stream},
-                        }
-                    ],
-                },
-            )
+        await self._join_groups([[category, csc, salindex, stream]])
+
+    async def _join_groups(self, streams, view_id=None):
+        """Join several groups at once in order to receive messages from them.
+
+        Parameters
+        ----------
+        streams: `list`
+            [category, csc, salindex, stream] of each group, see `_join_group`
+        view_id: `string`, optional
+            id of the View the groups are joined with,
+            otherwise they are joined individually
+        """
+        if view_id is None:
+            for stream in streams:
+                if list(stream) not in self.stream_group_names:
+                    self.stream_group_names.append(list(stream))
+        else:
+            self.view_stream_group_names[view_id] = [list(stream) for stream in streams]
+        await asyncio.gather(
+            *[self.channel_layer.group_add("-".join(stream), self.channel_name) for stream in streams]
+        )
+
+        # If subscribing to events, send the initial_state,
+        # with a single message for all the events of each CSC
+        initial_states = collections.defaultdict(list)
+        for category, csc, salindex, stream in streams:
+            if category == "event":
+                csc_group_key = csc if not settings.LOVE_PRODUCER_LEGACY else "all"
+                initial_states[csc_group_key].append(
+                    {
+                        "csc": csc,
+                        "salindex": (int(salindex) if salindex != "all" else salindex),
+                        "data": {"event_name": stream},
+                    }
+                )
+        await asyncio.gather(
+            *[
+                self.channel_layer.group_send(
+                    f"initial_state-{csc_group_key}-all-all",
+                    {"type": "subscription_all_data", "category": "initial_state", "data": data},
+                )
+                for csc_group_key, data in initial_states.items()
+            ]
+        )
 
     async def _leave_group(self, category, csc, salindex, stream):
         """Leave a group in order to receive messages from it.
@@ -340,10 +456,29 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         stream : `string`
             Stream to subscribe to. E.g. 'stream_1'
         """
-        key = "-".join([category, csc, salindex, stream])
         if [category, csc, salindex, stream] in self.stream_group_names:
             self.stream_group_names.remove([category, csc, salindex, stream])
-        await self.channel_layer.group_discard(key, self.channel_name)
+        await self._leave_groups([[category, csc, salindex, stream]])
+
+    async def _leave_groups(self, streams):
+        """Leave several groups at once, except the ones
+        still subscribed individually or with a View.
+
+        Parameters
+        ----------
+        streams: `list`
+            [category, csc, salindex, stream] of each group, see `_leave_group`
+        """
+        subscribed_streams = self.stream_group_names + [
+            stream for view_streams in self.view_stream_group_names.values() for stream in view_streams
+        ]
+        await asyncio.gather(
+            *[
+                self.channel_layer.group_discard("-".join(stream), self.channel_name)
+                for stream in streams
+                if list(stream) not in subscribed_streams
+            ]
+        )
 
     async def subscription_data(self, message):
         """
@@ -430,6 +565,19 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         # Send data to WebSocket
         await self.send(text_data=message["data"])
 
+    async def send_time_data(self, message):
+        """
+        Send the time data to all the instances
+        of a consumer that have joined the time-data group.
+
+        Parameters
+        ----------
+        message: `dict`
+            dictionary containing the time data message, already serialized
+        """
+        # Send data to WebSocket
+        await self.send(text_data=message["data"])
+
     async def logout(self, message):
         """Closes the connection.
 
@@ -28,6 +28,8 @@ from channels.testing import WebsocketCommunicator
 from django.contrib.auth.models import Permission, User
 from manager.routing import application
 
+from ui_framework.models import View
+
 
 class TestSubscriptionCombinations:
     """Test that clients can or cannot establish to subscriptions
@@ -458,3 +460,175 @@ class TestSubscriptionCombinations:
 
         await client_communicator.disconnect()
         await producer_communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_join_and_leave_view_subscriptions(self):
+        """Test that clients can subscribe to all the streams of a View
+        with one message, and the initial_state of its events is requested
+        with one message per CSC."""
+        # Arrange
+        view = await View.objects.acreate(
+            name="Dome",
+            data={
+                "content": {
+                    "newPanel-0": {
+                        "content": "CSCSummary",
+                        "config": {"hierarchy": [{"name": "ATDome", "salindex": 0}]},
+                    },
+                    "newPanel-1": {
+                        "content": "VegaTimeSeriesPlot",
+                        "config": {
+                            "inputs": {
+                                "Azimuth": {
+                                    "values": [
+                                        {
+                                            "category": "telemetry",
+                                            "csc": "ATDome",
+                                            "salindex": 0,
+                                            "topic": "position",
+                                        },
+                                        {
+                                            "category": "event",
+                                            "csc": "ATDome",
+                                            "salindex": 0,
+                                            "topic": "azimuthState",
+                                        },
+                                    ]
+                                }
+                            }
+                        },
+                    },
+                }
+            },
+        )
+        client_communicator = WebsocketCommunicator(application, self.url)
+        producer_communicator = WebsocketCommunicator(application, self.url)
+        await client_communicator.connect()
+        await producer_communicator.connect()
+        await producer_communicator.send_json_to(
+            {
+                "option": "subscribe",
+                "category": "initial_state",
+                "csc": "ATDome",
+                "salindex": "all",
+                "stream": "all",
+            }
+        )
+        await producer_communicator.receive_json_from()
+
+        # Act 1 (Subscribe)
+        await client_communicator.send_json_to({"option": "subscribe", "view": view.pk})
+        response = await client_communicator.receive_json_from()
+        initial_state_request = await producer_communicator.receive_json_from()
+        msg, expected = self.build_messages("telemetry", "ATDome", 0, ["position"])
+        await producer_communicator.send_json_to(msg)
+        data_response = await client_communicator.receive_json_from()
+
+        # Assert 1
+        assert response == {
+            "data": f"Successfully subscribed to view {view.pk}",
+            "subscriptions": [
+                "event-ATDome-0-azimuthState",
+                "event-ATDome-0-summaryState",
+                "telemetry-ATDome-0-position",
+            ],
+        }
+        assert initial_state_request["data"] == [
+            {"csc": "ATDome", "salindex": 0, "data": {"event_name": "azimuthState"}},
+            {"csc": "ATDome", "salindex": 0, "data": {"event_name": "summaryState"}},
+        ]
+        assert await producer_communicator.receive_nothing(self.no_reception_timeout)
+        assert data_response == expected
+
+        # Act 2 (Unsubscribe)
+        await client_communicator.send_json_to({"option": "unsubscribe", "view": view.pk})
+        response = await client_communicator.receive_json_from()
+        await producer_communicator.send_json_to(msg)
+
+        # Assert 2
+        assert response["data"] == f"Successfully unsubscribed to view {view.pk}"
+        assert await client_communicator.receive_nothing(self.no_reception_timeout)
+
+        # Unknown views are reported
+        await client_communicator.send_json_to({"option": "subscribe", "view": view.pk + 1})
+        response = await client_communicator.receive_json_from()
+        assert response == {"data": f"View {view.pk + 1} not found"}
+
+        await client_communicator.disconnect()
+        await producer_communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_leave_overlapping_view_subscriptions(self):
+        """Test that the streams shared by several subscribed Views,
+        or subscribed individually, are kept when unsubscribing from a View."""
+        # Arrange
+        summary_panel = {
+            "content": "CSCSummary",
+            "config": {"hierarchy": [{"name": "ATDome", "salindex": 0}]},
+        }
+        position_panel = {
+            "content": "VegaTimeSeriesPlot",
+            "config": {
+                "inputs": {
+                    "Azimuth": {
+                        "values": [
+                            {"category": "telemetry", "csc": "ATDome", "salindex": 0, "topic": "position"}
+                        ]
+                    }
+                }
+            },
+        }
+        dome_view = await View.objects.acreate(
+            name="Dome", data={"content": {"newPanel-0": summary_panel, "newPanel-1": position_panel}}
+        )
+        summary_view = await View.objects.acreate(
+            name="Summary", data={"content": {"newPanel-0": summary_panel}}
+        )
+        client_communicator = WebsocketCommunicator(application, self.url)
+        producer_communicator = WebsocketCommunicator(application, self.url)
+        await client_communicator.connect()
+        await producer_communicator.connect()
+        summary_msg, summary_expected = self.build_messages("event", "ATDome", 0, ["summaryState"])
+        position_msg, _ = self.build_messages("telemetry", "ATDome", 0, ["position"])
+        for view in [dome_view, summary_view]:
+            await client_communicator.send_json_to({"option": "subscribe", "view": view.pk})
+            await client_communicator.receive_json_from()
+        await client_communicator.send_json_to(
+            {
+                "option": "subscribe",
+                "category": "telemetry",
+                "csc": "ATDome",
+                "salindex": 0,
+                "stream": "position",
+            }
+        )
+        await client_communicator.receive_json_from()
+
+        # Act 1 (Unsubscribe from a View sharing its streams)
+        await client_communicator.send_json_to({"option": "unsubscribe", "view": dome_view.pk})
+        response = await client_communicator.receive_json_from()
+        await producer_communicator.send_json_to(summary_msg)
+        summary_response = await client_communicator.receive_json_from()
+        await producer_communicator.send_json_to(position_msg)
+        position_response = await client_communicator.receive_json_from()
+
+        # Assert 1
+        assert response == {
+            "data": f"Successfully unsubscribed to view {dome_view.pk}",
+            "subscriptions": ["event-ATDome-0-summaryState", "telemetry-ATDome-0-position"],
+        }
+        assert summary_response == summary_expected
+        assert position_response["subscription"] == "telemetry-ATDome-0-position"
+
+        # Act 2 (Unsubscribe from the last View with the stream)
+        await client_communicator.send_json_to({"option": "unsubscribe", "view": summary_view.pk})
+        await client_communicator.receive_json_from()
+        await producer_communicator.send_json_to(summary_msg)
+
+        # Assert 2
+        assert await client_communicator.receive_nothing(self.no_reception_timeout)
+
+        await client_communicator.disconnect()
+        await producer_communicator.disconnect()
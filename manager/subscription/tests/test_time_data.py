@@ -24,7 +24,9 @@ import pytest
 from api.models import Token
 from channels.testing import WebsocketCommunicator
 from django.contrib.auth.models import Permission, User
+from django.test import override_settings
 from manager.routing import application
+from subscription.time_data_broadcaster import TimeDataBroadcaster
 
 from manager import utils
 
@@ -58,3 +60,42 @@ class TestTimeData:
         assert utils.assert_time_data(time_data)
         assert request_time == 12312312341123
         await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    @override_settings(TIME_DATA_BROADCAST_INTERVAL=0.1)
+    async def test_subscribe_time_data(self):
+        # Arrange
+        broadcaster = TimeDataBroadcaster()
+        await broadcaster.reset()
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+
+        # Act 1 (Subscribe)
+        msg = {
+            "action": "subscribe_time_data",
+            "request_time": 12312312341123,
+        }
+        await communicator.send_json_to(msg)
+        response = await communicator.receive_json_from()
+
+        # Assert 1
+        assert utils.assert_time_data(response["time_data"])
+        assert response["request_time"] == 12312312341123
+
+        # Assert 2 (Published periodically)
+        first_response = await communicator.receive_json_from(timeout=2)
+        second_response = await communicator.receive_json_from(timeout=2)
+        assert utils.assert_time_data(first_response["time_data"])
+        assert "request_time" not in first_response
+        assert second_response["time_data"]["utc"] > first_response["time_data"]["utc"]
+
+        # Act 3 (Unsubscribe)
+        await communicator.send_json_to({"action": "unsubscribe_time_data"})
+        while not await communicator.receive_nothing(timeout=0.3):
+            await communicator.receive_json_from()
+
+        # Assert 3
+        assert await communicator.receive_nothing(timeout=0.5)
+        await communicator.disconnect()
+        await broadcaster.stop()
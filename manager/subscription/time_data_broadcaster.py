@@ -0,0 +1,129 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+import json
+import uuid
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from manager import utils
+
+TIME_DATA_GROUP = "time-data"
+"""Name of the group the time measures are published to"""
+
+TIME_DATA_LEASE_KEY = "time-data-broadcaster"
+"""Cache key of the lease held by the broadcaster publishing the time measures"""
+
+
+class TimeDataBroadcaster:
+    """Publishes the time measures to the clients subscribed
+    to the `time-data` group.
+
+    The time measures are computed and serialized once per tick,
+    instead of once per client request. When several manager processes
+    share the cache only the one holding the lease publishes them.
+    """
+
+    class __TimeDataBroadcaster:
+        broadcast_task = None
+        """Reference to the task that publishes the time measures."""
+
+        broadcaster_id = str(uuid.uuid4())
+        """Identifier of this broadcaster in the lease."""
+
+        @classmethod
+        def initialize(cls):
+            """Initialize the TimeDataBroadcaster
+
+            Run an async task in the event loop to publish the time measures
+            periodically, if not already running in this event loop.
+            """
+            if not settings.TIME_DATA_BROADCAST_INTERVAL:
+                return
+            if (
+                cls.broadcast_task is None
+                or cls.broadcast_task.done()
+                or cls.broadcast_task.get_loop() is not asyncio.get_running_loop()
+            ):
+                cls.broadcast_task = asyncio.create_task(cls.broadcast())
+
+        @classmethod
+        async def acquire_lease(cls):
+            """Acquire or renew the lease to publish the time measures.
+
+            The lease expires after a few ticks,
+            so another process takes over if this one stops.
+
+            Returns
+            -------
+            `bool`
+                True if this broadcaster holds the lease, False if not
+            """
+            timeout = max(3 * settings.TIME_DATA_BROADCAST_INTERVAL, 1)
+            if await cache.aadd(TIME_DATA_LEASE_KEY, cls.broadcaster_id, timeout):
+                return True
+            if await cache.aget(TIME_DATA_LEASE_KEY) == cls.broadcaster_id:
+                await cache.atouch(TIME_DATA_LEASE_KEY, timeout)
+                return True
+            return False
+
+        @classmethod
+        async def broadcast(cls):
+            """Publish the time measures to the `time-data` group periodically.
+
+            This is what the `broadcast_task` does
+            """
+            channel_layer = get_channel_layer()
+            while True:
+                try:
+                    if await cls.acquire_lease():
+                        data = json.dumps({"time_data": utils.get_times()})
+                        await channel_layer.group_send(
+                            TIME_DATA_GROUP,
+                            {"type": "send_time_data", "data": data},
+                        )
+                    await asyncio.sleep(settings.TIME_DATA_BROADCAST_INTERVAL)
+                except Exception as e:
+                    print(e, flush=True)
+                    await asyncio.sleep(settings.TIME_DATA_BROADCAST_INTERVAL)
+
+        @classmethod
+        async def reset(cls):
+            """Reset the `TimeDataBroadcaster`, changing the task reference
+            back to its default value."""
+            cls.broadcast_task = None
+
+        @classmethod
+        async def stop(cls):
+            """Stop (cancel) the task."""
+            if cls.broadcast_task:
+                cls.broadcast_task.cancel()
+
+    instance = None
+
+    def __init__(self):
+        if not TimeDataBroadcaster.instance:
+            TimeDataBroadcaster.instance = TimeDataBroadcaster.__TimeDataBroadcaster()
+
+    def __getattr__(self, name):
+        return getattr(self.instance, name)
@@ -0,0 +1,237 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Application of JSON Patch documents (RFC 6902) to JSON values,
+used to edit the data of the Views without sending all of it.
+
+The paths of the operations are JSON Pointers (RFC 6901).
+"""
+
+import copy
+import re
+
+ARRAY_INDEX_PATTERN = re.compile(r"^(0|[1-9][0-9]*)$")
+"""Pattern of the array indexes in JSON Pointers"""
+
+
+class JsonPatchError(ValueError):
+    """Raised when a JSON Patch is not valid or can not be applied."""
+
+
+class JsonPatchConflict(JsonPatchError):
+    """Raised when a `test` operation of a JSON Patch fails."""
+
+
+def parse_pointer(pointer):
+    """Return the reference tokens of a JSON Pointer.
+
+    Parameters
+    ----------
+    pointer : `str`
+        The JSON Pointer, e.g. "/content/0/config"
+
+    Returns
+    -------
+    `list`
+        The unescaped reference tokens, e.g. ["content", "0", "config"]
+
+    Raises
+    ------
+    JsonPatchError
+        If the pointer is not valid
+    """
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Invalid JSON Pointer: {pointer}")
+    if pointer == "":
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _get_array_index(array, token, pointer, allow_end=False):
+    """Return the index of an array referenced by a token.
+
+    Parameters
+    ----------
+    array : `list`
+        The array
+    token : `str`
+        The reference token
+    pointer : `str`
+        The JSON Pointer, used in the error messages
+    allow_end : `bool`
+        Whether the index after the last element can be referenced,
+        with the index itself or with "-"
+
+    Returns
+    -------
+    `int`
+        The index
+
+    Raises
+    ------
+    JsonPatchError
+        If the token is not a valid index of the array
+    """
+    if allow_end and token == "-":
+        return len(array)
+    if not ARRAY_INDEX_PATTERN.match(token):
+        raise JsonPatchError(f"Invalid array index in {pointer}")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not allow_end):
+        raise JsonPatchError(f"Array index out of range in {pointer}")
+    return index
+
+
+def _resolve(document, tokens, pointer):
+    """Return the value referenced by reference tokens.
+
+    Raises
+    ------
+    JsonPatchError
+        If the value does not exist
+    """
+    value = document
+    for token in tokens:
+        if isinstance(value, dict):
+            if token not in value:
+                raise JsonPatchError(f"Path not found: {pointer}")
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[_get_array_index(value, token, pointer)]
+        else:
+            raise JsonPatchError(f"Path not found: {pointer}")
+    return value
+
+
+def _get(document, pointer):
+    """Return the value referenced by a JSON Pointer."""
+    return _resolve(document, parse_pointer(pointer), pointer)
+
+
+def _add(document, pointer, value):
+    """Add a value at a JSON Pointer and return the document."""
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1], pointer)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_get_array_index(parent, tokens[-1], pointer, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Path not found: {pointer}")
+    return document
+
+
+def _remove(document, pointer):
+    """Remove the value at a JSON Pointer and return the document and the value."""
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        raise JsonPatchError("The whole document can not be removed")
+    parent = _resolve(document, tokens[:-1], pointer)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return document, parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return document, parent.pop(_get_array_index(parent, tokens[-1], pointer))
+    raise JsonPatchError(f"Path not found: {pointer}")
+
+
+def _json_equal(a, b):
+    """Return whether two JSON values are equal, as defined for the `test` operation.
+
+    Unlike in Python, booleans are not equal to numbers.
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (dict, list)) or isinstance(b, (dict, list)):
+        return False
+    return a == b
+
+
+def _get_member(operation, member):
+    """Return a member of an operation, which must be present."""
+    if member not in operation:
+        raise JsonPatchError(f"Missing '{member}' in {operation['op']} operation")
+    return operation[member]
+
+
+def apply_patch(document, patch):
+    """Apply a JSON Patch to a JSON value.
+
+    The operations are applied in order to a copy of the value,
+    so it is not modified if any of them fails.
+
+    Parameters
+    ----------
+    document : `dict`, `list`, `str`, `int`, `float`, `bool` or `None`
+        The JSON value to patch
+    patch : `list`
+        The operations, e.g. [{"op": "replace", "path": "/name", "value": "Dome"}]
+
+    Returns
+    -------
+    `dict`, `list`, `str`, `int`, `float`, `bool` or `None`
+        The patched value
+
+    Raises
+    ------
+    JsonPatchConflict
+        If a `test` operation fails
+    JsonPatchError
+        If the patch is not valid or can not be applied
+    """
+    if not isinstance(patch, list):
+        raise JsonPatchError("The JSON Patch must be an array of operations")
+
+    document = copy.deepcopy(document)
+    for operation in patch:
+        if not isinstance(operation, dict) or "op" not in operation:
+            raise JsonPatchError(f"Invalid operation: {operation}")
+        op = operation["op"]
+        path = _get_member(operation, "path")
+        if op == "add":
+            document = _add(document, path, copy.deepcopy(_get_member(operation, "value")))
+        elif op == "remove":
+            document, _ = _remove(document, path)
+        elif op == "replace":
+            value = copy.deepcopy(_get_member(operation, "value"))
+            _get(document, path)
+            document = value if path == "" else _add(_remove(document, path)[0], path, value)
+        elif op == "move":
+            from_path = _get_member(operation, "from")
+            if path != from_path and path.startswith(f"{from_path}/"):
+                raise JsonPatchError(f"A value can not be moved into one of its children: {from_path}")
+            document, value = _remove(document, from_path)
+            document = _add(document, path, value)
+        elif op == "copy":
+            value = copy.deepcopy(_get(document, _get_member(operation, "from")))
+            document = _add(document, path, value)
+        elif op == "test":
+            if not _json_equal(_get(document, path), _get_member(operation, "value")):
+                raise JsonPatchConflict(f"Test failed: {path}")
+        else:
+            raise JsonPatchError(f"Invalid operation: {op}")
+    return document
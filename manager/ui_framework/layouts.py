@@ -0,0 +1,631 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Streamed export and import of the layouts: the Workspaces, the Views,
+with their thumbnails, and the WorkspaceViews, to move them between
+the summit, the base and the test stands.
+
+The layouts are exported as newline-delimited JSON (NDJSON), one record
+per line: first the Views, then the Workspaces and then the WorkspaceViews,
+e.g.
+
+    {"model": "ui_framework.view", "name": "Dome", "screen": "desktop", "data": {...},
+     "thumbnail": {"sha256": "<hash>", "extension": ".png", "content": "<base64>"}, "checksum": "<hash>"}
+    {"model": "ui_framework.workspace", "name": "Summit", "checksum": "<hash>"}
+    {"model": "ui_framework.workspaceview", "workspace": "Summit", "view": "Dome",
+     "view_name": "", "sort_value": 0, "checksum": "<hash>"}
+
+The ids of the rows differ between databases, so they are identified by
+their natural keys: the names of the Views and Workspaces, and the names
+of both for the WorkspaceViews. The names are not unique in the database,
+so the layouts are not exported, nor imported, while several Views
+or Workspaces have the same name. The records are imported in batches, with
+a query to find the existing rows of each batch and bulk queries to insert
+the new rows and update the changed ones. The rows with the checksum of
+their record are skipped, without decoding or storing their thumbnails.
+Neither the export nor the import hold more than a batch of rows in memory,
+though the import keeps the natural keys of all the records to reject
+the duplicated ones.
+"""
+
+import base64
+import binascii
+import functools
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from ui_framework.models import View, Workspace, WorkspaceView
+from ui_framework.tasks import schedule_thumbnail_variants
+from ui_framework.thumbnails import release_thumbnail
+from ui_framework.view_search import update_view_search_indexes
+from ui_framework.view_subscriptions import get_view_subscriptions
+from ui_framework.workspace_cache import invalidate_workspaces
+
+LAYOUTS_BATCH_SIZE = 100
+"""Number of rows exported or imported at once"""
+
+VIEW_MODEL = "ui_framework.view"
+WORKSPACE_MODEL = "ui_framework.workspace"
+WORKSPACE_VIEW_MODEL = "ui_framework.workspaceview"
+
+CONTENT_ADDRESSED_THUMBNAIL_PATTERN = re.compile(r"^thumbnails/([0-9a-f]{64})(\.[a-z0-9]+)$")
+"""Pattern of the names of the thumbnails named after their hash"""
+
+THUMBNAIL_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+"""Pattern of the hashes of the thumbnails in the records"""
+
+THUMBNAIL_EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]+$")
+"""Pattern of the file extensions of the thumbnails in the records"""
+
+
+class LayoutsExportError(ValueError):
+    """Raised when the layouts can not be exported."""
+
+
+class LayoutsImportError(ValueError):
+    """Raised when a record of the layouts can not be imported."""
+
+
+def get_record_checksum(record):
+    """Return the checksum of a record.
+
+    The content of the thumbnail of a View is not included,
+    it is represented by its hash.
+
+    Parameters
+    ----------
+    record : `dict`
+        The record
+
+    Returns
+    -------
+    `str`
+        The hexadecimal SHA-256 hash of the record
+    """
+    fields = {key: value for key, value in record.items() if key != "checksum"}
+    if fields.get("thumbnail"):
+        fields["thumbnail"] = {key: value for key, value in fields["thumbnail"].items() if key != "content"}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _get_thumbnail_record(name, content=True):
+    """Return the record of a thumbnail.
+
+    Parameters
+    ----------
+    name : `str`
+        The name of the thumbnail in the storage, or its URL
+        if it is stored in a remote storage
+    content : `bool`
+        Whether to include the content of the thumbnail, encoded in base64
+
+    Returns
+    -------
+    `dict` or None
+        The record, or None if there is no thumbnail or its file is missing
+    """
+    if not name:
+        return None
+    if name.startswith("http"):
+        return {"url": name}
+    match = CONTENT_ADDRESSED_THUMBNAIL_PATTERN.match(name)
+    if match and not content:
+        return {"sha256": match[1], "extension": match[2]}
+    try:
+        with default_storage.open(name) as f:
+            image = f.read()
+    except OSError:
+        return None
+    record = {"sha256": hashlib.sha256(image).hexdigest(), "extension": os.path.splitext(name)[1].lower()}
+    if content:
+        record["content"] = base64.b64encode(image).decode()
+    return record
+
+
+def _get_view_record(view, content=True):
+    """Return the record of a View, without its checksum."""
+    return {
+        "model": VIEW_MODEL,
+        "name": view.name,
+        "screen": view.screen,
+        "data": view.data,
+        "thumbnail": _get_thumbnail_record(view.thumbnail.name if view.thumbnail else None, content),
+    }
+
+
+def _get_workspace_view_record(workspace, view, view_name, sort_value):
+    """Return the record of a WorkspaceView, without its checksum."""
+    return {
+        "model": WORKSPACE_VIEW_MODEL,
+        "workspace": workspace,
+        "view": view,
+        "view_name": view_name,
+        "sort_value": sort_value,
+    }
+
+
+def _dump_record(record):
+    """Return the NDJSON line of a record, with its checksum."""
+    record["checksum"] = get_record_checksum(record)
+    return json.dumps(record) + "\n"
+
+
+def check_layouts_export():
+    """Check that the layouts can be exported and imported again,
+    i.e. that the Views and the Workspaces have unique names.
+
+    Raises
+    ------
+    LayoutsExportError
+        If several Views or Workspaces have the same name
+    """
+    for model in (View, Workspace):
+        duplicated_names = (
+            model.objects.values("name")
+            .annotate(count=Count("pk"))
+            .filter(count__gt=1)
+            .order_by("name")
+            .values_list("name", flat=True)
+        )
+        if duplicated_names:
+            raise LayoutsExportError(
+                f"Several {model._meta.verbose_name_plural} have the same name, rename them to export"
+                f" the layouts: {', '.join(duplicated_names)}"
+            )
+
+
+def export_layouts():
+    """Export the layouts as NDJSON.
+
+    Returns
+    -------
+    `generator`
+        The lines of the export, one record each
+
+    Raises
+    ------
+    LayoutsExportError
+        If the layouts can not be exported, see `check_layouts_export`
+    """
+    check_layouts_export()
+    return _generate_layouts()
+
+
+def _generate_layouts():
+    """Yield the lines of the export of the layouts, one record each."""
+    views = View.objects.only("name", "screen", "data", "thumbnail").order_by("pk")
+    for view in views.iterator(chunk_size=LAYOUTS_BATCH_SIZE):
+        yield _dump_record(_get_view_record(view))
+
+    workspaces = Workspace.objects.order_by("pk").values_list("name", flat=True)
+    for name in workspaces.iterator(chunk_size=LAYOUTS_BATCH_SIZE):
+        yield _dump_record({"model": WORKSPACE_MODEL, "name": name})
+
+    workspace_views = WorkspaceView.objects.order_by("workspace_id", "sort_value", "pk").values_list(
+        "workspace__name", "view__name", "view_name", "sort_value"
+    )
+    for workspace_view in workspace_views.iterator(chunk_size=LAYOUTS_BATCH_SIZE):
+        yield _dump_record(_get_workspace_view_record(*workspace_view))
+
+
+async def aexport_layouts():
+    """Export the layouts as NDJSON, in batches of lines read in a thread.
+
+    The streaming responses served under ASGI consume the synchronous
+    iterators entirely before sending them, this one is sent as it is read.
+    The layouts are not checked, call `check_layouts_export` first.
+
+    Yields
+    ------
+    `str`
+        The lines of the export, a batch at a time
+    """
+    lines = _generate_layouts()
+    get_lines = sync_to_async(lambda: "".join(itertools.islice(lines, LAYOUTS_BATCH_SIZE)))
+    while batch := await get_lines():
+        yield batch
+
+
+def _get_string(line_number, record, field, max_length, default=None):
+    """Return a string field of a record.
+
+    Raises
+    ------
+    LayoutsImportError
+        If the field is missing or is not a string of at most `max_length` characters
+    """
+    value = record.get(field, default)
+    if not isinstance(value, str) or len(value) > max_length:
+        raise LayoutsImportError(
+            f"Line {line_number}: '{field}' must be a string of at most {max_length} characters"
+        )
+    return value
+
+
+def _parse_thumbnail(line_number, thumbnail):
+    """Return the validated record of the thumbnail of a View.
+
+    Raises
+    ------
+    LayoutsImportError
+        If the record is not valid
+    """
+    if thumbnail is None:
+        return None
+    if isinstance(thumbnail, dict) and str(thumbnail.get("url")).startswith("http"):
+        return {"url": thumbnail["url"]}
+    if (
+        not isinstance(thumbnail, dict)
+        or not THUMBNAIL_HASH_PATTERN.match(str(thumbnail.get("sha256")))
+        or not THUMBNAIL_EXTENSION_PATTERN.match(str(thumbnail.get("extension")))
+        or not isinstance(thumbnail.get("content", ""), str)
+    ):
+        raise LayoutsImportError(f"Line {line_number}: invalid thumbnail")
+    return {key: thumbnail[key] for key in ("sha256", "extension", "content") if key in thumbnail}
+
+
+def _parse_record(line_number, line):
+    """Return the validated record of a line and its natural key.
+
+    Parameters
+    ----------
+    line_number : `int`
+        The number of the line, used in the error messages
+    line : `str`
+        The line
+
+    Returns
+    -------
+    `tuple`
+        The record, with its optional fields filled, and its natural key
+
+    Raises
+    ------
+    LayoutsImportError
+        If the record is not valid
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise LayoutsImportError(f"Line {line_number}: invalid JSON: {e}")
+    model = record.get("model") if isinstance(record, dict) else None
+
+    if model == VIEW_MODEL:
+        screen = record.get("screen", View.ScreenSizes.DESKTOP)
+        if screen is not None and screen not in View.ScreenSizes.values:
+            raise LayoutsImportError(f"Line {line_number}: invalid screen: {screen}")
+        record = {
+            "model": model,
+            "name": _get_string(line_number, record, "name", 20),
+            "screen": screen,
+            "data": record.get("data"),
+            "thumbnail": _parse_thumbnail(line_number, record.get("thumbnail")),
+        }
+        return record, (model, record["name"])
+    if model == WORKSPACE_MODEL:
+        record = {"model": model, "name": _get_string(line_number, record, "name", 20)}
+        return record, (model, record["name"])
+    if model == WORKSPACE_VIEW_MODEL:
+        sort_value = record.get("sort_value", 0)
+        if not isinstance(sort_value, int) or isinstance(sort_value, bool) or sort_value < 0:
+            raise LayoutsImportError(f"Line {line_number}: 'sort_value' must be a positive integer")
+        record = _get_workspace_view_record(
+            _get_string(line_number, record, "workspace", 20),
+            _get_string(line_number, record, "view", 20),
+            _get_string(line_number, record, "view_name", 20, default=""),
+            sort_value,
+        )
+        return record, (model, record["workspace"], record["view"])
+    raise LayoutsImportError(f"Line {line_number}: unknown model: {model}")
+
+
+def _store_thumbnail(line_number, thumbnail, stored_thumbnails):
+    """Store the thumbnail of a View record, unless it is already stored.
+
+    Parameters
+    ----------
+    line_number : `int`
+        The number of the line of the record, used in the error messages
+    thumbnail : `dict` or None
+        The record of the thumbnail
+    stored_thumbnails : `list`
+        The names of the thumbnails stored by the import, updated in place
+
+    Returns
+    -------
+    `str` or None
+        The name of the thumbnail in the storage, or its URL
+
+    Raises
+    ------
+    LayoutsImportError
+        If the thumbnail is not stored and its content is missing or not valid
+    """
+    if thumbnail is None:
+        return None
+    if "url" in thumbnail:
+        return thumbnail["url"]
+    name = f"thumbnails/{thumbnail['sha256']}{thumbnail['extension']}"
+    if default_storage.exists(name):
+        return name
+    if "content" not in thumbnail:
+        raise LayoutsImportError(f"Line {line_number}: missing content of thumbnail {name}")
+    try:
+        image = base64.b64decode(thumbnail["content"], validate=True)
+    except binascii.Error:
+        raise LayoutsImportError(f"Line {line_number}: invalid base64 content of thumbnail {name}")
+    if hashlib.sha256(image).hexdigest() != thumbnail["sha256"]:
+        raise LayoutsImportError(
+            f"Line {line_number}: the content of thumbnail {name} does not match its hash"
+        )
+    try:
+        Image.open(io.BytesIO(image)).verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise LayoutsImportError(f"Line {line_number}: thumbnail {name} is not a valid image")
+    name = default_storage.save(name, ContentFile(image))
+    stored_thumbnails.append(name)
+    return name
+
+
+def _get_rows_by_name(queryset, batch, field):
+    """Return the rows of a queryset with the names of a field of a batch of records,
+    indexed by name.
+
+    Raises
+    ------
+    LayoutsImportError
+        If several rows have one of the names
+    """
+    line_numbers = {}
+    for line_number, record in batch:
+        line_numbers.setdefault(record[field], line_number)
+    rows = {}
+    for row in queryset.filter(name__in=line_numbers):
+        if row.name in rows:
+            raise LayoutsImportError(
+                f"Line {line_numbers[row.name]}: several {queryset.model._meta.verbose_name_plural}"
+                f" have the same name: {row.name}"
+            )
+        rows[row.name] = row
+    return rows
+
+
+def _import_views(batch, counts, stored_thumbnails):
+    """Import a batch of View records.
+
+    Parameters
+    ----------
+    batch : `list`
+        The (line number, record) of the records
+    counts : `dict`
+        The number of created, updated and unchanged rows, updated in place
+    stored_thumbnails : `list`
+        The names of the thumbnails stored by the import, updated in place
+    """
+    existing_views = _get_rows_by_name(View.objects.all(), batch, "name")
+
+    now = timezone.now()
+    created_views = []
+    updated_views = []
+    for line_number, record in batch:
+        view = existing_views.get(record["name"])
+        if view is not None and get_record_checksum(_get_view_record(view, content=False)) == (
+            get_record_checksum(record)
+        ):
+            counts["unchanged"] += 1
+            continue
+
+        thumbnail = _store_thumbnail(line_number, record["thumbnail"], stored_thumbnails)
+        if view is None:
+            view = View(name=record["name"])
+            created_views.append(view)
+        else:
+            if view.thumbnail and view.thumbnail.name != thumbnail:
+                release_thumbnail(view.thumbnail.name, view.thumbnail_variants)
+            # bulk_update does not update the auto_now fields
+            view.update_timestamp = now
+            updated_views.append(view)
+        view.data = record["data"]
+        view.screen = record["screen"]
+        view.thumbnail = thumbnail
+        if view.thumbnail_variants.get("source") != thumbnail:
+            view.thumbnail_variants = {}
+        view.subscriptions = get_view_subscriptions(view.data)
+
+    # The bulk queries do not send the signals of the Views
+    View.objects.bulk_create(created_views)
+    View.objects.bulk_update(
+        updated_views,
+        ["data", "screen", "thumbnail", "thumbnail_variants", "subscriptions", "update_timestamp"],
+    )
+    update_view_search_indexes(created_views + updated_views)
+    for view in created_views + updated_views:
+        schedule_thumbnail_variants(view)
+    counts["created"] += len(created_views)
+    counts["updated"] += len(updated_views)
+
+
+def _import_workspaces(batch, counts):
+    """Import a batch of Workspace records.
+
+    Parameters
+    ----------
+    batch : `list`
+        The (line number, record) of the records
+    counts : `dict`
+        The number of created, updated and unchanged rows, updated in place
+    """
+    names = [record["name"] for _, record in batch]
+    existing_names = set(Workspace.objects.filter(name__in=names).values_list("name", flat=True))
+    Workspace.objects.bulk_create([Workspace(name=name) for name in names if name not in existing_names])
+    counts["created"] += len(names) - len(existing_names)
+    counts["unchanged"] += len(existing_names)
+
+
+def _import_workspace_views(batch, counts):
+    """Import a batch of WorkspaceView records.
+
+    Parameters
+    ----------
+    batch : `list`
+        The (line number, record) of the records
+    counts : `dict`
+        The number of created, updated and unchanged rows, updated in place
+
+    Raises
+    ------
+    LayoutsImportError
+        If the Workspace or the View of a record does not exist,
+        or several Workspaces or Views have its name
+    """
+    workspaces = _get_rows_by_name(Workspace.objects.only("name"), batch, "workspace")
+    views = _get_rows_by_name(View.objects.only("name"), batch, "view")
+    workspace_ids = {name: workspace.pk for name, workspace in workspaces.items()}
+    view_ids = {name: view.pk for name, view in views.items()}
+    for line_number, record in batch:
+        if record["workspace"] not in workspace_ids:
+            raise LayoutsImportError(f"Line {line_number}: workspace not found: {record['workspace']}")
+        if record["view"] not in view_ids:
+            raise LayoutsImportError(f"Line {line_number}: view not found: {record['view']}")
+    existing_workspace_views = {
+        (wv.workspace_id, wv.view_id): wv
+        for wv in WorkspaceView.objects.filter(
+            workspace_id__in=workspace_ids.values(), view_id__in=view_ids.values()
+        )
+    }
+
+    now = timezone.now()
+    created_workspace_views = []
+    updated_workspace_views = []
+    for _, record in batch:
+        workspace_id = workspace_ids[record["workspace"]]
+        view_id = view_ids[record["view"]]
+        wv = existing_workspace_views.get((workspace_id, view_id))
+        if wv is None:
+            created_workspace_views.append(
+                WorkspaceView(
+                    workspace_id=workspace_id,
+                    view_id=view_id,
+                    view_name=record["view_name"],
+                    sort_value=record["sort_value"],
+                )
+            )
+            continue
+        existing_record = _get_workspace_view_record(
+            record["workspace"], record["view"], wv.view_name, wv.sort_value
+        )
+        if get_record_checksum(existing_record) == get_record_checksum(record):
+            counts["unchanged"] += 1
+            continue
+        wv.view_name = record["view_name"]
+        wv.sort_value = record["sort_value"]
+        wv.update_timestamp = now
+        updated_workspace_views.append(wv)
+
+    WorkspaceView.objects.bulk_create(created_workspace_views)
+    WorkspaceView.objects.bulk_update(
+        updated_workspace_views, ["view_name", "sort_value", "update_timestamp"]
+    )
+    counts["created"] += len(created_workspace_views)
+    counts["updated"] += len(updated_workspace_views)
+
+
+LAYOUTS_IMPORTERS = {
+    VIEW_MODEL: _import_views,
+    WORKSPACE_MODEL: _import_workspaces,
+    WORKSPACE_VIEW_MODEL: _import_workspace_views,
+}
+"""Function importing a batch of records of each model"""
+
+
+def import_layouts(lines):
+    """Import the layouts from the lines of an NDJSON export.
+
+    The existing rows are updated and the missing ones are created,
+    the rows not in the export are kept. The records are imported
+    in a single transaction, so nothing is imported if any of them fails.
+    In that case the thumbnails stored by the import are deleted again,
+    unless a View references them meanwhile.
+
+    Parameters
+    ----------
+    lines : `iterable`
+        The lines of the export, as `str` or `bytes`, e.g. a file
+
+    Returns
+    -------
+    `dict`
+        The number of created, updated and unchanged rows of each model,
+        e.g. {"ui_framework.view": {"created": 2, "updated": 1, "unchanged": 40}, ...}
+
+    Raises
+    ------
+    LayoutsImportError
+        If a record is not valid or can not be imported
+    """
+    summary = {model: {"created": 0, "updated": 0, "unchanged": 0} for model in LAYOUTS_IMPORTERS}
+    stored_thumbnails = []
+    importers = {
+        **LAYOUTS_IMPORTERS,
+        VIEW_MODEL: functools.partial(_import_views, stored_thumbnails=stored_thumbnails),
+    }
+    keys = set()
+    batch_model = None
+    batch = []
+    try:
+        with transaction.atomic():
+            for line_number, line in enumerate(lines, start=1):
+                if isinstance(line, bytes):
+                    line = line.decode()
+                if not line.strip():
+                    continue
+                record, key = _parse_record(line_number, line)
+                if key in keys:
+                    raise LayoutsImportError(f"Line {line_number}: duplicated record: {', '.join(key[1:])}")
+                keys.add(key)
+                if batch and (record["model"] != batch_model or len(batch) >= LAYOUTS_BATCH_SIZE):
+                    importers[batch_model](batch, summary[batch_model])
+                    batch = []
+                batch_model = record["model"]
+                batch.append((line_number, record))
+            if batch:
+                importers[batch_model](batch, summary[batch_model])
+    except Exception:
+        # The storage is not rolled back with the transaction
+        for name in stored_thumbnails:
+            release_thumbnail(name, {})
+        raise
+
+    if any(counts["created"] or counts["updated"] for counts in summary.values()):
+        # The bulk queries do not send the signals invalidating the cached Workspaces
+        invalidate_workspaces()
+    return summary
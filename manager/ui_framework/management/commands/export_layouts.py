@@ -0,0 +1,71 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Management utility to export the layouts as NDJSON."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ui_framework.layouts import LayoutsExportError, export_layouts
+
+
+class Command(BaseCommand):
+    """Django command to export the Workspaces, Views and WorkspaceViews
+    as NDJSON, to import them in another LOVE-manager with
+    the `import_layouts` command, see `ui_framework.layouts`.
+    """
+
+    help = "Export the Workspaces, Views and WorkspaceViews as NDJSON."
+
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        """Add arguments for the command.
+
+        Params
+        ------
+        parser: object
+            parser for the arguments
+        """
+        parser.add_argument(
+            "--output",
+            help="File to write the export to, by default it is written to the standard output.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command, which writes the export line by line.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with additional
+            keyword arguments (indexed by keys in the dict)
+        """
+        try:
+            lines = export_layouts()
+        except LayoutsExportError as e:
+            raise CommandError(e)
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w") as f:
+            f.writelines(lines)
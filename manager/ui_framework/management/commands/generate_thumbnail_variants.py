@@ -0,0 +1,52 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Management utility to generate the thumbnail variants of the existing Views."""
+
+from django.core.management.base import BaseCommand
+
+from ui_framework.models import View
+from ui_framework.tasks import schedule_thumbnail_variants
+
+
+class Command(BaseCommand):
+    """Django command to queue the generation of the thumbnail variants
+    of the Views without them, e.g. the Views created before the variants
+    were introduced. The variants are generated by the `process_tasks` command.
+    """
+
+    help = "Queue the generation of the missing thumbnail variants of the Views."
+
+    requires_migrations_checks = True
+
+    def handle(self, *args, **options):
+        """Execute the command, which queues the generation
+        of the missing thumbnail variants.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with additional
+            keyword arguments (indexed by keys in the dict)
+        """
+        for view in View.objects.exclude(thumbnail="").exclude(thumbnail=None).defer("data").iterator():
+            schedule_thumbnail_variants(view)
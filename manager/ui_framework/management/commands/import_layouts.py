@@ -0,0 +1,75 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Management utility to import the layouts from an NDJSON export."""
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ui_framework.layouts import LayoutsImportError, import_layouts
+
+
+class Command(BaseCommand):
+    """Django command to import the Workspaces, Views and WorkspaceViews
+    from an NDJSON export of the `export_layouts` command, see `ui_framework.layouts`.
+
+    The rows are identified by their names, the existing rows are updated,
+    unless they did not change, and the missing ones are created.
+    """
+
+    help = "Import the Workspaces, Views and WorkspaceViews from an NDJSON export."
+
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        """Add arguments for the command.
+
+        Params
+        ------
+        parser: object
+            parser for the arguments
+        """
+        parser.add_argument(
+            "input",
+            help="File to read the export from, or '-' to read it from the standard input.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command, which imports the export line by line.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with additional
+            keyword arguments (indexed by keys in the dict)
+        """
+        try:
+            if options["input"] == "-":
+                summary = import_layouts(sys.stdin)
+            else:
+                with open(options["input"]) as f:
+                    summary = import_layouts(f)
+        except (LayoutsImportError, OSError) as e:
+            raise CommandError(e)
+        self.stdout.write(json.dumps(summary))
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    """Create the trigram index of the search documents with PostgreSQL,
+    other databases are searched in the process."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS ui_framework_viewsearchindex_document_trgm "
+        "ON ui_framework_viewsearchindex USING gin (document gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    """Drop the trigram index of the search documents."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS ui_framework_viewsearchindex_document_trgm")
+
+
+def index_views(apps, schema_editor):
+    """Extract the search terms of the existing Views."""
+    from ui_framework.view_search import get_view_search_terms
+
+    View = apps.get_model("ui_framework", "View")
+    ViewSearchIndex = apps.get_model("ui_framework", "ViewSearchIndex")
+    indexes = []
+    for view in View.objects.iterator():
+        components, cscs = get_view_search_terms(view.data)
+        indexes.append(
+            ViewSearchIndex(
+                view=view,
+                name=view.name,
+                components=components,
+                cscs=cscs,
+                document=" ".join([view.name, *components, *cscs]),
+            )
+        )
+    ViewSearchIndex.objects.bulk_create(indexes)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ui_framework", "0005_auto_20230508_1512"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ViewSearchIndex",
+            fields=[
+                (
+                    "view",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="ui_framework.view",
+                    ),
+                ),
+                ("name", models.CharField(max_length=20)),
+                ("components", models.JSONField(default=list)),
+                ("cscs", models.JSONField(default=list)),
+                ("document", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(index_views, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ui_framework", "0006_view_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="view",
+            name="thumbnail_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
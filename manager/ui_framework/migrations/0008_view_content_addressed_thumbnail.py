@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:56
+
+from django.db import migrations
+
+import ui_framework.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ui_framework", "0007_view_thumbnail_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="view",
+            name="thumbnail",
+            field=ui_framework.models.ContentAddressedImageField(
+                blank=True, db_index=True, max_length=200, null=True, upload_to="thumbnails/"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+def extract_subscriptions(apps, schema_editor):
+    """Extract the subscriptions of the existing Views."""
+    from ui_framework.view_subscriptions import get_view_subscriptions
+
+    View = apps.get_model("ui_framework", "View")
+    views = list(View.objects.only("id", "data"))
+    for view in views:
+        view.subscriptions = get_view_subscriptions(view.data)
+    View.objects.bulk_update(views, ["subscriptions"], batch_size=100)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ui_framework", "0008_view_content_addressed_thumbnail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="view",
+            name="subscriptions",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(extract_subscriptions, migrations.RunPython.noop),
+    ]
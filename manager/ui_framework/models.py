@@ -29,8 +29,10 @@ import os
 
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage
-from django.db import models
+from django.db import models, transaction
 from django.db.models import JSONField
+from django.db.models.fields.files import ImageFieldFile
+from django.utils import timezone
 
 
 class BaseModel(models.Model):
@@ -90,6 +92,51 @@ class OverwriteStorage(FileSystemStorage):
         return name
 
 
+class ContentAddressedImageFieldFile(ImageFieldFile):
+    """Image of a `ContentAddressedImageField`."""
+
+    shared_content = None
+    """The content of the image, if it was already stored when saved,
+    see `ui_framework.thumbnails.keep_thumbnail`"""
+
+    def save(self, name, content, save=True):
+        """Save the image, unless it is already stored.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the image, derived from its content
+        content : `django.core.files.File`
+            The image
+        save : `bool`
+            Whether to save the model instance
+        """
+        stored_name = self.field.generate_filename(self.instance, name)
+        if not self.storage.exists(stored_name):
+            super().save(name, content, save)
+            return
+
+        # The stored image has the same content, it is shared
+        content.seek(0)
+        self.shared_content = content.read()
+        self.name = stored_name
+        # This file, with its content, is kept as the image of the instance
+        setattr(self.instance, self.field.attname, self)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+
+class ContentAddressedImageField(models.ImageField):
+    """ImageField for images named after their content, e.g. after their hash.
+
+    Images already stored are not written again but shared by the objects,
+    see `ui_framework.thumbnails.release_thumbnail` for their deletion.
+    """
+
+    attr_class = ContentAddressedImageFieldFile
+
+
 class View(BaseModel):
     """View Model."""
 
@@ -105,8 +152,19 @@ class View(BaseModel):
     """The data that constitutes the View, stored as a JSON"""
 
     """ default="thumbnails/default.png", """
-    thumbnail = models.ImageField(max_length=200, upload_to="thumbnails/", null=True, blank=True)
-    """A reference to the image thumbnail of the view"""
+    thumbnail = ContentAddressedImageField(
+        max_length=200, upload_to="thumbnails/", null=True, blank=True, db_index=True
+    )
+    """A reference to the image thumbnail of the view,
+    named after the hash of the image and shared by the views with the same one"""
+
+    subscriptions = JSONField(default=list, blank=True, editable=False)
+    """The [category, csc, salindex, stream] subscriptions of the components of the View,
+    extracted from its data when it is saved, see `ui_framework.view_subscriptions`"""
+
+    thumbnail_variants = JSONField(default=dict, blank=True, editable=False)
+    """The smaller variants of the thumbnail, generated in the background,
+    see `ui_framework.thumbnails`"""
 
     screen = models.CharField(
         max_length=20,
@@ -121,6 +179,30 @@ class View(BaseModel):
         return self.name
 
 
+class ViewSearchIndex(models.Model):
+    """Search terms of a View, extracted from its name and data
+    and updated every time the View is saved."""
+
+    view = models.OneToOneField(View, on_delete=models.CASCADE, primary_key=True, related_name="search_index")
+    """The corresponding View"""
+
+    name = models.CharField(max_length=20)
+    """The name of the View"""
+
+    components = JSONField(default=list)
+    """The types of the components of the View. e.g ['CSCSummary', 'Dome']"""
+
+    cscs = JSONField(default=list)
+    """The names of the CSCs used by the components of the View. e.g ['ATDome', 'ScriptQueue']"""
+
+    document = models.TextField(blank=True)
+    """The name, component types and CSC names, separated by spaces"""
+
+    def __str__(self):
+        """Redefine how objects of this class are transformed to string."""
+        return self.name
+
+
 class Workspace(BaseModel):
     """Workspace Model."""
 
@@ -142,7 +224,77 @@ class Workspace(BaseModel):
         list:
             List of View objects associated to this Workspace
         """
-        return [wv.view for wv in self.workspace_views.all()]
+        return [wv.view for wv in self.workspace_views.select_related("view")]
+
+    def update_views(self, order=None, add=None, remove=None):
+        """Add, remove and reorder the views of this Workspace at once.
+
+        The changes are applied in a single transaction, with one query
+        for each kind of change, while the Workspace is locked.
+
+        Parameters
+        ----------
+        order : `list`, optional
+            The ids of all the views of the Workspace after the changes,
+            in their new order. By default the order is kept
+            and the added views are appended
+        add : `list`, optional
+            The (view id, view name) of the views to add
+        remove : `list`, optional
+            The ids of the views to remove
+
+        Raises
+        ------
+        ValueError
+            If a view to add does not exist or is already in the Workspace,
+            a view to remove is not in the Workspace, or `order` does not
+            contain exactly the resulting views
+        """
+        add = add or []
+        remove = set(remove or [])
+        with transaction.atomic():
+            Workspace.objects.select_for_update().filter(pk=self.pk).first()
+            workspace_views = {wv.view_id: wv for wv in WorkspaceView.objects.filter(workspace=self)}
+
+            if not remove.issubset(workspace_views):
+                raise ValueError(f"Views not in the workspace: {sorted(remove - set(workspace_views))}")
+            view_ids = [wv.view_id for wv in sorted(workspace_views.values(), key=lambda wv: wv.sort_value)]
+            view_ids = [view_id for view_id in view_ids if view_id not in remove]
+            added_ids = [view_id for view_id, _ in add]
+            if len(set(added_ids)) != len(added_ids) or set(added_ids) & set(view_ids):
+                raise ValueError("Views added twice or already in the workspace")
+            existing_ids = View.objects.filter(pk__in=added_ids).values_list("pk", flat=True)
+            missing_ids = set(added_ids) - set(existing_ids)
+            if missing_ids:
+                raise ValueError(f"Views not found: {sorted(missing_ids)}")
+            view_ids += added_ids
+            if order is not None:
+                if len(order) != len(view_ids) or set(order) != set(view_ids):
+                    raise ValueError("The order must contain every view of the workspace once")
+                view_ids = list(order)
+
+            WorkspaceView.objects.filter(workspace=self, view_id__in=remove).delete()
+            sort_values = {view_id: sort_value for sort_value, view_id in enumerate(view_ids)}
+            WorkspaceView.objects.bulk_create(
+                [
+                    WorkspaceView(
+                        workspace=self,
+                        view_id=view_id,
+                        view_name=view_name,
+                        sort_value=sort_values[view_id],
+                    )
+                    for view_id, view_name in add
+                ]
+            )
+            now = timezone.now()
+            reordered_views = []
+            for view_id, wv in workspace_views.items():
+                if view_id not in remove and wv.sort_value != sort_values[view_id]:
+                    wv.sort_value = sort_values[view_id]
+                    # bulk_update does not update the auto_now fields
+                    wv.update_timestamp = now
+                    reordered_views.append(wv)
+            WorkspaceView.objects.bulk_update(reordered_views, ["sort_value", "update_timestamp"])
 
     @staticmethod
     def has_read_permission(request):
@@ -21,15 +21,16 @@
 """Defines the serializer used by the REST API exposed by this app."""
 
 import base64
+import hashlib
 import imghdr
 
 import six
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.db.models import Max
 from rest_framework import serializers
 
 from ui_framework.models import View, Workspace, WorkspaceView
+from ui_framework.thumbnails import THUMBNAIL_VARIANT_FORMATS, get_thumbnail_variant_url
 
 
 class Base64ImageField(serializers.ImageField):
@@ -43,22 +44,6 @@ class Base64ImageField(serializers.ImageField):
     Updated for Django REST framework 3.
     """
 
-    @staticmethod
-    def _get_view_id_from_data(data):
-        """Return a view_id integer for building the thumbnail file_namet
-        by checking whether the id comes in the request data or if a new one
-        has to be created"""
-        # id field should come in req data if view exists
-        if "id" in data:
-            return data["id"]
-
-        # safe to assume that max(id)+1 can be overwritten
-        view_id_max = View.objects.aggregate(Max("id"))
-        if view_id_max["id__max"] is None:
-            return 1
-
-        return view_id_max["id__max"] + 1
-
     def to_representation(self, value):
         """Return a string representation of the image based on a given value.
         If value is None, then None is returned.
@@ -108,9 +93,8 @@ class Base64ImageField(serializers.ImageField):
             except TypeError:
                 self.fail("invalid_image")
 
-            # Generate file name:
-            view_id = self._get_view_id_from_data(self.parent.context["request"].data)
-            file_name = f"view_{view_id}"
+            # Name the file after its content, so identical images are stored once
+            file_name = hashlib.sha256(decoded_file).hexdigest()
 
             # Get the file name extension:
             file_extension = self.get_file_extension(file_name, decoded_file)
@@ -161,25 +145,44 @@ class ViewSerializer(serializers.ModelSerializer):
         """Meta class to map serializer's fields with the model fields."""
 
         model = View
-        fields = ("id", "name", "thumbnail", "screen", "data")
+        fields = ("id", "name", "thumbnail", "screen", "data", "update_timestamp")
+        read_only_fields = ("update_timestamp",)
 
 
 class ViewSummarySerializer(serializers.ModelSerializer):
-    """Serializer for the View model including only id and name."""
+    """Serializer for the View model including only id and name,
+    with the URLs of the small variants of the thumbnail."""
 
-    thumbnail = Base64ImageField(
-        required=False,
-        max_length=None,
-        use_url=True,
-        allow_empty_file=True,
-        allow_null=True,
-    )
+    thumbnail = serializers.SerializerMethodField()
+    """URL of the preferred small variant of the thumbnail,
+    or of the thumbnail itself until its variants are generated."""
+
+    thumbnail_variants = serializers.SerializerMethodField()
+    """URLs of the variants of the thumbnail, indexed by size and format"""
 
     class Meta:
         """Meta class to map serializer's fields with the model fields."""
 
         model = View
-        fields = ("id", "name", "thumbnail", "screen")
+        fields = ("id", "name", "thumbnail", "thumbnail_variants", "screen")
+
+    def get_thumbnail(self, obj):
+        """Return the URL of the preferred small variant of the thumbnail."""
+        small_variants = self.get_thumbnail_variants(obj).get("small")
+        if small_variants:
+            return small_variants[next(iter(THUMBNAIL_VARIANT_FORMATS))]
+        return Base64ImageField().to_representation(obj.thumbnail or None)
+
+    def get_thumbnail_variants(self, obj):
+        """Return the URLs of the variants of the thumbnail, indexed by size and format,
+        e.g. {"small": {"webp": "/manager/ui_framework/thumbnails/<hash>_small.webp", ...}}."""
+        if not obj.thumbnail or obj.thumbnail_variants.get("source") != obj.thumbnail.name:
+            return {}
+        return {
+            size: {extension: get_thumbnail_variant_url(name) for extension, name in variants.items()}
+            for size, variants in obj.thumbnail_variants.items()
+            if size != "source"
+        }
 
 
 class WorkspaceSerializer(serializers.ModelSerializer):
@@ -226,3 +229,27 @@ class WorkspaceViewSerializer(serializers.ModelSerializer):
 
         model = WorkspaceView
         fields = "__all__"
+
+
+class WorkspaceViewAdditionSerializer(serializers.Serializer):
+    """Serializer for a View added to a Workspace."""
+
+    view = serializers.IntegerField()
+    """The id of the View"""
+
+    view_name = serializers.CharField(max_length=20, allow_blank=True, default="")
+    """The custom name for the View within the Workspace"""
+
+
+class WorkspaceViewsUpdateSerializer(serializers.Serializer):
+    """Serializer for the changes to the views of a Workspace,
+    see `Workspace.update_views`."""
+
+    order = serializers.ListField(child=serializers.IntegerField(), required=False)
+    """The ids of all the views of the Workspace after the changes, in their new order"""
+
+    add = WorkspaceViewAdditionSerializer(many=True, required=False)
+    """The views to add"""
+
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False)
+    """The ids of the views to remove"""
@@ -18,19 +18,22 @@
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
 
-import os
-
-from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from manager import settings
-from ui_framework.models import View
+from ui_framework.models import View, Workspace, WorkspaceView
+from ui_framework.tasks import schedule_thumbnail_variants
+from ui_framework.thumbnails import keep_thumbnail, release_thumbnail
+from ui_framework.view_search import update_view_search_index
+from ui_framework.view_subscriptions import get_view_subscriptions
+from ui_framework.workspace_cache import invalidate_workspaces
 
 
 @receiver(post_delete, sender=View)
 def hanlde_view_deletion(sender, **kwargs):
     """Receive signal when a View is deleted
-    and delete its thumbnail image from disk.
+    and delete its thumbnail and thumbnail variants from the storage,
+    unless other Views share them.
 
     Parameters
     ----------
@@ -42,9 +45,91 @@ def hanlde_view_deletion(sender, **kwargs):
     """
     deleted_view = kwargs["instance"]
     if deleted_view and deleted_view.thumbnail:
-        file_url = settings.MEDIA_BASE + deleted_view.thumbnail.url
-        try:
-            os.remove(file_url)
-        except FileNotFoundError:
-            pass
-    pass
+        release_thumbnail(deleted_view.thumbnail.name, deleted_view.thumbnail_variants)
+
+
+@receiver(pre_save, sender=View)
+def handle_view_data_change(sender, **kwargs):
+    """Receive signal before a View is saved
+    and extract the subscriptions of its components from its data.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, in this case 'View'
+    kwargs: `dict`
+        arguments dictionary sent with the signal.
+        It contains the key 'instance' with the View instance to be saved
+    """
+    view = kwargs["instance"]
+    view.subscriptions = get_view_subscriptions(view.data)
+
+
+@receiver(pre_save, sender=View)
+def handle_view_thumbnail_change(sender, **kwargs):
+    """Receive signal before a View is saved with a new thumbnail, or without it,
+    and delete its previous thumbnail from the storage, unless other Views share it.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, in this case 'View'
+    kwargs: `dict`
+        arguments dictionary sent with the signal.
+        It contains the key 'instance' with the View instance to be saved
+    """
+    view = kwargs["instance"]
+    update_fields = kwargs["update_fields"]
+    if view.pk is None or kwargs["raw"] or (update_fields is not None and "thumbnail" not in update_fields):
+        return
+    # An uploaded thumbnail is only committed to the storage when the View is saved
+    if view.thumbnail and view.thumbnail._committed:
+        return
+    previous = View.objects.filter(pk=view.pk).values_list("thumbnail", "thumbnail_variants").first()
+    if previous is not None:
+        release_thumbnail(*previous)
+
+
+@receiver(post_save, sender=View)
+def handle_view_save(sender, **kwargs):
+    """Receive signal when a View is saved, update its search terms,
+    keep its shared thumbnail and queue the generation of its thumbnail variants.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, in this case 'View'
+    kwargs: `dict`
+        arguments dictionary sent with the signal.
+        It contains the key 'instance' with the View instance that was saved
+    """
+    view = kwargs["instance"]
+    update_view_search_index(view)
+    keep_thumbnail(view.thumbnail.name, view.thumbnail.shared_content)
+    view.thumbnail.shared_content = None
+    schedule_thumbnail_variants(view)
+
+
+@receiver(post_save, sender=Workspace)
+@receiver(post_save, sender=View)
+@receiver(post_save, sender=WorkspaceView)
+@receiver(post_delete, sender=Workspace)
+@receiver(post_delete, sender=View)
+@receiver(post_delete, sender=WorkspaceView)
+@receiver(m2m_changed, sender=WorkspaceView)
+def handle_workspaces_change(sender, **kwargs):
+    """Receive signal when a Workspace, View or WorkspaceView changes
+    and invalidate the cached Workspaces.
+
+    The views added to or removed from a Workspace through its `views`
+    field do not send `post_save` or `post_delete` signals, so the
+    `m2m_changed` signal is also received.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender
+    kwargs: `dict`
+        arguments dictionary sent with the signal
+    """
+    invalidate_workspaces()
@@ -0,0 +1,95 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Tasks of the ui_framework app run in the background by the `process_tasks` command."""
+
+import hashlib
+
+from api.task_queue import enqueue_task, register_task
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import UnidentifiedImageError
+
+from ui_framework.models import View
+from ui_framework.thumbnails import create_thumbnail_variants
+from ui_framework.workspace_cache import invalidate_workspaces
+
+
+@register_task()
+def generate_thumbnail_variants(view_id, source):
+    """Generate the variants of the thumbnail of a View
+    and store their names in the View.
+
+    Parameters
+    ----------
+    view_id : `int`
+        The id of the View
+    source : `str`
+        The name of the thumbnail, the variants are not generated
+        if the View was deleted or its thumbnail changed since
+
+    Returns
+    -------
+    `dict` or None
+        The thumbnail variants of the View, or None if not generated
+    """
+    view = View.objects.filter(pk=view_id, thumbnail=source).first()
+    if view is None:
+        return None
+    with view.thumbnail.open("rb") as thumbnail:
+        content = thumbnail.read()
+    try:
+        variants = {"source": source, **create_thumbnail_variants(content)}
+    except UnidentifiedImageError:
+        # The original thumbnail is still served
+        variants = {"source": source}
+
+    # Only the variants are updated, the View itself did not change
+    View.objects.filter(pk=view_id, thumbnail=source).update(thumbnail_variants=variants)
+    # The variants may be deleted by `release_thumbnail` before they are referenced
+    variant_names = [name for size, names in variants.items() if size != "source" for name in names.values()]
+    if not all(default_storage.exists(name) for name in variant_names):
+        create_thumbnail_variants(content)
+    invalidate_workspaces()
+    return variants
+
+
+def schedule_thumbnail_variants(view):
+    """Queue the generation of the thumbnail variants of a View,
+    if its thumbnail changed since they were generated.
+
+    The task is queued once the current transaction is committed.
+
+    Parameters
+    ----------
+    view : `View`
+        The View
+    """
+    source = view.thumbnail.name if view.thumbnail else None
+    if not source or view.thumbnail_variants.get("source") == source:
+        return
+    source_hash = hashlib.md5(source.encode()).hexdigest()
+    transaction.on_commit(
+        lambda: enqueue_task(
+            "generate_thumbnail_variants",
+            args=[view.pk, source],
+            unique_key=f"thumbnail-variants:{view.pk}:{source_hash}",
+        )
+    )
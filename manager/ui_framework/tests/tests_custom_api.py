@@ -23,10 +23,13 @@
 from api.models import Token
 from django.conf import settings
 from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework import status
 
-from ui_framework.models import View
+from ui_framework.models import View, Workspace
 from ui_framework.tests.utils import BaseTestCase
 
 
@@ -70,6 +73,7 @@ class AuthorizedCrudTestCase(BaseTestCase):
                             if v.thumbnail.name == "" or v.thumbnail.name is None
                             else settings.MEDIA_URL + str(v.thumbnail.name)
                         ),
+                        "thumbnail_variants": {},
                         "screen": v.screen,
                     }
                     for v_pk in w["views"]
@@ -117,3 +121,152 @@ class AuthorizedCrudTestCase(BaseTestCase):
             expected_data,
             "Retrieved list of workspaces is not as expected",
         )
+
+    def get_with_queries(self, url):
+        """Get an url, returning the response and the SQL queries
+        to the ui_framework tables."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q["sql"] for q in queries.captured_queries if "ui_framework_" in q["sql"]]
+
+    def test_workspaces_queries_and_cache(self):
+        """Test that the workspaces are serialized with a fixed number
+        of queries, cached, and invalidated when their views change."""
+        # Arrange
+        self.user.user_permissions.add(Permission.objects.get(codename="view_workspace"))
+        with_view_name_url = reverse("workspace-with-view-name")
+        full_url = reverse("workspace-full", kwargs={"pk": self.workspaces_data[0]["id"]})
+
+        # Act
+        _, with_view_name_queries = self.get_with_queries(with_view_name_url)
+        _, full_queries = self.get_with_queries(full_url)
+        _, cached_with_view_name_queries = self.get_with_queries(with_view_name_url)
+        _, cached_full_queries = self.get_with_queries(full_url)
+        view = View.objects.get(pk=self.views_data[0]["id"])
+        view.name = "Renamed View"
+        view.save()
+        with_view_name_response = self.client.get(with_view_name_url)
+        full_response = self.client.get(full_url)
+        Workspace.objects.get(pk=self.workspaces_data[0]["id"]).views.remove(view)
+        removed_view_response = self.client.get(full_url)
+
+        # Assert
+        self.assertEqual(len(with_view_name_queries), 2)
+        self.assertEqual(len(full_queries), 2)
+        self.assertEqual(cached_with_view_name_queries, [])
+        self.assertEqual(cached_full_queries, [])
+        self.assertEqual(with_view_name_response.data[0]["views"][0]["name"], "Renamed View")
+        self.assertEqual(full_response.data["views"][0]["name"], "Renamed View")
+        self.assertEqual([v["id"] for v in removed_view_response.data["views"]], [self.views_data[1]["id"]])
+
+    def test_conditional_get(self):
+        """Test that views and workspaces are not sent again
+        to a client that has their current version."""
+        # Arrange
+        self.user.user_permissions.add(Permission.objects.get(codename="view_view"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_workspace"))
+        view_url = reverse("view-detail", kwargs={"pk": self.views_data[0]["id"]})
+        workspaces_url = reverse("workspace-list")
+        view_response = self.client.get(view_url)
+        workspaces_response = self.client.get(workspaces_url)
+
+        # Act
+        not_modified_view_response = self.client.get(view_url, HTTP_IF_NONE_MATCH=view_response["ETag"])
+        not_modified_since_view_response = self.client.get(
+            view_url, HTTP_IF_MODIFIED_SINCE=view_response["Last-Modified"]
+        )
+        not_modified_workspaces_response = self.client.get(
+            workspaces_url, HTTP_IF_NONE_MATCH=workspaces_response["ETag"]
+        )
+        view = View.objects.get(pk=self.views_data[0]["id"])
+        view.name = "Renamed View"
+        view.save()
+        Workspace.objects.get(pk=self.workspaces_data[0]["id"]).views.remove(view)
+        modified_view_response = self.client.get(view_url, HTTP_IF_NONE_MATCH=view_response["ETag"])
+        modified_workspaces_response = self.client.get(
+            workspaces_url, HTTP_IF_NONE_MATCH=workspaces_response["ETag"]
+        )
+
+        # Assert
+        self.assertEqual(view_response["Cache-Control"], "no-cache")
+        self.assertEqual(not_modified_view_response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified_since_view_response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified_workspaces_response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(modified_view_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified_view_response.data["name"], "Renamed View")
+        self.assertEqual(modified_workspaces_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified_workspaces_response.data[0]["views"], [self.views_data[1]["id"]])
+
+    def test_conditional_get_list_after_delete(self):
+        """Test that lists are sent without Last-Modified and are sent again
+        after an object other than the last modified one is deleted."""
+        # Arrange
+        self.user.user_permissions.add(Permission.objects.get(codename="view_view"))
+        views_url = reverse("view-list")
+        views_response = self.client.get(views_url)
+        View.objects.get(pk=self.views_data[0]["id"]).delete()
+
+        # Act
+        modified_views_response = self.client.get(views_url, HTTP_IF_NONE_MATCH=views_response["ETag"])
+        modified_since_views_response = self.client.get(views_url, HTTP_IF_MODIFIED_SINCE=http_date())
+
+        # Assert
+        self.assertNotIn("Last-Modified", views_response)
+        self.assertEqual(modified_views_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified_since_views_response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.views_data[0]["id"], [v["id"] for v in modified_views_response.data])
+
+    def test_update_workspace_views(self):
+        """Test that the views of a workspace can be added,
+        removed and reordered in one request."""
+        # Arrange
+        self.user.user_permissions.add(Permission.objects.get(codename="view_workspace"))
+        self.user.user_permissions.add(Permission.objects.get(codename="change_workspace"))
+        workspace = self.workspaces[0]
+        url = reverse("workspace-views", kwargs={"pk": workspace.pk})
+        full_url = reverse("workspace-full", kwargs={"pk": workspace.pk})
+        self.client.get(full_url)
+        data = {
+            "order": [self.views[3].pk, self.views[1].pk, self.views[2].pk],
+            "add": [{"view": self.views[2].pk, "view_name": "v2"}, {"view": self.views[3].pk}],
+            "remove": [self.views[0].pk],
+        }
+
+        # Act
+        response = self.client.put(url, data, format="json")
+        full_response = self.client.get(full_url)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([v["id"] for v in response.data], data["order"])
+        self.assertEqual(sorted(v["id"] for v in full_response.data["views"]), sorted(data["order"]))
+        self.assertEqual(
+            list(workspace.workspace_views.order_by("sort_value").values_list("view_id", "sort_value")),
+            [(self.views[3].pk, 0), (self.views[1].pk, 1), (self.views[2].pk, 2)],
+        )
+
+    def test_update_workspace_views_errors(self):
+        """Test that invalid changes of the views of a workspace
+        are rejected without applying any of them."""
+        # Arrange
+        self.user.user_permissions.add(Permission.objects.get(codename="change_workspace"))
+        workspace = self.workspaces[0]
+        url = reverse("workspace-views", kwargs={"pk": workspace.pk})
+        invalid_data = [
+            {"order": [self.views[1].pk], "remove": [self.views[0].pk], "add": [{"view": self.views[2].pk}]},
+            {"add": [{"view": self.views[1].pk}]},
+            {"add": [{"view": 9999}]},
+            {"remove": [self.views[3].pk]},
+            {"order": [self.views[0].pk, self.views[0].pk]},
+        ]
+
+        # Act
+        responses = [self.client.put(url, data, format="json") for data in invalid_data]
+
+        # Assert
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            list(workspace.workspace_views.order_by("sort_value").values_list("view_id", flat=True)),
+            [self.views[0].pk, self.views[1].pk],
+        )
@@ -0,0 +1,225 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test the JSON Patch of the data of the Views."""
+
+import json
+
+from api.models import Token
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers, status
+
+from ui_framework.json_patch import JsonPatchConflict, JsonPatchError, apply_patch
+from ui_framework.models import View
+from ui_framework.tests.utils import BaseTestCase
+
+
+class JsonPatchTestCase(TestCase):
+    """Test the application of JSON Patches."""
+
+    def test_operations(self):
+        """Test that all the operations are applied in order."""
+        # Arrange
+        document = {"foo": ["bar", "baz"], "a/b": {"c~d": 1}, "qux": {"quux": True}}
+        patch = [
+            {"op": "add", "path": "/foo/1", "value": "qux"},
+            {"op": "add", "path": "/foo/-", "value": "end"},
+            {"op": "remove", "path": "/foo/0"},
+            {"op": "replace", "path": "/a~1b/c~0d", "value": 2},
+            {"op": "move", "from": "/qux/quux", "path": "/moved"},
+            {"op": "copy", "from": "/foo", "path": "/copied"},
+            {"op": "test", "path": "/copied", "value": ["qux", "baz", "end"]},
+        ]
+
+        # Act
+        result = apply_patch(document, patch)
+
+        # Assert
+        self.assertEqual(
+            result,
+            {
+                "foo": ["qux", "baz", "end"],
+                "a/b": {"c~d": 2},
+                "qux": {},
+                "moved": True,
+                "copied": ["qux", "baz", "end"],
+            },
+        )
+        self.assertEqual(document["foo"], ["bar", "baz"])
+
+    def test_invalid_patches(self):
+        """Test that invalid patches are rejected
+        and failed tests are reported as conflicts."""
+        # Arrange
+        document = {"foo": [1], "bar": 1}
+
+        # Act and Assert
+        for patch in [
+            {"op": "add", "path": "/foo", "value": 1},
+            [{"op": "remove", "path": "/baz"}],
+            [{"op": "add", "path": "/foo/2", "value": 1}],
+            [{"op": "replace", "path": "/foo/01", "value": 1}],
+            [{"op": "add", "path": "foo", "value": 1}],
+            [{"op": "add", "path": "/baz"}],
+            [{"op": "move", "from": "/foo", "path": "/foo/0"}],
+            [{"op": "merge", "path": "/foo"}],
+        ]:
+            with self.assertRaises(JsonPatchError):
+                apply_patch(document, patch)
+        with self.assertRaises(JsonPatchConflict):
+            apply_patch(document, [{"op": "test", "path": "/bar", "value": True}])
+
+
+class ViewDataPatchTestCase(BaseTestCase):
+    """Test the JSON Patch endpoint of the Views."""
+
+    def setUp(self):
+        """Set testcase. Inherits from utils.BaseTestCase."""
+        # Arrange
+        super().setUp()
+        self.user = User.objects.create_user(
+            username="test",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.user.user_permissions.add(Permission.objects.get(codename="change_view"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_view"))
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.view = View.objects.create(
+            name="My big View",
+            data={"content": {"component_1": {"name": "CSCSummary", "config": {"salindex": 1}}}},
+        )
+        self.url = reverse("view-patch-data", kwargs={"pk": self.view.pk})
+        self.update_timestamp = self.client.get(reverse("view-detail", kwargs={"pk": self.view.pk})).data[
+            "update_timestamp"
+        ]
+
+    def test_patch_view_data(self):
+        """Test that a View data is patched and its new version returned."""
+        # Act
+        response = self.client.patch(
+            self.url,
+            {
+                "update_timestamp": self.update_timestamp,
+                "operations": [
+                    {"op": "replace", "path": "/content/component_1/config/salindex", "value": 2},
+                    {"op": "add", "path": "/content/component_2", "value": {"name": "Dome"}},
+                ],
+            },
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.view.refresh_from_db()
+        self.assertEqual(self.view.data["content"]["component_1"]["config"]["salindex"], 2)
+        self.assertEqual(self.view.data["content"]["component_2"], {"name": "Dome"})
+        self.assertEqual(
+            response.data,
+            {
+                "id": self.view.pk,
+                "update_timestamp": serializers.DateTimeField().to_representation(self.view.update_timestamp),
+            },
+        )
+        self.assertNotEqual(response.data["update_timestamp"], self.update_timestamp)
+
+    def test_patch_view_string_data(self):
+        """Test that the data of a View stored as a string is kept as a string."""
+        # Arrange
+        view = View.objects.get(pk=self.views_data[0]["id"])
+        url = reverse("view-patch-data", kwargs={"pk": view.pk})
+
+        # Act
+        response = self.client.patch(
+            url,
+            {
+                "update_timestamp": serializers.DateTimeField().to_representation(view.update_timestamp),
+                "operations": [{"op": "replace", "path": "/data_name", "value": "Renamed"}],
+            },
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        view.refresh_from_db()
+        self.assertEqual(json.loads(view.data), {"data_name": "Renamed"})
+
+    def test_patch_view_data_conflicts(self):
+        """Test that a patch of an outdated version, with a failed test
+        or with invalid operations is rejected and not applied."""
+        # Arrange
+        operations = [{"op": "replace", "path": "/content/component_1/name", "value": "Dome"}]
+
+        # Act
+        invalid_response = self.client.patch(
+            self.url,
+            {"update_timestamp": self.update_timestamp, "operations": [{"op": "remove", "path": "/foo"}]},
+            format="json",
+        )
+        failed_test_response = self.client.patch(
+            self.url,
+            {
+                "update_timestamp": self.update_timestamp,
+                "operations": [{"op": "test", "path": "/content", "value": {}}, *operations],
+            },
+            format="json",
+        )
+        missing_version_response = self.client.patch(self.url, {"operations": operations}, format="json")
+        self.client.patch(
+            self.url,
+            {"update_timestamp": self.update_timestamp, "operations": operations},
+            format="json",
+        )
+        outdated_response = self.client.patch(
+            self.url,
+            {"update_timestamp": self.update_timestamp, "operations": operations},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(invalid_response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(failed_test_response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(missing_version_response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(outdated_response.status_code, status.HTTP_409_CONFLICT)
+        self.view.refresh_from_db()
+        self.assertEqual(
+            outdated_response.data["update_timestamp"],
+            serializers.DateTimeField().to_representation(self.view.update_timestamp),
+        )
+
+    def test_patch_view_data_unauthorized(self):
+        """Test that users without permissions to change Views can not patch them."""
+        # Arrange
+        self.user.user_permissions.clear()
+
+        # Act
+        response = self.client.patch(
+            self.url,
+            {"update_timestamp": self.update_timestamp, "operations": []},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
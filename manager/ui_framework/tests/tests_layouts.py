@@ -0,0 +1,287 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test the export and import of the layouts."""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from api.models import Token
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission, User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from ui_framework.layouts import LayoutsExportError, LayoutsImportError, export_layouts, import_layouts
+from ui_framework.models import View, ViewSearchIndex, Workspace, WorkspaceView
+from ui_framework.tests.utils import BaseTestCase
+
+
+class LayoutsTestCase(BaseTestCase):
+    """Test that the layouts are exported and imported as NDJSON."""
+
+    def setUp(self):
+        """Set testcase. Inherits from utils.BaseTestCase."""
+        # Arrange
+        super().setUp()
+        image = io.BytesIO()
+        Image.new("RGB", (64, 32), color=(10, 20, 30)).save(image, format="PNG")
+        self.thumbnail_name = f"thumbnails/{hashlib.sha256(image.getvalue()).hexdigest()}.png"
+        default_storage.delete(self.thumbnail_name)
+        default_storage.save(self.thumbnail_name, ContentFile(image.getvalue()))
+        self.addCleanup(default_storage.delete, self.thumbnail_name)
+        self.views[0].data = {"content": {"newPanel-1": {"config": {"name": "ATDome", "salindex": 0}}}}
+        self.views[0].thumbnail = self.thumbnail_name
+        self.views[0].save()
+
+        self.user = User.objects.create_user(username="test", password="password", email="test@user.cl")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def get_layouts(self):
+        """Return the Views, Workspaces and WorkspaceViews by their names."""
+        return (
+            sorted(View.objects.values_list("name", "screen", "data", "thumbnail")),
+            sorted(Workspace.objects.values_list("name", flat=True)),
+            sorted(
+                WorkspaceView.objects.values_list("workspace__name", "view__name", "view_name", "sort_value")
+            ),
+        )
+
+    @staticmethod
+    @async_to_sync
+    async def read_streaming_content(response):
+        """Read the content of a streaming response, as served under ASGI."""
+        return b"".join([part async for part in response.streaming_content])
+
+    def test_export_and_import(self):
+        """Test that the exported layouts are imported in an empty database,
+        and that importing them again does not change them."""
+        # Arrange
+        layouts = self.get_layouts()
+        lines = list(export_layouts())
+        View.objects.all().delete()
+        Workspace.objects.all().delete()
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = import_layouts(lines)
+        imported_layouts = self.get_layouts()
+        same_summary = import_layouts(lines)
+
+        # Assert
+        self.assertEqual(len(lines), 4 + 3 + 6)
+        self.assertEqual(json.loads(lines[0])["thumbnail"]["sha256"], self.thumbnail_name[11:-4])
+        self.assertEqual(
+            summary,
+            {
+                "ui_framework.view": {"created": 4, "updated": 0, "unchanged": 0},
+                "ui_framework.workspace": {"created": 3, "updated": 0, "unchanged": 0},
+                "ui_framework.workspaceview": {"created": 6, "updated": 0, "unchanged": 0},
+            },
+        )
+        self.assertEqual(imported_layouts, layouts)
+        self.assertTrue(default_storage.exists(self.thumbnail_name))
+        view = View.objects.get(name="My View 0")
+        self.assertEqual(view.subscriptions, [["event", "ATDome", "0", "summaryState"]])
+        self.assertEqual(ViewSearchIndex.objects.get(view=view).cscs, ["ATDome"])
+        self.assertEqual(
+            [counts["unchanged"] for counts in same_summary.values()],
+            [4, 3, 6],
+        )
+
+    def test_import_changes(self):
+        """Test that the changed rows are updated, the missing ones created
+        and the unchanged ones skipped."""
+        # Arrange
+        records = [json.loads(line) for line in export_layouts()]
+        records[1]["data"] = {"data_name": "Changed"}
+        records[1]["thumbnail"] = records[0]["thumbnail"]
+        records[2]["name"] = "New View"
+        records[-1]["sort_value"] = 5
+        lines = [json.dumps(record) for record in records if record["model"] != "ui_framework.workspaceview"]
+        lines.append(json.dumps(records[-1]))
+
+        # Act
+        summary = import_layouts(lines)
+
+        # Assert
+        self.assertEqual(summary["ui_framework.view"], {"created": 1, "updated": 1, "unchanged": 2})
+        self.assertEqual(summary["ui_framework.workspace"], {"created": 0, "updated": 0, "unchanged": 3})
+        self.assertEqual(summary["ui_framework.workspaceview"], {"created": 0, "updated": 1, "unchanged": 0})
+        view = View.objects.get(pk=self.views[1].pk)
+        self.assertEqual(view.data, {"data_name": "Changed"})
+        self.assertEqual(view.thumbnail.name, self.thumbnail_name)
+        self.assertEqual(View.objects.get(name="New View").data, json.dumps({"data_name": "My View 2"}))
+        self.assertEqual(WorkspaceView.objects.get(pk=self.workspace_views_data[-1]["id"]).sort_value, 5)
+
+    def test_import_errors(self):
+        """Test that nothing is imported if a record is not valid."""
+        # Arrange
+        view = json.loads(next(export_layouts()))
+        view["name"] = "New View"
+        view["thumbnail"] = {"sha256": "0" * 64, "extension": ".png", "content": "aW1hZ2U="}
+        invalid_lines = [
+            ["not json"],
+            [json.dumps({"model": "auth.user", "name": "admin"})],
+            [json.dumps({"model": "ui_framework.workspace", "name": "x" * 21})],
+            [json.dumps({"model": "ui_framework.workspace", "name": "New"})] * 2,
+            [
+                json.dumps({"model": "ui_framework.workspace", "name": "New"}),
+                json.dumps({"model": "ui_framework.workspaceview", "workspace": "New", "view": "Missing"}),
+            ],
+            [json.dumps(view)],
+        ]
+
+        # Act
+        errors = []
+        for lines in invalid_lines:
+            with self.assertRaises(LayoutsImportError) as e:
+                import_layouts(lines)
+            errors.append(str(e.exception))
+
+        # Assert
+        self.assertEqual(errors[1], "Line 1: unknown model: auth.user")
+        self.assertEqual(errors[3], "Line 2: duplicated record: New")
+        self.assertEqual(errors[4], "Line 2: view not found: Missing")
+        self.assertIn("does not match its hash", errors[5])
+        self.assertFalse(Workspace.objects.filter(name="New").exists())
+        self.assertFalse(View.objects.filter(name="New View").exists())
+
+    def test_import_errors_delete_stored_thumbnails(self):
+        """Test that the thumbnails stored by an import are deleted
+        if a later record is not valid."""
+        # Arrange
+        image = io.BytesIO()
+        Image.new("RGB", (64, 32), color=(40, 50, 60)).save(image, format="PNG")
+        sha256 = hashlib.sha256(image.getvalue()).hexdigest()
+        thumbnail_name = f"thumbnails/{sha256}.png"
+        self.addCleanup(default_storage.delete, thumbnail_name)
+        view = json.loads(next(export_layouts()))
+        view["name"] = "New View"
+        view["thumbnail"] = {
+            "sha256": sha256,
+            "extension": ".png",
+            "content": base64.b64encode(image.getvalue()).decode(),
+        }
+        lines = [
+            json.dumps(view),
+            json.dumps({"model": "ui_framework.workspaceview", "workspace": "New", "view": "Missing"}),
+        ]
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(LayoutsImportError):
+                import_layouts(lines)
+
+        # Assert
+        self.assertFalse(View.objects.filter(name="New View").exists())
+        self.assertFalse(default_storage.exists(thumbnail_name))
+
+    def test_duplicated_names(self):
+        """Test that the layouts are not exported, nor imported,
+        while several Views or Workspaces have the same name."""
+        # Arrange
+        export = list(export_layouts())
+        View.objects.create(name="My View 1", data={})
+        Workspace.objects.create(name="My Workspace 2")
+        for action in ("view", "add", "change"):
+            self.user.user_permissions.add(Permission.objects.get(codename=f"{action}_view"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_workspace"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_workspaceview"))
+
+        # Act
+        with self.assertRaises(LayoutsExportError) as export_error:
+            export_layouts()
+        response = self.client.get(reverse("layouts"))
+        with self.assertRaises(CommandError):
+            call_command("export_layouts", stdout=io.StringIO())
+        with self.assertRaises(LayoutsImportError) as import_error:
+            import_layouts(export)
+
+        # Assert
+        self.assertEqual(
+            str(export_error.exception),
+            "Several views have the same name, rename them to export the layouts: My View 1",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["error"], str(export_error.exception))
+        self.assertEqual(str(import_error.exception), "Line 2: several views have the same name: My View 1")
+
+        View.objects.filter(name="My View 1").order_by("-pk").first().delete()
+        with self.assertRaises(LayoutsExportError) as workspace_export_error:
+            export_layouts()
+        self.assertIn("Several workspaces have the same name", str(workspace_export_error.exception))
+
+    def test_layouts_api(self):
+        """Test that the layouts are streamed and imported through the API."""
+        # Arrange
+        url = reverse("layouts")
+        unauthorized_response = self.client.get(url)
+        for model in ("view", "workspace", "workspaceview"):
+            for action in ("view", "add", "change"):
+                self.user.user_permissions.add(Permission.objects.get(codename=f"{action}_{model}"))
+
+        # Act
+        response = self.client.get(url)
+        export = self.read_streaming_content(response)
+        View.objects.filter(pk=self.views[3].pk).delete()
+        import_response = self.client.post(url, export, content_type="application/x-ndjson")
+        invalid_response = self.client.post(url, b"not json\n", content_type="application/x-ndjson")
+
+        # Assert
+        self.assertEqual(unauthorized_response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(export.decode(), "".join(export_layouts()))
+        self.assertEqual(import_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            import_response.data["ui_framework.view"], {"created": 1, "updated": 0, "unchanged": 3}
+        )
+        self.assertEqual(
+            import_response.data["ui_framework.workspaceview"], {"created": 1, "updated": 0, "unchanged": 5}
+        )
+        self.assertEqual(invalid_response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_layouts_commands(self):
+        """Test that the layouts are exported and imported by the management commands."""
+        # Arrange
+        layouts = self.get_layouts()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "layouts.ndjson")
+
+        # Act
+        call_command("export_layouts", output=path)
+        Workspace.objects.all().delete()
+        output = io.StringIO()
+        call_command("import_layouts", path, stdout=output)
+
+        # Assert
+        self.assertEqual(self.get_layouts(), layouts)
+        self.assertEqual(json.loads(output.getvalue())["ui_framework.workspace"]["created"], 3)
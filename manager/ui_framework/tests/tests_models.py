@@ -20,6 +20,8 @@
 
 """Test the models."""
 
+import json
+
 from django.test import TestCase
 from django.utils import timezone
 from freezegun import freeze_time
@@ -260,6 +262,58 @@ class ViewModelTestCase(TestCase):
         with self.assertRaises(Exception):
             Workspace.objects.get(pk=self.view_pk)
 
+    def test_view_subscriptions(self):
+        """Test that the subscriptions of the components of a view
+        are extracted from its data when it is saved."""
+        # Arrange:
+        data = {
+            "content": {
+                "newPanel-0": {"content": "ScriptQueue", "config": {"salindex": 1}},
+                "newPanel-1": {
+                    "content": "CSCGroup",
+                    "config": {
+                        "cscs": [{"name": "Watcher", "salindex": 0}, {"name": "ATMCS", "salindex": "x"}],
+                    },
+                },
+                "newPanel-2": {
+                    "content": "VegaTimeSeriesPlot",
+                    "config": {
+                        "inputs": {
+                            "Flow": {
+                                "values": [
+                                    {
+                                        "category": "telemetry",
+                                        "csc": "HVAC",
+                                        "salindex": 0,
+                                        "topic": "glycolSensor",
+                                    },
+                                ]
+                            }
+                        }
+                    },
+                },
+            }
+        }
+
+        # Act
+        self.view.data = data
+        self.view.save()
+        string_view = View.objects.create(name="String view", data=json.dumps(data))
+
+        # Assert
+        expected_subscriptions = [
+            ["event", "ScriptQueue", "1", "summaryState"],
+            ["event", "ScriptQueueState", "1", "stream"],
+            ["event", "Watcher", "0", "summaryState"],
+            ["telemetry", "HVAC", "0", "glycolSensor"],
+        ]
+        self.assertEqual(View.objects.get(pk=self.view.pk).subscriptions, expected_subscriptions)
+        self.assertEqual(View.objects.get(pk=string_view.pk).subscriptions, expected_subscriptions)
+
+        self.view.data = None
+        self.view.save()
+        self.assertEqual(View.objects.get(pk=self.view.pk).subscriptions, [])
+
 
 class WorkspaceViewModelTestCase(TestCase):
     """Test the workspace_view model."""
@@ -0,0 +1,160 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test the search of the Views."""
+
+from api.models import Token
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ui_framework.models import View, ViewSearchIndex
+from ui_framework.view_search import get_view_search_terms
+
+
+def get_view_data(*components):
+    """Return the data of a View with the given components."""
+    return {
+        "content": {
+            f"newPanel-{i}": {"content": content, "config": config, "properties": {"type": "component"}}
+            for i, (content, config) in enumerate(components)
+        },
+        "properties": {"type": "container"},
+    }
+
+
+class ViewSearchTermsTestCase(TestCase):
+    """Test the extraction of the search terms of the Views."""
+
+    def test_get_view_search_terms(self):
+        """Test that the component types and CSC names are extracted
+        from the data of a View, or from its JSON serialization."""
+        # Arrange
+        data = get_view_data(
+            (
+                "CSCGroup",
+                {"cscs": [{"name": "ScriptQueue", "salindex": 1}, {"name": "Watcher", "salindex": 0}]},
+            ),
+            ("VegaTimeSeriesPlot", {"inputs": {"Supply": {"values": [{"csc": "HVAC", "topic": "glycol"}]}}}),
+            ("CSCGroup", {"title": "Another group", "name": "Not a CSC"}),
+        )
+
+        # Act
+        terms = get_view_search_terms(data)
+        string_terms = get_view_search_terms('{"content": {"a": {"content": "Dome"}}}')
+
+        # Assert
+        self.assertEqual(terms, (["CSCGroup", "VegaTimeSeriesPlot"], ["HVAC", "ScriptQueue", "Watcher"]))
+        self.assertEqual(string_terms, (["Dome"], []))
+        self.assertEqual(get_view_search_terms(None), ([], []))
+        self.assertEqual(get_view_search_terms("not json"), ([], []))
+
+
+class ViewSearchTestCase(TestCase):
+    """Test the search endpoint of the Views."""
+
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("view-search")
+        self.dome_view = View.objects.create(
+            name="Dome",
+            data=get_view_data(
+                ("Dome", {}),
+                ("CSCSummary", {"hierarchy": [{"name": "ATDome", "salindex": 0}]}),
+            ),
+        )
+        self.summary_view = View.objects.create(
+            name="Summary",
+            data=get_view_data(("CSCSummary", {"hierarchy": [{"name": "ATMCS", "salindex": 0}]})),
+        )
+        self.queue_view = View.objects.create(
+            name="Queues",
+            data=get_view_data(("ScriptQueue", {"salindex": 1})),
+        )
+
+    def search(self, **params):
+        """Return the ids of the Views found with the given parameters."""
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [view["id"] for view in response.data["results"]]
+
+    def test_search_ranking(self):
+        """Test that the Views are matched by their names, component types
+        and CSC names, and the matches of the names are ranked first."""
+        # Act and Assert
+        self.assertEqual(self.search(query="dome"), [self.dome_view.pk])
+        self.assertEqual(self.search(query="summary"), [self.summary_view.pk, self.dome_view.pk])
+        self.assertEqual(self.search(query="atmcs"), [self.summary_view.pk])
+        self.assertEqual(self.search(query="queue"), [self.queue_view.pk])
+        self.assertEqual(self.search(query="summary atdome"), [self.dome_view.pk])
+        self.assertEqual(self.search(query="sumary"), [self.summary_view.pk, self.dome_view.pk])
+        self.assertEqual(self.search(query="telescope"), [])
+        self.assertEqual(self.search(query=""), [self.queue_view.pk, self.summary_view.pk, self.dome_view.pk])
+
+    def test_search_index_update(self):
+        """Test that the search terms are updated when the Views change."""
+        # Act
+        self.queue_view.name = "Renamed"
+        self.queue_view.data = get_view_data(("Watcher", {}))
+        self.queue_view.save()
+        self.dome_view.delete()
+
+        # Assert
+        self.assertEqual(self.search(query="renamed watcher"), [self.queue_view.pk])
+        self.assertEqual(self.search(query="queue"), [])
+        self.assertEqual(self.search(query="dome"), [])
+        self.assertEqual(ViewSearchIndex.objects.count(), 2)
+
+    @override_settings(VIEW_SEARCH_PAGE_SIZE=2)
+    def test_search_pages(self):
+        """Test that the results are paginated and serialized
+        without the data of the Views unless requested."""
+        # Act
+        response = self.client.get(self.url)
+        next_response = self.client.get(response.data["next"])
+        full_response = self.client.get(self.url, {"query": "dome", "full": "true"})
+
+        # Assert
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            response.data["results"][0],
+            {
+                "id": self.queue_view.pk,
+                "name": "Queues",
+                "thumbnail": None,
+                "thumbnail_variants": {},
+                "screen": "desktop",
+            },
+        )
+        self.assertEqual([view["id"] for view in next_response.data["results"]], [self.dome_view.pk])
+        self.assertEqual(full_response.data["results"][0]["data"], self.dome_view.data)
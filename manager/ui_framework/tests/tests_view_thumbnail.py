@@ -20,22 +20,28 @@
 
 """Test the UI Framework thumbnail behavior."""
 
+import base64
 import filecmp
 import glob
+import hashlib
+import io
 import os
 from unittest import mock
 
 import pytest
 import requests
-from api.models import Token
+from api.models import Task, Token
 from django.conf import settings
 from django.contrib.auth.models import Permission, User
+from django.core.files.storage import default_storage
 from django.test import TestCase, override_settings
 from django.urls import reverse
-from rest_framework import status
+from PIL import Image
+from rest_framework import serializers, status
 from rest_framework.test import APIClient
 
 from ui_framework.models import View
+from ui_framework.tasks import generate_thumbnail_variants
 
 
 @override_settings(DEBUG=True)
@@ -62,10 +68,17 @@ class ViewThumbnailTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-        # delete existing test thumbnails
-        thumbnail_files_list = glob.glob(settings.MEDIA_ROOT + "/thumbnails/*")
+        # delete existing test thumbnails, also after the tests
+        self.remove_thumbnail_files()
+        self.addCleanup(self.remove_thumbnail_files)
+
+    @staticmethod
+    def remove_thumbnail_files():
+        """Remove the thumbnail files and their variants."""
+        thumbnail_files_list = glob.glob(settings.MEDIA_ROOT + "/thumbnails/**/*", recursive=True)
         for file in thumbnail_files_list:
-            os.remove(file)
+            if os.path.isfile(file) and not file.endswith(".gitinclude"):
+                os.remove(file)
 
     @override_settings(
         STORAGES={
@@ -129,6 +142,7 @@ class ViewThumbnailTestCase(TestCase):
             "thumbnail": view.thumbnail.url,
             "data": {"key1": "value1"},
             "screen": "desktop",
+            "update_timestamp": serializers.DateTimeField().to_representation(view.update_timestamp),
         }
         self.assertEqual(response.data, expected_response)
 
@@ -164,7 +178,9 @@ class ViewThumbnailTestCase(TestCase):
 
         # - thumbnail url
         view = View.objects.get(name="view name")
-        self.assertEqual(view.thumbnail.url, f"{settings.MEDIA_URL}thumbnails/view_1.png")
+        with open(mock_location + ".png", "rb") as f:
+            image_hash = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual(view.thumbnail.url, f"{settings.MEDIA_URL}thumbnails/{image_hash}.png")
 
         # - expected response data
         expected_response = {
@@ -173,6 +189,7 @@ class ViewThumbnailTestCase(TestCase):
             "thumbnail": view.thumbnail.url,
             "data": {"key1": "value1"},
             "screen": "desktop",
+            "update_timestamp": serializers.DateTimeField().to_representation(view.update_timestamp),
         }
         self.assertEqual(response.data, expected_response)
 
@@ -204,7 +221,9 @@ class ViewThumbnailTestCase(TestCase):
         # Act
         # delete the view
         view = View.objects.get(name="view name")
-        delete_response = self.client.delete(reverse("view-detail", kwargs={"pk": view.pk}))
+        self.assertTrue(os.path.isfile(view.thumbnail.path))
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_response = self.client.delete(reverse("view-detail", kwargs={"pk": view.pk}))
 
         # Assert 2
 
@@ -212,6 +231,7 @@ class ViewThumbnailTestCase(TestCase):
         self.assertEqual(delete_response.status_code, status.HTTP_204_NO_CONTENT)
 
         # - file does not exist
+        self.assertFalse(os.path.isfile(view.thumbnail.path))
         file_url = settings.MEDIA_BASE + view.thumbnail.url
         with pytest.raises(FileNotFoundError):
             f = open(file_url, "r")
@@ -220,3 +240,178 @@ class ViewThumbnailTestCase(TestCase):
         # - getting the file gives 404
         get_deleted_response = self.client.get("/manager" + view.thumbnail.url)
         self.assertEqual(get_deleted_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_thumbnail_variants(self):
+        """Test the thumbnail variants are generated in the background
+        and the summaries of the views link to the small WebP variant."""
+        # Arrange
+        image = io.BytesIO()
+        Image.new("RGB", (1600, 900), "red").save(image, format="PNG")
+        request_data = {
+            "name": "view name",
+            "data": {"key1": "value1"},
+            "thumbnail": "data:image/png;base64," + base64.b64encode(image.getvalue()).decode(),
+        }
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("view-list"), request_data, format="json")
+        view = View.objects.get(pk=response.data["id"])
+        pending_summary = self.client.get(reverse("view-summary")).data[0]
+        task = Task.objects.get(name="generate_thumbnail_variants")
+        variants = generate_thumbnail_variants(*task.args)
+        summary = self.client.get(reverse("view-summary")).data[0]
+        variant_response = self.client.get(summary["thumbnail"])
+
+        # Assert
+        self.assertEqual(task.args, [view.pk, view.thumbnail.name])
+        self.assertEqual(pending_summary["thumbnail"], view.thumbnail.url)
+        self.assertEqual(pending_summary["thumbnail_variants"], {})
+        self.assertEqual(View.objects.get(pk=view.pk).thumbnail_variants, variants)
+        self.assertEqual(variants["source"], view.thumbnail.name)
+        self.assertEqual(set(summary["thumbnail_variants"]), {"small", "medium"})
+        self.assertEqual(summary["thumbnail"], summary["thumbnail_variants"]["small"]["webp"])
+        self.assertTrue(summary["thumbnail"].endswith("_small.webp"))
+
+        self.assertEqual(variant_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(variant_response["Content-Type"], "image/webp")
+        self.assertIn("immutable", variant_response["Cache-Control"])
+        variant = Image.open(io.BytesIO(b"".join(variant_response.streaming_content)))
+        self.assertEqual((variant.format, variant.size), ("WEBP", (320, 180)))
+        fallback_response = self.client.get(summary["thumbnail_variants"]["medium"]["png"])
+        fallback = Image.open(io.BytesIO(b"".join(fallback_response.streaming_content)))
+        self.assertEqual((fallback.format, fallback.size), ("PNG", (960, 540)))
+
+        # The variants of an outdated thumbnail are not generated
+        self.assertIsNone(generate_thumbnail_variants(view.pk, "thumbnails/other.png"))
+        missing_response = self.client.get(reverse("thumbnail-variant", kwargs={"name": "db.sqlite3"}))
+        self.assertEqual(missing_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_shared_thumbnail(self):
+        """Test views with the same thumbnail share its file,
+        which is deleted when no view references it anymore."""
+        # Arrange
+        mock_location = os.path.join(os.getcwd(), "ui_framework", "tests", "media", "mock", "test")
+        with open(mock_location) as f:
+            image_data = f.read()
+        image = io.BytesIO()
+        Image.new("RGB", (400, 200), "blue").save(image, format="PNG")
+        other_image_data = "data:image/png;base64," + base64.b64encode(image.getvalue()).decode()
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            first_response = self.client.post(
+                reverse("view-list"), {"name": "first", "data": {}, "thumbnail": image_data}, format="json"
+            )
+            second_response = self.client.post(
+                reverse("view-list"), {"name": "second", "data": {}, "thumbnail": image_data}, format="json"
+            )
+        first_view = View.objects.get(pk=first_response.data["id"])
+        second_view = View.objects.get(pk=second_response.data["id"])
+        for task in Task.objects.filter(name="generate_thumbnail_variants"):
+            generate_thumbnail_variants(*task.args)
+        first_view.refresh_from_db()
+        variant_paths = [
+            default_storage.path(name)
+            for size, variants in first_view.thumbnail_variants.items()
+            if size != "source"
+            for name in variants.values()
+        ]
+
+        # Assert
+        self.assertEqual(first_view.thumbnail.name, second_view.thumbnail.name)
+        self.assertEqual(len(glob.glob(settings.MEDIA_ROOT + "/thumbnails/*.png")), 1)
+        self.assertEqual(len(variant_paths), 4)
+
+        # The thumbnail is kept while a view references it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("view-detail", kwargs={"pk": first_view.pk}))
+        self.assertTrue(os.path.isfile(second_view.thumbnail.path))
+        self.assertTrue(all(os.path.isfile(path) for path in variant_paths))
+
+        # The thumbnail is deleted when the last view referencing it changes its thumbnail
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse("view-detail", kwargs={"pk": second_view.pk}),
+                {"name": "second", "data": {}, "thumbnail": other_image_data},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(os.path.isfile(second_view.thumbnail.path))
+        self.assertFalse(any(os.path.isfile(path) for path in variant_paths))
+        second_view.refresh_from_db()
+        self.assertTrue(os.path.isfile(second_view.thumbnail.path))
+
+    def test_shared_thumbnail_deleted_while_saved(self):
+        """Test a thumbnail is stored again if it is deleted
+        while a view sharing it is saved."""
+        # Arrange
+        image = io.BytesIO()
+        Image.new("RGB", (400, 200), "green").save(image, format="PNG")
+        image_data = "data:image/png;base64," + base64.b64encode(image.getvalue()).decode()
+        with self.captureOnCommitCallbacks(execute=True):
+            first_response = self.client.post(
+                reverse("view-list"), {"name": "first", "data": {}, "thumbnail": image_data}, format="json"
+            )
+        first_view = View.objects.get(pk=first_response.data["id"])
+        delete_storage = default_storage.delete
+
+        def save_view_and_delete(name):
+            # The second view shares the thumbnail while it is deleted
+            View.objects.create(name="second", data={}, thumbnail=name)
+            delete_storage(name)
+
+        # Act
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                reverse("view-list"), {"name": "third", "data": {}, "thumbnail": image_data}, format="json"
+            )
+        default_storage.delete(first_view.thumbnail.name)
+        for callback in callbacks:
+            callback()
+        kept_after_save = default_storage.exists(first_view.thumbnail.name)
+        View.objects.exclude(pk=first_view.pk).delete()
+        with mock.patch.object(default_storage, "delete", side_effect=save_view_and_delete):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("view-detail", kwargs={"pk": first_view.pk}))
+
+        # Assert
+        self.assertTrue(kept_after_save)
+        self.assertTrue(View.objects.filter(name="second", thumbnail=first_view.thumbnail.name).exists())
+        self.assertTrue(default_storage.exists(first_view.thumbnail.name))
+        with default_storage.open(first_view.thumbnail.name, "rb") as f:
+            self.assertEqual(f.read(), image.getvalue())
+
+    def test_legacy_thumbnails_share_variants(self):
+        """Test the variants of legacy thumbnails with the same image
+        are kept while a view references them."""
+        # Arrange
+        image = io.BytesIO()
+        Image.new("RGB", (400, 200), "yellow").save(image, format="PNG")
+        views = []
+        for i in range(2):
+            name = default_storage.save(f"thumbnails/view_{i}.png", io.BytesIO(image.getvalue()))
+            view = View.objects.create(name=f"legacy {i}", data={}, thumbnail=name)
+            generate_thumbnail_variants(view.pk, name)
+            view.refresh_from_db()
+            views.append(view)
+        variant_names = [
+            name
+            for size, variants in views[0].thumbnail_variants.items()
+            if size != "source"
+            for name in variants.values()
+        ]
+
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            views[0].delete()
+        kept_variants = [default_storage.exists(name) for name in variant_names]
+        with self.captureOnCommitCallbacks(execute=True):
+            views[1].delete()
+
+        # Assert
+        self.assertEqual(len(variant_names), 4)
+        self.assertFalse(default_storage.exists(views[0].thumbnail.name))
+        self.assertEqual(kept_variants, [True] * 4)
+        self.assertFalse(default_storage.exists(views[1].thumbnail.name))
+        self.assertFalse(any(default_storage.exists(name) for name in variant_names))
@@ -118,6 +118,7 @@ class BaseTestCase(TestCase):
                 view = View.objects.create(**self.views_data[i])
                 self.views_data[i]["id"] = view.id
                 self.views_data[i]["thumbnail"] = default_thumbnail
+                self.views_data[i]["update_timestamp"] = self.setup_ts_str
                 self.views.append(view)
 
             # Create views, store them in self.views
@@ -0,0 +1,225 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Variants of the thumbnails of the Views, in several sizes and formats.
+
+The thumbnails are uploaded at full size with the Views. Listing hundreds
+of Views with them downloads tens of MB, so smaller variants are generated
+in the background by the `generate_thumbnail_variants` task
+(see `ui_framework.tasks`) in WebP and, as a fallback, PNG.
+
+The variants are named after the hash of their source image, so they never
+change once stored and are served with long-lived cache headers by
+`ui_framework.views.thumbnail_variant`. The names of the variants of a View
+are stored in its `thumbnail_variants`, with the name of their source
+thumbnail, e.g. {"source": "thumbnails/<hash>.png",
+"small": {"webp": "thumbnails/variants/<hash>_small.webp", "png": ...}}.
+
+The thumbnails are also named after their hash, so the Views with the same
+thumbnail share its files. They are deleted by `release_thumbnail` once
+no View references them.
+"""
+
+import hashlib
+import io
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.fields.json import KeyTextTransform
+from django.urls import reverse
+from PIL import Image
+
+from ui_framework.models import View
+
+THUMBNAIL_VARIANTS_PREFIX = "thumbnails/variants/"
+"""Prefix of the names of the variants in the storage"""
+
+THUMBNAIL_VARIANT_SIZES = {"small": 320, "medium": 960}
+"""Maximum width and height in pixels of each variant"""
+
+THUMBNAIL_VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "png": ("PNG", "image/png", {"optimize": True}),
+}
+"""Pillow format, content type and save options of each variant format,
+the first one is preferred"""
+
+THUMBNAIL_VARIANT_NAME_PATTERN = re.compile(
+    rf"^[0-9a-f]{{32}}_({'|'.join(THUMBNAIL_VARIANT_SIZES)})\.({'|'.join(THUMBNAIL_VARIANT_FORMATS)})$"
+)
+"""Pattern of the file names of the variants"""
+
+
+def get_thumbnail_variant_url(name):
+    """Return the URL of a thumbnail variant.
+
+    Parameters
+    ----------
+    name : `str`
+        The name of the variant in the storage, or its URL
+        if it is stored in a remote storage
+
+    Returns
+    -------
+    `str`
+        The URL
+    """
+    if name.startswith("http"):
+        return name
+    return reverse("thumbnail-variant", kwargs={"name": name[len(THUMBNAIL_VARIANTS_PREFIX) :]})
+
+
+def create_thumbnail_variants(content):
+    """Create the variants of a thumbnail and store them.
+
+    The variants already stored, created from the same image,
+    are not created again.
+
+    Parameters
+    ----------
+    content : `bytes`
+        The thumbnail image
+
+    Returns
+    -------
+    `dict`
+        The names of the stored variants, indexed by size and format
+
+    Raises
+    ------
+    PIL.UnidentifiedImageError
+        If the content is not a valid image
+    """
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    image = Image.open(io.BytesIO(content))
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    variants = {}
+    for size, max_size in THUMBNAIL_VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        variants[size] = {}
+        for extension, (image_format, _, options) in THUMBNAIL_VARIANT_FORMATS.items():
+            name = f"{THUMBNAIL_VARIANTS_PREFIX}{digest}_{size}.{extension}"
+            if not default_storage.exists(name):
+                output = io.BytesIO()
+                resized.save(output, format=image_format, **options)
+                name = default_storage.save(name, ContentFile(output.getvalue()))
+            variants[size][extension] = name
+    return variants
+
+
+def keep_thumbnail(name, content):
+    """Store a thumbnail again if it is deleted while a View is saved with it.
+
+    `release_thumbnail` may delete a thumbnail found in the storage
+    before the View sharing it is committed, so the thumbnail is checked,
+    and stored again if missing, once the current transaction is committed.
+
+    Parameters
+    ----------
+    name : `str`
+        The name of the thumbnail
+    content : `bytes`
+        The thumbnail image
+    """
+    if not name or name.startswith("http") or content is None:
+        return
+    transaction.on_commit(lambda: _restore_thumbnail(name, content))
+
+
+def _restore_thumbnail(name, content):
+    """Store a thumbnail again under its name, unless it is stored."""
+    if default_storage.exists(name):
+        return
+    stored_name = default_storage.save(name, ContentFile(content))
+    # It was stored again concurrently under its name
+    if stored_name != name:
+        default_storage.delete(stored_name)
+
+
+def release_thumbnail(name, variants):
+    """Delete a thumbnail and its variants if no View references them anymore.
+
+    The references are counted once the current transaction is committed,
+    so the thumbnail is not deleted if a View referencing it is saved
+    in the same transaction. The variants are named after the content
+    of the thumbnail, so they are kept while a View with another thumbnail
+    name but the same image, e.g. a legacy "view_<id>.png", references them.
+
+    A View may be saved with the thumbnail, or its variants, between
+    the count of the references and the deletion, they are counted again
+    after the deletion and stored again if referenced, see also `keep_thumbnail`.
+
+    Parameters
+    ----------
+    name : `str`
+        The name of the thumbnail
+    variants : `dict`
+        The thumbnail variants of the View which referenced it
+    """
+    if not name or name.startswith("http"):
+        return
+    variant_lookups = {}
+    if variants.get("source") == name:
+        variant_lookups = {
+            variant_name: f"thumbnail_variants__{size}__{extension}"
+            for size, size_variants in variants.items()
+            if size != "source"
+            for extension, variant_name in size_variants.items()
+        }
+
+    def get_unreferenced_variants(variant_names):
+        # The variants of a View whose thumbnail changed since are outdated
+        current_variants = View.objects.annotate(
+            variants_source=KeyTextTransform("source", "thumbnail_variants")
+        ).filter(variants_source=F("thumbnail"))
+        return [
+            variant_name
+            for variant_name in variant_names
+            if not current_variants.filter(**{variant_lookups[variant_name]: variant_name}).exists()
+        ]
+
+    def delete_unreferenced_thumbnail():
+        if View.objects.filter(thumbnail=name).exists():
+            return
+        try:
+            with default_storage.open(name, "rb") as thumbnail:
+                content = thumbnail.read()
+        except FileNotFoundError:
+            content = None
+        deleted_variants = get_unreferenced_variants(variant_lookups)
+        for file_name in [name, *deleted_variants]:
+            default_storage.delete(file_name)
+
+        if content is None:
+            return
+        if View.objects.filter(thumbnail=name).exists():
+            _restore_thumbnail(name, content)
+        if get_unreferenced_variants(deleted_variants) != deleted_variants:
+            # Only the deleted variants are created again
+            create_thumbnail_variants(content)
+
+    transaction.on_commit(delete_unreferenced_thumbnail)
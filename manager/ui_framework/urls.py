@@ -36,12 +36,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from ui_framework.views import ViewViewSet, WorkspaceViewSet, WorkspaceViewViewSet
+from ui_framework.views import (
+    LayoutsView,
+    ViewViewSet,
+    WorkspaceViewSet,
+    WorkspaceViewViewSet,
+    thumbnail_variant,
+)
 
 router = DefaultRouter()
 router.register("workspaces", WorkspaceViewSet)
 router.register("views", ViewViewSet)
 router.register("workspaceviews", WorkspaceViewViewSet)
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("thumbnails/<str:name>", thumbnail_variant, name="thumbnail-variant"),
+    path("layouts/", LayoutsView.as_view(), name="layouts"),
+]
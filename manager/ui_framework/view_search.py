@@ -0,0 +1,259 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Search index of the Views, over their names and the component types
+and CSC names used in their data.
+
+The terms of each View are extracted when it is saved and stored in its
+`ViewSearchIndex`, so the searches do not load the data of the Views.
+With PostgreSQL the Views are matched and ranked with full-text search,
+by prefixes of the words, and trigram similarity, which tolerates typos.
+With other databases they are matched and ranked in the process
+with equivalent rules.
+"""
+
+import difflib
+import json
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q
+
+from ui_framework.models import ViewSearchIndex
+
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+"""Pattern of the terms of the search queries and the indexed words"""
+
+NAME_WEIGHT = 1.0
+"""Weight of the matches in the name of a View"""
+
+DATA_WEIGHT = 0.5
+"""Weight of the matches in the component types and CSC names of a View"""
+
+SIMILARITY_THRESHOLD = 0.6
+"""Minimum similarity of a term and a word to match them despite typos
+in the in-process search, as the default `pg_trgm.word_similarity_threshold`"""
+
+
+def get_view_search_terms(data):
+    """Return the component types and CSC names used in the data of a View.
+
+    The components are the nodes with a "content" string, e.g.
+    {"content": "CSCSummary", "config": {...}, "properties": {"type": "component"}}.
+    The CSCs are referenced in their configurations by objects
+    with a "name" and a "salindex", e.g. {"name": "ATDome", "salindex": 0},
+    or by a "csc", e.g. {"csc": "HVAC", "topic": "glycolSensor"}.
+
+    Parameters
+    ----------
+    data : `dict`, `str` or None
+        The data of the View, or its JSON serialization
+
+    Returns
+    -------
+    `tuple`
+        The sorted lists of component types and CSC names
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return [], []
+
+    components = set()
+    cscs = set()
+    nodes = [data]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, list):
+            nodes.extend(node)
+        elif isinstance(node, dict):
+            if isinstance(node.get("content"), str):
+                components.add(node["content"])
+            if isinstance(node.get("name"), str) and "salindex" in node:
+                cscs.add(node["name"])
+            if isinstance(node.get("csc"), str):
+                cscs.add(node["csc"])
+            nodes.extend(node.values())
+    return sorted(components), sorted(cscs)
+
+
+def update_view_search_index(view):
+    """Update the search terms of a View.
+
+    Parameters
+    ----------
+    view : `View`
+        The View
+    """
+    components, cscs = get_view_search_terms(view.data)
+    ViewSearchIndex.objects.update_or_create(
+        view=view,
+        defaults={
+            "name": view.name,
+            "components": components,
+            "cscs": cscs,
+            "document": " ".join([view.name, *components, *cscs]),
+        },
+    )
+
+
+def update_view_search_indexes(views):
+    """Update the search terms of several Views with a single query,
+    e.g. of the Views created or updated in bulk, which do not send signals.
+
+    Parameters
+    ----------
+    views : `list`
+        The Views
+    """
+    indexes = []
+    for view in views:
+        components, cscs = get_view_search_terms(view.data)
+        indexes.append(
+            ViewSearchIndex(
+                view=view,
+                name=view.name,
+                components=components,
+                cscs=cscs,
+                document=" ".join([view.name, *components, *cscs]),
+            )
+        )
+    ViewSearchIndex.objects.bulk_create(
+        indexes,
+        update_conflicts=True,
+        unique_fields=["view"],
+        update_fields=["name", "components", "cscs", "document"],
+    )
+
+
+def get_search_terms(query):
+    """Return the lowercase terms of a search query."""
+    return SEARCH_TERM_PATTERN.findall(query.lower())
+
+
+def _get_match_quality(term, words):
+    """Return how well a term matches the best of some words, from 0 to 1.
+
+    Equal words match best, followed by words starting with
+    and words containing the term, and by similar words.
+    """
+    quality = 0.0
+    for word in words:
+        if word == term:
+            return 1.0
+        if word.startswith(term):
+            quality = max(quality, 0.75)
+        elif term in word:
+            quality = max(quality, 0.5)
+        else:
+            similarity = difflib.SequenceMatcher(None, term, word).ratio()
+            if similarity >= SIMILARITY_THRESHOLD:
+                quality = max(quality, 0.4 * similarity)
+    return quality
+
+
+def rank_views_in_process(terms):
+    """Return the ids of the Views matching all the search terms, best ranked first.
+
+    Parameters
+    ----------
+    terms : `list`
+        The lowercase search terms
+
+    Returns
+    -------
+    `list`
+        The ids of the Views
+    """
+    ranks = []
+    for view_id, name, components, cscs, update_timestamp in ViewSearchIndex.objects.values_list(
+        "view_id", "name", "components", "cscs", "view__update_timestamp"
+    ):
+        name_words = get_search_terms(name)
+        data_words = get_search_terms(" ".join([*components, *cscs]))
+        rank = 0.0
+        for term in terms:
+            term_rank = max(
+                NAME_WEIGHT * _get_match_quality(term, name_words),
+                DATA_WEIGHT * _get_match_quality(term, data_words),
+            )
+            if term_rank == 0:
+                break
+            rank += term_rank
+        else:
+            ranks.append((rank, update_timestamp, view_id))
+    ranks.sort(reverse=True)
+    return [view_id for _, _, view_id in ranks]
+
+
+def rank_views_in_database(terms):
+    """Return the ids of the Views matching all the search terms, best ranked first,
+    using PostgreSQL full-text search and trigram similarity.
+
+    Parameters
+    ----------
+    terms : `list`
+        The lowercase search terms
+
+    Returns
+    -------
+    `list`
+        The ids of the Views
+    """
+    vector = SearchVector("name", weight="A", config="simple") + SearchVector(
+        "components", "cscs", weight="C", config="simple"
+    )
+    # Match the words starting with each of the terms
+    prefix_query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config="simple")
+    similarity_match = Q()
+    for term in terms:
+        similarity_match &= Q(document__trigram_word_similar=term)
+    indexes = (
+        ViewSearchIndex.objects.annotate(
+            search=vector,
+            rank=SearchRank(vector, prefix_query) + TrigramWordSimilarity(" ".join(terms), "document"),
+        )
+        .filter(Q(search=prefix_query) | similarity_match)
+        .order_by(F("rank").desc(), F("view__update_timestamp").desc())
+    )
+    return list(indexes.values_list("view_id", flat=True))
+
+
+def search_views(query):
+    """Return the ids of the Views matching a search query, best ranked first.
+
+    Parameters
+    ----------
+    query : `str`
+        The search query, e.g. "dome summary"
+
+    Returns
+    -------
+    `list`
+        The ids of the Views, or None if the query has no terms
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return None
+    if connection.vendor == "postgresql":
+        return rank_views_in_database(terms)
+    return rank_views_in_process(terms)
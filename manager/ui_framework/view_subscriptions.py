@@ -0,0 +1,117 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Extraction of the subscriptions of the Views.
+
+The components of a View subscribe to the `category-csc-salindex-stream`
+groups implied by their configurations. The subscriptions are extracted
+when a View is saved and stored in its `subscriptions`, so the clients can
+subscribe to all of them with a single message (see
+`subscription.consumers.SubscriptionConsumer.handle_subscription_message`).
+
+Only the subscriptions that can be read from the data are extracted:
+
+- Streams referenced explicitly, e.g. by the inputs of the plots:
+  {"category": "telemetry", "csc": "HVAC", "salindex": 0, "topic": "glycolSensor"}
+- The `CSC_REFERENCE_STREAMS` of the CSCs referenced by the components,
+  e.g. by the CSC summaries: {"name": "ATDome", "salindex": 0}
+- The `COMPONENT_STREAMS` of the components configured with a `salindex`
+"""
+
+import json
+
+SUBSCRIPTION_CATEGORIES = ("event", "telemetry")
+"""Categories of the streams the components subscribe to"""
+
+CSC_REFERENCE_STREAMS = [("event", "summaryState")]
+"""Streams subscribed for each CSC referenced by a component,
+as (category, stream)"""
+
+COMPONENT_STREAMS = {
+    "ScriptQueue": [
+        ("event", "ScriptQueueState", "stream"),
+        ("event", "ScriptQueue", "summaryState"),
+    ],
+}
+"""Streams subscribed by the components configured with a `salindex`,
+as (category, csc, stream), indexed by component type"""
+
+
+def _get_salindex(node):
+    """Return the salindex of a node as a string, or None if it is not valid."""
+    salindex = node.get("salindex")
+    if isinstance(salindex, bool) or not isinstance(salindex, (int, str)) or not str(salindex).isdigit():
+        return None
+    return str(salindex)
+
+
+def get_view_subscriptions(data):
+    """Return the subscriptions implied by the data of a View.
+
+    Parameters
+    ----------
+    data : `dict`, `str` or None
+        The data of the View, or its JSON serialization
+
+    Returns
+    -------
+    `list`
+        The sorted [category, csc, salindex, stream] of each subscription,
+        e.g. [["event", "ATDome", "0", "summaryState"]]
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return []
+
+    subscriptions = set()
+    nodes = [data]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, list):
+            nodes.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        nodes.extend(node.values())
+
+        salindex = _get_salindex(node)
+        stream = node.get("topic", node.get("stream"))
+        if salindex is not None:
+            if (
+                node.get("category") in SUBSCRIPTION_CATEGORIES
+                and isinstance(node.get("csc"), str)
+                and isinstance(stream, str)
+            ):
+                subscriptions.add((node["category"], node["csc"], salindex, stream))
+            if isinstance(node.get("name"), str):
+                for category, csc_stream in CSC_REFERENCE_STREAMS:
+                    subscriptions.add((category, node["name"], salindex, csc_stream))
+
+        content = node.get("content")
+        component_streams = COMPONENT_STREAMS.get(content) if isinstance(content, str) else None
+        config = node.get("config")
+        if component_streams and isinstance(config, dict):
+            config_salindex = _get_salindex(config)
+            if config_salindex is not None:
+                for category, csc, csc_stream in component_streams:
+                    subscriptions.add((category, csc, config_salindex, csc_stream))
+    return [list(subscription) for subscription in sorted(subscriptions)]
@@ -20,12 +20,31 @@
 
 """Defines the views exposed by the REST API exposed by this app."""
 
+import json
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status, viewsets
+from manager.mixins import ConditionalGetMixin
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from ui_framework.json_patch import JsonPatchConflict, JsonPatchError, apply_patch
+from ui_framework.layouts import (
+    LayoutsExportError,
+    LayoutsImportError,
+    aexport_layouts,
+    check_layouts_export,
+    import_layouts,
+)
 from ui_framework.models import View, Workspace, WorkspaceView
 from ui_framework.serializers import (
     ViewSerializer,
@@ -33,11 +52,23 @@ from ui_framework.serializers import (
     WorkspaceFullSerializer,
     WorkspaceSerializer,
     WorkspaceViewSerializer,
+    WorkspaceViewsUpdateSerializer,
     WorkspaceWithViewNameSerializer,
 )
+from ui_framework.thumbnails import (
+    THUMBNAIL_VARIANT_FORMATS,
+    THUMBNAIL_VARIANT_NAME_PATTERN,
+    THUMBNAIL_VARIANTS_PREFIX,
+)
+from ui_framework.view_search import search_views
+from ui_framework.workspace_cache import (
+    get_workspace_full_data,
+    get_workspaces_with_view_name_data,
+    invalidate_workspaces,
+)
 
 
-class WorkspaceViewSet(viewsets.ModelViewSet):
+class WorkspaceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances the Workspace model."""
 
     queryset = Workspace.objects.all()
@@ -46,6 +77,10 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
     serializer_class = WorkspaceSerializer
     """Serializer used to serialize Workspace objects"""
 
+    def get_related_conditional_querysets(self, queryset):
+        """The serialized Workspaces include the ids of their views."""
+        return [WorkspaceView.objects.filter(workspace__in=queryset)]
+
     @swagger_auto_schema(
         method="get",
         responses={200: openapi.Response("Response", WorkspaceFullSerializer)},
@@ -67,13 +102,50 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             The response containing the serialized Workspaces,
             with the views fully subserialized
         """
-        try:
-            workspace = Workspace.objects.get(pk=pk)
-        except Workspace.DoesNotExist:
+        data = get_workspace_full_data(pk)
+        if data is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
 
-        serializer = WorkspaceFullSerializer(workspace)
-        return Response(serializer.data)
+    @swagger_auto_schema(
+        method="put",
+        request_body=WorkspaceViewsUpdateSerializer,
+        responses={200: openapi.Response("Response", ViewSummarySerializer(many=True))},
+    )
+    @action(detail=True, methods=["put"], url_path="views", url_name="views")
+    def update_views(self, request, pk=None):
+        """Add, remove and reorder the views of a Workspace in one request.
+
+        Params
+        ------
+        request: Request
+            The Requets object, with the changes, e.g. {"order": [3, 1, 5],
+            "add": [{"view": 5, "view_name": "Dome"}], "remove": [2]}
+        pk: int
+            The corresponding Workspace pk
+
+        Returns
+        -------
+        Response
+            The response containing the summarized views of the Workspace,
+            sorted, or 400 if the changes are not valid
+        """
+        workspace = self.get_object()
+        serializer = WorkspaceViewsUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+        try:
+            workspace.update_views(
+                order=changes.get("order"),
+                add=[(added["view"], added["view_name"]) for added in changes.get("add", [])],
+                remove=changes.get("remove"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The bulk changes do not send the signals invalidating the cached Workspaces
+        invalidate_workspaces()
+        return Response(ViewSummarySerializer(workspace.get_sorted_views(), many=True).data)
 
     @swagger_auto_schema(
         method="get",
@@ -95,12 +167,21 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             The response containing the serialized Workspaces,
             but returning a list of dicts with each view's id and name
         """
-        workspaces = Workspace.objects.all()
-        serializer = WorkspaceWithViewNameSerializer(workspaces, many=True)
-        return Response(serializer.data)
+        return Response(get_workspaces_with_view_name_data())
 
 
-class ViewViewSet(viewsets.ModelViewSet):
+class ViewSearchPagination(PageNumberPagination):
+    """Pagination of the Views search results."""
+
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        """Set the page sizes from the settings."""
+        self.page_size = settings.VIEW_SEARCH_PAGE_SIZE
+        self.max_page_size = settings.VIEW_SEARCH_MAX_PAGE_SIZE
+
+
+class ViewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances the View model."""
 
     queryset = View.objects.order_by("-update_timestamp").all()
@@ -109,10 +190,34 @@ class ViewViewSet(viewsets.ModelViewSet):
     serializer_class = ViewSerializer
     """Serializer used to serialize View objects"""
 
-    @swagger_auto_schema(method="get", responses={200: openapi.Response("Response", ViewSerializer)})
+    @swagger_auto_schema(
+        method="get",
+        manual_parameters=[
+            openapi.Parameter(
+                "query",
+                openapi.IN_QUERY,
+                description="Terms searched in the names, component types and CSC names of the Views",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "full",
+                openapi.IN_QUERY,
+                description="Whether to include the data of the Views",
+                type=openapi.TYPE_BOOLEAN,
+            ),
+            openapi.Parameter("page", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: openapi.Response("Response", ViewSummarySerializer(many=True))},
+    )
     @action(detail=False)
     def search(self, request):
-        """Serialize Views containing the query string.
+        """Serialize a page of the Views matching the query string, best ranked first.
+
+        The Views are matched by their names and the component types
+        and CSC names used in their data, see `ui_framework.view_search`.
+        Without query all the Views are listed, the last updated first.
+        The Views are serialized without their data unless `full=true`.
 
         Params
         ------
@@ -122,16 +227,22 @@ class ViewViewSet(viewsets.ModelViewSet):
         Returns
         -------
         Response
-            The response containing the serialized Views.
+            The response containing the page of serialized Views.
         """
+        view_ids = search_views(request.query_params.get("query", ""))
+        if view_ids is None:
+            view_ids = list(View.objects.order_by("-update_timestamp").values_list("id", flat=True))
 
-        views = View.objects.order_by("-update_timestamp").all()
-        query = self.request.query_params.get("query", None)
-        if query is not None:
-            views = views.filter(name__icontains=query)
-
-        serializer = ViewSerializer(views, many=True)
-        return Response(serializer.data)
+        paginator = ViewSearchPagination()
+        page = paginator.paginate_queryset(view_ids, request, view=self)
+        if request.query_params.get("full", "false").lower() == "true":
+            views = View.objects.in_bulk(page)
+            serializer_class = ViewSerializer
+        else:
+            views = View.objects.defer("data").in_bulk(page)
+            serializer_class = ViewSummarySerializer
+        serializer = serializer_class([views[view_id] for view_id in page if view_id in views], many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(method="get", responses={200: openapi.Response("Response", ViewSerializer)})
     @action(detail=False)
@@ -145,12 +256,106 @@ class ViewViewSet(viewsets.ModelViewSet):
             The response containing the serialized Views.
         """
 
-        views = View.objects.order_by("-update_timestamp").all()
+        views = View.objects.order_by("-update_timestamp").defer("data")
         serializer = ViewSummarySerializer(views, many=True)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        method="patch",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "update_timestamp": openapi.Schema(
+                    type=openapi.TYPE_STRING, description="Last Updated time of the edited version"
+                ),
+                "operations": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                    description="JSON Patch operations (RFC 6902)",
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response("The new version of the View"),
+            400: openapi.Response("Invalid JSON Patch"),
+            409: openapi.Response("The View was edited by someone else or a test operation failed"),
+        },
+    )
+    @action(detail=True, methods=["patch"], url_path="data")
+    def patch_data(self, request, pk=None):
+        """Apply a JSON Patch (RFC 6902) to the data of a View.
+
+        The View is locked while the patch is applied. The patch is only
+        applied if the View was not edited since the version given by
+        its "update_timestamp", as sent with the View, and the thumbnail
+        is not modified.
+
+        Params
+        ------
+        request: Request
+            The Requets object, with the "operations" and
+            the "update_timestamp" of the edited version
+        pk: int
+            The corresponding View pk
+
+        Returns
+        -------
+        Response
+            The response containing the id and the "update_timestamp"
+            of the new version of the View
+        """
+        timestamp_field = serializers.DateTimeField()
+        try:
+            update_timestamp = timestamp_field.to_internal_value(request.data.get("update_timestamp"))
+        except serializers.ValidationError:
+            return Response(
+                {"error": "A valid update_timestamp is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            try:
+                view = View.objects.select_for_update().get(pk=pk)
+            except View.DoesNotExist:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+
+            current_timestamp = timestamp_field.to_representation(view.update_timestamp)
+            if view.update_timestamp != update_timestamp:
+                return Response(
+                    {
+                        "error": "The View was edited since this version",
+                        "update_timestamp": current_timestamp,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            # Some Views store their data serialized as a string
+            data_is_string = isinstance(view.data, str)
+            try:
+                data = apply_patch(
+                    json.loads(view.data) if data_is_string else view.data,
+                    request.data.get("operations"),
+                )
+            except JsonPatchConflict as e:
+                return Response(
+                    {"error": str(e), "update_timestamp": current_timestamp},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            except JsonPatchError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class WorkspaceViewViewSet(viewsets.ModelViewSet):
+            view.data = json.dumps(data) if data_is_string else data
+            view.save(update_fields=["data", "subscriptions", "update_timestamp"])
+
+        return Response(
+            {
+                "id": view.id,
+                "update_timestamp": timestamp_field.to_representation(view.update_timestamp),
+            }
+        )
+
+
+class WorkspaceViewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """GET, POST, PUT, PATCH or DELETE instances the WorkspaceView model."""
 
     queryset = WorkspaceView.objects.all()
@@ -158,3 +363,111 @@ class WorkspaceViewViewSet(viewsets.ModelViewSet):
 
     serializer_class = WorkspaceViewSerializer
     """Serializer used to serialize View objects"""
+
+
+@require_GET
+def thumbnail_variant(request, name):
+    """Serve a thumbnail variant, see `ui_framework.thumbnails`.
+
+    The variants are named after the hash of their source image,
+    so they never change and can be cached indefinitely by the clients.
+    Like the other media files, they do not require authentication.
+
+    Params
+    ------
+    request: Request
+        The Request object
+    name: str
+        The file name of the variant, e.g. "<hash>_small.webp"
+
+    Returns
+    -------
+    FileResponse
+        The image, or 404 if it does not exist
+    """
+    match = THUMBNAIL_VARIANT_NAME_PATTERN.match(name)
+    if not match or not default_storage.exists(THUMBNAIL_VARIANTS_PREFIX + name):
+        raise Http404("Thumbnail variant not found")
+    response = FileResponse(
+        default_storage.open(THUMBNAIL_VARIANTS_PREFIX + name, "rb"),
+        content_type=THUMBNAIL_VARIANT_FORMATS[match.group(2)][1],
+    )
+    response["Cache-Control"] = f"public, max-age={settings.THUMBNAIL_VARIANTS_CACHE_MAX_AGE}, immutable"
+    return response
+
+
+class LayoutsPermission(BasePermission):
+    """Permission class to check if the user can export the layouts,
+    or import them with unsafe methods."""
+
+    def has_permission(self, request, view):
+        """Return True if the user has the view permissions of the
+        Workspaces, Views and WorkspaceViews, or the add and change
+        permissions for unsafe methods."""
+        actions = ("view",) if request.method in SAFE_METHODS else ("add", "change")
+        return request.user.has_perms(
+            [
+                f"ui_framework.{action}_{model}"
+                for action in actions
+                for model in ("view", "workspace", "workspaceview")
+            ]
+        )
+
+
+class LayoutsView(APIView):
+    """Export and import the Workspaces, Views and WorkspaceViews
+    as NDJSON, see `ui_framework.layouts`."""
+
+    permission_classes = (IsAuthenticated, LayoutsPermission)
+
+    @swagger_auto_schema(
+        responses={
+            200: openapi.Response("NDJSON export of the layouts"),
+            409: openapi.Response("Several Views or Workspaces have the same name"),
+        }
+    )
+    def get(self, request):
+        """Stream the export of the layouts.
+
+        Params
+        ------
+        request: Request
+            The Request object
+
+        Returns
+        -------
+        StreamingHttpResponse
+            The NDJSON export, one record per line, or 409 if several
+            Views or Workspaces have the same name, checked before streaming
+        """
+        try:
+            check_layouts_export()
+        except LayoutsExportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        response = StreamingHttpResponse(aexport_layouts(), content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="layouts.ndjson"'
+        return response
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(type=openapi.TYPE_STRING, description="NDJSON export of the layouts"),
+        responses={200: openapi.Response("Number of created, updated and unchanged rows of each model")},
+    )
+    def post(self, request):
+        """Import the layouts from an NDJSON export, read line by line.
+
+        Params
+        ------
+        request: Request
+            The Request object, with the export as body
+
+        Returns
+        -------
+        Response
+            The number of created, updated and unchanged rows of each model,
+            or 400 if a record is not valid, in which case nothing is imported
+        """
+        try:
+            summary = import_layouts(request.stream or [])
+        except LayoutsImportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary)
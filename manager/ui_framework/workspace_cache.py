@@ -0,0 +1,95 @@
+# This file is part of LOVE-manager.
+#
+# Copyright (c) 2023 Inria Chile.
+#
+# Developed by Inria Chile.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or at
+# your option any later version.
+#
+# This program is distributed in the hope that it will be useful,but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Cache of the serialized Workspaces loaded by the frontend.
+
+The documents are cached under a generation that is changed whenever a
+Workspace, View or WorkspaceView changes, see `ui_framework.signals`.
+A document serialized while the data changes is stored under
+the previous generation, so it is never served.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ui_framework.models import Workspace
+from ui_framework.serializers import WorkspaceFullSerializer, WorkspaceWithViewNameSerializer
+
+WORKSPACES_GENERATION_KEY = "ui-framework-workspaces-generation"
+"""Cache key of the generation of the cached Workspaces"""
+
+
+def get_workspaces_generation():
+    """Return the generation of the cached Workspaces.
+
+    Returns
+    -------
+    `int`
+        The current generation
+    """
+    return cache.get_or_set(WORKSPACES_GENERATION_KEY, time.time_ns, None)
+
+
+def invalidate_workspaces():
+    """Invalidate the cached Workspaces."""
+    cache.set(WORKSPACES_GENERATION_KEY, time.time_ns(), None)
+
+
+def get_workspace_full_data(pk):
+    """Return a Workspace with its views fully subserialized.
+
+    Parameters
+    ----------
+    pk : `int`
+        The Workspace pk
+
+    Returns
+    -------
+    `dict` or `None`
+        The serialized Workspace, or None if it does not exist
+    """
+    cache_key = f"ui-framework-workspace-full-{get_workspaces_generation()}-{pk}"
+    data = cache.get(cache_key)
+    if data is None:
+        workspace = Workspace.objects.prefetch_related("views").filter(pk=pk).first()
+        if workspace is None:
+            return None
+        data = WorkspaceFullSerializer(workspace).data
+        cache.set(cache_key, data, settings.WORKSPACES_CACHE_TTL)
+    return data
+
+
+def get_workspaces_with_view_name_data():
+    """Return all the Workspaces with the ids and names of their views.
+
+    Returns
+    -------
+    `list`
+        The serialized Workspaces
+    """
+    cache_key = f"ui-framework-workspaces-with-view-name-{get_workspaces_generation()}"
+    data = cache.get(cache_key)
+    if data is None:
+        workspaces = Workspace.objects.prefetch_related("views")
+        data = WorkspaceWithViewNameSerializer(workspaces, many=True).data
+        cache.set(cache_key, data, settings.WORKSPACES_CACHE_TTL)
+    return data